@@ -1,7 +1,10 @@
 from collections import Counter
+from datetime import timedelta
 
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from . import bar_cache
 from .instrument import normalize_instrument
 from .models import MarketBar
 from .model_version import BASECALC_MODEL_VERSION
@@ -21,33 +24,21 @@ def run_basecalc_backtest(
     write=False,
     model_version=None,
 ) -> dict:
-    queryset = MarketBar.objects.filter(
-        symbol=symbol,
-        timeframe=timeframe,
-        instrument_key=instrument_key,
-    ).order_by("timestamp")
-    if date_from:
-        queryset = queryset.filter(timestamp__date__gte=date_from)
-    if date_to:
-        queryset = queryset.filter(timestamp__date__lte=date_to)
-    if limit:
-        queryset = queryset[: int(limit)]
-    bars = list(queryset)
+    history = _load_history(symbol, instrument_key, timeframe, date_from, date_to, limit)
     skip_reasons = Counter()
-    if len(bars) < min_bars:
+    if len(history["closes"]) < min_bars:
         skip_reasons["insufficient_bars"] = 1
         return _result(0, 0, 0, skip_reasons)
 
     created = 0
     evaluated = 0
-    for index in range(min_bars - 1, len(bars)):
-        window = bars[: index + 1]
-        current_bar = window[-1]
-        snapshot = _snapshot_from_bars(window, symbol, instrument_key)
+    for index in range(min_bars - 1, len(history["closes"])):
+        bar_timestamp = history["bar_timestamps"][index]
+        snapshot = _snapshot_from_history(history, index + 1, symbol, instrument_key)
         world_model = build_world_model(
-            current_bar.close,
+            history["closes"][index],
             snapshot,
-            as_of=current_bar.timestamp,
+            as_of=bar_timestamp,
         )
         if model_version:
             world_model["model_version"] = model_version
@@ -58,7 +49,7 @@ def run_basecalc_backtest(
         if write:
             prediction = save_prediction(
                 world_model,
-                prediction_timestamp=current_bar.timestamp,
+                prediction_timestamp=bar_timestamp,
                 is_backtest=True,
                 min_interval_minutes=None,
             )
@@ -70,8 +61,62 @@ def run_basecalc_backtest(
     return _result(evaluated, created, evaluated - created, skip_reasons, model_version=model_version)
 
 
-def _snapshot_from_bars(bars, symbol, instrument_key):
-    source = bars[-1].source or "unknown"
+def _as_date(value):
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def _load_history(symbol, instrument_key, timeframe, date_from, date_to, limit):
+    """対象期間のバーを列ごとのリストで返す。各時点の窓は先頭からのスライスで作る。"""
+    try:
+        series = bar_cache.load_bar_series(symbol=symbol, timeframe=timeframe, instrument_key=instrument_key)
+    except OSError:
+        return _load_history_from_db(symbol, instrument_key, timeframe, date_from, date_to, limit)
+    if series is None:
+        return {
+            key: []
+            for key in ("opens", "highs", "lows", "closes", "volumes", "timestamps", "sources", "bar_timestamps")
+        }
+    # timestamp__date と同じく現在のタイムゾーンの日付で区切る
+    start = series.index_before(_as_date(date_from)) if date_from else 0
+    stop = series.index_before(_as_date(date_to) + timedelta(days=1)) if date_to else len(series)
+    if limit:
+        stop = min(stop, start + int(limit))
+    stop = max(start, stop)
+    return {
+        **series.frame(start, stop),
+        "sources": [series.source_at(index) for index in range(start, stop)],
+        "bar_timestamps": [series.timestamp_at(index) for index in range(start, stop)],
+    }
+
+
+def _load_history_from_db(symbol, instrument_key, timeframe, date_from, date_to, limit):
+    queryset = MarketBar.objects.filter(
+        symbol=symbol,
+        timeframe=timeframe,
+        instrument_key=instrument_key,
+    ).order_by("timestamp")
+    if date_from:
+        queryset = queryset.filter(timestamp__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(timestamp__date__lte=date_to)
+    if limit:
+        queryset = queryset[: int(limit)]
+    bars = list(queryset)
+    return {
+        "opens": [bar.open or bar.close for bar in bars],
+        "highs": [bar.high or bar.close for bar in bars],
+        "lows": [bar.low or bar.close for bar in bars],
+        "closes": [bar.close for bar in bars],
+        "volumes": [bar.volume or 0 for bar in bars],
+        "timestamps": [int(bar.timestamp.timestamp()) for bar in bars],
+        "sources": [bar.source for bar in bars],
+        "bar_timestamps": [bar.timestamp for bar in bars],
+    }
+
+
+def _snapshot_from_history(history, stop, symbol, instrument_key):
+    closes = history["closes"][:stop]
+    source = history["sources"][stop - 1] or "unknown"
     instrument = normalize_instrument(symbol, source)
     if instrument["instrument_key"] != instrument_key:
         instrument["instrument_key"] = instrument_key
@@ -80,21 +125,21 @@ def _snapshot_from_bars(bars, symbol, instrument_key):
         "source": source if instrument_key == "cme_nikkei_futures" else "stooq",
         "instrument_key": instrument["instrument_key"],
         "instrument_type": instrument["instrument_type"],
-        "price": bars[-1].close,
-        "previous_close": bars[-2].close if len(bars) >= 2 else bars[-1].close,
+        "price": closes[-1],
+        "previous_close": closes[-2] if len(closes) >= 2 else closes[-1],
         "change_pct": (
-            ((bars[-1].close - bars[-2].close) / bars[-2].close) * 100
-            if len(bars) >= 2 and bars[-2].close
+            ((closes[-1] - closes[-2]) / closes[-2]) * 100
+            if len(closes) >= 2 and closes[-2]
             else 0
         ),
-        "opens": [bar.open or bar.close for bar in bars],
-        "highs": [bar.high or bar.close for bar in bars],
-        "lows": [bar.low or bar.close for bar in bars],
-        "closes": [bar.close for bar in bars],
-        "volumes": [bar.volume or 0 for bar in bars],
-        "timestamps": [int(bar.timestamp.timestamp()) for bar in bars],
+        "opens": history["opens"][:stop],
+        "highs": history["highs"][:stop],
+        "lows": history["lows"][:stop],
+        "closes": closes,
+        "volumes": history["volumes"][:stop],
+        "timestamps": history["timestamps"][:stop],
         "fetched_at": timezone.now(),
-        "bar_timestamp": bars[-1].timestamp,
+        "bar_timestamp": history["bar_timestamps"][stop - 1],
         "fallback_used": instrument_key != "cme_nikkei_futures",
     }
 
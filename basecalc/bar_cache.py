@@ -0,0 +1,274 @@
+"""MarketBar 履歴の列指向バイナリキャッシュ。
+
+絞り込み条件ごとに 1 ファイルを持ち、ヘッダに行数・最初と最後の時刻などの目印を置く。
+本体は時刻・OHLCV・ソース番号を列ごとに詰めた固定幅配列で、読み手は mmap した
+memoryview をそのまま受け取るので ORM オブジェクトを作らない。
+OHLCV は MarketBar を読む側の慣習どおり open/high/low の欠損を close、volume の欠損を 0 で埋めて保存する。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import MarketBar
+
+
+CACHE_VERSION = 1
+HEADER = struct.Struct("<4sHHqqqI")
+MAGIC = b"MBAR"
+FLOAT_COLUMNS = ("opens", "highs", "lows", "closes", "volumes")
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class BarSeries:
+    """時刻昇順に並んだバー列。各列は mmap 上の memoryview。"""
+
+    def __init__(self, meta, columns):
+        self.filters = meta["filters"]
+        self.sources = meta["sources"]
+        self.watermark = meta["watermark"]
+        self.timestamp_us = columns["timestamp_us"]
+        self.timestamps = columns["timestamps"]
+        self.opens = columns["opens"]
+        self.highs = columns["highs"]
+        self.lows = columns["lows"]
+        self.closes = columns["closes"]
+        self.volumes = columns["volumes"]
+        self.source_ids = columns["source_ids"]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def index_before(self, as_of):
+        """as_of より前 (timestamp < as_of) のバー数。"""
+        return bisect_left(self.timestamp_us, to_epoch_us(as_of))
+
+    def frame(self, start=0, stop=None):
+        """start..stop のバーを snapshot の OHLCV リスト形式で返す。"""
+        stop = len(self) if stop is None else stop
+        return {
+            "opens": self.opens[start:stop].tolist(),
+            "highs": self.highs[start:stop].tolist(),
+            "lows": self.lows[start:stop].tolist(),
+            "closes": self.closes[start:stop].tolist(),
+            "volumes": self.volumes[start:stop].tolist(),
+            "timestamps": self.timestamps[start:stop].tolist(),
+        }
+
+    def timestamp_at(self, index):
+        return EPOCH + timedelta(microseconds=self.timestamp_us[index])
+
+    def source_at(self, index):
+        return self.sources[self.source_ids[index]]
+
+
+def cache_dir():
+    return Path(settings.MARKET_BAR_CACHE_DIR)
+
+
+def to_epoch_us(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _cache_path(filters):
+    key = json.dumps(filters, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return cache_dir() / f"{filters.get('timeframe', 'all')}-{digest}.bars"
+
+
+def _watermark(filters):
+    values = MarketBar.objects.filter(**filters).aggregate(
+        count=Count("id"),
+        first=Min("timestamp"),
+        last=Max("timestamp"),
+        created=Max("created_at"),
+        open_sum=Sum("open"),
+        high_sum=Sum("high"),
+        low_sum=Sum("low"),
+        close_sum=Sum("close"),
+        volume_sum=Sum("volume"),
+    )
+    return {
+        "count": values["count"],
+        "first_us": to_epoch_us(values["first"]) if values["first"] else 0,
+        "last_us": to_epoch_us(values["last"]) if values["last"] else 0,
+        # 値だけの更新や、行数と期間が偶然一致する入れ替わりも見分ける。
+        # MarketBar には updated_at が無いので、refresh_bar_caches を通らない書き換えは各列の合計で気付く
+        "created": values["created"].isoformat() if values["created"] else "",
+        **{
+            key: round(values[key] or 0.0, 6)
+            for key in ("open_sum", "high_sum", "low_sum", "close_sum", "volume_sum")
+        },
+    }
+
+
+def _filled(value, close):
+    return value if value else close
+
+
+def _rows_from_db(filters, since_us=None):
+    queryset = MarketBar.objects.filter(**filters)
+    if since_us is not None:
+        queryset = queryset.filter(timestamp__gte=EPOCH + timedelta(microseconds=since_us))
+    return queryset.order_by("timestamp").values_list(
+        "timestamp", "open", "high", "low", "close", "volume", "source",
+    )
+
+
+def _empty_columns():
+    return {
+        "timestamp_us": [],
+        "timestamps": [],
+        "opens": [],
+        "highs": [],
+        "lows": [],
+        "closes": [],
+        "volumes": [],
+        "source_ids": [],
+    }
+
+
+def _append_rows(columns, sources, rows):
+    source_positions = {source: position for position, source in enumerate(sources)}
+    for timestamp, open_, high, low, close, volume, source in rows:
+        if source not in source_positions:
+            source_positions[source] = len(sources)
+            sources.append(source)
+        columns["timestamp_us"].append(to_epoch_us(timestamp))
+        columns["timestamps"].append(int(timestamp.timestamp()))
+        columns["opens"].append(_filled(open_, close))
+        columns["highs"].append(_filled(high, close))
+        columns["lows"].append(_filled(low, close))
+        columns["closes"].append(close)
+        columns["volumes"].append(volume or 0.0)
+        columns["source_ids"].append(source_positions[source])
+
+
+def _write(path, filters, sources, columns, watermark):
+    meta = json.dumps(
+        {"filters": filters, "sources": sources, "watermark": watermark},
+        sort_keys=True,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    meta += b" " * (-(HEADER.size + len(meta)) % 8)
+    header = HEADER.pack(
+        MAGIC,
+        CACHE_VERSION,
+        0,
+        watermark["count"],
+        watermark["first_us"],
+        watermark["last_us"],
+        len(meta),
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with temp_path.open("wb") as cache_file:
+        cache_file.write(header)
+        cache_file.write(meta)
+        array("q", columns["timestamp_us"]).tofile(cache_file)
+        array("q", columns["timestamps"]).tofile(cache_file)
+        for name in FLOAT_COLUMNS:
+            array("d", columns[name]).tofile(cache_file)
+        array("H", columns["source_ids"]).tofile(cache_file)
+    os.replace(temp_path, path)
+
+
+def _open(path):
+    try:
+        with path.open("rb") as cache_file:
+            mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    if len(mapped) < HEADER.size:
+        return None
+    magic, version, _, count, _, _, meta_length = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != CACHE_VERSION:
+        return None
+    meta = json.loads(bytes(mapped[HEADER.size:HEADER.size + meta_length]))
+    view = memoryview(mapped)
+    offset = HEADER.size + meta_length
+    columns = {}
+    for name, code, width in (
+        ("timestamp_us", "q", 8),
+        ("timestamps", "q", 8),
+        *((name, "d", 8) for name in FLOAT_COLUMNS),
+        ("source_ids", "H", 2),
+    ):
+        columns[name] = view[offset:offset + count * width].cast(code)
+        offset += count * width
+    if offset != len(mapped):
+        return None
+    return BarSeries(meta, columns)
+
+
+def _to_columns(series):
+    columns = {name: getattr(series, name).tolist() for name in ("timestamp_us", "timestamps", *FLOAT_COLUMNS)}
+    columns["source_ids"] = series.source_ids.tolist()
+    return columns
+
+
+def _rebuild(filters, watermark):
+    columns = _empty_columns()
+    sources = []
+    _append_rows(columns, sources, _rows_from_db(filters))
+    path = _cache_path(filters)
+    _write(path, filters, sources, columns, watermark)
+    return _open(path)
+
+
+def load_bar_series(**filters):
+    """filters に一致する MarketBar を BarSeries で返す。キャッシュが古ければ作り直す。"""
+    filters = {key: value for key, value in filters.items() if value is not None}
+    watermark = _watermark(filters)
+    if not watermark["count"]:
+        return None
+    series = _open(_cache_path(filters))
+    if series is not None and series.watermark == watermark:
+        return series
+    return _rebuild(filters, watermark)
+
+
+def _matches(filters, row):
+    return all(row.get(key) == value for key, value in filters.items())
+
+
+def refresh_bar_caches(rows):
+    """保存したバーに関係するキャッシュを、最も古い変更時刻以降だけ DB から読み直して更新する。"""
+    rows = [row for row in rows if row.get("timestamp") is not None]
+    if not rows or not cache_dir().is_dir():
+        return 0
+    refreshed = 0
+    for path in cache_dir().glob("*.bars"):
+        series = _open(path)
+        if series is None:
+            continue
+        changed = [row for row in rows if _matches(series.filters, row)]
+        if not changed:
+            continue
+        since_us = min(to_epoch_us(row["timestamp"]) for row in changed)
+        keep = series.index_before(EPOCH + timedelta(microseconds=since_us))
+        columns = {name: values[:keep] for name, values in _to_columns(series).items()}
+        sources = list(series.sources)
+        _append_rows(columns, sources, _rows_from_db(series.filters, since_us))
+        watermark = _watermark(series.filters)
+        if len(columns["timestamps"]) != watermark["count"]:
+            # 刈り込みなどで古い側も変わっていたら全体を読み直す
+            _rebuild(series.filters, watermark)
+        else:
+            _write(path, series.filters, sources, columns, watermark)
+        refreshed += 1
+    return refreshed
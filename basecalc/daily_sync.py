@@ -6,6 +6,7 @@ from bs4 import BeautifulSoup
 from django.core.cache import cache
 from django.utils import timezone
 
+from . import bar_cache
 from .data_quality import evaluate_snapshot_quality
 from .market_bars import attach_saved_daily_bars
 from .models import MarketBar, MarketSnapshot
@@ -89,6 +90,7 @@ def fetch_nikkei_futures_daily_rows(start=None, end=None):
 def save_daily_bars(rows, update_existing=False):
     created = 0
     updated = 0
+    changed_rows = []
     for row in rows:
         parsed = normalize_bar_row(row)
         if not parsed:
@@ -108,6 +110,7 @@ def save_daily_bars(rows, update_existing=False):
             "instrument_key": DEFAULT_INSTRUMENT_KEY,
             "instrument_type": DEFAULT_INSTRUMENT_TYPE,
         }
+        changed_row = {**lookup, "instrument_key": DEFAULT_INSTRUMENT_KEY}
         if update_existing:
             _, was_created = MarketBar.objects.update_or_create(
                 **lookup,
@@ -115,17 +118,25 @@ def save_daily_bars(rows, update_existing=False):
             )
             created += 1 if was_created else 0
             updated += 0 if was_created else 1
+            changed_rows.append(changed_row)
             continue
         existing, was_created = MarketBar.objects.get_or_create(
             **lookup,
             defaults=defaults,
         )
         created += 1 if was_created else 0
-        if not was_created and _should_update_existing_bar(existing, parsed):
+        if was_created:
+            changed_rows.append(changed_row)
+        elif _should_update_existing_bar(existing, parsed):
             for key, value in defaults.items():
                 setattr(existing, key, value)
             existing.save(update_fields=list(defaults.keys()))
             updated += 1
+            changed_rows.append(changed_row)
+    try:
+        bar_cache.refresh_bar_caches(changed_rows)
+    except OSError:
+        pass
     return {"created": created, "updated": updated}
 
 
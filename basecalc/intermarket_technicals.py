@@ -1,6 +1,7 @@
 from django.utils import timezone
 
 from .indicators import calculate_atr
+from .request_memo import memoize_loader
 
 
 US_INDEX_SYMBOLS = {
@@ -82,6 +83,7 @@ def build_us_index_technical_context(assets: dict) -> dict:
     }
 
 
+@memoize_loader
 def get_intermarket_technical_snapshot() -> dict:
     from .market_context import (
         _fetch_context_symbol,
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta, timezone as dt_timezone
 from django.db import DatabaseError, NotSupportedError, transaction
 from django.utils import timezone
 
+from . import bar_cache
 from .models import MarketBar
 from .instrument import normalize_instrument
 
@@ -53,6 +54,10 @@ def save_market_bars_from_snapshot(snapshot):
                 prune_market_bars({row["symbol"] for row in rows})
         except DatabaseError:
             return 0
+    try:
+        bar_cache.refresh_bar_caches(rows)
+    except OSError:
+        pass
     return len(rows)
 
 
@@ -63,15 +68,13 @@ def attach_saved_daily_bars(snapshot, limit=DAILY_HISTORY_LIMIT):
     instrument = normalize_instrument(root.get("symbol"), root.get("source"))
     instrument_key = root.get("instrument_key") or instrument["instrument_key"]
     symbol = instrument["symbol"] or root.get("symbol") or "NIY=F"
-    queryset = MarketBar.objects.filter(timeframe="1d")
     if instrument_key and instrument_key != "unknown":
-        queryset = queryset.filter(instrument_key=instrument_key)
+        filters = {"timeframe": "1d", "instrument_key": instrument_key}
     else:
-        queryset = queryset.filter(symbol=symbol)
-    bars = list(queryset.order_by("-timestamp")[:limit])
-    if not bars:
+        filters = {"timeframe": "1d", "symbol": symbol}
+    ohlcv = _latest_daily_ohlcv(filters, limit)
+    if not ohlcv:
         return root
-    bars.reverse()
 
     frame = {
         "symbol": symbol,
@@ -80,12 +83,7 @@ def attach_saved_daily_bars(snapshot, limit=DAILY_HISTORY_LIMIT):
         "instrument_type": root.get("instrument_type") or instrument["instrument_type"],
         "timeframe": "1d",
         "interval": "1d",
-        "opens": [bar.open or bar.close for bar in bars],
-        "highs": [bar.high or bar.close for bar in bars],
-        "lows": [bar.low or bar.close for bar in bars],
-        "closes": [bar.close for bar in bars],
-        "volumes": [bar.volume or 0 for bar in bars],
-        "timestamps": [int(bar.timestamp.timestamp()) for bar in bars],
+        **ohlcv,
     }
     _append_newer_snapshot_bar(frame, root)
     closes = frame["closes"]
@@ -113,6 +111,29 @@ def attach_saved_daily_bars(snapshot, limit=DAILY_HISTORY_LIMIT):
     return root
 
 
+def _latest_daily_ohlcv(filters, limit):
+    try:
+        series = bar_cache.load_bar_series(**filters)
+    except OSError:
+        series = None
+    else:
+        if series is None:
+            return None
+        return series.frame(max(0, len(series) - limit))
+    bars = list(MarketBar.objects.filter(**filters).order_by("-timestamp")[:limit])
+    if not bars:
+        return None
+    bars.reverse()
+    return {
+        "opens": [bar.open or bar.close for bar in bars],
+        "highs": [bar.high or bar.close for bar in bars],
+        "lows": [bar.low or bar.close for bar in bars],
+        "closes": [bar.close for bar in bars],
+        "volumes": [bar.volume or 0 for bar in bars],
+        "timestamps": [int(bar.timestamp.timestamp()) for bar in bars],
+    }
+
+
 def _bulk_upsert_market_bars(rows):
     MarketBar.objects.bulk_create(
         [
@@ -14,6 +14,8 @@ from django.utils import timezone
 from macro.models import Observation
 from macro.services.crash_alert import compute_crash_alert
 
+from .request_memo import memoize_loader
+
 
 TARGETS = (
     {'symbol': 'GSPC', 'label': 'S&P500'},
@@ -40,6 +42,7 @@ INDEX_FUTURES_TARGETS = {
 MOMENTUM_TRIGGER_PCT = 3.5
 
 
+@memoize_loader
 def _latest(series_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
     qs = Observation.objects.filter(indicator__fred_series_id=series_id)
     if as_of is not None:
@@ -53,6 +56,11 @@ def _latest(series_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
     }
 
 
+@memoize_loader
+def _crash_alert(as_of: date) -> Dict:
+    return compute_crash_alert(as_of=as_of)
+
+
 def _category_score(alert: Dict, category: str) -> Optional[int]:
     for row in alert.get('category_summary', []):
         if row.get('category') == category:
@@ -256,7 +264,7 @@ def build_market_shock_context(
 ) -> Dict:
     """急変判定の表示用コンテキストを返す。"""
     target_date = as_of or timezone.localdate()
-    alert_context = alert or compute_crash_alert(as_of=target_date)
+    alert_context = alert or _crash_alert(target_date)
     index_rows = [
         _row_for_target(target, alert=alert_context, as_of=target_date)
         for target in TARGETS
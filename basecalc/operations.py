@@ -17,6 +17,7 @@ from .daily_sync import (
     write_latest_market_snapshot,
 )
 from .persistence import export_basecalc_history
+from .request_memo import request_memo
 from .intermarket_technicals import get_intermarket_technical_snapshot
 from .market_shock import build_market_shock_context
 from .services.decision_context import (
@@ -227,8 +228,9 @@ def export_basecalc_snapshot(
         "updated": False,
         "price_param": f"{price:.0f}" if price else "",
     }
-    hydrate_saved_snapshot_context(payload)
-    enrich_basecalc_context(payload)
+    with request_memo():
+        hydrate_saved_snapshot_context(payload)
+        enrich_basecalc_context(payload)
     write_basecalc_snapshot(payload, export_snapshot_path)
     return payload
 
@@ -5,6 +5,7 @@ from django.db import transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
+from . import bar_cache
 from .models import MarketBar, MarketSnapshot, PredictionOutcome, WorldModelPrediction
 from .outcomes import evaluate_due_predictions
 from .instrument import normalize_instrument
@@ -63,6 +64,7 @@ def import_basecalc_history(input_path: str) -> dict:
         "market_snapshots_created": 0,
         "market_snapshots_skipped": 0,
     }
+    changed_bar_rows = []
     with transaction.atomic():
         for item in payload.get("predictions") or []:
             prediction, created = _import_prediction(item, schema=schema)
@@ -76,16 +78,21 @@ def import_basecalc_history(input_path: str) -> dict:
             _, created = _import_outcome(prediction, item)
             stats["outcomes_created" if created else "outcomes_skipped"] += 1
         for item in payload.get("market_bars") or []:
-            _, created, updated = _import_market_bar(item)
+            _, created, updated, changed = _import_market_bar(item)
             if created:
                 stats["market_bars_created"] += 1
             elif updated:
                 stats["market_bars_updated"] += 1
             else:
                 stats["market_bars_skipped"] += 1
+            changed_bar_rows.extend(changed)
         for item in payload.get("market_snapshots") or []:
             _, created = _import_market_snapshot(item)
             stats["market_snapshots_created" if created else "market_snapshots_skipped"] += 1
+    try:
+        bar_cache.refresh_bar_caches(changed_bar_rows)
+    except OSError:
+        pass
     return stats
 
 
@@ -278,9 +285,10 @@ def _import_outcome(prediction, item):
 
 
 def _import_market_bar(item):
+    """MarketBar を1行取り込み、(行, 新規か, 更新か, バーキャッシュ更新用の行) を返す。"""
     timestamp = _dt(item.get("timestamp"))
     if timestamp is None:
-        return None, False, False
+        return None, False, False, []
     instrument = normalize_instrument(item.get("symbol"), item.get("source"))
     lookup = {
         "symbol": instrument["symbol"] or item.get("symbol") or "NIY=F",
@@ -303,13 +311,15 @@ def _import_market_bar(item):
         defaults=defaults,
     )
     if created:
-        return market_bar, True, False
+        return market_bar, True, False, [{**lookup, "instrument_key": market_bar.instrument_key}]
     if defaults["source"] == "225navi" and market_bar.source != "225navi":
+        # instrument_key が変わる場合は元のキーのキャッシュからも行が消える
+        changed = [{**lookup, "instrument_key": key} for key in {market_bar.instrument_key, defaults["instrument_key"]}]
         for key, value in defaults.items():
             setattr(market_bar, key, value)
         market_bar.save(update_fields=list(defaults.keys()))
-        return market_bar, False, True
-    return market_bar, False, False
+        return market_bar, False, True, changed
+    return market_bar, False, False, []
 
 
 def _import_market_snapshot(item):
@@ -0,0 +1,106 @@
+"""1 リクエスト (または 1 回の事前計算) の中でローダー結果を使い回すメモ。
+
+build_context や保存済みスナップショットの補完、explanation のアダプタは
+同じステータスファイル・検証レポート・先物スナップショットを何度も読む。
+request_memo() の中では memoize_loader を付けたローダーが同じ引数で
+2 回目以降に呼ばれたとき、最初の結果を返して読み直しを省く。
+スコープ外では何もせず、そのまま元の関数を呼ぶ。
+"""
+
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_active_memo = contextvars.ContextVar("basecalc_request_memo", default=None)
+
+
+class RequestMemo:
+    def __init__(self):
+        self.values = {}
+        self.stats = {}
+
+    def call(self, name, func, args, kwargs):
+        try:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        stats = self.stats.setdefault(name, {"calls": 0, "avoided": 0, "saved_sec": 0.0})
+        stats["calls"] += 1
+        if key in self.values:
+            value, elapsed = self.values[key]
+            stats["avoided"] += 1
+            stats["saved_sec"] += elapsed
+            return _shallow_copy(value)
+        started = time.perf_counter()
+        value = func(*args, **kwargs)
+        self.values[key] = (value, time.perf_counter() - started)
+        return _shallow_copy(value)
+
+    def summary(self):
+        return {
+            "calls": sum(stats["calls"] for stats in self.stats.values()),
+            "avoided": sum(stats["avoided"] for stats in self.stats.values()),
+            "saved_sec": round(sum(stats["saved_sec"] for stats in self.stats.values()), 6),
+            "loaders": {name: dict(stats) for name, stats in self.stats.items()},
+        }
+
+
+def _shallow_copy(value):
+    # 呼び出し側はトップレベルのキーを書き換えることがあるので、毎回別の dict/list を渡す
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def log_memo_summary(summary):
+    if summary["avoided"]:
+        logger.debug(
+            "request memo avoided %s of %s loader calls (%.1f ms)",
+            summary["avoided"],
+            summary["calls"],
+            summary["saved_sec"] * 1000,
+        )
+
+
+@contextmanager
+def request_memo(reporter=log_memo_summary):
+    """スコープ内のローダー呼び出しを重複排除する。入れ子の場合は外側のメモを共有する。
+
+    reporter はスコープを抜けるときに RequestMemo.summary() の結果で呼ばれる。
+    """
+    memo = _active_memo.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = RequestMemo()
+    token = _active_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _active_memo.reset(token)
+        if reporter is not None:
+            reporter(memo.summary())
+
+
+def current_request_memo():
+    return _active_memo.get()
+
+
+def memoize_loader(func):
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _active_memo.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        return memo.call(name, func, args, kwargs)
+
+    return wrapper
@@ -235,6 +235,21 @@ def _market_bar_ohlcv(instrument_key, as_of=None, timeframe="1d"):
         from .models import MarketBar
     except Exception:
         return None
+    try:
+        from .bar_cache import load_bar_series
+
+        series = load_bar_series(timeframe=timeframe, instrument_key=instrument_key or None)
+    except OSError:
+        series = None
+    except Exception:
+        return None
+    else:
+        if series is None:
+            return None
+        stop = series.index_before(as_of) if as_of is not None else len(series)
+        if min(stop, 5000) < 35:
+            return None
+        return series.frame(0, min(stop, 5000))
     try:
         queryset = MarketBar.objects.filter(timeframe=timeframe)
         if instrument_key:
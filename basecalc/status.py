@@ -4,6 +4,8 @@ from pathlib import Path
 
 from django.utils import timezone
 
+from .request_memo import memoize_loader
+
 BASECALC_STATUS_PATH = Path(__file__).resolve().parent / "data" / "basecalc_status.json"
 
 STATUS_KEYS = ("price_data", "intermarket")
@@ -15,6 +17,7 @@ STATUS_LABELS = {
 }
 
 
+@memoize_loader
 def load_basecalc_status(path=BASECALC_STATUS_PATH):
     path = Path(path)
     if not path.exists():
@@ -30,7 +33,8 @@ def load_basecalc_status(path=BASECALC_STATUS_PATH):
 
 def write_basecalc_status(entries, path=BASECALC_STATUS_PATH, now=None):
     now = now or timezone.now()
-    status = load_basecalc_status(path)
+    # 書き込み前の読み込みはメモを通さず、常にファイルの最新内容に重ねる
+    status = load_basecalc_status.__wrapped__(path)
     for key, entry in (entries or {}).items():
         if key not in STATUS_KEYS or not isinstance(entry, dict):
             continue
@@ -13,6 +13,7 @@ from django.template.loader import render_to_string
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from myproject.perf import assert_within_query_budget
 
 from .anchor_snapshot import load_anchor_snapshot
 from .confidence import calculate_confidence_score
@@ -36,7 +37,8 @@ from .market_context import (
     get_market_context_snapshot,
     judge_nikkei_lead_context,
 )
-from .market_bars import prune_market_bars
+from . import bar_cache
+from .market_bars import attach_saved_daily_bars, prune_market_bars
 from .models import MarketBar, MarketSnapshot, PredictionOutcome, WorldModelPrediction
 from .outcomes import (
     apply_confidence_adjustment,
@@ -52,10 +54,11 @@ from .outcomes import (
 )
 from .persistence import export_basecalc_history, import_basecalc_history
 from .readiness import evaluate_world_model_readiness
+from .request_memo import memoize_loader, request_memo
 from .scoring import calculate_sentiment_score
 from .signal_contract import build_basecalc_signal_contract
-from .similarity import find_similar_cases
-from .status import intermarket_status_entry, status_display_rows
+from .similarity import _market_bar_ohlcv, find_similar_cases
+from .status import intermarket_status_entry, load_basecalc_status, status_display_rows, write_basecalc_status
 from .state_machine import STATE_DEFINITIONS, estimate_expected_returns, estimate_transition_probabilities
 from .scenario_engine import build_scenarios
 from .services.decision_context import (
@@ -315,6 +318,7 @@ class BasecalcUpdateSecurityTests(TestCase):
         response = self.client.get(reverse('basecalc:index'))
 
         self.assertNotContains(response, 'id="price-refresh"')
+        assert_within_query_budget(response)
 
     @override_settings(
         BASECALC_REFRESH_WORKFLOW_REPOSITORY='owner/repo',
@@ -4066,6 +4070,165 @@ class BasecalcAnchorSnapshotTests(TestCase):
         self.assertNotIn('valuation_label', context['data'])
 
 
+class BasecalcMarketBarCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        overrides = override_settings(MARKET_BAR_CACHE_DIR=self.cache_dir.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _without_cache(self, func, *args, **kwargs):
+        with patch('basecalc.bar_cache.load_bar_series', side_effect=OSError):
+            return func(*args, **kwargs)
+
+    def test_cached_frames_match_orm_frames(self):
+        bars = _create_market_bar_series(60)
+        MarketBar.objects.filter(id=bars[3].id).update(open=None, volume=None)
+        snapshot = {'symbol': 'NIY=F', 'source': 'cme_daily_bulletin', 'instrument_key': 'cme_nikkei_futures'}
+        as_of = bars[50].timestamp
+
+        self.assertEqual(attach_saved_daily_bars(snapshot, limit=40), self._without_cache(attach_saved_daily_bars, snapshot, limit=40))
+        self.assertEqual(_market_bar_ohlcv('cme_nikkei_futures', as_of), self._without_cache(_market_bar_ohlcv, 'cme_nikkei_futures', as_of))
+        self.assertEqual(
+            run_basecalc_backtest(min_bars=55, date_to=bars[57].timestamp.date().isoformat()),
+            self._without_cache(run_basecalc_backtest, min_bars=55, date_to=bars[57].timestamp.date().isoformat()),
+        )
+        # attach と類似局面は同じ条件なので 1 ファイルを共有する
+        self.assertEqual(len(list(Path(self.cache_dir.name).glob('*.bars'))), 2)
+
+    def test_stale_cache_is_rebuilt_when_rows_change_behind_it(self):
+        bars = _create_market_bar_series(40)
+        series = bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+        self.assertEqual(series.closes[-1], bars[-1].close)
+
+        MarketBar.objects.filter(id=bars[-1].id).update(close=12345.0)
+
+        series = bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+        self.assertEqual(series.closes[-1], 12345.0)
+        self.assertEqual(len(series), 40)
+
+    def test_stale_cache_is_rebuilt_when_only_high_low_change(self):
+        bars = _create_market_bar_series(40)
+        bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+
+        MarketBar.objects.filter(id=bars[-1].id).update(high=99999.0, volume=5)
+
+        series = bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+        self.assertEqual(series.frame(39)['highs'], [99999.0])
+        self.assertEqual(series.frame(39)['volumes'], [5.0])
+
+    def test_history_import_refreshes_cache_when_switching_source(self):
+        bars = _create_market_bar_series(40)
+        bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+        target = bars[-1]
+        payload = {
+            'schema': 'basecalc_history_v1',
+            'market_bars': [{
+                'symbol': 'NIY=F',
+                'timeframe': '1d',
+                'timestamp': target.timestamp.isoformat(),
+                'open': 41000,
+                'high': 41500,
+                'low': 40900,
+                'close': target.close,
+                'volume': 1000,
+                'source': '225navi',
+                'instrument_key': 'cme_nikkei_futures',
+            }],
+        }
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'history.json'
+            path.write_text(json.dumps(payload), encoding='utf-8')
+            with patch('basecalc.bar_cache._rebuild') as rebuild:
+                stats = import_basecalc_history(str(path))
+                series = bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+
+        rebuild.assert_not_called()
+        self.assertEqual(stats['market_bars_updated'], 1)
+        self.assertEqual(series.frame(39)['opens'], [41000.0])
+        self.assertEqual(series.frame(39)['highs'], [41500.0])
+        self.assertEqual(series.source_at(39), '225navi')
+
+    def test_refresh_rereads_only_rows_after_the_earliest_write(self):
+        bars = _create_market_bar_series(40)
+        bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+        new_bar = MarketBar.objects.create(
+            symbol='NIY=F',
+            timeframe='1d',
+            timestamp=bars[-1].timestamp + timezone.timedelta(days=1),
+            close=50000,
+            source='225navi',
+            instrument_key='cme_nikkei_futures',
+        )
+
+        with patch('basecalc.bar_cache._rebuild') as rebuild:
+            refreshed = bar_cache.refresh_bar_caches(
+                [{'symbol': 'NIY=F', 'timeframe': '1d', 'instrument_key': 'cme_nikkei_futures', 'timestamp': new_bar.timestamp}]
+            )
+            series = bar_cache.load_bar_series(timeframe='1d', instrument_key='cme_nikkei_futures')
+
+        rebuild.assert_not_called()
+        self.assertEqual(refreshed, 1)
+        self.assertEqual(len(series), 41)
+        self.assertEqual(series.frame(40)['opens'], [50000.0])
+        self.assertEqual(series.source_at(40), '225navi')
+        self.assertEqual(series.timestamp_at(40), new_bar.timestamp)
+
+
+class BasecalcRequestMemoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_loader_is_called_once_per_scope_and_reports_avoided_calls(self):
+        calls = []
+
+        @memoize_loader
+        def loader(key):
+            calls.append(key)
+            return {'key': key}
+
+        reports = []
+        with request_memo(reporter=reports.append):
+            first = loader('a')
+            first['key'] = 'changed'
+            self.assertEqual(loader('a'), {'key': 'a'})
+            loader('b')
+            with request_memo():
+                loader('b')
+        loader('a')
+
+        self.assertEqual(calls, ['a', 'b', 'a'])
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]['calls'], 4)
+        self.assertEqual(reports[0]['avoided'], 2)
+
+    def test_stale_futures_snapshot_is_loaded_once_per_request(self):
+        _create_market_bar_series(40)
+
+        with TemporaryDirectory() as cache_dir, override_settings(MARKET_BAR_CACHE_DIR=cache_dir):
+            with request_memo(reporter=None) as memo:
+                first = get_stale_futures_snapshot()
+                with self.assertNumQueries(0):
+                    second = get_stale_futures_snapshot()
+
+        self.assertEqual(first, second)
+        self.assertEqual(memo.summary()['avoided'], 1)
+
+    def test_status_write_reads_the_file_not_the_memo(self):
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'status.json'
+            with request_memo(reporter=None):
+                load_basecalc_status(path)
+                write_basecalc_status({'price_data': {'status': 'ok', 'last_success_at': '2026-01-01T00:00:00+00:00'}}, path=path)
+                write_basecalc_status({'intermarket': {'status': 'ok', 'last_success_at': '2026-01-01T00:00:00+00:00'}}, path=path)
+
+            status = load_basecalc_status(path)
+
+        self.assertEqual(status['price_data']['status'], 'ok')
+        self.assertEqual(status['intermarket']['status'], 'ok')
+
+
 class BasecalcFuturesSentimentTests(TestCase):
     def test_bullish_continuation_outputs_buyback_and_targets(self):
         result = calculate_futures_sentiment(
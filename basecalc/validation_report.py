@@ -11,6 +11,7 @@ from .outcomes import (
     state_direction_performance_summary,
     state_performance_summary,
 )
+from .request_memo import memoize_loader
 from .validation import validation_design_summary
 
 
@@ -61,6 +62,7 @@ def save_validation_report(report, output_path=DEFAULT_VALIDATION_REPORT_PATH):
     }
 
 
+@memoize_loader
 def load_validation_report(input_path=DEFAULT_VALIDATION_REPORT_PATH):
     path = Path(input_path)
     if not path.exists():
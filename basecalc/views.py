@@ -10,6 +10,7 @@ from django.db import OperationalError, ProgrammingError
 from django.http import HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
+from myproject.perf import query_budget
 from myproject.settings import is_serverless_runtime
 
 from .intermarket_technicals import get_intermarket_technical_snapshot
@@ -25,6 +26,7 @@ from .outcomes import (
     save_prediction,
 )
 from .persistence import import_basecalc_history
+from .request_memo import memoize_loader, request_memo
 from .serializers import serialize_snapshot
 from .services.decision_context import (
     build_basecalc_decision_context,
@@ -69,7 +71,16 @@ BASECALC_HISTORY_PATH = Path(__file__).resolve().parent / "data" / "basecalc_his
 TRUSTED_FUTURES_SOURCES = ("cme_daily_bulletin", "225navi", "matsui")
 
 
+@query_budget(60)
 def index(request):
+    if request.method == "POST":
+        return _basecalc_index(request)
+    # 表示だけのリクエストでは同じローダーを何度も呼ぶので、結果をリクエスト内で使い回す
+    with request_memo():
+        return _basecalc_index(request)
+
+
+def _basecalc_index(request):
     can_update_basecalc_data = request.user.is_authenticated and request.user.is_staff
     if request.method == "POST":
         if request.POST.get("action") != "update":
@@ -243,6 +254,7 @@ def _should_import_runtime_basecalc_history():
     return is_sqlite and (is_serverless_runtime() or (not settings.DEBUG and uses_tmp_sqlite))
 
 
+@request_memo()
 def snapshot_api(request):
     try:
         context = build_context(request, force_update=False)
@@ -1245,6 +1257,7 @@ def build_technical_data(price):
     }
 
 
+@memoize_loader
 def get_stale_futures_snapshot():
     snapshot = cache.get(CACHE_KEY_FUTURES_LAST_GOOD)
     if isinstance(snapshot, dict):
@@ -0,0 +1,7 @@
+"""ホットパスのベンチマーク。
+
+    python -m benchmarks run --output benchmarks/results/current.json
+    python -m benchmarks compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+データは固定シードの合成データで、DB を使うケースは Django のテスト用 DB に投入してから測る。
+"""
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+
+
+def _run(options):
+    from benchmarks.runner import format_result_line, run_benchmarks, write_results
+
+    payload = run_benchmarks(
+        options.names or None,
+        repeat=options.repeat,
+        progress=lambda name, result: print(format_result_line(name, result), flush=True),
+    )
+    path = write_results(payload, options.output)
+    print(f'Wrote {len(payload["results"])} results to {path} in {payload["elapsed_sec"]:.1f}s')
+    return 0
+
+
+def _compare(options):
+    from benchmarks.runner import compare_results, format_comparison, load_results
+
+    rows = compare_results(load_results(options.baseline), load_results(options.current), threshold=options.threshold)
+    for line in format_comparison(rows):
+        print(line)
+    regressions = [row['name'] for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {options.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    print(f'No regressions beyond {options.threshold:.0%}')
+    return 0
+
+
+def _list(options):
+    from benchmarks.cases import BENCHMARKS
+
+    for name, benchmark in BENCHMARKS.items():
+        print(f'{name:<48} {benchmark.kind}{" (db)" if benchmark.db else ""}')
+    return 0
+
+
+def main(argv=None):
+    from benchmarks.runner import DEFAULT_REPEAT, DEFAULT_THRESHOLD
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Hot-path benchmarks.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run benchmarks and write a JSON result file.')
+    run_parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all).')
+    run_parser.add_argument('--output', default='benchmarks/results/latest.json')
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run_parser.set_defaults(handler=_run)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files and flag regressions.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Allowed slowdown ratio before a case counts as a regression (default: 0.15).')
+    compare_parser.set_defaults(handler=_compare)
+
+    list_parser = subparsers.add_parser('list', help='List benchmark cases.')
+    list_parser.set_defaults(handler=_list)
+
+    options = parser.parse_args(argv)
+    if options.command == 'run':
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+        import django
+
+        django.setup()
+    return options.handler(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
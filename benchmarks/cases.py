@@ -0,0 +1,150 @@
+"""ベンチマークケースの一覧。
+
+各ケースの setup は合成データを用意して、計測する引数なしの関数を返す。
+db=True のケースはテスト用 DB の上で setup が呼ばれ、ケースごとに投入データを消す。
+"""
+
+from typing import Callable, NamedTuple
+
+from benchmarks import fixtures
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    kind: str = 'micro'
+    db: bool = False
+
+
+def _indicator_frame():
+    return fixtures.ohlcv(2000)
+
+
+def bench_calculate_adx():
+    from basecalc.indicators import calculate_adx
+
+    frame = _indicator_frame()
+    return lambda: calculate_adx(frame['highs'], frame['lows'], frame['closes'])
+
+
+def bench_calculate_rsi():
+    from basecalc.indicators import calculate_rsi
+
+    closes = _indicator_frame()['closes']
+    return lambda: calculate_rsi(closes)
+
+
+def bench_calculate_macd():
+    from basecalc.indicators import calculate_macd
+
+    closes = _indicator_frame()['closes']
+    return lambda: calculate_macd(closes)
+
+
+def bench_find_similar_cases():
+    from basecalc.similarity import find_similar_cases
+
+    fixtures.create_market_bars(1500)
+    features = fixtures.similarity_features()
+    empty = {'opens': [], 'highs': [], 'lows': [], 'closes': [], 'volumes': []}
+    return lambda: find_similar_cases(features, empty)
+
+
+def bench_build_world_model():
+    from django.utils import timezone
+
+    from basecalc.world_model import build_world_model
+
+    fixtures.create_market_bars(1500)
+    # 鮮度判定は現在時刻と比べるので、取得時刻だけは今にして判定まで通す
+    snapshot = {**fixtures.market_snapshot(250), 'fetched_at': timezone.now()}
+    return lambda: build_world_model(snapshot['price'], snapshot)
+
+
+def bench_run_basecalc_backtest():
+    from basecalc.backtesting import run_basecalc_backtest
+
+    fixtures.create_market_bars(200)
+    return lambda: run_basecalc_backtest(min_bars=160)
+
+
+def bench_build_observation_rows():
+    from macro.models import Indicator
+    from macro.services.data_sync import _build_observation_rows
+
+    indicator = Indicator(fred_series_id='BENCH', name_ja='bench')
+    raw = fixtures.raw_observations(420)
+    return lambda: _build_observation_rows(indicator, raw)
+
+
+def bench_linkage_lag_scan():
+    from macro.services.linkage import compute_pair_relationships
+
+    fixtures.create_linkage_indicators(12, 240)
+    return compute_pair_relationships
+
+
+def bench_train_crash_model():
+    from macro.services.crash_probability import train_logistic_model
+
+    rows = fixtures.crash_training_rows(400)
+    return lambda: train_logistic_model(rows, iterations=300)
+
+
+def bench_earning_similarity():
+    from earning.services.similarity import build_similarity_pool, find_similar_events
+
+    events = fixtures.earnings_events(600)
+    targets = events[:20]
+
+    def run():
+        pool = build_similarity_pool(events)
+        return [find_similar_events(target, pool) for target in targets]
+
+    return run
+
+
+def bench_lgb_walker_predict():
+    from earning.services.lgb_walker import predict_from_json
+
+    model = fixtures.lgb_model(200, 6, 11)
+    rows = fixtures.feature_rows(200, 11)
+    return lambda: [predict_from_json(row, model) for row in rows]
+
+
+def bench_build_grouped_payload():
+    from datetime import date
+
+    from django.core.cache import caches
+
+    from earning.views import build_grouped_payload
+
+    today = date(2024, 6, 3)
+    fixtures.create_earnings_calendar(300, today=today)
+
+    def run():
+        # 行単位のキャッシュに当たらない初回の組み立てを測る
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+        return build_grouped_payload(today)
+
+    return run
+
+
+BENCHMARKS = {
+    benchmark.name: benchmark
+    for benchmark in (
+        Benchmark('basecalc.indicators.calculate_adx', bench_calculate_adx),
+        Benchmark('basecalc.indicators.calculate_rsi', bench_calculate_rsi),
+        Benchmark('basecalc.indicators.calculate_macd', bench_calculate_macd),
+        Benchmark('basecalc.similarity.find_similar_cases', bench_find_similar_cases, db=True),
+        Benchmark('basecalc.world_model.build_world_model', bench_build_world_model, 'macro', db=True),
+        Benchmark('basecalc.backtesting.run_basecalc_backtest', bench_run_basecalc_backtest, 'macro', db=True),
+        Benchmark('macro.data_sync.build_observation_rows', bench_build_observation_rows),
+        Benchmark('macro.linkage.compute_pair_relationships', bench_linkage_lag_scan, 'macro', db=True),
+        Benchmark('macro.crash_probability.train_logistic_model', bench_train_crash_model, 'macro'),
+        Benchmark('earning.similarity.find_similar_events', bench_earning_similarity),
+        Benchmark('earning.lgb_walker.predict_from_json', bench_lgb_walker_predict),
+        Benchmark('earning.views.build_grouped_payload', bench_build_grouped_payload, 'macro', db=True),
+    )
+}
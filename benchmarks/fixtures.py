@@ -0,0 +1,246 @@
+"""ベンチマーク用の決定的な合成データ。同じシードなら毎回同じ値になる。"""
+
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+from dateutil.relativedelta import relativedelta
+
+
+SEED = 20240601
+BAR_START = datetime(2018, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def ohlcv(count, *, seed=SEED, start_price=30000.0):
+    """ランダムウォークの日足 OHLCV。snapshot と同じ列名のリストで返す。"""
+    rng = random.Random(seed)
+    closes = []
+    price = start_price
+    for _ in range(count):
+        price *= 1 + rng.gauss(0.0003, 0.012)
+        closes.append(round(price, 1))
+    opens = [round(close * (1 + rng.gauss(0, 0.003)), 1) for close in closes]
+    highs = [round(max(open_, close) * (1 + abs(rng.gauss(0, 0.004))), 1) for open_, close in zip(opens, closes)]
+    lows = [round(min(open_, close) * (1 - abs(rng.gauss(0, 0.004))), 1) for open_, close in zip(opens, closes)]
+    start = int(BAR_START.timestamp())
+    return {
+        'opens': opens,
+        'highs': highs,
+        'lows': lows,
+        'closes': closes,
+        'volumes': [rng.randint(5_000, 50_000) for _ in closes],
+        'timestamps': [start + index * 86400 for index in range(count)],
+    }
+
+
+def market_snapshot(count=250, *, seed=SEED):
+    frame = ohlcv(count, seed=seed)
+    closes = frame['closes']
+    return {
+        'symbol': 'NIY=F',
+        'source': 'cme_daily_bulletin',
+        'instrument_key': 'cme_nikkei_futures',
+        'price': closes[-1],
+        'previous_close': closes[-2],
+        'change_pct': round((closes[-1] / closes[-2] - 1) * 100, 2),
+        'fetched_at': BAR_START + timedelta(days=count),
+        'fallback_used': False,
+        **frame,
+    }
+
+
+def similarity_features(*, seed=SEED):
+    rng = random.Random(seed)
+    return {
+        'instrument_key': 'cme_nikkei_futures',
+        'sentiment_score': rng.uniform(-40, 40),
+        'ema5_gap_pct': rng.gauss(0, 1),
+        'ema20_gap_pct': rng.gauss(0, 2),
+        'ema60_gap_pct': rng.gauss(0, 3),
+        'vwap_gap_pct': rng.gauss(0, 1),
+        'rsi14': rng.uniform(30, 70),
+        'macd_histogram': rng.gauss(0, 0.5),
+        'atr_ratio': rng.uniform(0.8, 1.2),
+        'bb_width_pct': rng.uniform(2, 6),
+        'change_3d_pct': rng.gauss(0, 2),
+        'change_5d_pct': rng.gauss(0, 3),
+        'distance_recent_high_pct': -abs(rng.gauss(0, 2)),
+        'distance_recent_low_pct': abs(rng.gauss(0, 2)),
+        'structure_bias': rng.choice([-1, 0, 1]),
+    }
+
+
+def create_market_bars(count, *, seed=SEED):
+    from basecalc.models import MarketBar
+
+    frame = ohlcv(count, seed=seed)
+    MarketBar.objects.bulk_create([
+        MarketBar(
+            symbol='NIY=F',
+            timeframe='1d',
+            timestamp=BAR_START + timedelta(days=index),
+            open=frame['opens'][index],
+            high=frame['highs'][index],
+            low=frame['lows'][index],
+            close=frame['closes'][index],
+            volume=frame['volumes'][index],
+            source='cme_daily_bulletin',
+            instrument_key='cme_nikkei_futures',
+            instrument_type='futures',
+        )
+        for index in range(count)
+    ], batch_size=500)
+
+
+def raw_observations(months, *, seed=SEED):
+    """月次の (date, value) 列。_build_observation_rows の入力と同じ形。"""
+    rng = random.Random(seed)
+    value = 100.0
+    rows = []
+    for month in range(months):
+        value *= 1 + rng.gauss(0.002, 0.01)
+        rows.append((date(1990, 1, 1) + relativedelta(months=month), round(value, 3)))
+    return rows
+
+
+def create_linkage_indicators(series_count, months, *, seed=SEED):
+    """連動分析の対象になる重要度 A の指標と、z スコア付きの月次観測。"""
+    from macro.models import Indicator, Observation
+
+    rng = random.Random(seed)
+    end = date.today().replace(day=1)
+    observations = []
+    for position in range(series_count):
+        indicator = Indicator.objects.create(
+            fred_series_id=f'BENCH{position:02d}',
+            name_ja=f'bench {position}',
+            category=Indicator.Category.GROWTH,
+            source=Indicator.Source.FRED,
+            importance=Indicator.Importance.A,
+            display_order=position,
+        )
+        level = 0.0
+        for month in range(months):
+            level = 0.8 * level + rng.gauss(0, 1)
+            observations.append(Observation(
+                indicator=indicator,
+                observation_date=end - relativedelta(months=months - month),
+                value=level,
+                expanding_z_score=level,
+            ))
+    Observation.objects.bulk_create(observations, batch_size=1000)
+
+
+def crash_training_rows(count, *, seed=SEED):
+    from macro.services.crash_probability import FEATURE_NAMES
+
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        features = {name: rng.gauss(0, 50) for name in FEATURE_NAMES}
+        score = sum(features.values()) / (50 * len(FEATURE_NAMES))
+        rows.append({'features': features, 'event': score + rng.gauss(0, 0.5) > 0.8})
+    return rows
+
+
+def earnings_events(count, *, seed=SEED):
+    """DB に保存しない EarningsEvent。価格ウィンドウは prefetch 済みの形で持たせる。"""
+    from earning.models import EarningsEvent
+
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        event = EarningsEvent(
+            fiscal_period='2024Q1',
+            event_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)),
+            gross_margin=rng.uniform(10, 70),
+            operating_margin=rng.uniform(-5, 40),
+            relative_strength=rng.uniform(1, 99),
+            guidance_revision=rng.choice(['up', 'flat', 'down', '']),
+            vix_at_event=rng.uniform(11, 35),
+            hy_spread_at_event=rng.uniform(2.5, 7),
+            skew_at_event=rng.uniform(115, 160),
+            t5yie_at_event=rng.uniform(1.5, 3),
+            rut_at_event=rng.uniform(1500, 2500),
+            reaction_close=rng.gauss(0, 5),
+        )
+        close = rng.uniform(20, 500)
+        window = []
+        for offset in range(-21, 0):
+            close *= 1 + rng.gauss(0, 0.02)
+            window.append(SimpleNamespace(offset_days=offset, close=close))
+        event._feature_price_window = window
+        events.append(event)
+    return events
+
+
+def lgb_model(tree_count, depth, feature_count, *, seed=SEED):
+    """lgb_walker が読む JSON 形式の決定木アンサンブル。"""
+    rng = random.Random(seed)
+
+    def node(level):
+        if level == depth:
+            return {'leaf_value': rng.gauss(0, 1)}
+        return {
+            'split_feature': rng.randrange(feature_count),
+            'threshold': rng.gauss(0, 1),
+            'decision_type': '<=',
+            'default_left': rng.random() < 0.5,
+            'left_child': node(level + 1),
+            'right_child': node(level + 1),
+        }
+
+    return {
+        'init_score': 0.1,
+        'trees': [{'shrinkage': 0.05, 'root': node(0)} for _ in range(tree_count)],
+    }
+
+
+def feature_rows(count, feature_count, *, seed=SEED):
+    rng = random.Random(seed)
+    return [
+        [float('nan') if rng.random() < 0.05 else rng.gauss(0, 1) for _ in range(feature_count)]
+        for _ in range(count)
+    ]
+
+
+def create_earnings_calendar(stock_count, *, today, seed=SEED):
+    """build_grouped_payload 用に、今日の前後へ散らばった決算イベントを作る。"""
+    from earning.models import EarningsEvent, EarningsPrediction, Stock
+
+    rng = random.Random(seed)
+    themes = ['半導体', 'AI', '金融', '消費', 'エネルギー', 'ヘルスケア']
+    stocks = Stock.objects.bulk_create([
+        Stock(
+            symbol=f'B{position:03d}',
+            market='NASDAQ',
+            company=f'Bench {position}',
+            industry='Tech',
+            theme=rng.choice(themes),
+            watch_tier=rng.choice(['最重要', '重要', '補助', '']),
+        )
+        for position in range(stock_count)
+    ])
+    events = EarningsEvent.objects.bulk_create([
+        EarningsEvent(
+            stock=stock,
+            fiscal_period='2024Q1',
+            event_date=today + timedelta(days=rng.randint(-20, 20)),
+            fundamental=rng.choice(['up', 'flat', 'down']),
+            direction=rng.choice(['up', 'flat', 'down']),
+            sentiment=rng.choice(['up', 'flat', 'down']),
+            risk_value=rng.uniform(0, 100),
+            theme_score=rng.uniform(0, 100),
+            eps_forecast=f'{rng.uniform(0.1, 5):.2f}',
+            surp_eps_current=f'{rng.uniform(-10, 10):.1f}%',
+            gross_margin=rng.uniform(10, 70),
+            operating_margin=rng.uniform(-5, 40),
+            relative_strength=rng.uniform(1, 99),
+            reaction_close=rng.gauss(0, 5),
+        )
+        for stock in stocks
+    ])
+    EarningsPrediction.objects.bulk_create([
+        EarningsPrediction(event=event, predicted_reaction=rng.gauss(0, 3), model_version='bench')
+        for event in events
+    ])
@@ -0,0 +1,188 @@
+"""timeit ベースの計測と、結果 JSON の比較。"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import timeit
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from benchmarks.cases import BENCHMARKS
+
+
+RESULT_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.15
+# 比較には最も揺れにくい最小値を使う
+COMPARE_METRIC = 'min_sec'
+
+
+def time_callable(func, *, repeat=DEFAULT_REPEAT):
+    """1 回あたりの秒数を repeat 回測る。1 回の試行が 0.2 秒以上になるよう回数を自動で決める。"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min_sec': min(samples),
+        'median_sec': statistics.median(samples),
+        'mean_sec': statistics.fmean(samples),
+        'stdev_sec': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+@contextmanager
+def benchmark_environment():
+    """テスト用 DB とキャッシュを用意し、本番の DB やキャッシュファイルには触れない。"""
+    from django.test.utils import (
+        override_settings,
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-default'},
+            'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-shared'},
+        }
+        with override_settings(CACHES=caches, MARKET_BAR_CACHE_DIR=tmpdir):
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                yield
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+
+def _run_case(benchmark, repeat):
+    from django.core.cache import caches
+    from django.db import transaction
+
+    for alias in ('default', 'shared'):
+        caches[alias].clear()
+    if not benchmark.db:
+        return time_callable(benchmark.setup(), repeat=repeat)
+    # 投入データはケースごとに巻き戻す
+    with transaction.atomic():
+        result = time_callable(benchmark.setup(), repeat=repeat)
+        transaction.set_rollback(True)
+    return result
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def run_benchmarks(names=None, *, repeat=DEFAULT_REPEAT, progress=None):
+    """names (既定は全件) を計測して結果 dict を返す。progress(name, result) で 1 件ごとに通知する。"""
+    names = names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f'Unknown benchmark(s): {", ".join(unknown)}')
+
+    started = time.perf_counter()
+    results = {}
+    with benchmark_environment():
+        for name in names:
+            benchmark = BENCHMARKS[name]
+            results[name] = {'kind': benchmark.kind, **_run_case(benchmark, repeat)}
+            if progress is not None:
+                progress(name, results[name])
+    return {
+        'version': RESULT_VERSION,
+        'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'elapsed_sec': round(time.perf_counter() - started, 3),
+        'results': results,
+    }
+
+
+def write_results(payload, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+    return path
+
+
+def load_results(path):
+    payload = json.loads(Path(path).read_text(encoding='utf-8'))
+    if payload.get('version') != RESULT_VERSION:
+        raise ValueError(f'{path}: unsupported result version {payload.get("version")!r}')
+    return payload
+
+
+def compare_results(baseline, current, *, threshold=DEFAULT_THRESHOLD):
+    """両方にあるケースの比 (current / baseline) を出し、threshold を超えて遅くなったものを regression にする。"""
+    rows = []
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        before = baseline['results'].get(name)
+        after = current['results'].get(name)
+        if before is None or after is None:
+            rows.append({'name': name, 'status': 'missing' if after is None else 'new',
+                         'baseline_sec': before and before[COMPARE_METRIC],
+                         'current_sec': after and after[COMPARE_METRIC], 'ratio': None})
+            continue
+        ratio = after[COMPARE_METRIC] / before[COMPARE_METRIC] if before[COMPARE_METRIC] else None
+        if ratio is None:
+            status = 'ok'
+        elif ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({
+            'name': name,
+            'status': status,
+            'baseline_sec': before[COMPARE_METRIC],
+            'current_sec': after[COMPARE_METRIC],
+            'ratio': ratio,
+        })
+    return rows
+
+
+def _format_sec(value):
+    if value is None:
+        return '-'
+    if value < 1e-3:
+        return f'{value * 1e6:.1f}us'
+    if value < 1:
+        return f'{value * 1e3:.2f}ms'
+    return f'{value:.3f}s'
+
+
+def format_result_line(name, result):
+    return (
+        f'{name:<48} {_format_sec(result["min_sec"]):>10} min '
+        f'{_format_sec(result["median_sec"]):>10} median  (x{result["number"]}, {result["repeat"]} runs)'
+    )
+
+
+def format_comparison(rows):
+    lines = []
+    for row in rows:
+        ratio = f'{row["ratio"]:.2f}x' if row['ratio'] is not None else '-'
+        lines.append(
+            f'{row["name"]:<48} {_format_sec(row["baseline_sec"]):>10} -> '
+            f'{_format_sec(row["current_sec"]):>10} {ratio:>7}  {row["status"]}'
+        )
+    return lines
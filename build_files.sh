@@ -39,6 +39,15 @@ if [ -z "${DATABASE_URL:-}" ]; then
   cp "$SQLITE_DB_PATH" "$BUNDLED_SQLITE_PATH"
 fi
 
+# 静的 CSV ページ (person / prompt) を事前にコンパイルしてコールドスタート時の解析を省く
+# 失敗してもデプロイは続ける (実行時に CSV を解析する) が、ログには残す
+if ! $PYTHON_BIN manage.py build_compiled_datasets; then
+  echo "WARNING: build_compiled_datasets failed; person/prompt pages will parse CSVs at cold start" >&2
+fi
+
+# 決算ページの計算結果を共有キャッシュのバンドルに書き、新しいインスタンスを温まった状態で始める
+$PYTHON_BIN manage.py build_shared_cache_bundle || true
+
 # 静的ファイルの収集
 $PYTHON_BIN manage.py collectstatic --noinput --clear
 
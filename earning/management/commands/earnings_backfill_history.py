@@ -1,12 +1,27 @@
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 from django.core.management.base import BaseCommand
 
-from earning.models import EarningsEvent, Stock
+from earning.models import EarningsEvent, EarningsPriceWindow, Stock
 from earning.services.macro import attach_macro_snapshot
+from earning.services.price_backfill import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_WORKERS,
+    TokenBucket,
+    backfill_price_windows,
+    format_backfill_stats,
+)
 from earning.services.reactions import update_price_reactions
-from earning.services.yfinance import build_yahoo_symbol, fetch_price_window
+from earning.services.yfinance import build_yahoo_symbol
+
+
+def _fetch_earnings_dates(yahoo_symbol, limiter):
+    import yfinance as yf
+
+    limiter.acquire()
+    return yf.Ticker(yahoo_symbol).earnings_dates
 
 
 class Command(BaseCommand):
@@ -15,15 +30,17 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--symbol', type=str, default=None,
                             help='Restrict to a single ticker (debugging).')
-        parser.add_argument('--sleep', type=float, default=0.5,
-                            help='Seconds to sleep between stocks.')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help=f'Concurrent Yahoo requests (default: {DEFAULT_WORKERS}).')
+        parser.add_argument('--rate', type=float, default=DEFAULT_RATE_PER_SEC,
+                            help=f'Max Yahoo requests per second; 0 disables the limit (default: {DEFAULT_RATE_PER_SEC}).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows per bulk upsert (default: {DEFAULT_BATCH_SIZE}).')
 
     def handle(self, *args, **options):
-        import yfinance as yf
-
         today = date.today()
         symbol = options['symbol']
-        sleep_s = options['sleep']
+        limiter = TokenBucket(options['rate'])
 
         stocks = Stock.objects.all().order_by('symbol')
         if symbol:
@@ -31,9 +48,11 @@ class Command(BaseCommand):
         stocks = list(stocks)
 
         total_stocks = len(stocks)
-        new_events = price_filled = reaction_filled = macro_filled = 0
+        new_events = reaction_filled = macro_filled = 0
         skipped_stocks = 0
+        past_events = []
 
+        targets = []
         for i, stock in enumerate(stocks, start=1):
             yh = build_yahoo_symbol(stock.market, stock.symbol)
             label = f'[{i}/{total_stocks}] {stock.market}-{stock.symbol}'
@@ -41,70 +60,91 @@ class Command(BaseCommand):
                 self.stdout.write(f'{label}: skip (unsupported market)')
                 skipped_stocks += 1
                 continue
-
-            try:
-                df = yf.Ticker(yh).earnings_dates
-            except Exception as exc:
-                self.stdout.write(self.style.WARNING(f'{label}: yfinance err ({exc})'))
-                skipped_stocks += 1
-                continue
-
-            if df is None or len(df) == 0:
-                self.stdout.write(f'{label}: no earnings_dates')
-                skipped_stocks += 1
-                continue
-
-            existing_dates = set(
-                EarningsEvent.objects.filter(stock=stock)
-                .exclude(event_date__isnull=True)
-                .values_list('event_date', flat=True)
-            )
-
-            count = 0
-            for ts in df.index:
-                ev_date = ts.date()
-                if ev_date >= today:
+            targets.append((label, stock, yh))
+
+        # earnings_dates の取得だけを並列にし、イベント作成は呼び出しスレッドで行う
+        with ThreadPoolExecutor(max_workers=max(1, options['workers']), thread_name_prefix='earnings-dates') as executor:
+            futures = [
+                (label, stock, executor.submit(_fetch_earnings_dates, yh, limiter))
+                for label, stock, yh in targets
+            ]
+            for label, stock, future in futures:
+                try:
+                    df = future.result()
+                except Exception as exc:
+                    self.stdout.write(self.style.WARNING(f'{label}: yfinance err ({exc})'))
+                    skipped_stocks += 1
                     continue
-                if ev_date in existing_dates:
+
+                if df is None or len(df) == 0:
+                    self.stdout.write(f'{label}: no earnings_dates')
+                    skipped_stocks += 1
                     continue
 
-                fiscal = f'BF-{ev_date.isoformat()}'
-                event, created = EarningsEvent.objects.get_or_create(
-                    stock=stock, fiscal_period=fiscal,
-                    defaults={'event_date': ev_date},
+                existing_dates = set(
+                    EarningsEvent.objects.filter(stock=stock)
+                    .exclude(event_date__isnull=True)
+                    .values_list('event_date', flat=True)
                 )
-                if created:
-                    new_events += 1
-                    existing_dates.add(ev_date)
-
-                if not event.price_window.exists():
-                    try:
-                        n = fetch_price_window(event)
-                        if n:
-                            price_filled += 1
-                    except Exception as exc:
-                        self.stdout.write(self.style.WARNING(f'  {ev_date} price err: {exc}'))
-                        continue
-
-                if event.reaction_close is None or event.reaction_next_day is None:
-                    rc, rn = update_price_reactions(event)
-                    if rc is not None or rn is not None:
-                        reaction_filled += 1
 
-                if event.vix_at_event is None:
-                    try:
-                        n = attach_macro_snapshot(event)
-                        if n:
-                            macro_filled += 1
-                    except Exception:
-                        pass
-
-                count += 1
-
-            self.stdout.write(f'{label}: processed {count} past events')
-            if i < total_stocks and sleep_s > 0:
-                time.sleep(sleep_s)
+                count = 0
+                for ts in df.index:
+                    ev_date = ts.date()
+                    if ev_date >= today:
+                        continue
+                    if ev_date in existing_dates:
+                        continue
 
+                    fiscal = f'BF-{ev_date.isoformat()}'
+                    event, created = EarningsEvent.objects.get_or_create(
+                        stock=stock, fiscal_period=fiscal,
+                        defaults={'event_date': ev_date},
+                    )
+                    if created:
+                        new_events += 1
+                        existing_dates.add(ev_date)
+                    past_events.append(event)
+                    count += 1
+
+                self.stdout.write(f'{label}: processed {count} past events')
+
+        filled_event_ids = set(
+            EarningsPriceWindow.objects.filter(event__in=past_events)
+            .values_list('event_id', flat=True)
+            .distinct()
+        )
+        missing_window = [event for event in past_events if event.pk not in filled_event_ids]
+        stats = backfill_price_windows(
+            missing_window,
+            rate=options['rate'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            update_reactions=False,
+            limiter=limiter,
+        )
+        price_filled = (
+            EarningsPriceWindow.objects.filter(event__in=missing_window)
+            .values('event_id')
+            .distinct()
+            .count()
+        )
+
+        for event in past_events:
+            if event.reaction_close is None or event.reaction_next_day is None:
+                rc, rn = update_price_reactions(event)
+                if rc is not None or rn is not None:
+                    reaction_filled += 1
+
+            if event.vix_at_event is None:
+                try:
+                    n = attach_macro_snapshot(event)
+                    if n:
+                        macro_filled += 1
+                except Exception:
+                    pass
+
+        for line in format_backfill_stats(stats):
+            self.stdout.write(line)
         self.stdout.write(self.style.SUCCESS(
             f'Done: stocks={total_stocks} skipped={skipped_stocks} '
             f'new_events={new_events} price_filled={price_filled} '
@@ -1,11 +1,15 @@
-import time
 from datetime import date, timedelta
 
 from django.core.management.base import BaseCommand
 
 from earning.models import EarningsEvent
-from earning.services.reactions import update_price_reactions
-from earning.services.yfinance import fetch_price_window
+from earning.services.price_backfill import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_WORKERS,
+    backfill_price_windows,
+    format_backfill_stats,
+)
 
 
 class Command(BaseCommand):
@@ -17,14 +21,17 @@ class Command(BaseCommand):
         parser.add_argument('--symbol', type=str, default=None,
                             help='Restrict to a single ticker (debugging).')
         parser.add_argument('--force', action='store_true',
-                            help='Re-fetch even if rows already exist (currently informational; update_or_create is always idempotent).')
-        parser.add_argument('--sleep', type=float, default=0.3,
-                            help='Seconds to sleep between events (default: 0.3).')
+                            help='Re-fetch even if rows already exist (currently informational; rows are always upserted).')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help=f'Concurrent Yahoo requests (default: {DEFAULT_WORKERS}).')
+        parser.add_argument('--rate', type=float, default=DEFAULT_RATE_PER_SEC,
+                            help=f'Max Yahoo requests per second; 0 disables the limit (default: {DEFAULT_RATE_PER_SEC}).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows per bulk upsert (default: {DEFAULT_BATCH_SIZE}).')
 
     def handle(self, *args, **options):
         days = options['days']
         symbol = options['symbol']
-        sleep_seconds = options['sleep']
 
         cutoff = date.today() - timedelta(days=days)
         queryset = EarningsEvent.objects.filter(event_date__gte=cutoff).select_related('stock')
@@ -32,25 +39,23 @@ class Command(BaseCommand):
             queryset = queryset.filter(stock__symbol=symbol)
         events = list(queryset.order_by('event_date'))
 
-        total = len(events)
-        written_total = reaction_total = failed = 0
-        for i, event in enumerate(events, start=1):
-            label = f'[{i}/{total}] {event.stock.symbol} {event.fiscal_period}'
-            try:
-                n = fetch_price_window(event)
-                written_total += n
-                rc, rn = update_price_reactions(event)
-                if rc is not None or rn is not None:
-                    reaction_total += 1
-                self.stdout.write(f'{label}: {n} rows')
-            except Exception as exc:
-                failed += 1
-                self.stdout.write(self.style.WARNING(f'{label}: failed ({exc})'))
-
-            if i < total and sleep_seconds > 0:
-                time.sleep(sleep_seconds)
-
+        def progress(yahoo_symbol, group, rows, error):
+            label = f'{yahoo_symbol} ({len(group)} events)'
+            if error is not None:
+                self.stdout.write(self.style.WARNING(f'{label}: {rows} rows, fetch failed ({error})'))
+            else:
+                self.stdout.write(f'{label}: {rows} rows')
+
+        stats = backfill_price_windows(
+            events,
+            workers=options['workers'],
+            rate=options['rate'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+        for line in format_backfill_stats(stats):
+            self.stdout.write(line)
         self.stdout.write(self.style.SUCCESS(
-            f'Processed: {total} events, {written_total} rows written, '
-            f'{reaction_total} reactions updated, {failed} failed'
+            f'Processed: {len(events)} events, {stats["rows_written"]} rows written, '
+            f'{stats["reactions"]} reactions updated, {stats["failed_symbols"]} failed'
         ))
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('earning', '0007_earningsevent_expectation_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('yahoo_symbol', models.CharField(max_length=24)),
+                ('trade_date', models.DateField()),
+                ('open', models.FloatField(blank=True, null=True)),
+                ('high', models.FloatField(blank=True, null=True)),
+                ('low', models.FloatField(blank=True, null=True)),
+                ('close', models.FloatField(blank=True, null=True)),
+                ('volume', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['yahoo_symbol', 'trade_date'],
+                'constraints': [models.UniqueConstraint(fields=('yahoo_symbol', 'trade_date'), name='earning_daily_bar_symbol_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPriceCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('yahoo_symbol', models.CharField(max_length=24, unique=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
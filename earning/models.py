@@ -130,3 +130,36 @@ class EarningsPriceWindow(models.Model):
 
     def __str__(self):
         return f'{self.event} {self.trade_date} (T{self.offset_days:+d})'
+
+
+class DailyPriceBar(models.Model):
+    yahoo_symbol = models.CharField(max_length=24)
+    trade_date = models.DateField()
+    open = models.FloatField(null=True, blank=True)
+    high = models.FloatField(null=True, blank=True)
+    low = models.FloatField(null=True, blank=True)
+    close = models.FloatField(null=True, blank=True)
+    volume = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['yahoo_symbol', 'trade_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['yahoo_symbol', 'trade_date'],
+                name='earning_daily_bar_symbol_date_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.yahoo_symbol} {self.trade_date}'
+
+
+class DailyPriceCoverage(models.Model):
+    yahoo_symbol = models.CharField(max_length=24, unique=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.yahoo_symbol} {self.start_date}..{self.end_date}'
@@ -0,0 +1,257 @@
+"""決算イベントの価格ウィンドウをまとめて埋めるパイプライン。
+
+1. 取得: 同じ銘柄のイベントを束ね、全ウィンドウを覆う範囲のうち日足ストアに
+   無い部分だけを、トークンバケットで間隔を制御しつつ並列に取りに行く。
+2. 保存: 取得できた日足をストアへ入れ、イベントごとのウィンドウ行を組み立てる。
+3. 書き込み: EarningsPriceWindow を batch_size ごとに一括 upsert する。
+
+出力される行は fetch_price_window をイベントごとに呼んだ場合と同じ。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from earning.services import price_store, yfinance
+from earning.services.reactions import update_price_reactions
+
+logger = logging.getLogger(__name__)
+
+
+PRICE_WINDOW_DAYS = 90
+PRICE_WINDOW_UPDATE_FIELDS = ['offset_days', 'open', 'high', 'low', 'close', 'volume', 'updated_at']
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_PER_SEC = 2.0
+DEFAULT_BATCH_SIZE = 500
+
+
+class TokenBucket:
+    """rate 件/秒で補充されるトークンバケット。capacity 件までの連続取得を許す。"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+def _event_window(event):
+    window = timedelta(days=PRICE_WINDOW_DAYS)
+    return event.event_date - window, event.event_date + window
+
+
+def group_events_by_symbol(events):
+    """{yahoo_symbol: [event, ...]} と対象外になったイベント数を返す。"""
+    groups = {}
+    skipped = 0
+    for event in events:
+        if event.event_date is None:
+            skipped += 1
+            continue
+        yahoo_symbol = yfinance.build_yahoo_symbol(event.stock.market, event.stock.symbol)
+        if yahoo_symbol is None:
+            logger.info('Skipping unsupported market: %s/%s', event.stock.market, event.stock.symbol)
+            skipped += 1
+            continue
+        groups.setdefault(yahoo_symbol, []).append(event)
+    return groups, skipped
+
+
+def build_price_window_rows(event, bars):
+    """銘柄全体の日足から、このイベントの ±90 日ぶんの EarningsPriceWindow を組み立てる。"""
+    from earning.models import EarningsPriceWindow
+
+    start_date, end_date = _event_window(event)
+    rows = [bar for bar in bars if start_date <= bar['date'] <= end_date]
+    business_days = sorted(row['date'] for row in rows)
+    return [
+        EarningsPriceWindow(
+            event=event,
+            trade_date=row['date'],
+            offset_days=yfinance._business_day_offset(row['date'], event.event_date, business_days),
+            open=row['open'],
+            high=row['high'],
+            low=row['low'],
+            close=row['close'],
+            volume=row['volume'],
+        )
+        for row in rows
+    ]
+
+
+def write_price_window_rows(rows, batch_size=DEFAULT_BATCH_SIZE):
+    from earning.models import EarningsPriceWindow
+
+    if not rows:
+        return 0
+    EarningsPriceWindow.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['event', 'trade_date'],
+        update_fields=PRICE_WINDOW_UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+def _fetch_ranges(yahoo_symbol, ranges, limiter):
+    # ワーカースレッドでは通信だけを行い、DB には触らない
+    results = []
+    started = time.perf_counter()
+    for gap_start, gap_end in ranges:
+        limiter.acquire()
+        try:
+            rows = yfinance.fetch_daily_history(yahoo_symbol, gap_start, gap_end, strict=True)
+        except yfinance.YahooFetchError as exc:
+            results.append((gap_start, gap_end, None, exc))
+        else:
+            results.append((gap_start, gap_end, rows, None))
+    return results, time.perf_counter() - started
+
+
+def _throughput(count, seconds):
+    return count / seconds if seconds > 0 else 0.0
+
+
+def backfill_price_windows(
+    events,
+    *,
+    workers=DEFAULT_WORKERS,
+    rate=DEFAULT_RATE_PER_SEC,
+    batch_size=DEFAULT_BATCH_SIZE,
+    update_reactions=True,
+    today=None,
+    limiter=None,
+    progress=None,
+):
+    """イベント群の価格ウィンドウを埋め、段階ごとの件数と所要時間を返す。
+
+    progress は銘柄ごとに progress(yahoo_symbol, events, rows_written, error) で呼ばれる。
+    """
+    today = today or date.today()
+    limiter = limiter or TokenBucket(rate)
+    started = time.perf_counter()
+    stats = {
+        'events': 0,
+        'skipped': 0,
+        'symbols': 0,
+        'requests': 0,
+        'fetched_bars': 0,
+        'rows_written': 0,
+        'reactions': 0,
+        'failed_symbols': 0,
+        'fetch_sec': 0.0,
+        'store_sec': 0.0,
+        'write_sec': 0.0,
+    }
+
+    groups, stats['skipped'] = group_events_by_symbol(events)
+    stats['symbols'] = len(groups)
+    stats['events'] = sum(len(group) for group in groups.values())
+
+    pending_rows = []
+    pending_events = []
+
+    def flush():
+        if not pending_rows and not pending_events:
+            return
+        write_started = time.perf_counter()
+        stats['rows_written'] += write_price_window_rows(pending_rows, batch_size=batch_size)
+        if update_reactions:
+            for event in pending_events:
+                reaction_close, reaction_next_day = update_price_reactions(event)
+                if reaction_close is not None or reaction_next_day is not None:
+                    stats['reactions'] += 1
+        stats['write_sec'] += time.perf_counter() - write_started
+        pending_rows.clear()
+        pending_events.clear()
+
+    def collect(yahoo_symbol, group, fetch_results):
+        store_started = time.perf_counter()
+        error = None
+        for gap_start, gap_end, rows, exc in fetch_results:
+            if exc is not None:
+                logger.warning('price backfill fetch failed for %s %s..%s: %s', yahoo_symbol, gap_start, gap_end, exc)
+                error = exc
+                continue
+            stats['fetched_bars'] += price_store.store_fetched_range(
+                yahoo_symbol, gap_start, gap_end, rows, today=today,
+            )
+        if error is not None:
+            stats['failed_symbols'] += 1
+
+        start_date = min(_event_window(event)[0] for event in group)
+        end_date = max(_event_window(event)[1] for event in group)
+        bars = price_store.load_daily_history(yahoo_symbol, start_date, end_date)
+        symbol_rows = []
+        for event in group:
+            symbol_rows.extend(build_price_window_rows(event, bars))
+        stats['store_sec'] += time.perf_counter() - store_started
+
+        pending_rows.extend(symbol_rows)
+        pending_events.extend(group)
+        if len(pending_rows) >= batch_size:
+            flush()
+        if progress is not None:
+            progress(yahoo_symbol, group, len(symbol_rows), error)
+
+    plans = {}
+    for yahoo_symbol, group in groups.items():
+        start_date = min(_event_window(event)[0] for event in group)
+        end_date = max(_event_window(event)[1] for event in group)
+        plans[yahoo_symbol] = price_store.plan_missing_ranges(yahoo_symbol, start_date, end_date, today=today)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='earnings-price') as executor:
+        futures = {}
+        for yahoo_symbol, ranges in plans.items():
+            if not ranges:
+                # ストアで足りる銘柄は通信せずにそのまま書き込みへ回す
+                collect(yahoo_symbol, groups[yahoo_symbol], [])
+                continue
+            stats['requests'] += len(ranges)
+            futures[executor.submit(_fetch_ranges, yahoo_symbol, ranges, limiter)] = yahoo_symbol
+
+        for future in as_completed(futures):
+            yahoo_symbol = futures[future]
+            fetch_results, fetch_sec = future.result()
+            stats['fetch_sec'] += fetch_sec
+            collect(yahoo_symbol, groups[yahoo_symbol], fetch_results)
+
+    flush()
+    stats['elapsed_sec'] = time.perf_counter() - started
+    stats['fetch_per_sec'] = _throughput(stats['requests'], stats['fetch_sec'])
+    stats['store_per_sec'] = _throughput(stats['events'], stats['store_sec'])
+    stats['write_per_sec'] = _throughput(stats['rows_written'], stats['write_sec'])
+    return stats
+
+
+def format_backfill_stats(stats):
+    return [
+        f"fetch: {stats['requests']} requests for {stats['symbols']} symbols, "
+        f"{stats['fetched_bars']} bars in {stats['fetch_sec']:.1f}s "
+        f"({stats['fetch_per_sec']:.1f} req/s, {stats['failed_symbols']} failed)",
+        f"store: {stats['events']} events in {stats['store_sec']:.1f}s "
+        f"({stats['store_per_sec']:.1f} events/s)",
+        f"write: {stats['rows_written']} rows, {stats['reactions']} reactions in {stats['write_sec']:.1f}s "
+        f"({stats['write_per_sec']:.1f} rows/s)",
+        f"total: {stats['elapsed_sec']:.1f}s",
+    ]
@@ -0,0 +1,124 @@
+"""Yahoo 日足のローカルストア。
+
+銘柄ごとに取得済みの日付範囲 (DailyPriceCoverage) を持ち、要求範囲のうち
+未取得の前後だけを Yahoo から取りに行く。テーマ強度・決算ウィンドウ・
+反応率の計算はすべてここを経由するので、同じ銘柄やベンチマークを
+何度もダウンロードしない。
+"""
+
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from earning.services import yfinance
+
+logger = logging.getLogger(__name__)
+
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _missing_ranges(coverage, start_date, end_date, today):
+    if coverage is None:
+        return [(start_date, end_date)]
+    ranges = []
+    if start_date < coverage.start_date:
+        ranges.append((start_date, coverage.start_date - timedelta(days=1)))
+    if min(end_date, today) > coverage.end_date:
+        # 最終日は取得時点で未確定の足だった可能性があるので取り直す
+        ranges.append((coverage.end_date, end_date))
+    return ranges
+
+
+def _store_bars(yahoo_symbol, rows):
+    from earning.models import DailyPriceBar
+
+    bars = [
+        DailyPriceBar(
+            yahoo_symbol=yahoo_symbol,
+            trade_date=row['date'],
+            **{field: row.get(field) for field in BAR_FIELDS},
+        )
+        for row in rows
+        if row.get('date') is not None
+    ]
+    if not bars:
+        return 0
+    DailyPriceBar.objects.bulk_create(
+        bars,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['yahoo_symbol', 'trade_date'],
+        update_fields=[*BAR_FIELDS, 'updated_at'],
+    )
+    return len(bars)
+
+
+def plan_missing_ranges(yahoo_symbol, start_date, end_date, *, today=None):
+    """start_date..end_date のうちまだ取得していない (gap_start, gap_end) の一覧を返す。"""
+    from earning.models import DailyPriceCoverage
+
+    if not yahoo_symbol or start_date > end_date:
+        return []
+    coverage = DailyPriceCoverage.objects.filter(yahoo_symbol=yahoo_symbol).first()
+    return _missing_ranges(coverage, start_date, end_date, today or date.today())
+
+
+def store_fetched_range(yahoo_symbol, gap_start, gap_end, rows, *, today=None):
+    """取得済みの日足を保存し、カバー範囲を広げる。保存した行数を返す。"""
+    from earning.models import DailyPriceCoverage
+
+    # 未来日や当日分は確定していないので、カバー範囲は今日までに留める
+    covered_end = min(gap_end, today or date.today())
+    with transaction.atomic():
+        stored = _store_bars(yahoo_symbol, rows)
+        if covered_end < gap_start:
+            return stored
+        coverage = DailyPriceCoverage.objects.select_for_update().filter(yahoo_symbol=yahoo_symbol).first()
+        if coverage is None:
+            DailyPriceCoverage.objects.create(
+                yahoo_symbol=yahoo_symbol,
+                start_date=gap_start,
+                end_date=covered_end,
+            )
+        else:
+            coverage.start_date = min(coverage.start_date, gap_start)
+            coverage.end_date = max(coverage.end_date, covered_end)
+            coverage.save(update_fields=['start_date', 'end_date', 'fetched_at'])
+    return stored
+
+
+def ensure_daily_history(yahoo_symbol, start_date, end_date, *, today=None):
+    """start_date..end_date の未取得部分だけを取得して保存し、取得した行数を返す。"""
+    fetched = 0
+    for gap_start, gap_end in plan_missing_ranges(yahoo_symbol, start_date, end_date, today=today):
+        try:
+            rows = yfinance.fetch_daily_history(yahoo_symbol, gap_start, gap_end, strict=True)
+        except yfinance.YahooFetchError as exc:
+            # 取得できなかった範囲はカバー済みにしない
+            logger.warning('price store fetch failed for %s %s..%s: %s', yahoo_symbol, gap_start, gap_end, exc)
+            continue
+        fetched += store_fetched_range(yahoo_symbol, gap_start, gap_end, rows, today=today)
+    return fetched
+
+
+def load_daily_history(yahoo_symbol, start_date, end_date):
+    """ストア済みの日足だけを fetch_daily_history と同じ形で返す (通信しない)。"""
+    from earning.models import DailyPriceBar
+
+    rows = (
+        DailyPriceBar.objects
+        .filter(yahoo_symbol=yahoo_symbol, trade_date__gte=start_date, trade_date__lte=end_date)
+        .order_by('trade_date')
+        .values_list('trade_date', *BAR_FIELDS)
+    )
+    return [
+        {'date': trade_date, **dict(zip(BAR_FIELDS, values))}
+        for trade_date, *values in rows
+    ]
+
+
+def get_daily_history(yahoo_symbol, start_date, end_date, *, today=None):
+    ensure_daily_history(yahoo_symbol, start_date, end_date, today=today)
+    return load_daily_history(yahoo_symbol, start_date, end_date)
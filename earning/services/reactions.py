@@ -1,9 +1,38 @@
+from datetime import timedelta
+
+REACTION_STORE_WINDOW_DAYS = 10
+
+
+def _reaction_rows_from_store(event):
+    """価格ウィンドウ未作成のイベントは日足ストアから T-1..T+1 の終値を組み立てる。"""
+    if event.event_date is None:
+        return []
+
+    from earning.services.price_store import load_daily_history
+    from earning.services.yfinance import _business_day_offset, build_yahoo_symbol
+
+    yahoo_symbol = build_yahoo_symbol(event.stock.market, event.stock.symbol)
+    if yahoo_symbol is None:
+        return []
+    window = timedelta(days=REACTION_STORE_WINDOW_DAYS)
+    bars = load_daily_history(yahoo_symbol, event.event_date - window, event.event_date + window)
+    business_days = [bar['date'] for bar in bars]
+    rows = []
+    for bar in bars:
+        offset = _business_day_offset(bar['date'], event.event_date, business_days)
+        if offset in (-1, 0, 1):
+            rows.append((offset, bar['close']))
+    return rows
+
+
 def compute_price_reactions(event):
     rows = list(
         event.price_window
         .filter(offset_days__in=[-1, 0, 1])
         .values_list('offset_days', 'close')
     )
+    if not rows:
+        rows = _reaction_rows_from_store(event)
     closes = {offset: close for offset, close in rows if close is not None}
     previous_close = closes.get(-1)
     if previous_close in (None, 0):
@@ -118,7 +118,8 @@ def fetch_theme_strength(theme, end_date=None):
     if not basket:
         return fallback_theme_score(theme)
 
-    from earning.services.yfinance import build_yahoo_symbol, fetch_daily_history
+    from earning.services.price_store import get_daily_history
+    from earning.services.yfinance import build_yahoo_symbol
 
     end = end_date or date.today()
     start = end - timedelta(days=120)
@@ -129,7 +130,7 @@ def fetch_theme_strength(theme, end_date=None):
         yahoo_symbol = build_yahoo_symbol(market, symbol)
         if not yahoo_symbol:
             continue
-        rows = fetch_daily_history(yahoo_symbol, start, end)
+        rows = get_daily_history(yahoo_symbol, start, end)
         if not rows:
             continue
         ret_5 = _latest_return(rows, 5)
@@ -151,7 +152,7 @@ def fetch_theme_strength(theme, end_date=None):
         yahoo_symbol = build_yahoo_symbol(*benchmark)
         if not yahoo_symbol:
             continue
-        rows = fetch_daily_history(yahoo_symbol, start, end)
+        rows = get_daily_history(yahoo_symbol, start, end)
         ret_20 = _latest_return(rows, 20)
         if ret_20 is not None:
             benchmark_returns.append(ret_20)
@@ -61,7 +61,8 @@ def _fetch_chart_json(url, params=None):
     raise YahooFetchError(f'Yahoo fetch failed after retries: {url}') from last_exc
 
 
-def fetch_daily_history(yahoo_symbol, start_date, end_date):
+def fetch_daily_history(yahoo_symbol, start_date, end_date, *, strict=False):
+    """strict=True のときは取得失敗を [] ではなく YahooFetchError で返す。"""
     url = YAHOO_CHART_URL.format(symbol=yahoo_symbol)
     start_ts = int(datetime(start_date.year, start_date.month, start_date.day, tzinfo=dt_timezone.utc).timestamp())
     end_ts = int(datetime(end_date.year, end_date.month, end_date.day, tzinfo=dt_timezone.utc).timestamp()) + 86400
@@ -75,11 +76,15 @@ def fetch_daily_history(yahoo_symbol, start_date, end_date):
     try:
         payload = _fetch_chart_json(url, params=params)
     except YahooFetchError as exc:
+        if strict:
+            raise
         logger.warning('yfinance fetch failed for %s: %s', yahoo_symbol, exc)
         return []
 
     chart = payload.get('chart', {}) if isinstance(payload, dict) else {}
     if chart.get('error'):
+        if strict:
+            raise YahooFetchError(f'Yahoo chart error for {yahoo_symbol}: {chart.get("error")}')
         logger.warning('yfinance chart error for %s: %s', yahoo_symbol, chart.get('error'))
         return []
 
@@ -140,7 +145,9 @@ def fetch_price_window(event):
     start_date = event.event_date - timedelta(days=90)
     end_date = event.event_date + timedelta(days=90)
 
-    rows = fetch_daily_history(yahoo_symbol, start_date, end_date)
+    from earning.services.price_store import get_daily_history
+
+    rows = get_daily_history(yahoo_symbol, start_date, end_date)
     if not rows:
         return 0
 
@@ -9,6 +9,7 @@ from django.urls import reverse
 
 
 from earning.models import Stock
+from myproject.perf import assert_within_query_budget
 from scripts.earning import _normalize_earnings_date_after_keyword, _sort_eps_sales_targets
 
 
@@ -1236,6 +1237,75 @@ class FetchPriceWindowTests(TestCase):
         self.assertEqual(PriceWindow.objects.filter(event=self.event).count(), 0)
 
 
+from earning.models import DailyPriceBar, DailyPriceCoverage
+from earning.services.price_store import get_daily_history
+
+
+class PriceStoreTests(TestCase):
+    def _bars(self, *days):
+        return [
+            {'date': d, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10}
+            for d in days
+        ]
+
+    @patch('earning.services.yfinance.fetch_daily_history')
+    def test_only_missing_ranges_are_downloaded(self, mock_fetch):
+        today = date_cls(2026, 2, 20)
+        mock_fetch.return_value = self._bars(date_cls(2026, 1, 5), date_cls(2026, 1, 30))
+        rows = get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 1, 31), today=today)
+        self.assertEqual([r['date'] for r in rows], [date_cls(2026, 1, 5), date_cls(2026, 1, 30)])
+
+        # 内側の範囲はストアから返るだけ
+        get_daily_history('AAPL', date_cls(2026, 1, 5), date_cls(2026, 1, 20), today=today)
+        self.assertEqual(mock_fetch.call_count, 1)
+
+        # 後ろに伸ばすと最終日以降だけを取りに行く
+        mock_fetch.return_value = self._bars(date_cls(2026, 2, 2))
+        rows = get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 2, 10), today=today)
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(mock_fetch.call_args[0][1:], (date_cls(2026, 1, 31), date_cls(2026, 2, 10)))
+        self.assertEqual(len(rows), 3)
+        coverage = DailyPriceCoverage.objects.get(yahoo_symbol='AAPL')
+        self.assertEqual((coverage.start_date, coverage.end_date), (date_cls(2026, 1, 1), date_cls(2026, 2, 10)))
+
+    @patch('earning.services.yfinance.fetch_daily_history')
+    def test_coverage_stops_at_today(self, mock_fetch):
+        mock_fetch.return_value = self._bars(date_cls(2026, 2, 2))
+        today = date_cls(2026, 2, 2)
+        get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 3, 1), today=today)
+        get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 3, 1), today=today)
+        self.assertEqual(mock_fetch.call_count, 1)
+
+        get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 3, 1), today=date_cls(2026, 2, 3))
+        self.assertEqual(mock_fetch.call_args[0][1], date_cls(2026, 2, 2))
+        self.assertEqual(DailyPriceBar.objects.filter(yahoo_symbol='AAPL').count(), 1)
+
+    @patch('earning.services.yfinance.fetch_daily_history')
+    def test_failed_fetch_is_not_marked_covered(self, mock_fetch):
+        mock_fetch.side_effect = YahooFetchError('boom')
+        rows = get_daily_history('AAPL', date_cls(2026, 1, 1), date_cls(2026, 1, 31), today=date_cls(2026, 2, 20))
+        self.assertEqual(rows, [])
+        self.assertFalse(DailyPriceCoverage.objects.filter(yahoo_symbol='AAPL').exists())
+
+    def test_reactions_fall_back_to_stored_bars(self):
+        stock = Stock.objects.create(symbol='MSFT', market='NASDAQ', company='Microsoft', industry='Tech')
+        event = EarningsEvent.objects.create(
+            stock=stock, fiscal_period="Q1 '26", event_date=date_cls(2026, 1, 31),
+        )
+        for trade_date, close in [
+            (date_cls(2026, 1, 29), 90.0),
+            (date_cls(2026, 1, 30), 100.0),
+            (date_cls(2026, 2, 2), 110.0),
+            (date_cls(2026, 2, 3), 99.0),
+        ]:
+            DailyPriceBar.objects.create(yahoo_symbol='MSFT', trade_date=trade_date, close=close)
+
+        reaction_close, reaction_next_day = compute_price_reactions(event)
+
+        self.assertAlmostEqual(reaction_close, 10.0)
+        self.assertAlmostEqual(reaction_next_day, -1.0)
+
+
 class EarningsFetchPricesCommandTests(TestCase):
     def setUp(self):
         self.stock = Stock.objects.create(symbol='AAPL', market='NASDAQ', company='Apple Inc.', industry='Tech')
@@ -1249,39 +1319,108 @@ class EarningsFetchPricesCommandTests(TestCase):
             event_date=date.today() - timedelta(days=200),
         )
 
-    @patch('earning.management.commands.earnings_fetch_prices.fetch_price_window')
-    @patch('earning.management.commands.earnings_fetch_prices.time.sleep')
-    def test_iterates_only_recent_events_by_default(self, mock_sleep, mock_fetch):
-        mock_fetch.return_value = 5
+    def _stats(self):
+        return {
+            'events': 0, 'skipped': 0, 'symbols': 0, 'requests': 0, 'fetched_bars': 0,
+            'rows_written': 0, 'reactions': 0, 'failed_symbols': 0,
+            'fetch_sec': 0.0, 'store_sec': 0.0, 'write_sec': 0.0, 'elapsed_sec': 0.0,
+            'fetch_per_sec': 0.0, 'store_per_sec': 0.0, 'write_per_sec': 0.0,
+        }
+
+    @patch('earning.management.commands.earnings_fetch_prices.backfill_price_windows')
+    def test_iterates_only_recent_events_by_default(self, mock_backfill):
+        mock_backfill.return_value = self._stats()
         out = StringIO()
         call_command('earnings_fetch_prices', stdout=out)
         # only the recent event (within 90 days) should be processed
-        self.assertEqual(mock_fetch.call_count, 1)
-        called_event = mock_fetch.call_args[0][0]
-        self.assertEqual(called_event.id, self.recent_event.id)
+        events = mock_backfill.call_args[0][0]
+        self.assertEqual([event.id for event in events], [self.recent_event.id])
 
-    @patch('earning.management.commands.earnings_fetch_prices.fetch_price_window')
-    @patch('earning.management.commands.earnings_fetch_prices.time.sleep')
-    def test_days_flag_widens_window(self, mock_sleep, mock_fetch):
-        mock_fetch.return_value = 5
+    @patch('earning.management.commands.earnings_fetch_prices.backfill_price_windows')
+    def test_days_flag_widens_window(self, mock_backfill):
+        mock_backfill.return_value = self._stats()
         out = StringIO()
         call_command('earnings_fetch_prices', '--days', '365', stdout=out)
-        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(len(mock_backfill.call_args[0][0]), 2)
 
-    @patch('earning.management.commands.earnings_fetch_prices.fetch_price_window')
-    @patch('earning.management.commands.earnings_fetch_prices.time.sleep')
-    def test_symbol_flag_filters_to_one_stock(self, mock_sleep, mock_fetch):
+    @patch('earning.management.commands.earnings_fetch_prices.backfill_price_windows')
+    def test_symbol_flag_filters_to_one_stock(self, mock_backfill):
         other_stock = Stock.objects.create(symbol='MSFT', market='NASDAQ', company='Microsoft', industry='Tech')
         EarningsEvent.objects.create(
             stock=other_stock, fiscal_period="Q1 '26",
             event_date=date.today() - timedelta(days=5),
         )
-        mock_fetch.return_value = 3
+        mock_backfill.return_value = self._stats()
         out = StringIO()
         call_command('earnings_fetch_prices', '--symbol', 'AAPL', stdout=out)
+        events = mock_backfill.call_args[0][0]
+        self.assertEqual([event.stock.symbol for event in events], ['AAPL'])
+
+
+from earning.services.price_backfill import TokenBucket, backfill_price_windows
+
+
+class PriceBackfillPipelineTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='AAPL', market='NASDAQ', company='Apple Inc.', industry='Tech')
+        self.first = EarningsEvent.objects.create(
+            stock=self.stock, fiscal_period="Q4 '25", event_date=date_cls(2025, 10, 30),
+        )
+        self.second = EarningsEvent.objects.create(
+            stock=self.stock, fiscal_period="Q1 '26", event_date=date_cls(2026, 1, 29),
+        )
+        self.bars = [
+            {'date': d, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': close, 'volume': 10}
+            for d, close in [
+                (date_cls(2025, 10, 29), 100.0),
+                (date_cls(2025, 10, 30), 104.0),
+                (date_cls(2025, 10, 31), 101.0),
+                (date_cls(2026, 1, 28), 200.0),
+                (date_cls(2026, 1, 29), 190.0),
+                (date_cls(2026, 1, 30), 210.0),
+            ]
+        ]
+
+    def _window_rows(self):
+        return list(
+            PriceWindow.objects.order_by('event_id', 'trade_date')
+            .values_list('event_id', 'trade_date', 'offset_days', 'close')
+        )
+
+    @patch('earning.services.yfinance.fetch_daily_history')
+    def test_one_history_call_per_symbol_matches_per_event_rows(self, mock_fetch):
+        mock_fetch.return_value = self.bars
+        events = list(EarningsEvent.objects.select_related('stock'))
+
+        stats = backfill_price_windows(events, rate=0, today=date_cls(2026, 6, 1))
+
         self.assertEqual(mock_fetch.call_count, 1)
-        called_event = mock_fetch.call_args[0][0]
-        self.assertEqual(called_event.stock.symbol, 'AAPL')
+        self.assertEqual(stats['rows_written'], 8)
+        self.assertEqual(stats['reactions'], 2)
+        pipeline_rows = self._window_rows()
+
+        PriceWindow.objects.all().delete()
+        for event in events:
+            fetch_price_window(event)
+        self.assertEqual(self._window_rows(), pipeline_rows)
+
+        self.second.refresh_from_db()
+        self.assertAlmostEqual(self.second.reaction_close, -5.0)
+
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(2.0, capacity=1, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        bucket.acquire()
+
+        self.assertEqual(slept, [0.5, 0.5])
 
 
 from earning.services.scenarios import MACRO_KEYS, compute_feature_ranges
@@ -1377,6 +1516,13 @@ class EarningsViewTests(TestCase):
         self.assertNotContains(response, 'cdn.jsdelivr.net')
         self.assertContains(response, '/static/dashboard/vendor/bootstrap-icons/bootstrap-icons.css')
 
+    def test_pages_stay_within_query_budget(self):
+        for name in ('earning:index', 'earning:completed'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            assert_within_query_budget(response)
+            self.assertIn('grouped_payload;dur=', response['Server-Timing'])
+
     def test_index_does_not_enrich_completed_rows_initially(self):
         from unittest.mock import patch
         from earning import views
@@ -1460,6 +1606,47 @@ class EarningsViewTests(TestCase):
         self.assertNotIn('data-whatif-baseline', content)
 
 
+    def _record_enriched_symbols(self, loader):
+        from unittest.mock import patch
+        from earning import views
+
+        touched_symbols = []
+        original_enrich_item = views.enrich_item
+
+        def record_enrich(item, *args, **kwargs):
+            touched_symbols.append(item.get('symbol'))
+            return original_enrich_item(item, *args, **kwargs)
+
+        with patch('earning.views.enrich_item', side_effect=record_enrich):
+            payload = loader()
+        return touched_symbols, payload
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'earnings-test'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'earnings-test-shared'},
+    })
+    def test_rebuild_reenriches_only_changed_events(self):
+        from django.core.cache import caches
+        from earning.views import load_grouped_earnings
+
+        caches['shared'].clear()
+        touched, _ = self._record_enriched_symbols(lambda: load_grouped_earnings(period='all'))
+        self.assertEqual(sorted(touched), ['FUT', 'PST'])
+
+        future_event = EarningsEvent.objects.get(stock__symbol='FUT')
+        future_event.summary = 'revised upcoming summary'
+        future_event.save()
+        touched, payload = self._record_enriched_symbols(lambda: load_grouped_earnings(period='all'))
+        self.assertEqual(touched, ['FUT'])
+        self.assertEqual(payload['upcoming'][0]['companies'][0]['summary'], 'revised upcoming summary')
+        self.assertEqual(payload['completed'][0]['companies'][0]['summary'], 'completed summary')
+
+        # 別プロセス相当: locmem が空でも共有キャッシュの行を使う
+        caches['default'].clear()
+        touched, _ = self._record_enriched_symbols(lambda: load_grouped_earnings(period='all'))
+        self.assertEqual(touched, [])
+        caches['shared'].clear()
+
 from earning.services.lgb_walker import predict_from_json, _walk_tree
 
 
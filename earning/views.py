@@ -1,14 +1,16 @@
+import hashlib
 import logging
 from collections import defaultdict
 from datetime import date
 
-from django.core.cache import cache
+from django.core.cache import InvalidCacheBackendError, cache, caches
 from django.db.models import Prefetch, Q
 from django.shortcuts import render
 from django.views.decorators.cache import cache_control
 from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_GET
 
+from myproject.perf import query_budget, span
 from earning.services.expectation import compute_expectation_score, expectation_level
 from earning.services.risk import compute_risk_score as compute_event_risk_score
 from earning.services.theme_strength import fallback_theme_score, normalize_theme
@@ -54,6 +56,9 @@ WATCH_TIER_CLASS_MAP = {
 }
 
 CACHE_TTL = 86400
+SHARED_CACHE_ALIAS = 'shared'
+ITEM_CACHE_VERSION = 'earnings_item_v1'
+POOL_CACHE_VERSION = 'earnings_pool_v1'
 
 
 def parse_float(value):
@@ -605,10 +610,171 @@ def group_by_date(items, is_past=False, theme_pool=None):
     return grouped
 
 
-def build_grouped_payload(today, period='all'):
+def _timestamp_ms(value):
+    return int(value.timestamp() * 1000) if value else 0
+
+
+def build_pool_watermark():
+    """
+    類似度プール・テーマ強度プールの元データ (反応率つきイベント・価格ウィンドウ・銘柄属性) の水位。
+    """
+    from django.db.models import Count, Max
+
+    from earning.models import EarningsEvent, EarningsPriceWindow, Stock
+
+    events = (
+        EarningsEvent.objects
+        .filter(reaction_close__isnull=False)
+        .aggregate(count=Count('id'), last=Max('updated_at'))
+    )
+    windows = EarningsPriceWindow.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    stocks = Stock.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    return ':'.join(str(part) for part in (
+        events['count'], _timestamp_ms(events['last']),
+        windows['count'], _timestamp_ms(windows['last']),
+        stocks['count'], _timestamp_ms(stocks['last']),
+    ))
+
+
+def _shared_cache():
+    try:
+        return caches[SHARED_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+
+
+def _cache_get_many(keys):
+    """locmem を先に見て、無いものだけプロセス間共有キャッシュから引き戻す。"""
+    if not keys:
+        return {}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    shared = _shared_cache()
+    if missing and shared is not None:
+        shared_found = shared.get_many(missing)
+        if shared_found:
+            cache.set_many(shared_found, CACHE_TTL)
+            found.update(shared_found)
+    return found
+
+
+def _cache_set_many(values):
+    if not values:
+        return
+    cache.set_many(values, CACHE_TTL)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set_many(values, CACHE_TTL)
+
+
+def _cache_get_or_build(cache_key, builder):
+    """
+    locmem → 共有キャッシュの順に探し、無ければ builder で作る。
+    共有キャッシュの get_or_set はロック行で計算を 1 プロセスに絞るので、同時に冷えた他ワーカーは結果を待つ。
+    """
+    value = cache.get(cache_key)
+    if value is not None:
+        return value
+    shared = _shared_cache()
+    value = shared.get_or_set(cache_key, builder, CACHE_TTL) if shared is not None else builder()
+    cache.set(cache_key, value, CACHE_TTL)
+    return value
+
+
+def load_theme_strength_pool(watermark):
+    cache_key = f'{POOL_CACHE_VERSION}:theme:{watermark}'
+    return _cache_get_or_build(cache_key, build_theme_strength_pool)
+
+
+def load_similarity_pool(watermark):
+    """
+    類似度プールはモデルインスタンスを抱えるのでプロセス内 (locmem) にだけ置く。
+    """
     from earning.models import EarningsEvent, EarningsPriceWindow
     from earning.services.similarity import build_similarity_pool
 
+    cache_key = f'{POOL_CACHE_VERSION}:similarity:{watermark}'
+    pool = cache.get(cache_key)
+    if pool is None:
+        pool_events = list(
+            EarningsEvent.objects
+            .filter(reaction_close__isnull=False)
+            .select_related('stock')
+            .prefetch_related(
+                Prefetch(
+                    'price_window',
+                    queryset=EarningsPriceWindow.objects
+                    .filter(offset_days__gte=-21, offset_days__lte=-1)
+                    .only('event_id', 'offset_days', 'close'),
+                    to_attr='_feature_price_window',
+                )
+            )
+        )
+        pool = build_similarity_pool(pool_events)
+        cache.set(cache_key, pool, CACHE_TTL)
+    return pool
+
+
+def build_item_cache_key(item, role, theme_pool, watermark, uses_similarity=False):
+    """
+    enrich_item の結果を左右する入力だけでキーを作る。
+    イベント・銘柄の更新時刻、予測値、その行が参照するテーマプールの値、特徴量用の価格ウィンドウ。
+    """
+    event = item['_event_obj']
+    theme = (item.get('theme') or '').strip()
+    industry = (item.get('industry') or '').strip()
+    theme_avg = (theme_pool or {}).get('theme', {}).get(normalize_theme(theme)) if theme else None
+    industry_avg = (theme_pool or {}).get('industry', {}).get(industry) if industry else None
+    window_rows = getattr(event, '_feature_price_window', None)
+    if window_rows is not None:
+        window_stamp = repr([(row.offset_days, row.close) for row in window_rows])
+    else:
+        # 価格ウィンドウを先読みしていない場合は全体の水位で代用する
+        window_stamp = watermark
+    parts = [
+        event.pk,
+        _timestamp_ms(event.updated_at),
+        _timestamp_ms(event.stock.updated_at),
+        repr(item.get('predicted_reaction_raw')),
+        repr(theme_avg),
+        repr(industry_avg),
+        window_stamp,
+        watermark if uses_similarity else '-',
+    ]
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'{ITEM_CACHE_VERSION}:{role}:{event.pk}:{digest}'
+
+
+def enrich_items_cached(items, role, theme_pool, watermark, pool_loader=None):
+    """
+    変更のあったイベントだけ enrich_item し直し、それ以外はキャッシュ済みの行を使う。
+    """
+    keyed = []
+    for item in items:
+        if item.get('_event_obj') is None:
+            keyed.append((None, item))
+            continue
+        keyed.append((build_item_cache_key(
+            item, role, theme_pool, watermark, uses_similarity=pool_loader is not None,
+        ), item))
+
+    cached_rows = _cache_get_many([key for key, _ in keyed if key is not None])
+    enriched = []
+    fresh_rows = {}
+    for key, item in keyed:
+        if key is not None and key in cached_rows:
+            enriched.append(cached_rows[key])
+            continue
+        pool = pool_loader() if pool_loader is not None else None
+        enrich_item(item, pool=pool, event_obj=item.get('_event_obj'), theme_pool=theme_pool)
+        if key is not None:
+            fresh_rows[key] = item
+        enriched.append(item)
+    _cache_set_many(fresh_rows)
+    return enriched
+
+
+def build_grouped_payload(today, period='all'):
     include_upcoming = period in {'all', 'upcoming'}
     include_completed = period in {'all', 'completed'}
     earnings_data = fetch_earnings_from_db(today=today, period=period)
@@ -644,31 +810,29 @@ def build_grouped_payload(today, period='all'):
             latest_completed.append(item)
         completed_earnings = latest_completed
 
-    pool = None
     needs_similarity = any(item.get('predicted_reaction_raw') is not None for item in future_earnings)
-    if needs_similarity:
-        pool_events = list(
-            EarningsEvent.objects
-            .filter(reaction_close__isnull=False)
-            .select_related('stock')
-            .prefetch_related(
-                Prefetch(
-                    'price_window',
-                    queryset=EarningsPriceWindow.objects
-                    .filter(offset_days__gte=-21, offset_days__lte=-1)
-                    .only('event_id', 'offset_days', 'close'),
-                    to_attr='_feature_price_window',
-                )
-            )
-        )
-        pool = build_similarity_pool(pool_events)
-
-    theme_pool = build_theme_strength_pool()
-
-    for item in future_earnings:
-        enrich_item(item, pool=pool, event_obj=item.get('_event_obj'), theme_pool=theme_pool)
-    for item in completed_earnings:
-        enrich_item(item, pool=None, event_obj=item.get('_event_obj'), theme_pool=theme_pool)
+    watermark = build_pool_watermark()
+    theme_pool = load_theme_strength_pool(watermark)
+    similarity_pool = {}
+
+    def get_similarity_pool():
+        if 'pool' not in similarity_pool:
+            similarity_pool['pool'] = load_similarity_pool(watermark)
+        return similarity_pool['pool']
+
+    future_earnings = enrich_items_cached(
+        future_earnings,
+        role='upcoming',
+        theme_pool=theme_pool,
+        watermark=watermark,
+        pool_loader=get_similarity_pool if needs_similarity else None,
+    )
+    completed_earnings = enrich_items_cached(
+        completed_earnings,
+        role='completed',
+        theme_pool=theme_pool,
+        watermark=watermark,
+    )
 
     return {
         'upcoming': group_by_date(future_earnings, is_past=False, theme_pool=theme_pool),
@@ -716,7 +880,8 @@ def completed_date_group_count(today):
 def build_cache_key(today, period='all'):
     """
     Cache key invalidated by date and the latest EarningsEvent.updated_at,
-    so any DB write (importer or scraper) busts the cache.
+    so any DB write (importer or scraper) busts the cache. The rebuild itself
+    reuses per-event rows (enrich_items_cached), so only changed events are re-enriched.
     """
     from earning.models import EarningsEvent
     last = EarningsEvent.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
@@ -727,13 +892,26 @@ def build_cache_key(today, period='all'):
 def load_grouped_earnings(today=None, period='all'):
     target_date = today or date.today()
     cache_key = build_cache_key(target_date, period)
-    cached_payload = cache.get(cache_key)
-    if cached_payload is None:
-        cached_payload = build_grouped_payload(target_date, period=period)
-        cache.set(cache_key, cached_payload, CACHE_TTL)
-    return cached_payload
+    with span('grouped_payload'):
+        return _cache_get_or_build(cache_key, lambda: build_grouped_payload(target_date, period=period))
+
+
+def warm_shared_cache(target_cache, today=None):
+    """
+    ビルド時に共有キャッシュのバンドルへ決算ページの値を書き込む。書いた件数を返す。
+    テーマプールはデータが変わらない限り有効なので、バンドルでは失効させない。
+    """
+    target_date = today or date.today()
+    values = {
+        f'{POOL_CACHE_VERSION}:theme:{build_pool_watermark()}': build_theme_strength_pool(),
+    }
+    for period in ('all', 'upcoming', 'completed'):
+        values[build_cache_key(target_date, period)] = build_grouped_payload(target_date, period=period)
+    target_cache.set_many(values, None)
+    return len(values)
 
 
+@query_budget(15)
 @require_GET
 @cache_control(public=True, max_age=0, s_maxage=300, stale_while_revalidate=86400)
 @gzip_page
@@ -762,6 +940,7 @@ def index(request):
     return render(request, 'earning/index.html', context)
 
 
+@query_budget(15)
 @require_GET
 @cache_control(public=True, max_age=0, s_maxage=300, stale_while_revalidate=86400)
 @gzip_page
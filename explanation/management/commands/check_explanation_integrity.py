@@ -5,7 +5,13 @@ from django.core.management.base import BaseCommand, CommandError
 
 from explanation.models import ExplanationSnapshot
 from explanation.services.serializer import snapshot_to_view
-from explanation.services.static_snapshot import snapshot_from_payload
+from explanation.services.static_snapshot import (
+    LEGACY_SNAPSHOT_HISTORY_SCHEMA,
+    SNAPSHOT_HISTORY_INDEX_SCHEMA,
+    load_static_snapshot_history,
+    missing_static_history_blobs,
+    snapshot_from_payload,
+)
 from explanation.services.validation_engine import build_static_trade_validation_summary
 
 
@@ -42,8 +48,22 @@ class Command(BaseCommand):
         outcomes = _read_json(options['outcomes'])
         manifest = _read_json(options['manifest'])
 
-        if history.get('schema') != 'explanation_snapshot_history_v1':
-            raise CommandError('snapshot_history.json schema must be explanation_snapshot_history_v1')
+        if history.get('schema') not in {LEGACY_SNAPSHOT_HISTORY_SCHEMA, SNAPSHOT_HISTORY_INDEX_SCHEMA}:
+            raise CommandError(
+                'snapshot_history.json schema must be '
+                f'{LEGACY_SNAPSHOT_HISTORY_SCHEMA} or {SNAPSHOT_HISTORY_INDEX_SCHEMA}'
+            )
+        if history.get('schema') == SNAPSHOT_HISTORY_INDEX_SCHEMA:
+            history_rows = load_static_snapshot_history(options['history'])
+            if len(history_rows) != len(history.get('rows') or []):
+                raise CommandError('snapshot_history.json index points to missing segment rows')
+            missing_blobs = missing_static_history_blobs(options['history'])
+            if missing_blobs:
+                raise CommandError(
+                    'snapshot_history.json references missing source blobs: ' + ', '.join(missing_blobs[:5])
+                )
+        else:
+            history_rows = history.get('snapshots') or []
         if outcomes.get('schema') != 'explanation_trade_outcomes_v1':
             raise CommandError('trade_outcomes.json schema must be explanation_trade_outcomes_v1')
         if manifest.get('schema') != 'finance_data_manifest_v1':
@@ -82,7 +102,7 @@ class Command(BaseCommand):
 
         _assert_status_names(latest, 'latest_snapshot.json')
         _assert_score_bundle_contract(latest, 'latest_snapshot.json')
-        for index, snapshot_row in enumerate(history.get('snapshots') or []):
+        for index, snapshot_row in enumerate(history_rows):
             if not isinstance(snapshot_row, dict):
                 raise CommandError('snapshot_history.json snapshots must contain JSON objects')
             snapshot_key = snapshot_row.get('snapshot_key') or f'row {index + 1}'
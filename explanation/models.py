@@ -39,6 +39,15 @@ class ExplanationSnapshot(models.Model):
         return f'{self.as_of:%Y-%m-%d %H:%M}: {self.final_label}'
 
 
+class ExplanationSourceBlob(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest[:12]
+
+
 class ExplanationOutcome(models.Model):
     explanation = models.ForeignKey(ExplanationSnapshot, on_delete=models.CASCADE)
     horizon = models.CharField(max_length=16)
@@ -17,6 +17,7 @@ from basecalc.status import (
     price_status_entry,
     status_display_rows,
 )
+from basecalc.request_memo import request_memo
 from basecalc.snapshot import load_basecalc_snapshot
 from basecalc.validation_report import load_validation_report
 from basecalc.views import (
@@ -33,6 +34,7 @@ from basecalc.signal_contract import build_basecalc_signal_contract
 from .contracts import BasecalcSignal
 
 
+@request_memo()
 def load_basecalc_signal(price_override=None) -> BasecalcSignal:
     snapshot = load_basecalc_snapshot() or {}
     if price_override is not None:
@@ -1,14 +1,14 @@
-import json
-from datetime import date, datetime
-
 from django.utils import timezone
 
+from myproject.json_payload import to_json_safe
+
 from ..models import ExplanationSnapshot
 from .audit_engine import evaluate_audit
 from .basecalc_adapter import load_basecalc_signal
 from .fusion_engine import build_final_decision, build_trade_decision_v2
 from .macro_adapter import load_macro_signal
 from .scenario_builder import build_scenarios
+from .source_blobs import save_explanation_snapshot
 
 
 def build_explanation_snapshot(*, save=True, basecalc_price_override=None):
@@ -97,18 +97,12 @@ def build_explanation_snapshot(*, save=True, basecalc_price_override=None):
         version='explanation_v2',
     )
     if save:
-        snapshot.save()
+        save_explanation_snapshot(snapshot)
     return snapshot
 
 
 def _json_safe(value):
-    return json.loads(json.dumps(value, default=_json_default))
-
-
-def _json_default(value):
-    if isinstance(value, (date, datetime)):
-        return value.isoformat()
-    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+    return to_json_safe(value)
 
 
 def _normalize_text_list(items):
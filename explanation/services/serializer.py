@@ -4,13 +4,14 @@ from zoneinfo import ZoneInfo
 
 from .beginner_decision import build_beginner_decision
 from .readiness_score import build_readiness_score
+from .source_blobs import hydrate_snapshot_sources
 
 
 JST = ZoneInfo('Asia/Tokyo')
 
 
 def snapshot_to_view(snapshot):
-    source = snapshot.source_snapshots or {}
+    source = hydrate_snapshot_sources(snapshot).source_snapshots or {}
     macro = source.get('macro') or {}
     basecalc = source.get('basecalc') or {}
     world_model = _world_model_from_basecalc(basecalc)
@@ -225,7 +226,7 @@ def _validation_summary_placeholder(snapshot):
 
 
 def snapshot_to_api(snapshot):
-    source = snapshot.source_snapshots or {}
+    source = hydrate_snapshot_sources(snapshot).source_snapshots or {}
     macro = source.get('macro') or {}
     basecalc = source.get('basecalc') or {}
     levels = (snapshot.scenario or {}).get('levels') or {}
@@ -0,0 +1,143 @@
+import copy
+import json
+import logging
+from functools import lru_cache
+from hashlib import sha256
+from pathlib import Path
+
+from django.db import OperationalError, ProgrammingError
+
+from ..models import ExplanationSourceBlob
+
+logger = logging.getLogger(__name__)
+
+SOURCE_BLOB_SECTIONS = ('macro', 'basecalc')
+SOURCE_BLOB_REF_KEY = 'raw_ref'
+
+
+def source_blob_digest(value):
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def externalize_source_snapshots(source_snapshots, store):
+    """raw を内容ハッシュの参照に置き換え、本体は store(digest, raw) に一度だけ渡す。"""
+    externalized = dict(source_snapshots or {})
+    for section in SOURCE_BLOB_SECTIONS:
+        item = externalized.get(section)
+        if not isinstance(item, dict) or not item.get('raw'):
+            continue
+        digest = source_blob_digest(item['raw'])
+        store(digest, item['raw'])
+        item = {key: value for key, value in item.items() if key != 'raw'}
+        item[SOURCE_BLOB_REF_KEY] = digest
+        externalized[section] = item
+    return externalized
+
+
+def hydrate_source_snapshots(source_snapshots, resolver=None):
+    """raw_ref を持つ section だけ raw を復元する。参照がなければ同じ dict を返す。"""
+    source_snapshots = source_snapshots or {}
+    if not has_source_blob_refs(source_snapshots):
+        return source_snapshots
+    resolver = resolver or resolve_source_blob
+    hydrated = dict(source_snapshots)
+    for section in SOURCE_BLOB_SECTIONS:
+        item = hydrated.get(section)
+        if not isinstance(item, dict) or not item.get(SOURCE_BLOB_REF_KEY):
+            continue
+        item = {key: value for key, value in item.items() if key != SOURCE_BLOB_REF_KEY}
+        item['raw'] = resolver(source_snapshots[section][SOURCE_BLOB_REF_KEY]) or {}
+        hydrated[section] = item
+    return hydrated
+
+
+def has_source_blob_refs(source_snapshots):
+    return any(
+        isinstance((source_snapshots or {}).get(section), dict)
+        and (source_snapshots or {})[section].get(SOURCE_BLOB_REF_KEY)
+        for section in SOURCE_BLOB_SECTIONS
+    )
+
+
+def hydrate_snapshot_sources(snapshot, resolver=None):
+    snapshot.source_snapshots = hydrate_source_snapshots(snapshot.source_snapshots, resolver)
+    return snapshot
+
+
+def save_explanation_snapshot(snapshot):
+    """raw を ExplanationSourceBlob に逃がして保存し、メモリ上の snapshot は raw 付きのまま返す。"""
+    source_snapshots = snapshot.source_snapshots or {}
+    blobs = {}
+    snapshot.source_snapshots = externalize_source_snapshots(source_snapshots, blobs.__setitem__)
+    try:
+        if blobs:
+            ExplanationSourceBlob.objects.bulk_create(
+                [ExplanationSourceBlob(digest=digest, payload=payload) for digest, payload in blobs.items()],
+                ignore_conflicts=True,
+            )
+        snapshot.save()
+    finally:
+        snapshot.source_snapshots = source_snapshots
+    return snapshot
+
+
+def resolve_source_blob(digest):
+    # lru_cache の dict は他のリクエストとも共有なので、呼び出し側には複製を渡す
+    try:
+        return copy.deepcopy(_load_source_blob(digest))
+    except LookupError:
+        logger.warning('explanation source blob %s is missing; raw is left empty', digest)
+        return None
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+@lru_cache(maxsize=32)
+def _load_source_blob(digest):
+    # 内容ハッシュなので一度読めた blob は不変。見つからない場合は例外にしてキャッシュしない。
+    payload = ExplanationSourceBlob.objects.filter(digest=digest).values_list('payload', flat=True).first()
+    if payload is None:
+        raise LookupError(digest)
+    return payload
+
+
+def write_source_blob_file(blob_dir, digest, payload):
+    blob_path = Path(blob_dir) / f'{digest}.json'
+    if blob_path.exists():
+        return blob_path
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = blob_path.with_name(f'.{blob_path.name}.tmp')
+    temp_path.write_text(
+        json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')),
+        encoding='utf-8',
+    )
+    temp_path.replace(blob_path)
+    return blob_path
+
+
+def source_blob_file_resolver(blob_dir):
+    blob_dir = str(blob_dir)
+
+    def resolve(digest):
+        try:
+            return copy.deepcopy(_read_source_blob_file(blob_dir, digest))
+        except (OSError, ValueError) as exc:
+            logger.warning('explanation source blob file %s is unreadable; raw is left empty: %s', digest, exc)
+            return None
+
+    return resolve
+
+
+def missing_source_blob_files(blob_dir, digests):
+    """blob_dir に実体がない digest を返す。"""
+    blob_dir = Path(blob_dir)
+    return sorted({digest for digest in digests if not (blob_dir / f'{digest}.json').is_file()})
+
+
+@lru_cache(maxsize=32)
+def _read_source_blob_file(blob_dir, digest):
+    payload = json.loads((Path(blob_dir) / f'{digest}.json').read_text(encoding='utf-8'))
+    if not isinstance(payload, dict):
+        raise ValueError(f'source blob must be a JSON object: {digest}')
+    return payload
@@ -8,14 +8,30 @@ from django.conf import settings
 from django.db import OperationalError, ProgrammingError
 from django.utils import timezone
 
+from myproject.json_payload import to_json_safe, write_json_payload
+
 from ..models import ExplanationSnapshot, ExplanationTradeOutcome
 from .readiness_score import build_readiness_score
 from .serializer import _snapshot_with_trade_decision, _trade_decision, _world_model_from_basecalc
+from .source_blobs import (
+    SOURCE_BLOB_REF_KEY,
+    SOURCE_BLOB_SECTIONS,
+    externalize_source_snapshots,
+    hydrate_snapshot_sources,
+    hydrate_source_snapshots,
+    missing_source_blob_files,
+    save_explanation_snapshot,
+    source_blob_file_resolver,
+    write_source_blob_file,
+)
 
 
 DEFAULT_EXPLANATION_SNAPSHOT_PATH = Path('explanation/data/latest_snapshot.json')
 DEFAULT_EXPLANATION_SNAPSHOT_HISTORY_PATH = Path('explanation/data/snapshot_history.json')
 DEFAULT_EXPLANATION_TRADE_OUTCOMES_PATH = Path('explanation/data/trade_outcomes.json')
+SNAPSHOT_HISTORY_INDEX_SCHEMA = 'explanation_snapshot_history_v2'
+LEGACY_SNAPSHOT_HISTORY_SCHEMA = 'explanation_snapshot_history_v1'
+DEFAULT_SNAPSHOT_HISTORY_SEGMENT_ROWS = 50
 
 
 def _json_default(value):
@@ -29,6 +45,7 @@ def _path(path, default):
 
 
 def explanation_snapshot_payload(snapshot):
+    hydrate_snapshot_sources(snapshot)
     snapshot_key = snapshot_key_for_snapshot(snapshot)
     basecalc = (snapshot.source_snapshots or {}).get('basecalc') or {}
     trade_decision = _trade_decision(snapshot, _world_model_from_basecalc(basecalc))
@@ -70,14 +87,9 @@ def explanation_snapshot_payload(snapshot):
     }
 
 
-def write_static_explanation_snapshot(snapshot, path=None):
-    payload_path = _path(path, DEFAULT_EXPLANATION_SNAPSHOT_PATH)
-    payload_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = json.loads(json.dumps(explanation_snapshot_payload(snapshot), default=_json_default))
-    payload_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
-        encoding='utf-8',
-    )
+def write_static_explanation_snapshot(snapshot, path=None, pretty=None):
+    payload = to_json_safe(explanation_snapshot_payload(snapshot))
+    write_json_payload(_path(path, DEFAULT_EXPLANATION_SNAPSHOT_PATH), payload, pretty=pretty)
     return payload
 
 
@@ -94,41 +106,74 @@ def load_static_explanation_snapshot(path=None):
     return snapshot_from_payload(payload)
 
 
-def load_static_snapshot_history(path=None):
+def load_static_snapshot_history(path=None, *, last=None, since=None, until=None):
+    return list(iter_static_snapshot_history(path, last=last, since=since, until=until))
+
+
+def iter_static_snapshot_history(path=None, *, last=None, since=None, until=None):
+    """判定履歴を古い順に返す。v2 はインデックスで絞り込んでから該当行だけ読む。"""
     payload_path = _path(path, DEFAULT_EXPLANATION_SNAPSHOT_HISTORY_PATH)
-    payload = _read_json(payload_path)
-    if not isinstance(payload, dict):
+    index = _read_json(payload_path)
+    if not isinstance(index, dict):
+        return
+    if index.get('schema') != SNAPSHOT_HISTORY_INDEX_SCHEMA:
+        rows = index.get('snapshots') or []
+        if not isinstance(rows, list):
+            return
+        rows = [
+            row for row in rows
+            if not isinstance(row, dict) or _history_as_of_in_range(row.get('as_of'), since, until)
+        ]
+        yield from _tail(rows, last)
+        return
+    entries = [
+        entry for entry in index.get('rows') or []
+        if isinstance(entry, dict) and _history_as_of_in_range(entry.get('as_of'), since, until)
+    ]
+    segment_dir = _history_segment_dir(payload_path)
+    resolver = source_blob_file_resolver(_history_blob_dir(payload_path))
+    handles = {}
+    try:
+        for entry in _tail(entries, last):
+            row = _read_history_segment_row(segment_dir, entry, handles)
+            if row is not None:
+                row['source_snapshots'] = hydrate_source_snapshots(row.get('source_snapshots'), resolver)
+                yield row
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+
+def missing_static_history_blobs(path=None):
+    """v2 インデックスの blob_refs のうち、blobs/ に実体がない digest。"""
+    payload_path = _path(path, DEFAULT_EXPLANATION_SNAPSHOT_HISTORY_PATH)
+    index = _read_json(payload_path)
+    if not isinstance(index, dict) or index.get('schema') != SNAPSHOT_HISTORY_INDEX_SCHEMA:
         return []
-    rows = payload.get('snapshots') or []
-    return rows if isinstance(rows, list) else []
+    digests = [
+        digest
+        for entry in index.get('rows') or []
+        if isinstance(entry, dict)
+        for digest in entry.get('blob_refs') or []
+    ]
+    return missing_source_blob_files(_history_blob_dir(payload_path), digests)
 
 
-def append_static_explanation_history(snapshot, path=None, max_rows=500):
+def append_static_explanation_history(snapshot, path=None, max_rows=500, segment_rows=None):
     payload_path = _path(path, DEFAULT_EXPLANATION_SNAPSHOT_HISTORY_PATH)
     payload_path.parent.mkdir(parents=True, exist_ok=True)
-    rows = [
-        _normalize_snapshot_history_payload(row)
-        for row in load_static_snapshot_history(payload_path)
-        if isinstance(row, dict)
-    ]
-    snapshot_payload = json.loads(json.dumps(explanation_snapshot_payload(snapshot), default=_json_default))
+    segment_rows = max(int(segment_rows or DEFAULT_SNAPSHOT_HISTORY_SEGMENT_ROWS), 1)
+    index = _load_history_index(payload_path, segment_rows)
+    entries = index['rows']
+    snapshot_payload = _normalize_snapshot_history_payload(to_json_safe(explanation_snapshot_payload(snapshot)))
     key = _snapshot_history_key(snapshot_payload)
-    existing_keys = {_snapshot_history_key(row) for row in rows if isinstance(row, dict)}
-    added = key not in existing_keys
+    added = key not in {entry.get('history_key') for entry in entries}
     if added:
-        rows.append(snapshot_payload)
-    rows = rows[-max_rows:]
-    payload = {
-        'schema': 'explanation_snapshot_history_v1',
-        'generated_at': timezone.now().isoformat(),
-        'max_rows': max_rows,
-        'snapshots': rows,
-    }
-    payload_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
-        encoding='utf-8',
-    )
-    return {'added': added, 'count': len(rows), 'path': str(payload_path)}
+        entries.append(_append_history_segment_row(payload_path, index, snapshot_payload, segment_rows))
+    entries = entries[-max_rows:]
+    _write_history_index(payload_path, entries, max_rows)
+    _compact_history_segments(payload_path, entries)
+    return {'added': added, 'count': len(entries), 'path': str(payload_path)}
 
 
 def snapshot_from_payload(payload):
@@ -189,7 +234,7 @@ def import_static_explanation_snapshot(path=None):
     ).first()
     if existing:
         return existing, False
-    snapshot.save()
+    save_explanation_snapshot(snapshot)
     return snapshot, True
 
 
@@ -205,7 +250,7 @@ def import_static_snapshot_history(path=None):
         ).first()
         if existing:
             continue
-        snapshot.save()
+        save_explanation_snapshot(snapshot)
         imported += 1
     return imported
 
@@ -239,14 +284,9 @@ def trade_outcomes_payload(outcomes=None, static_rows=None):
     }
 
 
-def write_static_trade_outcomes(path=None, outcomes=None, static_rows=None):
-    payload_path = _path(path, DEFAULT_EXPLANATION_TRADE_OUTCOMES_PATH)
-    payload_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = json.loads(json.dumps(trade_outcomes_payload(outcomes, static_rows=static_rows), default=_json_default))
-    payload_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
-        encoding='utf-8',
-    )
+def write_static_trade_outcomes(path=None, outcomes=None, static_rows=None, pretty=None):
+    payload = to_json_safe(trade_outcomes_payload(outcomes, static_rows=static_rows))
+    write_json_payload(_path(path, DEFAULT_EXPLANATION_TRADE_OUTCOMES_PATH), payload, pretty=pretty)
     return payload
 
 
@@ -379,6 +419,139 @@ def _read_json(path):
         return None
 
 
+def _history_segment_dir(payload_path):
+    return payload_path.with_suffix('')
+
+
+def _history_blob_dir(payload_path):
+    return _history_segment_dir(payload_path) / 'blobs'
+
+
+def _tail(rows, last):
+    if last is None:
+        return rows
+    last = int(last)
+    return rows[-last:] if last > 0 else []
+
+
+def _history_as_of_in_range(as_of, since=None, until=None):
+    if since is None and until is None:
+        return True
+    parsed = _parse_datetime(as_of)
+    if parsed is None:
+        return False
+    if since is not None and parsed < _parse_datetime(since):
+        return False
+    if until is not None and parsed > _parse_datetime(until):
+        return False
+    return True
+
+
+def _read_history_segment_row(segment_dir, entry, handles):
+    name = entry.get('segment')
+    try:
+        handle = handles.get(name)
+        if handle is None:
+            handle = handles[name] = (segment_dir / name).open('rb')
+        handle.seek(int(entry['offset']))
+        row = json.loads(handle.read(int(entry['length'])).decode('utf-8'))
+    except (OSError, KeyError, TypeError, ValueError):
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def _load_history_index(payload_path, segment_rows):
+    """v2 インデックスを読む。v1 の一括JSONなら一度だけ正規化してセグメントへ移す。"""
+    payload = _read_json(payload_path)
+    if not isinstance(payload, dict):
+        return {'rows': []}
+    if payload.get('schema') == SNAPSHOT_HISTORY_INDEX_SCHEMA:
+        return {'rows': [entry for entry in payload.get('rows') or [] if isinstance(entry, dict)]}
+    index = {'rows': []}
+    for row in payload.get('snapshots') or []:
+        if isinstance(row, dict):
+            index['rows'].append(
+                _append_history_segment_row(payload_path, index, _normalize_snapshot_history_payload(row), segment_rows)
+            )
+    return index
+
+
+def _append_history_segment_row(payload_path, index, payload, segment_rows):
+    segment_dir = _history_segment_dir(payload_path)
+    segment_dir.mkdir(parents=True, exist_ok=True)
+    entries = index['rows']
+    segment = entries[-1]['segment'] if entries else _history_segment_name(1)
+    if sum(1 for entry in entries if entry.get('segment') == segment) >= segment_rows:
+        segment = _history_segment_name(_history_segment_number(segment) + 1)
+    blob_dir = _history_blob_dir(payload_path)
+    source_snapshots = externalize_source_snapshots(
+        payload.get('source_snapshots'),
+        lambda digest, raw: write_source_blob_file(blob_dir, digest, raw),
+    )
+    line = json.dumps(
+        {**payload, 'source_snapshots': source_snapshots},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=_json_default,
+    ).encode('utf-8')
+    with (segment_dir / segment).open('ab') as handle:
+        handle.seek(0, os.SEEK_END)
+        offset = handle.tell()
+        handle.write(line + b'\n')
+    return {
+        'snapshot_key': payload.get('snapshot_key') or snapshot_key_for_payload(payload),
+        'history_key': _snapshot_history_key(payload),
+        'as_of': payload.get('as_of'),
+        'segment': segment,
+        'offset': offset,
+        'length': len(line),
+        'blob_refs': [
+            source_snapshots[section][SOURCE_BLOB_REF_KEY]
+            for section in SOURCE_BLOB_SECTIONS
+            if (source_snapshots.get(section) or {}).get(SOURCE_BLOB_REF_KEY)
+        ],
+    }
+
+
+def _history_segment_name(number):
+    return f'segment_{number:06d}.jsonl'
+
+
+def _history_segment_number(name):
+    try:
+        return int(str(name).removeprefix('segment_').removesuffix('.jsonl'))
+    except ValueError:
+        return 0
+
+
+def _write_history_index(payload_path, entries, max_rows):
+    payload = {
+        'schema': SNAPSHOT_HISTORY_INDEX_SCHEMA,
+        'generated_at': timezone.now().isoformat(),
+        'max_rows': max_rows,
+        'segment_dir': _history_segment_dir(payload_path).name,
+        'rows': entries,
+    }
+    temp_path = payload_path.with_name(f'.{payload_path.name}.tmp')
+    temp_path.write_text(
+        json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
+        encoding='utf-8',
+    )
+    os.replace(temp_path, payload_path)
+
+
+def _compact_history_segments(payload_path, entries):
+    """保持件数から外れた行だけになったセグメントと、どの行からも参照されない blob を削除する。"""
+    live_segments = {entry.get('segment') for entry in entries}
+    for segment_path in _history_segment_dir(payload_path).glob('segment_*.jsonl'):
+        if segment_path.name not in live_segments:
+            segment_path.unlink(missing_ok=True)
+    live_blobs = {f'{digest}.json' for entry in entries for digest in entry.get('blob_refs') or []}
+    for blob_path in _history_blob_dir(payload_path).glob('*.json'):
+        if blob_path.name not in live_blobs:
+            blob_path.unlink(missing_ok=True)
+
+
 def _snapshot_history_key(payload):
     final = payload.get('final') or {}
     basecalc = payload.get('basecalc') or {}
@@ -7,6 +7,7 @@ from basecalc.market_bars import market_bars_between, nearest_bar_for_horizon
 from basecalc.validation_report import load_validation_report
 
 from ..models import ExplanationSnapshot, ExplanationTradeOutcome
+from .source_blobs import hydrate_snapshot_sources
 from .static_snapshot import load_static_trade_outcomes, snapshot_from_payload, snapshot_key_for_payload
 
 
@@ -82,6 +83,7 @@ def evaluate_due_trade_outcomes(horizon: Optional[str] = None) -> Dict[str, int]
         due_at = now - timedelta(days=HORIZON_DAYS[item])
         snapshots = ExplanationSnapshot.objects.filter(as_of__lte=due_at).exclude(trade_decision={})
         for snapshot in snapshots.iterator():
+            hydrate_snapshot_sources(snapshot)
             if evaluate_trade_outcome(snapshot, item) is not None:
                 counts[item] += 1
     return counts
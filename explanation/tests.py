@@ -2860,6 +2860,87 @@ class ExplanationViewCompositionTests(SimpleTestCase):
         self.assertEqual(contract_row['status'], 'OK')
         self.assertEqual(contract_row['value'], '20/20')
 
+    def test_static_snapshot_history_appends_to_segments_and_compacts_old_rows(self):
+        from .services.static_snapshot import (
+            SNAPSHOT_HISTORY_INDEX_SCHEMA,
+            append_static_explanation_history,
+            load_static_snapshot_history,
+        )
+
+        base_snapshot = self._snapshot()
+        with TemporaryDirectory() as tmpdir:
+            history = Path(tmpdir) / 'snapshot_history.json'
+            for minutes in range(5):
+                snapshot = self._snapshot()
+                snapshot.as_of = base_snapshot.as_of + timedelta(minutes=minutes)
+                result = append_static_explanation_history(snapshot, history, max_rows=3, segment_rows=2)
+            index = json.loads(history.read_text(encoding='utf-8'))
+            segments = sorted(path.name for path in (Path(tmpdir) / 'snapshot_history').glob('segment_*.jsonl'))
+            blobs = list((Path(tmpdir) / 'snapshot_history' / 'blobs').glob('*.json'))
+            stored_line = json.loads((Path(tmpdir) / 'snapshot_history' / segments[-1]).read_text(encoding='utf-8'))
+            rows = load_static_snapshot_history(history)
+            last_row = load_static_snapshot_history(history, last=1)
+            ranged = load_static_snapshot_history(
+                history,
+                since=base_snapshot.as_of + timedelta(minutes=3),
+                until=base_snapshot.as_of + timedelta(minutes=3),
+            )
+
+        self.assertEqual(index['schema'], SNAPSHOT_HISTORY_INDEX_SCHEMA)
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(segments, ['segment_000002.jsonl', 'segment_000003.jsonl'])
+        self.assertEqual(
+            [row['as_of'] for row in rows],
+            [(base_snapshot.as_of + timedelta(minutes=minutes)).isoformat() for minutes in (2, 3, 4)],
+        )
+        self.assertEqual([entry['snapshot_key'] for entry in index['rows']], [row['snapshot_key'] for row in rows])
+        self.assertEqual(last_row, rows[-1:])
+        self.assertEqual(len(blobs), len(index['rows'][-1]['blob_refs']))
+        self.assertNotIn('raw', stored_line['source_snapshots']['macro'])
+        self.assertEqual(rows[-1]['source_snapshots'], base_snapshot.source_snapshots)
+        self.assertEqual([row['as_of'] for row in ranged], [rows[1]['as_of']])
+
+    def test_static_snapshot_history_blobs_are_copied_and_missing_blobs_are_reported(self):
+        from .services.static_snapshot import (
+            append_static_explanation_history,
+            load_static_snapshot_history,
+            missing_static_history_blobs,
+        )
+        from .services.source_blobs import _read_source_blob_file
+
+        snapshot = self._snapshot()
+        with TemporaryDirectory() as tmpdir:
+            history = Path(tmpdir) / 'snapshot_history.json'
+            append_static_explanation_history(snapshot, history)
+            first = load_static_snapshot_history(history)[0]
+            first['source_snapshots']['basecalc']['raw']['world_model']['mutated'] = True
+            second = load_static_snapshot_history(history)[0]
+            self.assertEqual(missing_static_history_blobs(history), [])
+
+            blob_path = next((Path(tmpdir) / 'snapshot_history' / 'blobs').glob('*.json'))
+            blob_path.unlink()
+            _read_source_blob_file.cache_clear()
+            with self.assertLogs('explanation.services.source_blobs', level='WARNING'):
+                load_static_snapshot_history(history)
+            for name, body in (
+                ('latest_snapshot.json', '{}'),
+                ('trade_outcomes.json', '{}'),
+                ('finance_data_manifest.json', '{}'),
+            ):
+                (Path(tmpdir) / name).write_text(body, encoding='utf-8')
+            with self.assertRaisesMessage(CommandError, f'missing source blobs: {blob_path.stem}'):
+                call_command(
+                    'check_explanation_integrity',
+                    latest=str(Path(tmpdir) / 'latest_snapshot.json'),
+                    history=str(history),
+                    outcomes=str(Path(tmpdir) / 'trade_outcomes.json'),
+                    manifest=str(Path(tmpdir) / 'finance_data_manifest.json'),
+                    stdout=StringIO(),
+                )
+
+        self.assertNotIn('mutated', second['source_snapshots']['basecalc']['raw']['world_model'])
+        self.assertEqual(second['source_snapshots'], snapshot.source_snapshots)
+
     def test_static_snapshot_history_backfills_existing_legacy_rows_when_appending(self):
         from .services.static_snapshot import append_static_explanation_history, load_static_snapshot_history
 
@@ -2908,6 +2989,8 @@ class ExplanationViewCompositionTests(SimpleTestCase):
             rows = load_static_snapshot_history(history)
 
         old_row = rows[0]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(old_row['snapshot_key'], 'old-key')
         self.assertEqual(old_row['trade_decision']['decision_status'], 'wait')
         self.assertEqual(old_row['trade_decision']['entry_permission'], 'no_entry')
         contract_row = next(row for row in old_row['score_bundle']['system_quality_components'] if row['label'] == '判定契約')
@@ -10254,6 +10337,52 @@ class ExplanationSnapshotFactoryPersistenceTests(TestCase):
         self.assertEqual(saved_basecalc['display_status'], 'blocked')
         self.assertEqual(saved_basecalc['explanation_allowed'], 'blocked')
 
+    def test_saved_snapshots_share_source_blobs_and_hydrate_on_read(self):
+        from .models import ExplanationSourceBlob
+        from .services.contracts import BasecalcSignal, MacroSignal
+        from .services.factory import build_explanation_snapshot
+        from .services.serializer import snapshot_to_api
+        from .services.source_blobs import SOURCE_BLOB_REF_KEY
+
+        macro = MacroSignal(
+            bias='positive',
+            summary='Macroは支援的。',
+            confidence_score=78,
+            confidence_grade='B',
+            data_quality_score=82,
+            source={'schema': 'macro_test', 'regime': 'expansion'},
+            as_of=timezone.now(),
+        )
+        basecalc = BasecalcSignal(
+            bias='bullish',
+            summary='日経先物は上昇優勢。',
+            confidence_score=72,
+            confidence_grade='B',
+            data_quality_score=86,
+            readiness_level='ready',
+            can_show_prediction=True,
+            source={'world_model': {'model_version': 'wm_test'}},
+            as_of=timezone.now(),
+        )
+
+        with (
+            mock.patch('explanation.services.factory.load_macro_signal', return_value=macro),
+            mock.patch('explanation.services.factory.load_basecalc_signal', return_value=basecalc),
+        ):
+            first = build_explanation_snapshot(save=True)
+            second = build_explanation_snapshot(save=True)
+
+        stored = ExplanationSnapshot.objects.get(pk=second.pk)
+        self.assertEqual(ExplanationSourceBlob.objects.count(), 2)
+        self.assertNotIn('raw', stored.source_snapshots['basecalc'])
+        self.assertEqual(
+            stored.source_snapshots['basecalc'][SOURCE_BLOB_REF_KEY],
+            ExplanationSnapshot.objects.get(pk=first.pk).source_snapshots['basecalc'][SOURCE_BLOB_REF_KEY],
+        )
+        self.assertEqual(second.source_snapshots['macro']['raw'], {'schema': 'macro_test', 'regime': 'expansion'})
+        snapshot_to_api(stored)
+        self.assertEqual(stored.source_snapshots['basecalc']['raw'], {'world_model': {'model_version': 'wm_test'}})
+
 
 class ExplanationMacroAdapterTests(SimpleTestCase):
     def test_macro_signal_keeps_static_payload_generated_at(self):
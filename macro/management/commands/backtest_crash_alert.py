@@ -10,8 +10,10 @@ from statistics import mean, median
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import BaseCommand, CommandError
 
-from macro.models import Observation, PriceObservation
-from macro.services.crash_alert import compute_crash_alert
+from macro.models import PriceObservation
+from macro.services.crash_alert import CRASH_ALERT_SERIES, compute_crash_alert
+from macro.services.probability_metrics import ProbabilityMetrics
+from macro.services.regime import AsOfPanel
 
 
 DEFAULT_TARGETS = [
@@ -37,36 +39,6 @@ def _month_end(month_start: date) -> date:
     return month_start.replace(day=1) + relativedelta(months=1) - timedelta(days=1)
 
 
-def _make_lookup_for_date(target_date: date):
-    """target_date 時点で利用可能だった各 series の最新値を返す。"""
-    cache = {}
-
-    def lookup(series_id: str):
-        if series_id in cache:
-            return cache[series_id]
-        obs = (
-            Observation.objects
-            .filter(
-                indicator__fred_series_id=series_id,
-                observation_date__lte=target_date,
-            )
-            .select_related('indicator')
-            .order_by('-observation_date')
-            .first()
-        )
-        if obs is None:
-            cache[series_id] = None
-        else:
-            cache[series_id] = {
-                'value': obs.value,
-                'observation_date': obs.observation_date,
-                'frequency': obs.indicator.frequency,
-            }
-        return cache[series_id]
-
-    return lookup
-
-
 def _parse_dates(spec: str):
     out = []
     for item in spec.split(','):
@@ -118,43 +90,6 @@ def _future_drawdown(
     return max_drawdown, lead_days
 
 
-def _roc_auc(records):
-    positives = [r['score'] for r in records if r['event']]
-    negatives = [r['score'] for r in records if not r['event']]
-    if not positives or not negatives:
-        return None
-    wins = 0.0
-    total = 0
-    for pos in positives:
-        for neg in negatives:
-            total += 1
-            if pos > neg:
-                wins += 1
-            elif pos == neg:
-                wins += 0.5
-    return wins / total if total else None
-
-
-def _pr_auc(records):
-    positive_total = sum(1 for r in records if r['event'])
-    if positive_total == 0:
-        return None
-    tp = 0
-    fp = 0
-    previous_recall = 0.0
-    area = 0.0
-    for row in sorted(records, key=lambda r: r['score'], reverse=True):
-        if row['event']:
-            tp += 1
-        else:
-            fp += 1
-        recall = tp / positive_total
-        precision = tp / (tp + fp)
-        area += (recall - previous_recall) * precision
-        previous_recall = recall
-    return area
-
-
 def _threshold_metrics(records):
     metrics = []
     for threshold in THRESHOLDS:
@@ -274,11 +209,13 @@ class Command(BaseCommand):
         self.stdout.write('=' * 80)
         self.stdout.write(f"{'日付':<12} {'レベル':<8} {'点':>4} {'品質':>5} {'強度':>5} 局面")
         self.stdout.write('-' * 80)
-        for date_str, label in targets:
-            target = datetime.strptime(date_str, '%Y-%m-%d').date()
+        target_dates = [datetime.strptime(date_str, '%Y-%m-%d').date() for date_str, _ in targets]
+        panel = AsOfPanel(target_dates, CRASH_ALERT_SERIES)
+        for (date_str, label), target in zip(targets, target_dates):
             result = compute_crash_alert(
-                value_lookup=_make_lookup_for_date(target),
+                value_lookup=panel.value_lookup(target),
                 as_of=target,
+                indicators=panel.indicators,
             )
             score = result['total_score']
             score_str = f'{score:>4}' if score is not None else '   -'
@@ -307,21 +244,26 @@ class Command(BaseCommand):
         if len(prices) < horizon_months + 2:
             raise CommandError('価格データが不足しています。先に価格データを更新してください。')
 
-        rows = []
-        months = sorted(prices)
-        for month_start in months:
+        drawdowns = {}
+        for month_start in sorted(prices):
             max_drawdown, lead_time_days = _future_drawdown(
                 prices,
                 month_start,
                 horizon_months,
                 threshold,
             )
-            if max_drawdown is None:
-                continue
+            if max_drawdown is not None:
+                drawdowns[month_start] = (max_drawdown, lead_time_days)
+        # 全月末の各系列の値を、系列ごとの読み込み1回で引き当てておく
+        panel = AsOfPanel([_month_end(month_start) for month_start in drawdowns], CRASH_ALERT_SERIES)
+
+        rows = []
+        for month_start, (max_drawdown, lead_time_days) in drawdowns.items():
             as_of = _month_end(month_start)
             result = compute_crash_alert(
-                value_lookup=_make_lookup_for_date(as_of),
+                value_lookup=panel.value_lookup(as_of),
                 as_of=as_of,
+                indicators=panel.indicators,
             )
             if result['total_score'] is None:
                 continue
@@ -340,7 +282,8 @@ class Command(BaseCommand):
         if not rows:
             raise CommandError('検証に使える月次行がありません。')
 
-        event_count = sum(1 for row in rows if row['event'])
+        metrics = ProbabilityMetrics(rows, score_key='score')
+        event_count = metrics.positive_count
         lead_times = [row['lead_time_days'] for row in rows if row['lead_time_days'] is not None]
         danger_drawdowns = [
             row['max_drawdown_pct'] for row in rows
@@ -357,8 +300,8 @@ class Command(BaseCommand):
             'drawdown_threshold_pct': threshold,
             'sample_count': len(rows),
             'event_count': event_count,
-            'roc_auc': _roc_auc(rows),
-            'pr_auc': _pr_auc(rows),
+            'roc_auc': metrics.roc_auc(),
+            'pr_auc': metrics.pr_auc(),
             'thresholds': _threshold_metrics(rows),
             'lead_time_days': _quantiles(lead_times),
             'danger_drawdown_pct': _quantiles(danger_drawdowns),
@@ -9,10 +9,13 @@ from django.core.management.base import BaseCommand
 
 from macro.models import Observation, RegimeSnapshot
 from macro.services.regime import (
+    KEY_METRIC_SERIES,
     MODEL_VERSION,
+    AsOfPanel,
+    ObservationPanel,
     _latest_observation,
     classify_regime,
-    collect_key_metrics,
+    collect_key_metrics_for_dates,
 )
 
 
@@ -36,8 +39,11 @@ def _prediction_is_recession(label: str) -> bool:
     return label == RegimeSnapshot.Label.CONTRACTION
 
 
-def _actual_recession(as_of: date) -> Optional[bool]:
-    obs = _latest_observation('USREC', as_of=as_of)
+def _actual_recession(as_of: date, panel: Optional[ObservationPanel] = None) -> Optional[bool]:
+    if panel is not None:
+        obs = panel.at_or_before('USREC', as_of)
+    else:
+        obs = _latest_observation('USREC', as_of=as_of)
     if obs is None or obs.value is None:
         return None
     return obs.value >= 0.5
@@ -115,11 +121,14 @@ class Command(BaseCommand):
         rows = []
         label_counts: Dict[str, int] = {}
 
-        for month in _month_starts(start, latest):
-            metrics = collect_key_metrics(as_of=month)
-            label, strength = classify_regime(metrics)
+        months = _month_starts(start, latest)
+        panel = AsOfPanel(months, (*KEY_METRIC_SERIES, 'USREC'))
+        metrics_by_month = collect_key_metrics_for_dates(months, panel=panel)
+
+        for month in months:
+            label, strength = classify_regime(metrics_by_month[month])
             label_counts[label] = label_counts.get(label, 0) + 1
-            actual = _actual_recession(month)
+            actual = _actual_recession(month, panel)
             rows.append({
                 'month': month.isoformat(),
                 'label': label,
@@ -1,3 +1,4 @@
+import os
 import time
 
 from django.core.management.base import BaseCommand
@@ -49,14 +50,24 @@ class Command(BaseCommand):
             action='store_true',
             help='最後の正常データを古いデータとして出力する場合に指定',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max(1, min(4, os.cpu_count() or 1)),
+            help='依存の揃った区画を並行に計算するスレッド数。1なら逐次実行',
+        )
 
     def handle(self, *args, **options):
         started = time.monotonic()
-        payload = precompute_dashboard_payload()
+        payload = precompute_dashboard_payload(workers=options['workers'])
         duration = round(time.monotonic() - started, 3)
         warnings = payload.get('warnings') or []
         if not isinstance(warnings, list):
             warnings = [str(warnings)]
+        meta = payload.get('precompute_meta') or {}
+        warnings = warnings + [
+            f'section failed: {key}' for key in meta.get('failed_sections') or []
+        ]
         payload = {
             **payload,
             'generated_at': timezone.localtime().isoformat(),
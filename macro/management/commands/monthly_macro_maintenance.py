@@ -6,6 +6,7 @@ from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
 
 from macro.models import WorldModelRun
+from macro.services import forecast_models
 from macro.services.operations import finish_run, start_run
 
 
@@ -88,11 +89,13 @@ class Command(BaseCommand):
         )
         completed = []
         try:
-            for label, command_name, command_args, command_kwargs in steps:
-                self.stdout.write(f'開始: {label}')
-                call_command(command_name, *command_args, **command_kwargs)
-                completed.append(label)
-                self.stdout.write(self.style.SUCCESS(f'完了: {label}'))
+            # 学習と検証の各コマンドで特徴量ブロックを共有する (元データが変われば作り直す)
+            with forecast_models.feature_matrix_memo() as memo:
+                for label, command_name, command_args, command_kwargs in steps:
+                    self.stdout.write(f'開始: {label}')
+                    call_command(command_name, *command_args, **command_kwargs)
+                    completed.append(label)
+                    self.stdout.write(self.style.SUCCESS(f'完了: {label}'))
         except Exception as exc:
             finish_run(
                 run,
@@ -110,6 +113,7 @@ class Command(BaseCommand):
             summary={
                 'message': '月次メンテナンスが完了しました。',
                 'completed_steps': completed,
+                'feature_matrix_memo': memo.summary(),
             },
         )
 
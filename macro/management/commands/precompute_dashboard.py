@@ -20,6 +20,7 @@ from macro.services.dashboard_cache import (
     save_dashboard_payload,
     save_macro_update_status,
 )
+from macro.services.detail import DetailPanel
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +28,22 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'macro ダッシュボードの重い計算結果を DashboardCache に保存する'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                '依存の揃った区画を並行に計算するスレッド数。1なら逐次実行。'
+                'policy_expectation_snapshot は SQLite に書き込むので、'
+                'SQLite では書き込みロック待ちが起きうる点に注意'
+            ),
+        )
+
     def handle(self, *args, **options):
         # 1) メインのダッシュボードペイロード（最重要）
         try:
-            payload = precompute_dashboard_payload()
+            payload = precompute_dashboard_payload(workers=options['workers'])
             save_dashboard_payload(payload)
         except Exception as exc:
             logger.exception('dashboard payload precompute failed')
@@ -55,10 +68,29 @@ class Command(BaseCommand):
 
         keys = ', '.join(payload.keys())
         self.stdout.write(f'precomputed dashboard payload saved (keys: {keys})')
+        meta = payload.get('precompute_meta') or {}
+        slowest = sorted(
+            (meta.get('sections') or {}).items(),
+            key=lambda item: item[1]['elapsed_sec'],
+            reverse=True,
+        )[:5]
+        slowest_text = ', '.join(
+            f"{key} {record['elapsed_sec']:.1f}s" for key, record in slowest
+        )
+        self.stdout.write(
+            f"sections computed in {meta.get('elapsed_sec', 0.0):.1f}s "
+            f"with {meta.get('workers')} workers (slowest: {slowest_text})"
+        )
+        for key in meta.get('failed_sections') or []:
+            error = meta['sections'][key].get('error')
+            self.stdout.write(f'dashboard section failed (空のまま保存): {key}: {error}')
 
         # 2) 指標詳細ページ（best-effort）
+        # 観測値と相関表は類似期間詳細と共有する
+        panel = None
         try:
-            detail_count = precompute_all_indicator_details()
+            panel = DetailPanel()
+            detail_count = precompute_all_indicator_details(panel=panel)
             self.stdout.write(
                 f'precomputed indicator detail payloads saved: {detail_count} 件'
             )
@@ -70,7 +102,7 @@ class Command(BaseCommand):
 
         # 3) 類似期間詳細ページ（best-effort）
         try:
-            similar_count = precompute_top_similar_details(payload=payload)
+            similar_count = precompute_top_similar_details(payload=payload, panel=panel)
             self.stdout.write(
                 f'precomputed similar detail payloads saved: {similar_count} 件'
             )
@@ -1,9 +1,11 @@
+import os
+import time
 from datetime import date
 
 from django.core.management.base import BaseCommand, CommandError
 
 from macro.services.dashboard_cache import write_static_macro_payload
-from macro.services.house_view_backtest import run_house_view_backtest
+from macro.services.house_view_backtest import DEFAULT_SHARD_MONTHS, run_house_view_backtest
 
 
 def _parse_date(value: str) -> date:
@@ -33,6 +35,18 @@ class Command(BaseCommand):
             choices=('auto', 'revised_reference', 'point_in_time'),
         )
         parser.add_argument('--max-rows', type=int, default=240)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max(1, min(4, os.cpu_count() or 1)),
+            help='シャードを並列に流すプロセス数。1なら逐次実行',
+        )
+        parser.add_argument(
+            '--shard-months',
+            type=int,
+            default=DEFAULT_SHARD_MONTHS,
+            help='1シャードに含める月数',
+        )
         parser.add_argument(
             '--output',
             default='static/macro/house_view_backtest.json',
@@ -45,14 +59,28 @@ class Command(BaseCommand):
         if end < start:
             raise CommandError('--end は --start 以降の日付にしてください。')
 
+        started = time.perf_counter()
         payload = run_house_view_backtest(
             start=start,
             end=end,
             horizons=_parse_horizons(options['horizons']),
             data_mode=options['data_mode'],
             max_rows=options['max_rows'],
+            workers=options['workers'],
+            shard_months=options['shard_months'],
+            progress=self._report_shard,
         )
         write_static_macro_payload(payload, options['output'])
         self.stdout.write(
-            self.style.SUCCESS(f"exported house view backtest: {options['output']}")
+            self.style.SUCCESS(
+                f"exported house view backtest: {options['output']} "
+                f"({payload['row_count_total']} rows in {time.perf_counter() - started:.1f}s)"
+            )
+        )
+
+    def _report_shard(self, result):
+        self.stdout.write(
+            f"shard {result['shard'] + 1}/{result['shard_count']} "
+            f"{result['start']}..{result['end']}: {result['month_count']} months, "
+            f"{len(result['rows'])} rows in {result['elapsed_sec']:.1f}s"
         )
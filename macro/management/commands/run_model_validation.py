@@ -15,17 +15,19 @@ class Command(BaseCommand):
         parser.add_argument('--all', action='store_true')
 
     def handle(self, *args, **options):
-        if options['all']:
-            reports = model_validation.run_all_model_validations()
-        else:
-            reports = [
-                model_validation.validate_model(
-                    model_version=options['model'],
-                    target=options['target'],
-                    horizon=options['horizon'],
-                )
-            ]
+        with forecast_models.feature_matrix_memo() as memo:
+            if options['all']:
+                reports = model_validation.run_all_model_validations()
+            else:
+                reports = [
+                    model_validation.validate_model(
+                        model_version=options['model'],
+                        target=options['target'],
+                        horizon=options['horizon'],
+                    )
+                ]
         self.stdout.write(f'検証レポート {len(reports)} 件を保存しました。')
+        self.stdout.write(forecast_models.format_feature_matrix_memo(memo.summary()))
         for report in reports[:20]:
             self.stdout.write(
                 f'  {report.model_version} {report.target} {report.horizon}: '
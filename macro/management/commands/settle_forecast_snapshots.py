@@ -22,3 +22,8 @@ class Command(BaseCommand):
             f"予測検証: {summary['checked_count']} 件確認 / "
             f"{summary['settled_count']} 件確定"
         )
+        if summary['next_due_date']:
+            self.stdout.write(
+                f"未決済: {len(summary['pending_groups'])} グループ / "
+                f"次の決済可能月 {summary['next_due_date']}"
+            )
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 
 from macro.services.production_data_sync import (
+    DEFAULT_MAX_WORKERS,
     ProductionDataSyncError,
     discover_data_paths,
     sync_production_data,
@@ -22,6 +23,17 @@ class Command(BaseCommand):
             action="store_true",
             help="同期対象のデータファイル一覧を表示する",
         )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="本番 manifest による差分判定をせず、全ファイルを取得する",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_MAX_WORKERS,
+            help=f"並列ダウンロード数 (既定: {DEFAULT_MAX_WORKERS})",
+        )
         parser.add_argument(
             "--no-staticfiles-mirror",
             action="store_true",
@@ -38,6 +50,8 @@ class Command(BaseCommand):
             result = sync_production_data(
                 paths=options["paths"],
                 mirror_staticfiles=not options["no_staticfiles_mirror"],
+                use_manifest=not options["full"],
+                max_workers=options["workers"],
             )
         except ProductionDataSyncError as exc:
             raise CommandError(str(exc)) from exc
@@ -47,10 +61,15 @@ class Command(BaseCommand):
                 "本番データ同期が完了しました "
                 f"(更新: {result['updated_count']}件, "
                 f"変更なし: {result['unchanged_count']}件, "
-                f"staticfiles反映: {result['mirrored_count']}件)"
+                f"staticfiles反映: {result['mirrored_count']}件, "
+                f"ダウンロード: {result['downloaded_count']}件, "
+                f"manifest一致で省略: {len(result['skipped_by_manifest'])}件, "
+                f"304: {len(result['not_modified'])}件)"
             )
         )
         for path in result["updated"]:
             self.stdout.write(f"updated: {path}")
         for path in result["mirrored"]:
             self.stdout.write(f"mirrored: {path}")
+        for path in result["skipped_imports"]:
+            self.stdout.write(f"import skipped (unchanged): {path}")
@@ -11,6 +11,7 @@ from django.utils import timezone
 
 from macro.services import crash_probability
 from macro.services.forecast_models import save_forecast_snapshot
+from macro.services.probability_metrics import ProbabilityMetrics
 
 
 OUTPUT_RELATIVE_PATH = Path('static') / 'macro' / 'crash_probability_model.json'
@@ -79,7 +80,8 @@ class Command(BaseCommand):
             )
             raw_scored_validation.append({**row, 'probability': probability})
 
-        raw_calibration_bins = crash_probability.calibration_bins(raw_scored_validation)
+        raw_metrics = ProbabilityMetrics(raw_scored_validation)
+        raw_calibration_bins = raw_metrics.calibration_bins()
         scored_validation = []
         for row in raw_scored_validation:
             calibrated = crash_probability.calibrated_probability(
@@ -101,7 +103,8 @@ class Command(BaseCommand):
             current_raw_probability,
             raw_calibration_bins,
         )
-        validation_event_count = sum(1 for row in scored_validation if row['event'])
+        metrics = ProbabilityMetrics(scored_validation)
+        validation_event_count = metrics.positive_count
         event_rate_interval = crash_probability.wilson_interval(
             validation_event_count,
             len(scored_validation),
@@ -148,14 +151,16 @@ class Command(BaseCommand):
             'validation_event_count': validation_event_count,
             'validation_event_rate_interval': event_rate_interval,
             'validation': {
-                'roc_auc': crash_probability.roc_auc(scored_validation),
-                'pr_auc': crash_probability.pr_auc(scored_validation),
-                'brier_score': crash_probability.brier_score(scored_validation),
+                'roc_auc': metrics.roc_auc(),
+                'pr_auc': metrics.pr_auc(),
+                'brier_score': metrics.brier_score(),
+                'log_loss': metrics.log_loss(),
                 'thresholds': crash_probability.threshold_metrics(scored_validation),
-                'calibration_bins': crash_probability.calibration_bins(scored_validation),
-                'raw_roc_auc': crash_probability.roc_auc(raw_scored_validation),
-                'raw_pr_auc': crash_probability.pr_auc(raw_scored_validation),
-                'raw_brier_score': crash_probability.brier_score(raw_scored_validation),
+                'calibration_bins': metrics.calibration_bins(),
+                'bootstrap_intervals': metrics.bootstrap_intervals(),
+                'raw_roc_auc': raw_metrics.roc_auc(),
+                'raw_pr_auc': raw_metrics.pr_auc(),
+                'raw_brier_score': raw_metrics.brier_score(),
                 'raw_calibration_bins': raw_calibration_bins,
             },
             'coefficients': crash_probability.coefficient_rows(model),
@@ -48,13 +48,21 @@ class Command(BaseCommand):
         results = []
         skipped = []
 
-        for target in targets:
-            for horizon in horizons:
-                matrix = forecast_models.build_monthly_feature_matrix(
+        # 特徴量ブロックは全ターゲット・ホライズンで共有し、ラベル列だけ付け替える
+        with forecast_models.feature_matrix_memo() as memo:
+            matrices = {
+                (target, horizon): forecast_models.build_monthly_feature_matrix(
                     'macro_forecast',
                     target,
                     horizon,
                 )
+                for target in targets
+                for horizon in horizons
+            }
+
+        for target in targets:
+            for horizon in horizons:
+                matrix = matrices[(target, horizon)]
                 rows = matrix.get('rows') or []
                 if len(rows) < MIN_TRAINING_SAMPLES:
                     skipped.append({
@@ -136,6 +144,7 @@ class Command(BaseCommand):
             encoding='utf-8',
         )
         self.stdout.write(self.style.SUCCESS(f'マクロ予測 JSON 書き出し: {out_path}'))
+        self.stdout.write(forecast_models.format_feature_matrix_memo(memo.summary()))
         for row in results:
             self.stdout.write(
                 f"  {row['target']} {row['horizon']}: "
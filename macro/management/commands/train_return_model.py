@@ -70,10 +70,18 @@ class Command(BaseCommand):
         results = []
         skipped = []
 
+        # 特徴量ブロックは全ターゲット・ホライズンで共有し、ラベル列だけ付け替える
+        with forecast_models.feature_matrix_memo() as memo:
+            matrices = {
+                (target, horizon): return_model_config(target, horizon)['matrix_builder'](target, horizon)
+                for target in targets
+                for horizon in horizons
+            }
+
         for target in targets:
             for horizon in horizons:
                 config = return_model_config(target, horizon)
-                matrix = config['matrix_builder'](target, horizon)
+                matrix = matrices[(target, horizon)]
                 rows = matrix.get('rows') or []
                 if len(rows) < MIN_TRAINING_SAMPLES:
                     skipped.append({
@@ -160,6 +168,7 @@ class Command(BaseCommand):
         )
         self._write_legacy_lightgbm_payload(results)
         self.stdout.write(self.style.SUCCESS(f'リターン予測 JSON 書き出し: {out_path}'))
+        self.stdout.write(forecast_models.format_feature_matrix_memo(memo.summary()))
         for row in results:
             self.stdout.write(
                 f"  {row['target']} {row['horizon']}: "
@@ -101,6 +101,7 @@ PRICE_ACTION_SPECS = [
 ]
 
 COMPONENT_SPECS = NORMAL_COMPONENT_SPECS + PRICE_ACTION_SPECS
+CRASH_ALERT_SERIES = tuple(spec['series_id'] for spec in COMPONENT_SPECS)
 
 CATEGORY_WEIGHTS = {
     'volatility_sentiment': 0.30,
@@ -412,15 +413,23 @@ def _quality_warnings(
     return warnings
 
 
-def compute_crash_alert(value_lookup=None, as_of: Optional[date] = None) -> Dict:
-    """市場ストレス・急落警戒スコアを計算する。"""
+def compute_crash_alert(
+    value_lookup=None,
+    as_of: Optional[date] = None,
+    *,
+    indicators: Optional[Dict[str, Indicator]] = None,
+) -> Dict:
+    """市場ストレス・急落警戒スコアを計算する。
+
+    indicators (系列ID -> Indicator) を渡すと、複数時点を続けて計算するときに Indicator を読み直さない。
+    """
     target_date = as_of or timezone.localdate()
     lookup = value_lookup or (lambda series_id: _latest_observation_meta(series_id, as_of=as_of))
-    series_ids = [spec['series_id'] for spec in COMPONENT_SPECS]
-    indicators = {
-        i.fred_series_id: i
-        for i in Indicator.objects.filter(fred_series_id__in=series_ids)
-    }
+    if indicators is None:
+        indicators = {
+            i.fred_series_id: i
+            for i in Indicator.objects.filter(fred_series_id__in=CRASH_ALERT_SERIES)
+        }
 
     components = [
         _component_result(
@@ -15,6 +15,7 @@ from dateutil.relativedelta import relativedelta
 
 from macro.models import DailyPriceObservation, Observation, PriceObservation
 from macro.services.crash_alert import compute_crash_alert
+from macro.services.probability_metrics import ProbabilityMetrics, wilson_interval  # noqa: F401
 
 
 TARGET_TICKERS = {
@@ -328,73 +329,15 @@ def predict_probability(model: Dict, features: Dict[str, float]) -> float:
 
 
 def roc_auc(records: List[Dict], score_key: str = 'probability') -> Optional[float]:
-    positives = [r[score_key] for r in records if r['event']]
-    negatives = [r[score_key] for r in records if not r['event']]
-    if not positives or not negatives:
-        return None
-    wins = 0.0
-    total = 0
-    for pos in positives:
-        for neg in negatives:
-            total += 1
-            if pos > neg:
-                wins += 1
-            elif pos == neg:
-                wins += 0.5
-    return wins / total if total else None
+    return ProbabilityMetrics(records, score_key).roc_auc()
 
 
 def pr_auc(records: List[Dict], score_key: str = 'probability') -> Optional[float]:
-    positive_total = sum(1 for r in records if r['event'])
-    if positive_total == 0:
-        return None
-    tp = 0
-    fp = 0
-    previous_recall = 0.0
-    area = 0.0
-    for row in sorted(records, key=lambda r: r[score_key], reverse=True):
-        if row['event']:
-            tp += 1
-        else:
-            fp += 1
-        recall = tp / positive_total
-        precision = tp / (tp + fp)
-        area += (recall - previous_recall) * precision
-        previous_recall = recall
-    return area
+    return ProbabilityMetrics(records, score_key).pr_auc()
 
 
 def brier_score(records: List[Dict]) -> Optional[float]:
-    if not records:
-        return None
-    return mean([
-        (row['probability'] - (1.0 if row['event'] else 0.0)) ** 2
-        for row in records
-    ])
-
-
-def wilson_interval(
-    event_count: int,
-    sample_count: int,
-    *,
-    z_value: float = 1.96,
-) -> Optional[Tuple[float, float]]:
-    """少数イベントでも極端になりにくい実現率の目安範囲。"""
-    if sample_count <= 0 or event_count < 0 or event_count > sample_count:
-        return None
-    p_hat = event_count / sample_count
-    z2 = z_value ** 2
-    denominator = 1 + z2 / sample_count
-    center = (p_hat + z2 / (2 * sample_count)) / denominator
-    spread = (
-        z_value
-        * math.sqrt(
-            (p_hat * (1 - p_hat) / sample_count)
-            + z2 / (4 * sample_count ** 2)
-        )
-        / denominator
-    )
-    return max(0.0, center - spread), min(1.0, center + spread)
+    return ProbabilityMetrics(records).brier_score()
 
 
 def threshold_metrics(records: List[Dict], thresholds=(0.1, 0.2, 0.3, 0.5)) -> List[Dict]:
@@ -427,39 +370,7 @@ def threshold_metrics(records: List[Dict], thresholds=(0.1, 0.2, 0.3, 0.5)) -> L
 
 
 def calibration_bins(records: List[Dict], bins: int = 5) -> List[Dict]:
-    if not records:
-        return []
-    out = []
-    for idx in range(bins):
-        lower = idx / bins
-        upper = (idx + 1) / bins
-        bucket = [
-            row for row in records
-            if lower <= row['probability'] < upper
-            or (idx == bins - 1 and row['probability'] == 1.0)
-        ]
-        if not bucket:
-            out.append({
-                'lower': lower,
-                'upper': upper,
-                'count': 0,
-                'event_count': 0,
-                'avg_probability': None,
-                'event_rate': None,
-                'smoothed_event_rate': None,
-            })
-            continue
-        event_count = sum(1 for row in bucket if row['event'])
-        out.append({
-            'lower': lower,
-            'upper': upper,
-            'count': len(bucket),
-            'event_count': event_count,
-            'avg_probability': mean(row['probability'] for row in bucket),
-            'event_rate': event_count / len(bucket),
-            'smoothed_event_rate': (event_count + 1) / (len(bucket) + 2),
-        })
-    return out
+    return ProbabilityMetrics(records).calibration_bins(bins)
 
 
 def calibrated_probability(raw_probability: float, bins: List[Dict]) -> float:
@@ -39,7 +39,7 @@ from .judgment import evaluate as evaluate_judgment
 from .linkage import compute_pair_relationships
 from .raw_archive import latest_archive_status
 from .similarity import find_similar_months
-from .sparkline import generate_sparkline_svg
+from .sparkline import CARD_STYLE, render_sparklines
 
 logger = logging.getLogger(__name__)
 
@@ -140,7 +140,8 @@ def _bulk_load_monthly_values(
 def build_indicator_cards() -> List[Dict]:
     """全アクティブ指標のカード情報を作る。
 
-    最新観測値はサブクエリで 1 クエリ、スパークラインの月次値も 1 クエリでまとめて取得する。
+    最新観測値はサブクエリで 1 クエリ、スパークラインの月次値も 1 クエリでまとめて取得し、
+    SVG は全カードぶんを 1 回の render_sparklines で描く。
     """
     latest_obs_qs = (
         Observation.objects
@@ -162,6 +163,14 @@ def build_indicator_cards() -> List[Dict]:
     monthly_by_id = _bulk_load_monthly_values(
         [i.id for i in indicators], SPARKLINE_MONTHS,
     )
+    sparklines = render_sparklines(
+        (
+            (ind.fred_series_id, ind.latest_obs_date, monthly_by_id.get(ind.id, []))
+            for ind in indicators
+            if ind.latest_obs_date is not None
+        ),
+        CARD_STYLE,
+    )
 
     cards: List[Dict] = []
     for ind in indicators:
@@ -207,9 +216,7 @@ def build_indicator_cards() -> List[Dict]:
             'direction_arrow': _direction_from(
                 ind.latest_prev_value, ind.latest_value,
             ),
-            'sparkline_svg': generate_sparkline_svg(
-                monthly_by_id.get(ind.id, []),
-            ),
+            'sparkline_svg': sparklines[ind.fred_series_id],
         })
     return cards
 
@@ -642,9 +649,9 @@ def build_vintage_status_context() -> Dict:
     }
 
 
-def build_similar_periods(top_n: int = 5) -> List[Dict]:
+def build_similar_periods(top_n: int = 5, lookup: Optional[Dict] = None) -> List[Dict]:
     try:
-        raw = find_similar_months(top_n=top_n)
+        raw = find_similar_months(top_n=top_n, lookup=lookup)
     except Exception:
         logger.exception("Similarity computation failed")
         return []
@@ -1522,22 +1529,36 @@ def _build_decision_confidence(
     }
 
 
-def build_macro_decision_context(snapshot: Optional[RegimeSnapshot]) -> Dict:
-    """トップ画面用に、判断に必要な要素だけを集約する。"""
+def build_macro_decision_context(
+    snapshot: Optional[RegimeSnapshot],
+    *,
+    crash: Optional[Dict] = None,
+    world: Optional[Dict] = None,
+    quality_report: Optional[Dict] = None,
+    policy: Optional[Dict] = None,
+) -> Dict:
+    """トップ画面用に、判断に必要な要素だけを集約する。
+
+    事前計算ではほかのセクションで作った結果を渡し、渡されなかったものだけここで作る。
+    """
     regime = build_regime_context(snapshot)
     reliability = build_reliability_context(
         last_updated=regime.get('snapshot_date'),
         regime_model_version=regime.get('regime_model_version'),
     )
-    crash = build_crash_alert_context()
-    world = build_world_state_context()
-    quality_report = build_data_quality_report()
-    try:
-        from .policy_expectation import build_policy_expectation_context
-        policy = build_policy_expectation_context()
-    except Exception:
-        logger.exception("Policy expectation context failed")
-        policy = {}
+    if crash is None:
+        crash = build_crash_alert_context()
+    if world is None:
+        world = build_world_state_context()
+    if quality_report is None:
+        quality_report = build_data_quality_report()
+    if policy is None:
+        try:
+            from .policy_expectation import build_policy_expectation_context
+            policy = build_policy_expectation_context()
+        except Exception:
+            logger.exception("Policy expectation context failed")
+            policy = {}
 
     return {
         'headline': regime['regime_plain_judgment'],
@@ -2083,9 +2104,9 @@ def _safe_float(value):
         return None
 
 
-def build_historical_crash_similarity(top_n: int = 3) -> List[Dict]:
+def build_historical_crash_similarity(top_n: int = 3, lookup: Optional[Dict] = None) -> List[Dict]:
     """歴史的クラッシュ月との類似度を返す。"""
-    return find_similar_crash_months(top_n=top_n)
+    return find_similar_crash_months(top_n=top_n, lookup=lookup)
 
 
 def _classify_predicted_return(pct: float) -> str:
@@ -9,12 +9,17 @@ from __future__ import annotations
 
 import json
 import logging
-from datetime import date, datetime
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
 
 from django.conf import settings
+from django.db import connections, transaction
 from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from myproject.json_payload import to_json_safe, write_json_payload
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +35,7 @@ LEGACY_DASHBOARD_CACHE_KEYS = (
 INDICATOR_DETAIL_CACHE_PREFIX = 'macro_indicator_detail_v1:'
 SIMILAR_DETAIL_CACHE_PREFIX = 'macro_similar_detail_v1:'
 UPDATE_STATUS_CACHE_KEY = 'macro_update_status_v1'
+CACHE_WRITE_BATCH_SIZE = 200
 STATIC_MACRO_PAYLOAD_PATH = Path('static/macro/latest_dashboard.json')
 STATIC_MACRO_OPERATIONS_STATUS_PATH = Path('static/macro/operations_status.json')
 
@@ -42,19 +48,9 @@ def similar_detail_cache_key(month_iso: str) -> str:
     return f'{SIMILAR_DETAIL_CACHE_PREFIX}{month_iso}'
 
 
-def _json_default(value):
-    if isinstance(value, (datetime, date)):
-        return value.isoformat()
-    # Django モデルインスタンスはキャッシュ目的では捨てる（テンプレート未使用）
-    from django.db.models import Model
-    if isinstance(value, Model):
-        return None
-    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
-
-
 def save_dashboard_payload(payload: dict) -> None:
     from ..models import DashboardCache
-    serialized = json.loads(json.dumps(payload, default=_json_default))
+    serialized = to_json_safe(payload)
     DashboardCache.objects.update_or_create(
         cache_key=DASHBOARD_CACHE_KEY,
         defaults={'payload': serialized},
@@ -99,14 +95,13 @@ def load_static_macro_operations_status() -> Optional[dict]:
     return load_static_macro_payload(STATIC_MACRO_OPERATIONS_STATUS_PATH)
 
 
-def write_static_macro_payload(payload: dict, path: str | Path | None = None) -> None:
+def write_static_macro_payload(
+    payload: dict,
+    path: str | Path | None = None,
+    pretty: bool | None = None,
+) -> None:
     payload_path = Path(path) if path else settings.BASE_DIR / STATIC_MACRO_PAYLOAD_PATH
-    payload_path.parent.mkdir(parents=True, exist_ok=True)
-    serialized = json.loads(json.dumps(payload, default=_json_default))
-    payload_path.write_text(
-        json.dumps(serialized, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
-        encoding='utf-8',
-    )
+    write_json_payload(payload_path, payload, pretty=pretty)
 
 
 def load_dashboard_cache_meta() -> dict:
@@ -140,7 +135,7 @@ def invalidate_dashboard_cache() -> None:
 
 def save_indicator_detail_payload(series_id: str, payload: dict) -> None:
     from ..models import DashboardCache
-    serialized = json.loads(json.dumps(payload, default=_json_default))
+    serialized = to_json_safe(payload)
     DashboardCache.objects.update_or_create(
         cache_key=indicator_detail_cache_key(series_id),
         defaults={'payload': serialized},
@@ -171,7 +166,7 @@ def invalidate_indicator_detail_caches() -> None:
 
 def save_similar_detail_payload(month_iso: str, payload: dict) -> None:
     from ..models import DashboardCache
-    serialized = json.loads(json.dumps(payload, default=_json_default))
+    serialized = to_json_safe(payload)
     DashboardCache.objects.update_or_create(
         cache_key=similar_detail_cache_key(month_iso),
         defaults={'payload': serialized},
@@ -205,7 +200,7 @@ def save_macro_update_status(status: dict) -> None:
         **status,
         'recorded_at': status.get('recorded_at') or timezone.now().isoformat(),
     }
-    serialized = json.loads(json.dumps(payload, default=_json_default))
+    serialized = to_json_safe(payload)
     DashboardCache.objects.update_or_create(
         cache_key=UPDATE_STATUS_CACHE_KEY,
         defaults={'payload': serialized},
@@ -229,99 +224,291 @@ def load_macro_update_status() -> Optional[dict]:
     }
 
 
-def precompute_dashboard_payload() -> dict:
-    """ビューで使う重い計算結果をまとめて返す。"""
-    from .dashboard import (
-        build_crash_alert_context,
-        build_forecast_monitor_context,
-        build_historical_crash_similarity,
-        build_indicator_cards,
-        build_linkages,
-        build_macro_decision_context,
-        build_macro_forecast_report_context,
-        build_macro_outcome_validation_context,
-        build_forecast_model_context,
-        build_model_validation_context,
-        build_monthly_model_status,
-        build_raw_archive_context,
-        build_vintage_status_context,
-        build_world_state_context,
-        build_world_model_operations_context,
-        build_similar_periods,
-        build_top_decision_context,
-        TOP_MACRO_SERIES,
-        load_regime_probability_model,
-    )
-    from .data_sync import get_latest_observation_date
-    from .data_quality import build_data_quality_report
-    from .goldman_outlook import build_goldman_outlook_comparison
-    from .house_view import build_house_view_context
-    from .house_view_validation import build_house_view_validation_report
-    from .scenario import build_auto_scenarios
-    from .validation_weights import build_validation_weight_report
-    from .vintage_quality import build_vintage_quality_report
-    from .policy_expectation import (
-        build_policy_expectation_context,
-        build_policy_expectation_snapshot,
-    )
+class DashboardSection(NamedTuple):
+    """事前計算の1区画。builder は呼び出し時に解決するので、差し替え (mock) がそのまま効く。
+
+    args / kwargs には他の区画の key を書き、その結果を位置引数・キーワード引数で受け取る。
+    publish=False の区画は共有の入力 (データの目印や先読みした観測値) で、ペイロードには載せない。
+    """
+
+    key: str
+    builder: Union[str, Callable]
+    args: Tuple[str, ...] = ()
+    kwargs: Tuple[Tuple[str, str], ...] = ()
+    deps: Tuple[str, ...] = ()
+    publish: bool = True
+
+    @property
+    def requires(self) -> Tuple[str, ...]:
+        return (*self.args, *(name for _, name in self.kwargs), *self.deps)
+
+    def run(self, results: dict) -> Any:
+        builder = import_string(self.builder) if isinstance(self.builder, str) else self.builder
+        return builder(
+            *(results[name] for name in self.args),
+            **{param: results[name] for param, name in self.kwargs},
+        )
+
+
+DASHBOARD_SECTIONS = (
+    DashboardSection('latest_observation_date', 'macro.services.data_sync.get_latest_observation_date', publish=False),
+    DashboardSection('latest_snapshot', 'macro.services.dashboard_cache._latest_regime_snapshot', publish=False),
+    DashboardSection('observation_panel', 'macro.services.dashboard_cache._key_metric_panel', publish=False),
+    DashboardSection('importance_a_lookup', 'macro.services.similarity.load_importance_a_lookup', publish=False),
+    # 政策期待スナップショットを保存してから、それを読む区画を流す
+    DashboardSection(
+        'policy_expectation_snapshot',
+        'macro.services.policy_expectation.build_policy_expectation_snapshot',
+        publish=False,
+    ),
+    DashboardSection('data_quality_report', 'macro.services.data_quality.build_data_quality_report'),
+    DashboardSection('house_view', 'macro.services.house_view.build_house_view_context'),
+    DashboardSection('goldman_outlook_comparison', 'macro.services.goldman_outlook.build_goldman_outlook_comparison'),
+    DashboardSection('house_view_validation', 'macro.services.house_view_validation.build_house_view_validation_report'),
+    DashboardSection('vintage_quality_report', 'macro.services.vintage_quality.build_vintage_quality_report'),
+    DashboardSection('validation_weight_report', 'macro.services.validation_weights.build_validation_weight_report'),
+    DashboardSection(
+        'macro_decision',
+        'macro.services.dashboard.build_macro_decision_context',
+        args=('latest_snapshot',),
+        kwargs=(
+            ('crash', 'crash_alert'),
+            ('world', 'world_state'),
+            ('quality_report', 'data_quality_report'),
+            ('policy', 'policy_expectation'),
+        ),
+    ),
+    DashboardSection('macro_forecast_report', 'macro.services.dashboard.build_macro_forecast_report_context'),
+    DashboardSection('macro_outcome_validation', 'macro.services.dashboard.build_macro_outcome_validation_context'),
+    DashboardSection(
+        'similar_periods',
+        'macro.services.dashboard.build_similar_periods',
+        kwargs=(('lookup', 'importance_a_lookup'),),
+    ),
+    DashboardSection('linkages', 'macro.services.dashboard.build_linkages'),
+    DashboardSection(
+        'indicator_cards',
+        'macro.services.dashboard_cache._top_indicator_cards',
+        args=('audit_indicator_cards',),
+    ),
+    DashboardSection('audit_indicator_cards', 'macro.services.dashboard.build_indicator_cards'),
+    DashboardSection('crash_alert', 'macro.services.dashboard.build_crash_alert_context'),
+    DashboardSection('monthly_model_status', 'macro.services.dashboard.build_monthly_model_status'),
+    DashboardSection('forecast_monitor', 'macro.services.dashboard.build_forecast_monitor_context'),
+    DashboardSection('world_state', 'macro.services.dashboard.build_world_state_context'),
+    DashboardSection('forecast_models', 'macro.services.dashboard.build_forecast_model_context'),
+    DashboardSection('model_validation', 'macro.services.dashboard.build_model_validation_context'),
+    DashboardSection('world_model_operations', 'macro.services.dashboard.build_world_model_operations_context'),
+    DashboardSection('raw_archive_status', 'macro.services.dashboard.build_raw_archive_context'),
+    DashboardSection('vintage_status', 'macro.services.dashboard.build_vintage_status_context'),
+    DashboardSection('regime_probability_model', 'macro.services.dashboard.load_regime_probability_model'),
+    DashboardSection(
+        'policy_expectation',
+        'macro.services.policy_expectation.build_policy_expectation_context',
+        deps=('policy_expectation_snapshot',),
+    ),
+    DashboardSection(
+        'scenario_analysis',
+        'macro.services.scenario.build_auto_scenarios',
+        kwargs=(('panel', 'observation_panel'),),
+        deps=('policy_expectation_snapshot',),
+    ),
+    DashboardSection(
+        'historical_crash_similarity',
+        'macro.services.dashboard.build_historical_crash_similarity',
+        kwargs=(('lookup', 'importance_a_lookup'),),
+    ),
+)
+
 
-    latest_obs_date = get_latest_observation_date()
+def _latest_regime_snapshot():
     from ..models import RegimeSnapshot
-    latest_snapshot = RegimeSnapshot.objects.order_by('-snapshot_date').first()
-    all_indicator_cards = build_indicator_cards()
-    top_indicator_cards = [
-        card for card in all_indicator_cards
+    return RegimeSnapshot.objects.order_by('-snapshot_date').first()
+
+
+def _key_metric_panel():
+    from .regime import ObservationPanel
+    return ObservationPanel.for_dates([None])
+
+
+def _top_indicator_cards(all_indicator_cards: Optional[list]) -> list:
+    from .dashboard import TOP_MACRO_SERIES
+    return [
+        card for card in all_indicator_cards or []
         if card.get('series_id') in TOP_MACRO_SERIES
     ]
 
-    try:
-        build_policy_expectation_snapshot()
-    except Exception:
-        logger.exception('policy expectation precompute failed')
 
+def _run_section(section: DashboardSection, results: dict) -> Tuple[Any, dict]:
+    """区画を1つ実行する。失敗しても例外は外へ出さず、結果 None と失敗内容を返す。"""
+    started = time.perf_counter()
+    try:
+        value = section.run(results)
+        record = {'status': 'ok'}
+    except Exception as exc:
+        logger.exception('dashboard section precompute failed: %s', section.key)
+        value = None
+        record = {'status': 'failed', 'error': f'{type(exc).__name__}: {exc}'}
+    record['elapsed_sec'] = round(time.perf_counter() - started, 4)
+    return value, record
+
+
+def _run_section_in_worker(section: DashboardSection, results: dict) -> Tuple[Any, dict]:
+    # ワーカースレッドは自分の DB 接続を開くので、終わったら閉じておく
+    try:
+        return _run_section(section, results)
+    finally:
+        connections.close_all()
+
+
+def run_dashboard_sections(
+    sections: Iterable[DashboardSection] = DASHBOARD_SECTIONS,
+    *,
+    workers: int = 1,
+) -> Tuple[dict, dict]:
+    """依存関係の順に区画を実行し、(key -> 結果, key -> 実行記録) を返す。
+
+    workers > 1 なら依存の揃った区画からスレッドで並行に流す。失敗した区画の結果は None とし、
+    それに依存する区画もそのまま実行する (各ビルダーは入力が None なら自前で作り直す)。
+    """
+    sections = list(sections)
+    keys = {section.key for section in sections}
+    for section in sections:
+        missing = [name for name in section.requires if name not in keys]
+        if missing:
+            raise ValueError(f'dashboard section {section.key} requires unknown sections: {missing}')
+
+    results = {}
+    records = {}
+    pending = list(sections)
+
+    def ready():
+        return [
+            section for section in pending
+            if all(name in results for name in section.requires)
+        ]
+
+    def finish(section, value, record):
+        results[section.key] = value
+        records[section.key] = record
+        pending.remove(section)
+
+    if workers <= 1:
+        while pending:
+            runnable = ready()
+            if not runnable:
+                break
+            section = runnable[0]
+            finish(section, *_run_section(section, results))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard-section') as executor:
+            running = {}
+            while pending:
+                for section in ready():
+                    if section.key not in running.values():
+                        running[executor.submit(_run_section_in_worker, section, dict(results))] = section.key
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    section = next(section for section in pending if section.key == key)
+                    finish(section, *future.result())
+    if pending:
+        raise ValueError(
+            'dashboard sections have circular dependencies: '
+            + ', '.join(section.key for section in pending)
+        )
+    return results, records
+
+
+def precompute_dashboard_payload(*, workers: int = 1) -> dict:
+    """ビューで使う重い計算結果をまとめて返す。
+
+    各区画は DASHBOARD_SECTIONS の依存関係に沿って実行し、区画ごとの所要時間と
+    失敗内容を payload['precompute_meta'] に残す。失敗した区画は保存済みペイロードの
+    値を引き継ぎ、引き継いだ区画を stale_sections に記録する。
+    """
+    from .dashboard import build_top_decision_context
+
+    started = time.perf_counter()
+    results, records = run_dashboard_sections(DASHBOARD_SECTIONS, workers=workers)
+
+    latest_obs_date = results['latest_observation_date']
+    latest_snapshot = results['latest_snapshot']
     payload = {
         'has_observations': latest_obs_date is not None,
         'last_updated': latest_obs_date.isoformat() if latest_obs_date else '—',
-        'data_quality_report': build_data_quality_report(),
-        'house_view': build_house_view_context(),
-        'goldman_outlook_comparison': build_goldman_outlook_comparison(),
-        'house_view_validation': build_house_view_validation_report(),
-        'vintage_quality_report': build_vintage_quality_report(),
-        'validation_weight_report': build_validation_weight_report(),
-        'macro_decision': build_macro_decision_context(latest_snapshot),
-        'macro_forecast_report': build_macro_forecast_report_context(),
-        'macro_outcome_validation': build_macro_outcome_validation_context(),
-        'similar_periods': build_similar_periods(),
-        'linkages': build_linkages(),
-        'indicator_cards': top_indicator_cards,
-        'audit_indicator_cards': all_indicator_cards,
-        'crash_alert': build_crash_alert_context(),
-        'monthly_model_status': build_monthly_model_status(),
-        'forecast_monitor': build_forecast_monitor_context(),
-        'world_state': build_world_state_context(),
-        'forecast_models': build_forecast_model_context(),
-        'model_validation': build_model_validation_context(),
-        'world_model_operations': build_world_model_operations_context(),
-        'raw_archive_status': build_raw_archive_context(),
-        'vintage_status': build_vintage_status_context(),
-        'regime_probability_model': load_regime_probability_model(),
-        'policy_expectation': build_policy_expectation_context(),
-        'scenario_analysis': build_auto_scenarios(),
-        'historical_crash_similarity': build_historical_crash_similarity(),
     }
-    payload['top_decision'] = build_top_decision_context(payload)
+    for section in DASHBOARD_SECTIONS:
+        if section.publish:
+            payload[section.key] = results[section.key]
+
+    # 失敗した区画を None で上書きすると前回までの表示が消えるので、保存済みの値に戻す
+    failed_published = [
+        section.key for section in DASHBOARD_SECTIONS
+        if section.publish and records[section.key]['status'] == 'failed'
+    ]
+    previous = (load_dashboard_payload() or {}) if failed_published else {}
+    stale_sections = [key for key in failed_published if previous.get(key) is not None]
+    for key in stale_sections:
+        payload[key] = previous[key]
+
+    top_decision = DashboardSection('top_decision', build_top_decision_context, args=('payload',))
+    payload['top_decision'], records['top_decision'] = _run_section(top_decision, {'payload': payload})
+
+    payload['precompute_meta'] = {
+        'workers': workers,
+        'elapsed_sec': round(time.perf_counter() - started, 4),
+        'watermarks': {
+            'latest_observation_date': latest_obs_date,
+            'latest_snapshot_date': latest_snapshot.snapshot_date if latest_snapshot else None,
+        },
+        'sections': records,
+        'failed_sections': [key for key, record in records.items() if record['status'] == 'failed'],
+        'stale_sections': stale_sections,
+    }
     return payload
 
 
-def precompute_all_indicator_details() -> int:
-    """全アクティブ指標の詳細ページ用ペイロードを事前計算して保存する。"""
-    from ..models import Indicator
-    from .detail import build_indicator_detail_context
+def save_cache_payloads(payloads: Dict[str, dict], *, replace_prefix: Optional[str] = None) -> int:
+    """cache_key -> payload をひとつのトランザクションでまとめて upsert する。
 
-    count = 0
-    for indicator in Indicator.objects.filter(is_active=True):
+    replace_prefix を渡すと、その接頭辞のうち今回書かなかった古い行も同じトランザクションで消す。
+    """
+    from ..models import DashboardCache
+    rows = [
+        DashboardCache(cache_key=cache_key, payload=to_json_safe(payload))
+        for cache_key, payload in payloads.items()
+    ]
+    with transaction.atomic():
+        if replace_prefix is not None:
+            DashboardCache.objects.filter(
+                cache_key__startswith=replace_prefix,
+            ).exclude(cache_key__in=list(payloads)).delete()
+        DashboardCache.objects.bulk_create(
+            rows,
+            batch_size=CACHE_WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['cache_key'],
+            update_fields=['payload', 'computed_at'],
+        )
+    return len(rows)
+
+
+def precompute_all_indicator_details(panel=None) -> int:
+    """全アクティブ指標の詳細ページ用ペイロードを事前計算して保存する。
+
+    観測値・株価と指標間のラグ相関表は DetailPanel で一度だけ用意し、
+    各指標のペイロードはそこから切り出す。保存は最後にまとめて行う。
+    """
+    from .detail import DetailPanel, build_indicator_detail_context
+
+    panel = panel or DetailPanel()
+    payloads = {}
+    for indicator in panel.indicators:
         try:
-            payload = build_indicator_detail_context(indicator)
+            payload = build_indicator_detail_context(indicator, panel=panel)
         except Exception:
             logger.exception(
                 'precompute indicator detail failed: %s',
@@ -330,24 +517,23 @@ def precompute_all_indicator_details() -> int:
             continue
         # indicator モデルはキャッシュ不要（ビュー側で再取得）
         payload.pop('indicator', None)
-        save_indicator_detail_payload(indicator.fred_series_id, payload)
-        count += 1
-    return count
+        payloads[indicator_detail_cache_key(indicator.fred_series_id)] = payload
+    return save_cache_payloads(payloads)
 
 
-def precompute_top_similar_details(payload: Optional[dict] = None) -> int:
-    """トップページの類似期間上位件分だけ詳細ページペイロードを事前計算する。"""
+def precompute_top_similar_details(payload: Optional[dict] = None, panel=None) -> int:
+    """トップページの類似期間上位件分だけ詳細ページペイロードを事前計算する。
+
+    古い類似期間のキャッシュは、新しい行の書き込みと同じトランザクションで消す。
+    """
     from datetime import date as _date
-    from .detail import build_similar_detail_context
+    from .detail import DetailPanel, build_similar_detail_context
 
     if payload is None:
         payload = load_dashboard_payload() or {}
     similar_periods = payload.get('similar_periods', []) or []
 
-    # 古い類似期間のキャッシュは事前にクリア
-    invalidate_similar_detail_caches()
-
-    count = 0
+    payloads = {}
     for period in similar_periods:
         month_iso = period.get('month_start')
         if not month_iso:
@@ -356,11 +542,12 @@ def precompute_top_similar_details(payload: Optional[dict] = None) -> int:
             month_start = _date.fromisoformat(month_iso)
         except (TypeError, ValueError):
             continue
+        if panel is None:
+            panel = DetailPanel()
         try:
-            detail_payload = build_similar_detail_context(month_start)
+            detail_payload = build_similar_detail_context(month_start, panel=panel)
         except Exception:
             logger.exception('precompute similar detail failed: %s', month_iso)
             continue
-        save_similar_detail_payload(month_iso, detail_payload)
-        count += 1
-    return count
+        payloads[similar_detail_cache_key(month_iso)] = detail_payload
+    return save_cache_payloads(payloads, replace_prefix=SIMILAR_DETAIL_CACHE_PREFIX)
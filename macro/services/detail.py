@@ -3,6 +3,7 @@
 import csv
 import logging
 import math
+from bisect import bisect_left, bisect_right
 from datetime import date, datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -20,7 +21,7 @@ from .detail_analysis import (
     interpret_state,
 )
 from .linkage import LAG_CANDIDATES, _pearson, _shifted_series, _aggregate_to_monthly
-from .sparkline import generate_sparkline_svg
+from .sparkline import DETAIL_STYLE, render_sparkline
 from .yfinance_client import get_monthly_close
 
 logger = logging.getLogger(__name__)
@@ -60,9 +61,143 @@ def _resolve_cutoff(range_param: str) -> Optional[date]:
         return today.replace(year=today.year - years, day=28)
 
 
+def _month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _month_index_pairs(
+    data1: Dict[int, float],
+    data2: Dict[int, float],
+    lag_months: int,
+) -> List[Tuple[float, float]]:
+    """月番号キーの系列で _shifted_series と同じ (x, y) の組を作る。"""
+    if lag_months >= 0:
+        return [
+            (v1, data2[month + lag_months])
+            for month, v1 in data1.items()
+            if month + lag_months in data2
+        ]
+    return [
+        (data1[month - lag_months], data2[month])
+        for month in data1
+        if month - lag_months in data1 and month in data2
+    ]
+
+
+class DetailPanel:
+    """アクティブ指標の観測値・月次 z スコアと株価指数の月次終値を一度に読み込んだもの。
+
+    詳細ページを全指標ぶんまとめて作るときに使い、指標ごと・ペアごとの問い合わせをなくす。
+    指標間のラグ相関は correlation_table() で全組を一度だけ計算する。
+    """
+
+    def __init__(self, indicators: Optional[List[Indicator]] = None):
+        if indicators is None:
+            indicators = Indicator.objects.filter(is_active=True)
+        self.indicators = list(indicators)
+        series_by_pk = {ind.pk: ind.fred_series_id for ind in self.indicators}
+        self.observations: Dict[str, List[Observation]] = {
+            sid: [] for sid in series_by_pk.values()
+        }
+        rows = (
+            Observation.objects
+            .filter(indicator_id__in=list(series_by_pk))
+            .order_by('indicator_id', 'observation_date')
+        )
+        for obs in rows:
+            self.observations[series_by_pk[obs.indicator_id]].append(obs)
+        self.observation_dates = {
+            sid: [o.observation_date for o in obs_list]
+            for sid, obs_list in self.observations.items()
+        }
+        # 相関用: 月番号 -> その月の最後の z スコア (_aggregate_to_monthly と同じ)
+        self.z_counts: Dict[str, int] = {}
+        self.monthly_z: Dict[str, Dict[int, float]] = {}
+        for sid, obs_list in self.observations.items():
+            scored = [o for o in obs_list if o.expanding_z_score is not None]
+            self.z_counts[sid] = len(scored)
+            self.monthly_z[sid] = {
+                _month_index(o.observation_date): o.expanding_z_score for o in scored
+            }
+        self.monthly_closes: Dict[str, Dict[date, float]] = {}
+        for ticker, month, close in PriceObservation.objects.values_list(
+            'ticker', 'observation_month', 'close_price',
+        ):
+            self.monthly_closes.setdefault(ticker, {})[month] = close
+        self._correlations: Optional[Dict[str, List[Dict]]] = None
+
+    def filtered_observations(self, indicator: Indicator, range_param: str) -> List[Observation]:
+        obs_list = self.observations.get(indicator.fred_series_id, [])
+        cutoff = _resolve_cutoff(range_param)
+        if cutoff is None:
+            return list(obs_list)
+        start = bisect_left(self.observation_dates[indicator.fred_series_id], cutoff)
+        return obs_list[start:]
+
+    def latest_at_or_before(self, indicator: Indicator, as_of: date) -> Optional[Observation]:
+        dates = self.observation_dates.get(indicator.fred_series_id, [])
+        position = bisect_right(dates, as_of)
+        if not position:
+            return None
+        return self.observations[indicator.fred_series_id][position - 1]
+
+    def recent_values(self, indicator: Indicator, limit: int) -> List[Tuple[date, float]]:
+        """correlation_with_sp500 が読むのと同じ、新しい順の (日付, 値)。"""
+        obs_list = self.observations.get(indicator.fred_series_id, [])
+        return [(o.observation_date, o.value) for o in reversed(obs_list[-limit:])]
+
+    def recent_closes(self, ticker: str, limit: int) -> List[Tuple[date, float]]:
+        closes = self.monthly_closes.get(ticker, {})
+        return [(month, closes[month]) for month in sorted(closes, reverse=True)[:limit]]
+
+    def monthly_close(self, ticker: str, month_start: date) -> Optional[float]:
+        return self.monthly_closes.get(ticker, {}).get(month_start)
+
+    def correlation_table(self) -> Dict[str, List[Dict]]:
+        """series_id -> 重要度A/B指標とのラグ相関 (相関の絶対値の降順、全件)。"""
+        if self._correlations is not None:
+            return self._correlations
+        others = [
+            ind for ind in self.indicators
+            if ind.importance in ('A', 'B') and self.z_counts[ind.fred_series_id] >= 24
+        ]
+        table = {}
+        for target in self.indicators:
+            target_id = target.fred_series_id
+            results = []
+            if self.z_counts[target_id] >= 24:
+                target_monthly = self.monthly_z[target_id]
+                for other in others:
+                    if other.pk == target.pk:
+                        continue
+                    other_monthly = self.monthly_z[other.fred_series_id]
+                    best = _best_lag_correlation(
+                        lambda lag: _month_index_pairs(target_monthly, other_monthly, lag)
+                    )
+                    if best is None:
+                        continue
+                    results.append({
+                        'other_id': other.fred_series_id,
+                        'other_name': other.name_ja,
+                        'correlation': best[0],
+                        'lag_months': best[1],
+                    })
+                results.sort(key=lambda x: abs(x['correlation']), reverse=True)
+            table[target_id] = results
+        self._correlations = table
+        return table
+
+    def top_correlations(self, indicator: Indicator, top: int = 5) -> List[Dict]:
+        return self.correlation_table().get(indicator.fred_series_id, [])[:top]
+
+
 def _filtered_observations(
-    indicator: Indicator, range_param: str,
+    indicator: Indicator,
+    range_param: str,
+    panel: Optional[DetailPanel] = None,
 ) -> List[Observation]:
+    if panel is not None:
+        return panel.filtered_observations(indicator, range_param)
     qs = Observation.objects.filter(indicator=indicator).order_by('observation_date')
     cutoff = _resolve_cutoff(range_param)
     if cutoff is not None:
@@ -101,6 +236,27 @@ def _extreme_months(observations: List[Observation], top: int = 5):
     return by_dev_desc[:top], by_dev_asc[:top]
 
 
+def _best_lag_correlation(shifted_pairs) -> Optional[Tuple[float, int]]:
+    """shifted_pairs(lag) の (x, y) 組から、絶対値が最大の相関とその lag を返す。"""
+    best_corr = None
+    best_lag = 0
+    for lag in LAG_CANDIDATES:
+        shifted = shifted_pairs(lag)
+        if len(shifted) < 24:
+            continue
+        xs = [p[0] for p in shifted]
+        ys = [p[1] for p in shifted]
+        corr = _pearson(xs, ys)
+        if corr is None:
+            continue
+        if best_corr is None or abs(corr) > abs(best_corr):
+            best_corr = corr
+            best_lag = lag
+    if best_corr is None:
+        return None
+    return best_corr, best_lag
+
+
 def _top_correlations(target_indicator: Indicator, top: int = 5) -> List[Dict]:
     """target と他の重要度A/B指標との相関上位を返す。"""
     target_obs = list(
@@ -130,28 +286,16 @@ def _top_correlations(target_indicator: Indicator, top: int = 5) -> List[Dict]:
             continue
         other_monthly = _aggregate_to_monthly(other_obs)
 
-        best_corr = None
-        best_lag = 0
-        for lag in LAG_CANDIDATES:
-            shifted = _shifted_series(target_monthly, other_monthly, lag)
-            if len(shifted) < 24:
-                continue
-            xs = [p[1] for p in shifted]
-            ys = [p[2] for p in shifted]
-            corr = _pearson(xs, ys)
-            if corr is None:
-                continue
-            if best_corr is None or abs(corr) > abs(best_corr):
-                best_corr = corr
-                best_lag = lag
-
-        if best_corr is None:
+        best = _best_lag_correlation(
+            lambda lag: [(x, y) for _, x, y in _shifted_series(target_monthly, other_monthly, lag)]
+        )
+        if best is None:
             continue
         results.append({
             'other_id': other.fred_series_id,
             'other_name': other.name_ja,
-            'correlation': best_corr,
-            'lag_months': best_lag,
+            'correlation': best[0],
+            'lag_months': best[1],
         })
 
     results.sort(key=lambda x: abs(x['correlation']), reverse=True)
@@ -161,9 +305,11 @@ def _top_correlations(target_indicator: Indicator, top: int = 5) -> List[Dict]:
 def build_indicator_detail_context(
     indicator: Indicator,
     range_param: str = DEFAULT_RANGE_PARAM,
+    panel: Optional[DetailPanel] = None,
 ) -> Dict:
+    """指標詳細ページのコンテキスト。panel を渡すと観測値と相関をそこから引く。"""
     range_param = normalize_range_param(range_param)
-    observations = _filtered_observations(indicator, range_param)
+    observations = _filtered_observations(indicator, range_param, panel)
     if not observations:
         return {
             'indicator': indicator,
@@ -176,8 +322,8 @@ def build_indicator_detail_context(
         monthly_map[o.observation_date.replace(day=1)] = o.value
     sorted_months = sorted(monthly_map.keys())
     monthly_values = [monthly_map[m] for m in sorted_months]
-    chart_svg = generate_sparkline_svg(
-        monthly_values, width=320, height=120, stroke_width=2.0
+    chart_svg = render_sparkline(
+        indicator.fred_series_id, sorted_months[-1], monthly_values, DETAIL_STYLE,
     )
 
     stats = _summary_stats(observations)
@@ -194,7 +340,10 @@ def build_indicator_detail_context(
         'deviation_display': format_signed(_standardized_score(o), 2),
     } for o in low_months]
 
-    correlations = _top_correlations(indicator, top=5)
+    if panel is not None:
+        correlations = panel.top_correlations(indicator, top=5)
+    else:
+        correlations = _top_correlations(indicator, top=5)
     corr_rows = [{
         'other_id': c['other_id'],
         'other_name': c['other_name'],
@@ -209,7 +358,8 @@ def build_indicator_detail_context(
     state = interpret_state(indicator, latest)
 
     crash_value_rows = []
-    for row in get_values_at_crash_months(indicator):
+    all_observations = panel.observations.get(indicator.fred_series_id) if panel is not None else None
+    for row in get_values_at_crash_months(indicator, observations=all_observations):
         crash_value_rows.append({
             'month_label': row['month_label'],
             'crash_label': row['crash_label'],
@@ -217,7 +367,14 @@ def build_indicator_detail_context(
             'yoy_display': format_pct(row['yoy_change']),
         })
 
-    sp500_corr = correlation_with_sp500(indicator)
+    if panel is not None:
+        sp500_corr = correlation_with_sp500(
+            indicator,
+            indicator_obs=panel.recent_values(indicator, 24 * 3),
+            sp500_obs=panel.recent_closes(PriceObservation.Ticker.SP500, 24 * 2),
+        )
+    else:
+        sp500_corr = correlation_with_sp500(indicator)
     sp500_corr_block = {
         'value': sp500_corr,
         'value_display': f'{sp500_corr:+.2f}' if sp500_corr is not None else '—',
@@ -287,21 +444,27 @@ def _events_at_month(year: int, month: int) -> List[Dict]:
     return items
 
 
-def build_similar_detail_context(month_start: date) -> Dict:
-    """指定月の詳細を作る。"""
+def build_similar_detail_context(month_start: date, panel: Optional[DetailPanel] = None) -> Dict:
+    """指定月の詳細を作る。panel を渡すと観測値と月次終値をそこから引く。"""
     month_end = (month_start.replace(day=1) + relativedelta(months=1)) - relativedelta(days=1)
 
-    indicators = list(
-        Indicator.objects.filter(is_active=True).order_by('display_order')
-    )
+    if panel is not None:
+        indicators = sorted(panel.indicators, key=lambda ind: ind.display_order)
+    else:
+        indicators = list(
+            Indicator.objects.filter(is_active=True).order_by('display_order')
+        )
     rows = []
     for ind in indicators:
-        obs = (
-            Observation.objects
-            .filter(indicator=ind, observation_date__lte=month_end)
-            .order_by('-observation_date')
-            .first()
-        )
+        if panel is not None:
+            obs = panel.latest_at_or_before(ind, month_end)
+        else:
+            obs = (
+                Observation.objects
+                .filter(indicator=ind, observation_date__lte=month_end)
+                .order_by('-observation_date')
+                .first()
+            )
         if obs is None:
             continue
         rows.append({
@@ -317,10 +480,10 @@ def build_similar_detail_context(month_start: date) -> Dict:
         })
 
     # 月次価格と、+1m/+3m/+6m リターン
-    nikkei_returns = _multi_month_returns(PriceObservation.Ticker.NIKKEI, month_start)
-    spx_returns = _multi_month_returns(PriceObservation.Ticker.SP500, month_start)
-    nydow_returns = _multi_month_returns(PriceObservation.Ticker.NYDOW, month_start)
-    nasdaq_returns = _multi_month_returns(PriceObservation.Ticker.NASDAQ, month_start)
+    nikkei_returns = _multi_month_returns(PriceObservation.Ticker.NIKKEI, month_start, panel)
+    spx_returns = _multi_month_returns(PriceObservation.Ticker.SP500, month_start, panel)
+    nydow_returns = _multi_month_returns(PriceObservation.Ticker.NYDOW, month_start, panel)
+    nasdaq_returns = _multi_month_returns(PriceObservation.Ticker.NASDAQ, month_start, panel)
 
     events = _events_at_month(month_start.year, month_start.month)
 
@@ -336,14 +499,19 @@ def build_similar_detail_context(month_start: date) -> Dict:
     }
 
 
-def _multi_month_returns(ticker: str, month_start: date) -> Dict[str, str]:
-    base_close = get_monthly_close(ticker, month_start)
+def _multi_month_returns(
+    ticker: str,
+    month_start: date,
+    panel: Optional[DetailPanel] = None,
+) -> Dict[str, str]:
+    monthly_close = panel.monthly_close if panel is not None else get_monthly_close
+    base_close = monthly_close(ticker, month_start)
     if base_close is None or base_close == 0:
         return {'r1m': '—', 'r3m': '—', 'r6m': '—'}
     out = {}
     for label, months in [('r1m', 1), ('r3m', 3), ('r6m', 6)]:
         target = month_start + relativedelta(months=months)
-        target_close = get_monthly_close(ticker, target)
+        target_close = monthly_close(ticker, target)
         if target_close is None:
             out[label] = '—'
             continue
@@ -4,7 +4,7 @@ ML依存なしで、現在状態の解釈・歴史的クラッシュ時の値・
 """
 
 from datetime import date
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta
 
@@ -76,15 +76,19 @@ def interpret_state(
     }
 
 
-def get_values_at_crash_months(indicator: Indicator) -> List[Dict]:
-    """歴史的クラッシュ月時点での観測値を返す。"""
+def get_values_at_crash_months(
+    indicator: Indicator,
+    observations: Optional[List[Observation]] = None,
+) -> List[Dict]:
+    """歴史的クラッシュ月時点での観測値を返す。observations は日付昇順の全観測値。"""
     rows: List[Dict] = []
-    obs_qs = (
-        Observation.objects
-        .filter(indicator=indicator)
-        .order_by('observation_date')
-    )
-    obs_list = list(obs_qs)
+    if observations is None:
+        observations = (
+            Observation.objects
+            .filter(indicator=indicator)
+            .order_by('observation_date')
+        )
+    obs_list = list(observations)
     if not obs_list:
         return []
 
@@ -115,17 +119,22 @@ def get_values_at_crash_months(indicator: Indicator) -> List[Dict]:
 def correlation_with_sp500(
     indicator: Indicator,
     months: int = 24,
+    *,
+    indicator_obs: Optional[List[Tuple[date, float]]] = None,
+    sp500_obs: Optional[List[Tuple[date, float]]] = None,
 ) -> Optional[float]:
     """指標値とSP500月次終値の過去 months ヶ月のピアソン相関を返す。
 
-    データ不足の場合 None を返す。
+    データ不足の場合 None を返す。indicator_obs / sp500_obs には読み込み済みの
+    新しい順の (日付, 値) を渡せる (件数は months * 3 / months * 2 まで)。
     """
-    indicator_obs = list(
-        Observation.objects
-        .filter(indicator=indicator)
-        .order_by('-observation_date')
-        .values_list('observation_date', 'value')[:months * 3]
-    )
+    if indicator_obs is None:
+        indicator_obs = list(
+            Observation.objects
+            .filter(indicator=indicator)
+            .order_by('-observation_date')
+            .values_list('observation_date', 'value')[:months * 3]
+        )
     if not indicator_obs:
         return None
 
@@ -134,12 +143,13 @@ def correlation_with_sp500(
     for d, v in indicator_obs:
         monthly_indicator[d.replace(day=1)] = v
 
-    sp500_obs = list(
-        PriceObservation.objects
-        .filter(ticker=PriceObservation.Ticker.SP500)
-        .order_by('-observation_month')
-        .values_list('observation_month', 'close_price')[:months * 2]
-    )
+    if sp500_obs is None:
+        sp500_obs = list(
+            PriceObservation.objects
+            .filter(ticker=PriceObservation.Ticker.SP500)
+            .order_by('-observation_month')
+            .values_list('observation_month', 'close_price')[:months * 2]
+        )
     if not sp500_obs:
         return None
     monthly_sp500: Dict[date, float] = {
@@ -5,11 +5,18 @@ from __future__ import annotations
 import hashlib
 import json
 import math
+import mmap
+import os
+import sys
+from array import array
 from datetime import date
+from pathlib import Path
 from typing import Optional
 
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, Max, Sum
 from django.utils import timezone
 
 from ..models import (
@@ -17,10 +24,14 @@ from ..models import (
     Indicator,
     Observation,
     PriceObservation,
+    VintageObservation,
     WorldStateSnapshot,
 )
 
 
+COLUMNAR_STORE_VERSION = 1
+
+
 def normalize_feature_value(value) -> Optional[float]:
     if value is None:
         return None
@@ -222,3 +233,194 @@ def save_feature_snapshot(
             },
         )
     return snapshot
+
+
+def columnar_store_dir() -> Path:
+    explicit_dir = (os.getenv('FEATURE_STORE_DIR') or '').strip()
+    if explicit_dir:
+        return Path(explicit_dir)
+    return Path(settings.BASE_DIR) / 'runtime' / 'feature_store'
+
+
+def _aggregate_token(queryset, **aggregates) -> str:
+    values = queryset.aggregate(**aggregates)
+    return json.dumps(
+        [values[key] for key in sorted(values)],
+        default=str,
+        separators=(',', ':'),
+    )
+
+
+def source_watermarks() -> dict:
+    """月次特徴量の元データが変わったかを見分けるための目印。
+
+    indicators: 対象指標の集合、vintage: 当時値、revised: 改定後の観測値と World State。
+    """
+    indicator_ids = sorted(
+        Indicator.objects
+        .filter(is_active=True, importance__in=[Indicator.Importance.A, Indicator.Importance.B])
+        .values_list('fred_series_id', flat=True)
+    )
+    return {
+        'indicators': hash_feature_vector({series_id: 1 for series_id in indicator_ids}),
+        'vintage': _aggregate_token(
+            VintageObservation.objects.all(),
+            count=Count('id'),
+            max_id=Max('id'),
+            max_collected_at=Max('collected_at'),
+            value_sum=Sum('value'),
+        ),
+        'revised': _aggregate_token(
+            Observation.objects.all(),
+            count=Count('id'),
+            max_updated_at=Max('updated_at'),
+            expanding_sum=Sum('expanding_z_score'),
+            rolling_sum=Sum('rolling_5y_z_score'),
+        ) + _aggregate_token(
+            WorldStateSnapshot.objects.all(),
+            count=Count('id'),
+            max_updated_at=Max('updated_at'),
+        ),
+    }
+
+
+class ColumnarFeatureStore:
+    """月ごとの特徴量を float64 の列に詰めて保存するストア。
+
+    特徴量名は登録順に列番号を振り、既存の列番号は変えない。各月は
+    `<YYYY-MM>.f64` に登録済みの列数ぶんの値を持ち、欠けている特徴量は NaN で埋める。
+    index.json には列名の一覧と、月ごとの列数・特徴量ハッシュ・元データの目印を持つ。
+    """
+
+    def __init__(self, namespace: str, root: Optional[Path] = None):
+        self.path = Path(root or columnar_store_dir()) / namespace
+        self.names: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._partitions: dict[str, dict] = {}
+        self._views: dict[str, memoryview] = {}
+        self._dirty = False
+        self._load_index()
+
+    @staticmethod
+    def _month_key(month: date) -> str:
+        return month.strftime('%Y-%m')
+
+    def _partition_path(self, key: str) -> Path:
+        return self.path / f'{key}.f64'
+
+    def _load_index(self) -> None:
+        index_path = self.path / 'index.json'
+        try:
+            payload = json.loads(index_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return
+        if (
+            payload.get('version') != COLUMNAR_STORE_VERSION
+            or payload.get('byteorder') != sys.byteorder
+        ):
+            return
+        self.names = list(payload.get('names') or [])
+        self._positions = {name: position for position, name in enumerate(self.names)}
+        self._partitions = {
+            key: entry
+            for key, entry in (payload.get('partitions') or {}).items()
+            if entry.get('width', 0) <= len(self.names)
+        }
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'version': COLUMNAR_STORE_VERSION,
+            'byteorder': sys.byteorder,
+            'names': self.names,
+            'partitions': dict(sorted(self._partitions.items())),
+        }
+        index_path = self.path / 'index.json'
+        temp_path = index_path.with_name('.index.json.tmp')
+        temp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_path, index_path)
+        self._dirty = False
+
+    def entry(self, month: date) -> Optional[dict]:
+        return self._partitions.get(self._month_key(month))
+
+    def is_fresh(self, month: date, watermarks: dict) -> bool:
+        entry = self.entry(month)
+        if entry is None or not self._partition_path(self._month_key(month)).exists():
+            return False
+        return all(
+            watermarks.get(key) == value
+            for key, value in (entry.get('watermark') or {}).items()
+        )
+
+    def put(self, month: date, feature_map: dict, *, source_mode: str, watermark: dict) -> dict:
+        for name in sorted(feature_map):
+            if name not in self._positions:
+                self._positions[name] = len(self.names)
+                self.names.append(name)
+        values = array('d', [math.nan]) * len(self.names)
+        for name, value in feature_map.items():
+            values[self._positions[name]] = normalize_feature_value(value) or 0.0
+
+        key = self._month_key(month)
+        self.path.mkdir(parents=True, exist_ok=True)
+        partition_path = self._partition_path(key)
+        temp_path = partition_path.with_name(f'.{partition_path.name}.tmp')
+        with temp_path.open('wb') as partition_file:
+            values.tofile(partition_file)
+        os.replace(temp_path, partition_path)
+
+        entry = {
+            'width': len(values),
+            'feature_count': len(feature_map),
+            'feature_hash': hash_feature_vector(feature_map),
+            'source_mode': source_mode,
+            'watermark': watermark,
+        }
+        self._partitions[key] = entry
+        self._views.pop(key, None)
+        self._dirty = True
+        return entry
+
+    def _view(self, month: date) -> memoryview:
+        key = self._month_key(month)
+        view = self._views.get(key)
+        if view is None:
+            width = self._partitions[key]['width']
+            if width == 0:
+                view = memoryview(array('d'))
+            else:
+                with self._partition_path(key).open('rb') as partition_file:
+                    mapped = mmap.mmap(partition_file.fileno(), width * 8, access=mmap.ACCESS_READ)
+                view = memoryview(mapped).cast('d')
+            self._views[key] = view
+        return view
+
+    def feature_map(self, month: date) -> dict:
+        view = self._view(month)
+        return {
+            self.names[position]: view[position]
+            for position in range(len(view))
+            if not math.isnan(view[position])
+        }
+
+    def matrix(self, months) -> tuple[list[str], list[list[float]]]:
+        """months × 特徴量の行列を返す。列はいずれかの月に値がある特徴量を名前順に並べる。"""
+        views = [self._view(month) for month in months]
+        present = set()
+        for view in views:
+            present.update(
+                position for position in range(len(view))
+                if not math.isnan(view[position])
+            )
+        positions = sorted(present, key=lambda position: self.names[position])
+        matrix = []
+        for view in views:
+            width = len(view)
+            matrix.append([
+                0.0 if position >= width or math.isnan(view[position]) else view[position]
+                for position in positions
+            ])
+        return [self.names[position] for position in positions], matrix
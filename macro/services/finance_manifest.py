@@ -1,10 +1,12 @@
 import json
-from datetime import date, datetime
 from pathlib import Path
 
 from django.conf import settings
 from django.utils import timezone
 
+from macro.services.production_data_sync import build_file_index
+from myproject.json_payload import to_json_safe
+
 
 DEFAULT_MANIFEST_PATH = Path('static/finance_data_manifest.json')
 
@@ -48,13 +50,15 @@ def build_finance_data_manifest(base_dir=None):
             'basecalc': (((basecalc or {}).get('world_model') or {}).get('model_version')) or '',
             'explanation': (explanation or {}).get('version') or '',
         },
+        # sync_production_data はこの一覧とローカルの sha256/size を突き合わせて差分だけを取りに行く
+        'files': build_file_index(root),
     }
 
 
 def write_finance_data_manifest(manifest, path=None):
     output_path = Path(path) if path else settings.BASE_DIR / DEFAULT_MANIFEST_PATH
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    serialized = json.loads(json.dumps(manifest, default=_json_default))
+    serialized = to_json_safe(manifest)
     _write_manifest(output_path, serialized)
     _mirror_staticfiles_manifest(output_path, serialized)
     return serialized
@@ -157,9 +161,3 @@ def _dedupe(values):
         if value and value not in result:
             result.append(value)
     return result
-
-
-def _json_default(value):
-    if isinstance(value, (datetime, date)):
-        return value.isoformat()
-    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
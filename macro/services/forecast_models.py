@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import contextvars
+import json
 import math
+from contextlib import contextmanager
 from datetime import date, timedelta
 from statistics import mean
 from typing import Dict, Iterable, Optional
 
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import CommandError
+from django.db.models import Count, Max
 from django.utils import timezone
 
 from ..models import (
@@ -32,6 +36,63 @@ SHORT_RETURN_MODEL_VERSION = 'short_horizon_return_v1'
 SHORT_RETURN_TARGETS = ('N225', 'IXIC')
 SHORT_RETURN_DAILY_TICKERS = ('N225', 'IXIC', 'GSPC', 'DJI')
 SHORT_RETURN_MACRO_SERIES = ('VIXCLS', 'DGS10')
+HISTORICAL_FEATURE_NAMESPACE = 'monthly_historical'
+VINTAGE_SOURCE_MODE = 'vintage_point_in_time'
+SHORT_HORIZON_FEATURE_NAMESPACE = 'short_horizon'
+
+_active_matrix_memo = contextvars.ContextVar('forecast_feature_matrix_memo', default=None)
+
+
+class FeatureMatrixMemo:
+    """1 回の学習・検証の中で、ターゲットに依らない特徴量ブロックを使い回すメモ。
+
+    ブロックは (namespace, 元データの目印) ごとに、ターゲット系列は (ターゲット, 元データの目印)
+    ごとに一度だけ作り、ホライズンごとに違うラベル列 (target_value など) だけを行列を組むたびに付け直す。
+    """
+
+    def __init__(self):
+        self.blocks: dict = {}
+        self.target_series: dict = {}
+        self.stats = {'requests': 0, 'built': 0, 'avoided': 0}
+
+    def block(self, namespace: str, watermarks: dict, factory) -> dict:
+        key = (namespace, json.dumps(watermarks, sort_keys=True, default=str))
+        self.stats['requests'] += 1
+        block = self.blocks.get(key)
+        if block is None:
+            self.stats['built'] += 1
+            block = self.blocks[key] = factory()
+        else:
+            self.stats['avoided'] += 1
+        return block
+
+    def summary(self) -> dict:
+        return {
+            **self.stats,
+            'blocks': sorted({namespace for namespace, _ in self.blocks}),
+        }
+
+
+@contextmanager
+def feature_matrix_memo():
+    """スコープ内の build_*_feature_matrix で特徴量ブロックを共有する。入れ子なら外側を使う。"""
+    memo = _active_matrix_memo.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = FeatureMatrixMemo()
+    token = _active_matrix_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _active_matrix_memo.reset(token)
+
+
+def format_feature_matrix_memo(summary: dict) -> str:
+    return (
+        f"特徴量ブロック: 作成 {summary['built']} 回 / "
+        f"再利用 {summary['avoided']} 回 (要求 {summary['requests']} 回)"
+    )
 
 
 def parse_horizon_months(horizon: str) -> int:
@@ -41,6 +102,29 @@ def parse_horizon_months(horizon: str) -> int:
 
 
 def load_monthly_target_series(target: str) -> dict[date, float]:
+    memo = _active_matrix_memo.get()
+    if memo is None:
+        return _load_monthly_target_series(target)
+    # ホライズン違いで同じターゲットを何度も読むので、元データが同じ間は一度だけ読む
+    key = (target, json.dumps(_target_series_watermark(target), sort_keys=True, default=str))
+    if key not in memo.target_series:
+        memo.target_series[key] = _load_monthly_target_series(target)
+    return memo.target_series[key]
+
+
+def _target_series_watermark(target: str) -> dict:
+    if target in RETURN_TARGETS:
+        queryset = PriceObservation.objects.filter(ticker=target)
+    else:
+        queryset = Observation.objects.filter(indicator__fred_series_id=target)
+    return queryset.aggregate(
+        count=Count('id'),
+        max_id=Max('id'),
+        max_updated_at=Max('updated_at'),
+    )
+
+
+def _load_monthly_target_series(target: str) -> dict[date, float]:
     if target in RETURN_TARGETS:
         rows = (
             PriceObservation.objects
@@ -186,10 +270,57 @@ def _vintage_feature_row(as_of: date) -> dict:
 def _historical_feature_row(as_of: date) -> tuple[dict, str]:
     vintage_features = _vintage_feature_row(as_of)
     if vintage_features:
-        return vintage_features, 'vintage_point_in_time'
+        return vintage_features, VINTAGE_SOURCE_MODE
     return _world_feature_row(as_of), 'revised_observation_fallback'
 
 
+def load_historical_feature_store(
+    months: Iterable[date],
+    store: Optional[feature_store.ColumnarFeatureStore] = None,
+    watermarks: Optional[dict] = None,
+) -> feature_store.ColumnarFeatureStore:
+    """月次特徴量をカラム型ストアから読み、元データが変わった月だけ作り直す。"""
+    store = store or feature_store.ColumnarFeatureStore(HISTORICAL_FEATURE_NAMESPACE)
+    watermarks = watermarks or feature_store.source_watermarks()
+    for month in months:
+        if store.is_fresh(month, watermarks):
+            continue
+        features, source_mode = _historical_feature_row(month)
+        # 当時値だけで作れた月は改定後データの更新に影響されない
+        depends_on = ('indicators', 'vintage')
+        if source_mode != VINTAGE_SOURCE_MODE:
+            depends_on += ('revised',)
+        store.put(
+            month,
+            features,
+            source_mode=source_mode,
+            watermark={key: watermarks[key] for key in depends_on},
+        )
+    store.flush()
+    return store
+
+
+def _historical_feature_block(months: list[date]) -> feature_store.ColumnarFeatureStore:
+    memo = _active_matrix_memo.get()
+    if memo is None:
+        return load_historical_feature_store(months)
+    watermarks = feature_store.source_watermarks()
+    block = memo.block(
+        HISTORICAL_FEATURE_NAMESPACE,
+        watermarks,
+        lambda: {
+            'store': feature_store.ColumnarFeatureStore(HISTORICAL_FEATURE_NAMESPACE),
+            'months': set(),
+        },
+    )
+    # 同じ目印のもとで確認済みの月は鮮度チェックもしない
+    missing = [month for month in months if month not in block['months']]
+    if missing:
+        load_historical_feature_store(missing, store=block['store'], watermarks=watermarks)
+        block['months'].update(missing)
+    return block['store']
+
+
 def _matrix_from_feature_maps(feature_maps: Iterable[dict]) -> tuple[list[str], list[list[float]]]:
     maps = list(feature_maps)
     names = sorted({key for item in maps for key in item.keys()})
@@ -246,9 +377,10 @@ def _drawdown_pct(prices: list[float], periods: int) -> Optional[float]:
     return (prices[-1] / high - 1.0) * 100.0
 
 
-def _daily_market_feature_row(target: str, as_of: date) -> dict:
+def _daily_market_feature_row(target: str, as_of: date, price_loader=None) -> dict:
+    price_loader = price_loader or _daily_prices
     features = {}
-    target_prices = _daily_prices(target, as_of)
+    target_prices = price_loader(target, as_of)
     for periods in (5, 20, 60):
         value = _return_pct(target_prices, periods)
         if value is not None:
@@ -264,7 +396,7 @@ def _daily_market_feature_row(target: str, as_of: date) -> dict:
     for ticker in SHORT_RETURN_DAILY_TICKERS:
         if ticker == target:
             continue
-        prices = _daily_prices(ticker, as_of)
+        prices = price_loader(ticker, as_of)
         value = _return_pct(prices, 20)
         if value is not None:
             features[f'{ticker}_return_20d'] = value
@@ -346,12 +478,69 @@ def _basecalc_feature_row(as_of: date) -> dict:
     return features
 
 
-def _short_horizon_feature_row(target: str, as_of: date) -> tuple[dict, list[str]]:
-    daily_features = _daily_market_feature_row(target, as_of)
+def _short_horizon_watermarks() -> dict:
+    try:
+        from basecalc.models import WorldModelPrediction
+    except ImportError:
+        basecalc = None
+    else:
+        basecalc = WorldModelPrediction.objects.aggregate(
+            count=Count('id'),
+            max_created_at=Max('created_at'),
+        )
+    return {
+        'daily': DailyPriceObservation.objects.aggregate(
+            count=Count('id'),
+            max_date=Max('observation_date'),
+            max_id=Max('id'),
+        ),
+        'revised': feature_store.source_watermarks()['revised'],
+        'basecalc': basecalc,
+    }
+
+
+def _short_horizon_feature_block() -> Optional[dict]:
+    """短期モデルの、ターゲットに依らない部分 (日次終値・マクロ日次変化・basecalc) のブロック。"""
+    memo = _active_matrix_memo.get()
+    if memo is None:
+        return None
+    return memo.block(
+        SHORT_HORIZON_FEATURE_NAMESPACE,
+        _short_horizon_watermarks(),
+        lambda: {'prices': {}, 'shared_rows': {}},
+    )
+
+
+def _short_horizon_feature_row(
+    target: str,
+    as_of: date,
+    block: Optional[dict] = None,
+) -> tuple[dict, list[str]]:
+    if block is None:
+        daily_features = _daily_market_feature_row(target, as_of)
+    else:
+        prices = block['prices']
+
+        def price_loader(ticker, price_as_of):
+            key = (ticker, price_as_of)
+            if key not in prices:
+                prices[key] = _daily_prices(ticker, price_as_of)
+            return prices[key]
+
+        daily_features = _daily_market_feature_row(target, as_of, price_loader=price_loader)
     if not daily_features:
         return {}, []
-    macro_features = _macro_daily_change_feature_row(as_of)
-    basecalc_features = _basecalc_feature_row(as_of)
+    if block is None:
+        macro_features = _macro_daily_change_feature_row(as_of)
+        basecalc_features = _basecalc_feature_row(as_of)
+    else:
+        shared = block['shared_rows'].get(as_of)
+        if shared is None:
+            shared = block['shared_rows'][as_of] = (
+                _macro_daily_change_feature_row(as_of),
+                _basecalc_feature_row(as_of),
+            )
+        macro_features, basecalc_features = shared
     source_modes = ['daily_market']
     if macro_features:
         source_modes.append('daily_macro')
@@ -383,6 +572,7 @@ def build_short_horizon_feature_matrix(target: str, horizon: str = '1m'):
             'warning': 'target series has too few rows',
         }
 
+    block = _short_horizon_feature_block()
     rows = []
     source_modes = set()
     latest_feature_map = None
@@ -390,7 +580,7 @@ def build_short_horizon_feature_matrix(target: str, horizon: str = '1m'):
         base = series.get(month)
         future = series.get(month + relativedelta(months=horizon_months))
         as_of = _month_end(month)
-        features, row_source_modes = _short_horizon_feature_row(target, as_of)
+        features, row_source_modes = _short_horizon_feature_row(target, as_of, block)
         if features:
             latest_feature_map = features
             source_modes.update(row_source_modes)
@@ -420,7 +610,7 @@ def build_short_horizon_feature_matrix(target: str, horizon: str = '1m'):
 
     latest_month = max(series)
     latest_as_of = _month_end(latest_month)
-    latest_feature_map = latest_feature_map or _short_horizon_feature_row(target, latest_as_of)[0]
+    latest_feature_map = latest_feature_map or _short_horizon_feature_row(target, latest_as_of, block)[0]
     latest_values = [
         feature_store.normalize_feature_value(latest_feature_map.get(name)) or 0.0
         for name in feature_names
@@ -455,23 +645,25 @@ def build_monthly_feature_matrix(namespace: str, target: str, horizon: str):
             'warning': 'target series has too few rows',
         }
 
+    months = sorted(series)
+    store = _historical_feature_block(months)
     rows = []
-    latest_feature_map = None
-    for month in sorted(series):
+    latest_feature_month = None
+    for month in months:
         base = series.get(month)
         future = series.get(month + relativedelta(months=horizon_months))
-        features, source_mode = _historical_feature_row(month)
-        if features:
-            latest_feature_map = features
-        if base in (None, 0) or future is None or not features:
+        entry = store.entry(month)
+        has_features = entry['feature_count'] > 0
+        if has_features:
+            latest_feature_month = month
+        if base in (None, 0) or future is None or not has_features:
             continue
         rows.append({
             'as_of_date': month,
-            'feature_map': features,
             'target_value': _target_value(base, future, target),
             'base_value': base,
             'future_value': future,
-            'feature_source_mode': source_mode,
+            'feature_source_mode': entry['source_mode'],
         })
 
     if not rows:
@@ -482,12 +674,14 @@ def build_monthly_feature_matrix(namespace: str, target: str, horizon: str):
             'warning': 'feature matrix is empty',
         }
 
-    feature_names, matrix = _matrix_from_feature_maps(row['feature_map'] for row in rows)
+    feature_names, matrix = store.matrix(row['as_of_date'] for row in rows)
     for row, values in zip(rows, matrix):
         row['x'] = values
-        row.pop('feature_map', None)
     latest_month = max(series)
-    latest_feature_map = latest_feature_map or _world_feature_row(latest_month)
+    if latest_feature_month is not None:
+        latest_feature_map = store.feature_map(latest_feature_month)
+    else:
+        latest_feature_map = _world_feature_row(latest_month)
     latest_values = [
         feature_store.normalize_feature_value(latest_feature_map.get(name)) or 0.0
         for name in feature_names
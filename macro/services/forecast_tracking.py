@@ -3,16 +3,17 @@
 from __future__ import annotations
 
 import math
+from bisect import bisect_right
 from datetime import date
 from statistics import median
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta
 from django.db.models import Count
 from django.utils import timezone
 
 from ..models import ForecastSnapshot, Observation, PriceObservation
-from .crash_probability import TARGET_TICKERS, future_drawdown, load_price_series
+from .crash_probability import TARGET_TICKERS, future_drawdown
 
 
 def _parse_days(value: str) -> Optional[int]:
@@ -42,36 +43,101 @@ def _target_ticker(target: str) -> Optional[str]:
         return None
 
 
-def _latest_price_month(ticker: str) -> Optional[date]:
+SETTLEMENT_FIELDS = ['realized_value', 'realized_at', 'error', 'metadata']
+SETTLEMENT_BATCH_SIZE = 500
+
+
+def _settlement_kind(snapshot: ForecastSnapshot) -> Optional[str]:
+    if snapshot.model_version.startswith('crash_probability_logistic'):
+        return 'crash_probability'
+    if snapshot.model_version.startswith(('lightgbm_return', 'return_lightgbm')):
+        return 'return'
+    if snapshot.model_version.startswith('macro_forecast'):
+        return 'macro'
+    return None
+
+
+def _horizon_months(kind: str, snapshot: ForecastSnapshot) -> Optional[int]:
+    if kind == 'crash_probability':
+        horizon_days = (
+            snapshot.metadata.get('horizon_days')
+            or _parse_days(snapshot.horizon)
+        )
+        if horizon_days is None:
+            return None
+        return max(1, math.ceil(horizon_days / 30.4375))
     return (
-        PriceObservation.objects
-        .filter(ticker=ticker)
-        .order_by('-observation_month')
-        .values_list('observation_month', flat=True)
-        .first()
+        snapshot.metadata.get('horizon_months')
+        or _parse_months(snapshot.horizon)
     )
 
 
-def _settle_crash_probability(snapshot: ForecastSnapshot) -> Optional[Dict]:
+def _series_key(kind: str, snapshot: ForecastSnapshot) -> Optional[Tuple[str, str]]:
+    """決済に使う系列。価格系は ('price', ticker)、マクロ系は ('observation', series_id)。"""
+    if kind == 'macro':
+        return 'observation', snapshot.target
     ticker = _target_ticker(snapshot.target)
     if ticker is None:
         return None
-    horizon_days = (
-        snapshot.metadata.get('horizon_days')
-        or _parse_days(snapshot.horizon)
+    return 'price', ticker
+
+
+def _due_month(kind: str, snapshot: ForecastSnapshot) -> Optional[date]:
+    horizon_months = _horizon_months(kind, snapshot)
+    if horizon_months is None:
+        return None
+    return snapshot.as_of_date.replace(day=1) + relativedelta(months=horizon_months)
+
+
+def _load_price_series(tickers) -> Dict[str, Dict[date, float]]:
+    series = {ticker: {} for ticker in tickers}
+    rows = (
+        PriceObservation.objects
+        .filter(ticker__in=list(series))
+        .order_by('observation_month')
+        .values_list('ticker', 'observation_month', 'close_price')
+    )
+    for ticker, month, close in rows:
+        series[ticker][month.replace(day=1)] = close
+    return series
+
+
+def _load_observation_series(series_ids) -> Dict[str, Tuple[List[date], List[float]]]:
+    """series_id ごとに (観測日の昇順リスト, 同じ並びの値リスト) を返す。"""
+    series = {series_id: ([], []) for series_id in series_ids}
+    rows = (
+        Observation.objects
+        .filter(indicator__fred_series_id__in=list(series))
+        .order_by('observation_date')
+        .values_list('indicator__fred_series_id', 'observation_date', 'value')
     )
-    if horizon_days is None:
+    for series_id, observation_date, value in rows:
+        dates, values = series[series_id]
+        dates.append(observation_date)
+        values.append(value)
+    return series
+
+
+def _observation_at_or_before(observations, target_date: date) -> Optional[Tuple[date, float]]:
+    dates, values = observations
+    index = bisect_right(dates, target_date)
+    if index == 0:
+        return None
+    return dates[index - 1], values[index - 1]
+
+
+def _settle_crash_probability(snapshot: ForecastSnapshot, prices: Dict[date, float]) -> Optional[Dict]:
+    horizon_months = _horizon_months('crash_probability', snapshot)
+    if horizon_months is None:
         return None
-    horizon_months = max(1, math.ceil(horizon_days / 30.4375))
     month_start = snapshot.as_of_date.replace(day=1)
     needed_month = month_start + relativedelta(months=horizon_months)
-    latest_month = _latest_price_month(ticker)
-    if latest_month is None or latest_month < needed_month:
+    if not prices or max(prices) < needed_month:
         return None
 
     threshold = snapshot.metadata.get('drawdown_threshold_pct', -10.0)
     max_drawdown, lead_time_days = future_drawdown(
-        load_price_series(ticker),
+        prices,
         month_start,
         horizon_months,
         threshold,
@@ -92,17 +158,10 @@ def _settle_crash_probability(snapshot: ForecastSnapshot) -> Optional[Dict]:
     }
 
 
-def _settle_return_forecast(snapshot: ForecastSnapshot) -> Optional[Dict]:
-    ticker = _target_ticker(snapshot.target)
-    if ticker is None:
-        return None
-    horizon_months = (
-        snapshot.metadata.get('horizon_months')
-        or _parse_months(snapshot.horizon)
-    )
+def _settle_return_forecast(snapshot: ForecastSnapshot, prices: Dict[date, float]) -> Optional[Dict]:
+    horizon_months = _horizon_months('return', snapshot)
     if horizon_months is None:
         return None
-    prices = load_price_series(ticker)
     month_start = snapshot.as_of_date.replace(day=1)
     future_month = month_start + relativedelta(months=horizon_months)
     base = prices.get(month_start)
@@ -121,39 +180,20 @@ def _settle_return_forecast(snapshot: ForecastSnapshot) -> Optional[Dict]:
     }
 
 
-def _settle_macro_forecast(snapshot: ForecastSnapshot) -> Optional[Dict]:
-    horizon_months = (
-        snapshot.metadata.get('horizon_months')
-        or _parse_months(snapshot.horizon)
-    )
+def _settle_macro_forecast(snapshot: ForecastSnapshot, observations) -> Optional[Dict]:
+    horizon_months = _horizon_months('macro', snapshot)
     if horizon_months is None:
         return None
     month_start = snapshot.as_of_date.replace(day=1)
     future_month = month_start + relativedelta(months=horizon_months)
-    base = (
-        Observation.objects
-        .filter(
-            indicator__fred_series_id=snapshot.target,
-            observation_date__lte=month_start,
-        )
-        .order_by('-observation_date')
-        .first()
-    )
-    future = (
-        Observation.objects
-        .filter(
-            indicator__fred_series_id=snapshot.target,
-            observation_date__lte=future_month,
-        )
-        .order_by('-observation_date')
-        .first()
-    )
+    base = _observation_at_or_before(observations, month_start)
+    future = _observation_at_or_before(observations, future_month)
     if base is None or future is None:
         return None
-    realized = future.value - base.value
+    realized = future[1] - base[1]
     return {
         'realized_value': realized,
-        'realized_at': future.observation_date,
+        'realized_at': future[0],
         'error': realized - snapshot.prediction_value,
         'metadata': {
             **(snapshot.metadata or {}),
@@ -162,27 +202,83 @@ def _settle_macro_forecast(snapshot: ForecastSnapshot) -> Optional[Dict]:
     }
 
 
-def settle_snapshot(snapshot: ForecastSnapshot) -> bool:
-    if snapshot.realized_value is not None:
-        return False
-    if snapshot.model_version.startswith('crash_probability_logistic'):
-        result = _settle_crash_probability(snapshot)
-    elif snapshot.model_version.startswith(('lightgbm_return', 'return_lightgbm')):
-        result = _settle_return_forecast(snapshot)
-    elif snapshot.model_version.startswith('macro_forecast'):
-        result = _settle_macro_forecast(snapshot)
-    else:
-        result = None
-    if result is None:
-        return False
-    snapshot.realized_value = result['realized_value']
-    snapshot.realized_at = result['realized_at']
-    snapshot.error = result['error']
-    snapshot.metadata = result['metadata']
-    snapshot.save(
-        update_fields=['realized_value', 'realized_at', 'error', 'metadata'],
+SETTLERS = {
+    'crash_probability': _settle_crash_probability,
+    'return': _settle_return_forecast,
+    'macro': _settle_macro_forecast,
+}
+
+
+def settle_snapshots(snapshots: Iterable[ForecastSnapshot]) -> Dict:
+    """未決済の予測を (系列, horizon) ごとにまとめ、系列を一度だけ読んで決済し一括保存する。
+
+    決済できなかったグループは、次に決済可能になる月 (next_due_date) を返す。
+    """
+    groups = {}
+    checked = 0
+    for snapshot in snapshots:
+        checked += 1
+        if snapshot.realized_value is not None:
+            continue
+        kind = _settlement_kind(snapshot)
+        key = _series_key(kind, snapshot) if kind else None
+        if key is None:
+            continue
+        groups.setdefault((kind, key, snapshot.horizon), []).append(snapshot)
+
+    keys = {key for _, key, _ in groups}
+    series = {}
+    series.update({
+        ('price', ticker): prices
+        for ticker, prices in _load_price_series(
+            [name for source, name in keys if source == 'price']
+        ).items()
+    })
+    series.update({
+        ('observation', series_id): observations
+        for series_id, observations in _load_observation_series(
+            [name for source, name in keys if source == 'observation']
+        ).items()
+    })
+
+    settled = []
+    pending_groups = []
+    for (kind, key, horizon), group in groups.items():
+        pending = []
+        for snapshot in group:
+            result = SETTLERS[kind](snapshot, series[key])
+            if result is None:
+                pending.append(snapshot)
+                continue
+            for field in SETTLEMENT_FIELDS:
+                setattr(snapshot, field, result[field])
+            settled.append(snapshot)
+        due_months = [month for month in (_due_month(kind, snapshot) for snapshot in pending) if month]
+        if due_months:
+            pending_groups.append({
+                'kind': kind,
+                'series': key[1],
+                'horizon': horizon,
+                'pending_count': len(pending),
+                'next_due_date': min(due_months).isoformat(),
+            })
+
+    ForecastSnapshot.objects.bulk_update(
+        settled,
+        SETTLEMENT_FIELDS,
+        batch_size=SETTLEMENT_BATCH_SIZE,
     )
-    return True
+    pending_groups.sort(key=lambda row: (row['next_due_date'], row['kind'], row['series'], row['horizon']))
+    return {
+        'checked_count': checked,
+        'settled_count': len(settled),
+        'pending_groups': pending_groups,
+        'next_due_date': pending_groups[0]['next_due_date'] if pending_groups else None,
+    }
+
+
+def settle_snapshot(snapshot: ForecastSnapshot) -> bool:
+    return settle_snapshots([snapshot])['settled_count'] == 1
 
 
 def settle_due_forecasts(limit: Optional[int] = None) -> Dict:
@@ -192,15 +288,8 @@ def settle_due_forecasts(limit: Optional[int] = None) -> Dict:
     )
     if limit:
         qs = qs[:limit]
-    checked = 0
-    settled = 0
-    for snapshot in qs:
-        checked += 1
-        if settle_snapshot(snapshot):
-            settled += 1
     return {
-        'checked_count': checked,
-        'settled_count': settled,
+        **settle_snapshots(qs),
         'finished_at': timezone.now().isoformat(),
     }
 
@@ -6,7 +6,7 @@
 """
 
 from datetime import date
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from django.utils import timezone
 
@@ -45,7 +45,10 @@ HISTORICAL_CRASH_MONTHS = [
 ]
 
 
-def find_similar_crash_months(top_n: int = 3) -> List[Dict]:
+def find_similar_crash_months(
+    top_n: int = 3,
+    lookup: Optional[Dict[str, Tuple[List[date], List[float]]]] = None,
+) -> List[Dict]:
     """現在ベクトルに最も近い歴史的クラッシュ月を上位 top_n 件返す。
 
     返り値の各要素:
@@ -61,7 +64,8 @@ def find_similar_crash_months(top_n: int = 3) -> List[Dict]:
     if not indicators:
         return []
     series_ids = [i.fred_series_id for i in indicators]
-    lookup = _build_observation_lookup(series_ids)
+    if lookup is None:
+        lookup = _build_observation_lookup(series_ids)
     if not lookup:
         return []
 
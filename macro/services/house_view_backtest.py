@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import time
+from bisect import bisect_right
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import date
-from typing import Iterable
+from typing import Callable, Iterable, NamedTuple
 
 from dateutil.relativedelta import relativedelta
+from django.db import connections
 from django.utils import timezone
 
 from ..models import Indicator, RegimeSnapshot, VintageObservation
@@ -43,6 +47,98 @@ VINTAGE_YOY_SERIES = {
 }
 
 
+VINTAGE_CHANGE_SERIES = ('PAYEMS', 'TCU', 'UMCSENT')
+
+DEFAULT_SHARD_MONTHS = 12
+
+
+class VintageRow(NamedTuple):
+    observation_date: date
+    realtime_start: date
+    realtime_end: date
+    value: float
+
+
+class SnapshotRow(NamedTuple):
+    snapshot_date: date
+    regime_label: str
+
+
+class VintageIndex:
+    """Backtest 期間に見えうる vintage を系列ごとに読み込んでおき、当時見えていた値をメモリ上で引く。"""
+
+    def __init__(self, rows_by_series: dict[str, list[VintageRow]]):
+        self._rows = rows_by_series
+        self._dates = {
+            series_id: [row.observation_date for row in rows]
+            for series_id, rows in rows_by_series.items()
+        }
+
+    @classmethod
+    def load(cls, series_ids: Iterable[str], *, start: date, end: date) -> 'VintageIndex':
+        indicators = dict(
+            Indicator.objects
+            .filter(fred_series_id__in=set(series_ids))
+            .values_list('pk', 'fred_series_id')
+        )
+        rows_by_series = {series_id: [] for series_id in indicators.values()}
+        rows = (
+            VintageObservation.objects
+            .filter(
+                indicator_id__in=list(indicators),
+                realtime_start__lte=end,
+                realtime_end__gte=start,
+            )
+            .order_by('indicator_id', 'observation_date', 'realtime_start')
+            .values_list('indicator_id', 'observation_date', 'realtime_start', 'realtime_end', 'value')
+        )
+        for indicator_id, *values in rows:
+            rows_by_series[indicators[indicator_id]].append(VintageRow(*values))
+        return cls(rows_by_series)
+
+    def visible(self, series_id: str, as_of: date, observation_date: date | None = None):
+        rows = self._rows.get(series_id)
+        if not rows:
+            return None
+        index = bisect_right(self._dates[series_id], observation_date or as_of)
+        # 観測日・公表日の新しい順に見て、as_of 時点で有効だった最初の vintage を返す
+        for position in range(index - 1, -1, -1):
+            row = rows[position]
+            if row.realtime_start <= as_of <= row.realtime_end:
+                return row
+        return None
+
+
+class SnapshotIndex:
+    def __init__(self, rows: list[SnapshotRow]):
+        self._rows = rows
+        self._dates = [row.snapshot_date for row in rows]
+
+    @classmethod
+    def load(cls, *, start: date, end: date) -> 'SnapshotIndex':
+        rows = (
+            RegimeSnapshot.objects
+            .filter(snapshot_date__gt=start, snapshot_date__lte=end)
+            .order_by('snapshot_date')
+            .values_list('snapshot_date', 'regime_label')
+        )
+        return cls([SnapshotRow(*row) for row in rows])
+
+    def latest_between(self, as_of: date, target_date: date):
+        index = bisect_right(self._dates, target_date)
+        if index and self._rows[index - 1].snapshot_date > as_of:
+            return self._rows[index - 1]
+        return None
+
+
+# シャード実行中に読む事前ロード済みデータ。プロセスごとに1組だけ持つ
+_shard_data = {
+    'vintage_index': None,
+    'snapshot_index': None,
+    'panel': None,
+}
+
+
 def _month_starts(start: date, end: date):
     current = start.replace(day=1)
     final = end.replace(day=1)
@@ -52,6 +148,9 @@ def _month_starts(start: date, end: date):
 
 
 def _actual_regime(as_of: date, target_date: date):
+    snapshot_index = _shard_data['snapshot_index']
+    if snapshot_index is not None:
+        return snapshot_index.latest_between(as_of, target_date)
     return (
         RegimeSnapshot.objects
         .filter(snapshot_date__gt=as_of, snapshot_date__lte=target_date)
@@ -83,6 +182,9 @@ def _actual_regime_row(as_of: date, target_date: date) -> dict | None:
 
 
 def _visible_vintage(series_id: str, as_of: date, observation_date: date | None = None):
+    vintage_index = _shard_data['vintage_index']
+    if vintage_index is not None:
+        return vintage_index.visible(series_id, as_of, observation_date)
     indicator = Indicator.objects.filter(fred_series_id=series_id).first()
     if indicator is None:
         return None
@@ -204,32 +306,31 @@ def _build_assessment(as_of: date, data_mode: str) -> tuple[dict | None, str]:
         point_in_time_assessment, _ = _build_assessment(as_of, 'point_in_time')
         if point_in_time_assessment is not None:
             return point_in_time_assessment, 'point_in_time'
-        assessment = regime.build_current_regime_assessment(as_of=as_of)
+        assessment = regime.build_current_regime_assessment(as_of=as_of, panel=_shard_data['panel'])
         return assessment, 'revised_reference'
     if data_mode == 'point_in_time':
         metrics = _collect_vintage_metrics(as_of)
         if not metrics:
             return None, data_mode
-        assessment = regime.build_regime_assessment_from_metrics(metrics, as_of=as_of)
+        assessment = regime.build_regime_assessment_from_metrics(
+            metrics,
+            as_of=as_of,
+            panel=_shard_data['panel'],
+        )
         return assessment, data_mode
-    assessment = regime.build_current_regime_assessment(as_of=as_of)
+    assessment = regime.build_current_regime_assessment(as_of=as_of, panel=_shard_data['panel'])
     return assessment, 'revised_reference'
 
 
-def run_house_view_backtest(
-    *,
-    start: date,
-    end: date,
-    horizons: Iterable[int] = (3, 6),
-    data_mode: str = 'auto',
-    max_rows: int = 240,
-) -> dict:
-    """過去の各月に戻ったつもりで House View を再計算する。"""
+def _replay_months(
+    months: list[date],
+    horizon_values: tuple[int, ...],
+    data_mode: str,
+    today: date,
+) -> tuple[list[dict], list[str]]:
     rows = []
     warnings = []
-    horizon_values = tuple(int(horizon) for horizon in horizons)
-
-    for as_of in _month_starts(start, end):
+    for as_of in months:
         assessment, row_data_mode = _build_assessment(as_of, data_mode)
         if assessment is None:
             warnings.append(
@@ -241,7 +342,7 @@ def run_house_view_backtest(
             continue
         for horizon in horizon_values:
             target_date = as_of + relativedelta(months=horizon)
-            if target_date > timezone.localdate():
+            if target_date > today:
                 warnings.append(
                     f'{as_of.isoformat()} の{horizon}m先はまだ実績日が来ていないためスキップしました。'
                 )
@@ -265,6 +366,140 @@ def run_house_view_backtest(
                 'confidence': assessment.get('rule_strength'),
                 'data_quality': assessment.get('data_quality'),
             })
+    return rows, warnings
+
+
+def _split_months(months: list[date], shard_months: int) -> list[list[date]]:
+    size = max(int(shard_months), 1)
+    return [months[index:index + size] for index in range(0, len(months), size)]
+
+
+def _load_shard_indexes(months: list[date], horizon_values: tuple[int, ...]) -> dict:
+    last_target = months[-1] + relativedelta(months=max(horizon_values, default=0))
+    return {
+        'vintage_index': VintageIndex.load(
+            (*VINTAGE_VALUE_SERIES, *VINTAGE_YOY_SERIES, *VINTAGE_CHANGE_SERIES),
+            start=months[0] - relativedelta(months=3),
+            end=months[-1],
+        ),
+        'snapshot_index': SnapshotIndex.load(start=months[0], end=last_target),
+    }
+
+
+def _init_shard_worker(indexes: dict) -> None:
+    import django
+
+    django.setup()
+    # 親プロセスから引き継いだ接続は使わず、ワーカーごとに開き直す
+    connections.close_all()
+    _shard_data.update(indexes)
+
+
+def _run_shard(
+    shard_number: int,
+    months: list[date],
+    horizon_values: tuple[int, ...],
+    data_mode: str,
+    today: date,
+) -> dict:
+    started = time.perf_counter()
+    targets = [
+        as_of + relativedelta(months=horizon)
+        for as_of in months
+        for horizon in horizon_values
+    ]
+    _shard_data['panel'] = regime.ObservationPanel.for_dates([*months, *targets])
+    try:
+        rows, warnings = _replay_months(months, horizon_values, data_mode, today)
+    finally:
+        _shard_data['panel'] = None
+    return {
+        'shard': shard_number,
+        'start': months[0].isoformat(),
+        'end': months[-1].isoformat(),
+        'month_count': len(months),
+        'rows': rows,
+        'warnings': warnings,
+        'elapsed_sec': time.perf_counter() - started,
+    }
+
+
+def _run_shards(
+    shards: list[list[date]],
+    indexes: dict,
+    horizon_values: tuple[int, ...],
+    data_mode: str,
+    today: date,
+    workers: int,
+    progress: Callable[[dict], None] | None,
+) -> list[dict]:
+    results = []
+    if workers <= 1 or len(shards) <= 1:
+        previous = dict(_shard_data)
+        _shard_data.update(indexes)
+        try:
+            for number, months in enumerate(shards):
+                result = _run_shard(number, months, horizon_values, data_mode, today)
+                results.append(result)
+                if progress is not None:
+                    progress({**result, 'shard_count': len(shards)})
+        finally:
+            _shard_data.update(previous)
+        return results
+
+    # fork したワーカーが親の DB 接続を共有しないよう、先に閉じておく
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(shards)),
+        initializer=_init_shard_worker,
+        initargs=(indexes,),
+    ) as executor:
+        futures = [
+            executor.submit(_run_shard, number, months, horizon_values, data_mode, today)
+            for number, months in enumerate(shards)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress is not None:
+                progress({**result, 'shard_count': len(shards)})
+    return sorted(results, key=lambda result: result['shard'])
+
+
+def run_house_view_backtest(
+    *,
+    start: date,
+    end: date,
+    horizons: Iterable[int] = (3, 6),
+    data_mode: str = 'auto',
+    max_rows: int = 240,
+    workers: int = 1,
+    shard_months: int = DEFAULT_SHARD_MONTHS,
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """過去の各月に戻ったつもりで House View を再計算する。
+
+    月を shard_months ごとのシャードに分け、workers > 1 ならプロセスプールで並列に流す。
+    結果はシャード順に連結するので、並列数によらず同じ出力になる。
+    """
+    rows = []
+    warnings = []
+    horizon_values = tuple(int(horizon) for horizon in horizons)
+    months = list(_month_starts(start, end))
+
+    if months:
+        shard_results = _run_shards(
+            _split_months(months, shard_months),
+            _load_shard_indexes(months, horizon_values),
+            horizon_values,
+            data_mode,
+            timezone.localdate(),
+            workers,
+            progress,
+        )
+        for result in shard_results:
+            rows.extend(result['rows'])
+            warnings.extend(result['warnings'])
 
     backtest_accuracy = {
         **_summary(rows),
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import logging
 import math
 from statistics import median
 from typing import Iterable, Optional
@@ -9,7 +10,10 @@ from typing import Iterable, Optional
 from django.db.models import Count
 
 from ..models import ForecastSnapshot, ModelValidationReport
-from . import crash_probability, forecast_models
+from . import forecast_models
+from .probability_metrics import ProbabilityMetrics
+
+logger = logging.getLogger(__name__)
 
 SHORT_RETURN_MIN_DIRECTION_ACCURACY = 0.56
 SHORT_RETURN_MIN_SKILL_SCORE = 0.02
@@ -62,12 +66,7 @@ def _probability_metrics(rows: list[dict]) -> dict:
         }
         for row in rows
     ]
-    return {
-        'roc_auc': crash_probability.roc_auc(records),
-        'pr_auc': crash_probability.pr_auc(records),
-        'brier_score': crash_probability.brier_score(records),
-        'calibration_bins': crash_probability.calibration_bins(records),
-    }
+    return ProbabilityMetrics(records).summary()
 
 
 def model_display_grade(report: ModelValidationReport) -> tuple[str, str]:
@@ -292,12 +291,15 @@ def run_all_model_validations() -> list[ModelValidationReport]:
         )
     )
     reports = []
-    for model_version, target, horizon in sorted(groups):
-        reports.append(
-            validate_model(
-                model_version=model_version,
-                target=target,
-                horizon=horizon,
+    # 同じ特徴量ブロックをターゲット・ホライズン間で使い回す
+    with forecast_models.feature_matrix_memo() as memo:
+        for model_version, target, horizon in sorted(groups):
+            reports.append(
+                validate_model(
+                    model_version=model_version,
+                    target=target,
+                    horizon=horizon,
+                )
             )
-        )
+    logger.info(forecast_models.format_feature_matrix_memo(memo.summary()))
     return reports
@@ -0,0 +1,220 @@
+"""確率予測の評価指標。
+
+レコードを一度だけスコア順に並べ、その並びから ROC-AUC・PR-AUC・Brier・
+log-loss・確率帯別の実現率をまとめて求める。ROC-AUC は総当たり比較の代わりに
+Mann-Whitney の U 統計量 (同点は 0.5 勝) を同点グループごとに数えるので O(n log n)。
+値は crash_probability の従来の総当たり実装と一致する。
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from statistics import mean
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+LOG_LOSS_EPSILON = 1e-15
+DEFAULT_BOOTSTRAP_REPLICATES = 1000
+
+
+def wilson_interval(
+    event_count: int,
+    sample_count: int,
+    *,
+    z_value: float = 1.96,
+) -> Optional[Tuple[float, float]]:
+    """少数イベントでも極端になりにくい実現率の目安範囲。"""
+    if sample_count <= 0 or event_count < 0 or event_count > sample_count:
+        return None
+    p_hat = event_count / sample_count
+    z2 = z_value ** 2
+    denominator = 1 + z2 / sample_count
+    center = (p_hat + z2 / (2 * sample_count)) / denominator
+    spread = (
+        z_value
+        * math.sqrt(
+            (p_hat * (1 - p_hat) / sample_count)
+            + z2 / (4 * sample_count ** 2)
+        )
+        / denominator
+    )
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+class ProbabilityMetrics:
+    """records の score_key と event を一度だけ取り出して並べ替え、各指標を同じ配列から計算する。"""
+
+    def __init__(self, records: Sequence[Dict], score_key: str = 'probability'):
+        self.scores = [row[score_key] for row in records]
+        self.events = [bool(row['event']) for row in records]
+        self.positive_count = sum(self.events)
+        self.negative_count = len(self.events) - self.positive_count
+        # PR 曲線は従来どおり同点を元の並び順で処理するので、安定ソートの降順を基準にする
+        self.descending = sorted(range(len(self.scores)), key=self.scores.__getitem__, reverse=True)
+        ascending = self.descending[::-1]
+        self.sorted_scores = [self.scores[index] for index in ascending]
+        self.sorted_events = [self.events[index] for index in ascending]
+        self.event_prefix = [0, *accumulate(self.sorted_events)]
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def _tie_groups(self) -> List[Tuple[int, int]]:
+        """昇順の配列で同じスコアが続く (start, stop) の一覧。"""
+        groups = []
+        start = 0
+        for index in range(1, len(self.sorted_scores) + 1):
+            if index == len(self.sorted_scores) or self.sorted_scores[index] != self.sorted_scores[start]:
+                groups.append((start, index))
+                start = index
+        return groups
+
+    def roc_auc(self) -> Optional[float]:
+        if not self.positive_count or not self.negative_count:
+            return None
+        wins = 0.0
+        negatives_below = 0
+        for start, stop in self._tie_groups():
+            positives = self.event_prefix[stop] - self.event_prefix[start]
+            negatives = (stop - start) - positives
+            wins += positives * (negatives_below + 0.5 * negatives)
+            negatives_below += negatives
+        return wins / (self.positive_count * self.negative_count)
+
+    def pr_auc(self) -> Optional[float]:
+        if self.positive_count == 0:
+            return None
+        tp = 0
+        fp = 0
+        previous_recall = 0.0
+        area = 0.0
+        for index in self.descending:
+            if self.events[index]:
+                tp += 1
+            else:
+                fp += 1
+            recall = tp / self.positive_count
+            precision = tp / (tp + fp)
+            area += (recall - previous_recall) * precision
+            previous_recall = recall
+        return area
+
+    def brier_score(self) -> Optional[float]:
+        if not self.scores:
+            return None
+        return mean([
+            (score - (1.0 if event else 0.0)) ** 2
+            for score, event in zip(self.scores, self.events)
+        ])
+
+    def log_loss(self, epsilon: float = LOG_LOSS_EPSILON) -> Optional[float]:
+        if not self.scores:
+            return None
+        losses = []
+        for score, event in zip(self.scores, self.events):
+            clipped = min(max(score, epsilon), 1 - epsilon)
+            losses.append(-math.log(clipped if event else 1 - clipped))
+        return mean(losses)
+
+    def calibration_bins(self, bins: int = 5) -> List[Dict]:
+        if not self.scores:
+            return []
+        out = []
+        for idx in range(bins):
+            lower = idx / bins
+            upper = (idx + 1) / bins
+            start = bisect_left(self.sorted_scores, lower)
+            # 最後の帯だけは確率 1.0 ちょうども含める
+            stop = (
+                bisect_right(self.sorted_scores, 1.0)
+                if idx == bins - 1
+                else bisect_left(self.sorted_scores, upper)
+            )
+            count = stop - start
+            if not count:
+                out.append({
+                    'lower': lower,
+                    'upper': upper,
+                    'count': 0,
+                    'event_count': 0,
+                    'avg_probability': None,
+                    'event_rate': None,
+                    'smoothed_event_rate': None,
+                })
+                continue
+            event_count = self.event_prefix[stop] - self.event_prefix[start]
+            out.append({
+                'lower': lower,
+                'upper': upper,
+                'count': count,
+                'event_count': event_count,
+                'avg_probability': mean(self.sorted_scores[start:stop]),
+                'event_rate': event_count / count,
+                'smoothed_event_rate': (event_count + 1) / (count + 2),
+            })
+        return out
+
+    def summary(self, bins: int = 5) -> Dict:
+        return {
+            'roc_auc': self.roc_auc(),
+            'pr_auc': self.pr_auc(),
+            'brier_score': self.brier_score(),
+            'calibration_bins': self.calibration_bins(bins),
+        }
+
+    def bootstrap_intervals(
+        self,
+        replicates: int = DEFAULT_BOOTSTRAP_REPLICATES,
+        *,
+        confidence: float = 0.95,
+        seed: int = 0,
+    ) -> Optional[Dict]:
+        """ROC-AUC・Brier・log-loss のブートストラップ信頼区間。numpy が無ければ None。
+
+        再標本は並べ替え済みの位置ごとの出現回数行列 (replicates x n) で表し、
+        同点グループごとの正例・負例の重みを累積して全反復の U 統計量を一度に求める。
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return None
+        if not self.scores or replicates <= 0:
+            return None
+
+        count = len(self.scores)
+        rng = np.random.default_rng(seed)
+        draws = rng.integers(0, count, size=(replicates, count))
+        offsets = np.arange(replicates)[:, None] * count
+        weights = np.bincount((draws + offsets).ravel(), minlength=replicates * count).reshape(replicates, count)
+
+        events = np.asarray(self.sorted_events, dtype=float)
+        scores = np.asarray(self.sorted_scores, dtype=float)
+        group_starts = np.asarray([start for start, _ in self._tie_groups()])
+        positives = np.add.reduceat(weights * events, group_starts, axis=1)
+        negatives = np.add.reduceat(weights * (1.0 - events), group_starts, axis=1)
+        negatives_below = np.cumsum(negatives, axis=1) - negatives
+        wins = (positives * (negatives_below + 0.5 * negatives)).sum(axis=1)
+        pairs = positives.sum(axis=1) * negatives.sum(axis=1)
+        aucs = wins[pairs > 0] / pairs[pairs > 0]
+
+        clipped = np.clip(scores, LOG_LOSS_EPSILON, 1 - LOG_LOSS_EPSILON)
+        briers = (weights * (scores - events) ** 2).sum(axis=1) / count
+        log_losses = -(weights * np.where(events > 0, np.log(clipped), np.log(1 - clipped))).sum(axis=1) / count
+
+        tail = (1 - confidence) / 2 * 100
+
+        def interval(values):
+            if not len(values):
+                return None
+            lower, upper = np.percentile(values, [tail, 100 - tail])
+            return float(lower), float(upper)
+
+        return {
+            'replicates': replicates,
+            'confidence': confidence,
+            'roc_auc': interval(aucs),
+            'brier_score': interval(briers),
+            'log_loss': interval(log_losses),
+        }
@@ -1,12 +1,25 @@
-"""本番で保存済みのデータファイルをローカルへ同期する。"""
+"""本番で保存済みのデータファイルをローカルへ同期する。
 
+先に本番の finance_data_manifest.json を取り、そこに載っている sha256/size と
+ローカルのファイルを突き合わせて、差分のあるものだけを並列に取りに行く。
+manifest で省略するのは manifest と同じ配信元 (Vercel の static/) のファイルだけ。
+GitHub raw から取るファイルはデプロイ前に先に更新されるので manifest では判定しない。
+取得時は前回の ETag を If-None-Match で送り、304 なら本文を受け取らない。
+"""
+
+import hashlib
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import requests
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 PRODUCTION_BASE_URL = "https://yoshi-nakane0-github-io-finance.vercel.app"
 GITHUB_RAW_BASE_URL = (
@@ -18,6 +31,8 @@ DATA_PATTERNS = (
     "static/**/*.json",
     "basecalc/data/*.json",
     "explanation/data/*.json",
+    "explanation/data/snapshot_history/*.jsonl",
+    "explanation/data/snapshot_history/blobs/*.json",
 )
 REQUIRED_DATA_PATHS = (
     "static/finance_data_manifest.json",
@@ -30,6 +45,11 @@ REQUIRED_DATA_PATHS = (
 OPTIONAL_DATA_PATHS = {
     "explanation/data/snapshot_history.json",
 }
+MANIFEST_PATH = "static/finance_data_manifest.json"
+SYNC_STATE_PATH = ".production_data_sync.json"
+IMPORT_STATE_CACHE_KEY = "production_data_sync_imports"
+DEFAULT_MAX_WORKERS = 8
+DOWNLOAD_TIMEOUT_SEC = 30
 
 
 class ProductionDataSyncError(Exception):
@@ -37,11 +57,45 @@ class ProductionDataSyncError(Exception):
 
 
 def download_url(url):
-    response = requests.get(url, timeout=30)
+    response = requests.get(url, timeout=DOWNLOAD_TIMEOUT_SEC)
     response.raise_for_status()
     return response.content
 
 
+def fetch_url(url, etag=None):
+    """(本文, ETag) を返す。If-None-Match に一致して 304 なら本文は None。"""
+    headers = {"If-None-Match": etag} if etag else {}
+    response = requests.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT_SEC)
+    if response.status_code == 304:
+        return None, etag
+    response.raise_for_status()
+    return response.content, response.headers.get("ETag")
+
+
+def content_digest(content):
+    return {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+
+def file_digest(path):
+    path = Path(path)
+    if not path.is_file():
+        return None
+    return content_digest(path.read_bytes())
+
+
+def build_file_index(base_dir=None, paths=None):
+    """manifest に載せる {相対パス: {sha256, size}}。manifest 自身は含めない。"""
+    root = Path(base_dir or settings.BASE_DIR)
+    index = {}
+    for relative_path in paths or discover_data_paths(root):
+        if relative_path == MANIFEST_PATH:
+            continue
+        digest = file_digest(root / relative_path)
+        if digest is not None:
+            index[relative_path] = digest
+    return index
+
+
 def discover_data_paths(base_dir=None):
     root = Path(base_dir or settings.BASE_DIR)
     paths = list(REQUIRED_DATA_PATHS)
@@ -66,60 +120,141 @@ def source_url_for_path(
     raise ProductionDataSyncError(f"同期対象外のパスです: {relative_path}")
 
 
+def _url_origin(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
 def sync_production_data(
     *,
     base_dir=None,
     paths=None,
-    downloader=download_url,
+    downloader=None,
     mirror_staticfiles=True,
+    use_manifest=True,
+    max_workers=DEFAULT_MAX_WORKERS,
 ):
+    """
+    downloader を渡した場合は url -> bytes の旧来の取得関数として扱い、ETag は使わない。
+    use_manifest=False なら manifest による差分判定をせず全ファイルを取りに行く。
+    """
     root = Path(base_dir or settings.BASE_DIR)
     target_paths = [str(path).replace("\\", "/") for path in (paths or discover_data_paths(root))]
-    downloads = []
-    skipped_optional = []
+    fetch = fetch_url if downloader is None else (lambda url, etag=None: (downloader(url), None))
+    sync_state = _load_sync_state(root)
+    etags = sync_state.setdefault("etags", {})
+    local_digests = {relative_path: file_digest(root / relative_path) for relative_path in target_paths}
+
+    def request_etag(relative_path):
+        # ローカルが前回取得時と同じ内容のときだけ条件付きリクエストにする
+        entry = etags.get(relative_path) or {}
+        local_digest = local_digests.get(relative_path) or file_digest(root / relative_path)
+        if entry.get("etag") and local_digest and entry.get("sha256") == local_digest["sha256"]:
+            return entry["etag"]
+        return None
 
-    for relative_path in target_paths:
+    def fetch_path(relative_path):
         url = source_url_for_path(relative_path)
+        content, etag = fetch(url, request_etag(relative_path))
+        if content is not None and relative_path.endswith(".json"):
+            json.loads(content.decode("utf-8"))
+        return content, etag
+
+    fetched = {}
+    remote_files = None
+    if use_manifest:
         try:
-            content = downloader(url)
-            if relative_path.endswith(".json"):
-                json.loads(content.decode("utf-8"))
+            manifest_content, manifest_etag = fetch_path(MANIFEST_PATH)
+            manifest_bytes = manifest_content if manifest_content is not None else (root / MANIFEST_PATH).read_bytes()
+            manifest = json.loads(manifest_bytes.decode("utf-8"))
+            remote_files = manifest.get("files") if isinstance(manifest, dict) else None
+            fetched[MANIFEST_PATH] = (manifest_content, manifest_etag)
         except Exception as exc:
-            if relative_path in OPTIONAL_DATA_PATHS and _is_not_found(exc):
-                skipped_optional.append(relative_path)
-                continue
-            raise ProductionDataSyncError(
-                f"{relative_path} の取得に失敗しました: {exc}"
-            ) from exc
-        downloads.append((relative_path, content))
+            logger.info("production manifest unavailable, syncing all paths: %s", exc)
+            remote_files = None
+
+    manifest_origin = _url_origin(source_url_for_path(MANIFEST_PATH))
+    skipped_by_manifest = []
+    to_fetch = []
+    for relative_path in target_paths:
+        if relative_path in fetched:
+            continue
+        # manifest と別の配信元のファイルは、manifest が古くても取りこぼさないよう ETag で確かめる
+        same_origin = _url_origin(source_url_for_path(relative_path)) == manifest_origin
+        remote_digest = (remote_files or {}).get(relative_path) if same_origin else None
+        local_digest = local_digests.get(relative_path)
+        if (
+            remote_digest
+            and local_digest
+            and remote_digest.get("sha256") == local_digest["sha256"]
+            and remote_digest.get("size") == local_digest["size"]
+        ):
+            skipped_by_manifest.append(relative_path)
+            continue
+        to_fetch.append(relative_path)
+
+    errors = {}
+    if to_fetch:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(to_fetch))),
+            thread_name_prefix="production-sync",
+        ) as executor:
+            futures = {relative_path: executor.submit(fetch_path, relative_path) for relative_path in to_fetch}
+            for relative_path, future in futures.items():
+                try:
+                    fetched[relative_path] = future.result()
+                except Exception as exc:
+                    errors[relative_path] = exc
+
+    skipped_optional = []
+    for relative_path in target_paths:
+        exc = errors.get(relative_path)
+        if exc is None:
+            continue
+        if relative_path in OPTIONAL_DATA_PATHS and _is_not_found(exc):
+            skipped_optional.append(relative_path)
+            continue
+        raise ProductionDataSyncError(
+            f"{relative_path} の取得に失敗しました: {exc}"
+        ) from exc
 
     updated = []
     unchanged = []
+    not_modified = []
     mirrored = []
-    forecast_snapshots_imported_count = 0
-    basecalc_history_imported_count = 0
-    explanation_snapshots_imported_count = 0
-    for relative_path, content in downloads:
+    for relative_path in target_paths:
+        if relative_path in errors:
+            continue
         local_path = root / relative_path
-        local_path.parent.mkdir(parents=True, exist_ok=True)
-        if local_path.exists() and local_path.read_bytes() == content:
-            unchanged.append(relative_path)
+        if relative_path in fetched:
+            content, etag = fetched[relative_path]
+            if content is None:
+                not_modified.append(relative_path)
+                unchanged.append(relative_path)
+            else:
+                digest = content_digest(content)
+                local_path.parent.mkdir(parents=True, exist_ok=True)
+                if local_digests.get(relative_path) == digest:
+                    unchanged.append(relative_path)
+                else:
+                    _write_bytes_atomic(local_path, content)
+                    local_digests[relative_path] = digest
+                    updated.append(relative_path)
+                if etag:
+                    etags[relative_path] = {"etag": etag, "sha256": digest["sha256"]}
         else:
-            _write_bytes_atomic(local_path, content)
-            updated.append(relative_path)
+            unchanged.append(relative_path)
 
         staticfiles_path = _staticfiles_alias_path(root, relative_path)
-        if mirror_staticfiles and staticfiles_path and staticfiles_path.exists():
-            if staticfiles_path.read_bytes() != content:
-                _write_bytes_atomic(staticfiles_path, content)
+        if mirror_staticfiles and staticfiles_path and staticfiles_path.exists() and local_path.is_file():
+            if file_digest(staticfiles_path) != local_digests.get(relative_path):
+                _write_bytes_atomic(staticfiles_path, local_path.read_bytes())
                 mirrored.append(staticfiles_path.relative_to(root).as_posix())
 
-        if relative_path == "static/macro/forecast_ledger.json":
-            forecast_snapshots_imported_count = _import_forecast_ledger(content)
-        if relative_path == "basecalc/data/basecalc_history.json":
-            basecalc_history_imported_count = _import_basecalc_history(local_path)
-        if relative_path == "explanation/data/latest_snapshot.json":
-            explanation_snapshots_imported_count = _import_explanation_snapshot(local_path)
+    if downloader is None:
+        _save_sync_state(root, sync_state)
+
+    import_counts, skipped_imports = _run_importers(root, target_paths, local_digests, errors)
 
     return {
         "updated": updated,
@@ -128,13 +263,72 @@ def sync_production_data(
         "updated_count": len(updated),
         "unchanged_count": len(unchanged),
         "mirrored_count": len(mirrored),
+        "downloaded_count": sum(1 for content, _etag in fetched.values() if content is not None),
+        "not_modified": not_modified,
+        "skipped_by_manifest": skipped_by_manifest,
         "skipped_optional": skipped_optional,
-        "forecast_snapshots_imported_count": forecast_snapshots_imported_count,
-        "basecalc_history_imported_count": basecalc_history_imported_count,
-        "explanation_snapshots_imported_count": explanation_snapshots_imported_count,
+        "skipped_imports": skipped_imports,
+        "forecast_snapshots_imported_count": import_counts.get("static/macro/forecast_ledger.json", 0),
+        "basecalc_history_imported_count": import_counts.get("basecalc/data/basecalc_history.json", 0),
+        "explanation_snapshots_imported_count": import_counts.get("explanation/data/latest_snapshot.json", 0),
     }
 
 
+IMPORTERS = {
+    "static/macro/forecast_ledger.json": lambda path: _import_forecast_ledger(path.read_bytes()),
+    "basecalc/data/basecalc_history.json": lambda path: _import_basecalc_history(path),
+    "explanation/data/latest_snapshot.json": lambda path: _import_explanation_snapshot(path),
+}
+
+
+def _run_importers(root, target_paths, local_digests, errors):
+    """入力ファイルの sha256 が前回取り込み時と同じなら importer を飛ばす。"""
+    import_paths = [
+        relative_path for relative_path in target_paths
+        if relative_path in IMPORTERS and relative_path not in errors and local_digests.get(relative_path)
+    ]
+    if not import_paths:
+        return {}, []
+
+    from macro.models import DashboardCache
+
+    # 取り込み済みハッシュは取り込み先と同じ DB に置き、DB を作り直したら取り込み直す
+    state_row = DashboardCache.objects.filter(cache_key=IMPORT_STATE_CACHE_KEY).first()
+    imported_hashes = dict(state_row.payload) if state_row and isinstance(state_row.payload, dict) else {}
+    counts = {}
+    skipped = []
+    for relative_path in import_paths:
+        digest = local_digests[relative_path]["sha256"]
+        if imported_hashes.get(relative_path) == digest:
+            skipped.append(relative_path)
+            continue
+        counts[relative_path] = IMPORTERS[relative_path](root / relative_path)
+        imported_hashes[relative_path] = digest
+
+    if counts:
+        DashboardCache.objects.update_or_create(
+            cache_key=IMPORT_STATE_CACHE_KEY,
+            defaults={"payload": imported_hashes},
+        )
+    return counts, skipped
+
+
+def _load_sync_state(root):
+    try:
+        state = json.loads((root / SYNC_STATE_PATH).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _save_sync_state(root, state):
+    state_path = root / SYNC_STATE_PATH
+    try:
+        _write_bytes_atomic(state_path, (json.dumps(state, sort_keys=True, indent=2) + "\n").encode("utf-8"))
+    except OSError as exc:
+        logger.warning("could not save production sync state: %s", exc)
+
+
 def _is_not_found(exc):
     response = getattr(exc, "response", None)
     return getattr(response, "status_code", None) == 404
@@ -6,10 +6,12 @@
 
 import logging
 import math
+from bisect import bisect_right
 from datetime import date, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from django.db import transaction
+from django.db.models import Max, Q
 from django.utils import timezone
 
 from ..models import Indicator, Observation, RegimeSnapshot
@@ -37,6 +39,39 @@ QUALITY_SERIES = (
     'VIXCLS',
 )
 
+# collect_key_metrics が読む系列。QUALITY_SERIES もすべて含む
+KEY_METRIC_SERIES = (
+    GROWTH_KEY_SERIES,
+    EMPLOYMENT_KEY_SERIES,
+    GDP_KEY_SERIES,
+    INFLATION_KEY_SERIES,
+    'PAYEMS',
+    'RSAFS',
+    'TCU',
+    'UMCSENT',
+    'JTSJOL',
+    'CES0500000003',
+    'CPIAUCSL',
+    'CPILFESL',
+    'PCEPI',
+    'T5YIE',
+    'BAMLH0A0HYM2',
+    'T10Y2Y',
+    'T10Y3M',
+    'VIXCLS',
+)
+
+# 6ヶ月前の値と公表の遅い四半期系列の最新値がほぼ収まる読み込み幅
+METRIC_WINDOW_DAYS = 400
+
+
+class PanelObservation(NamedTuple):
+    observation_date: date
+    value: Optional[float]
+    prev_value: Optional[float]
+    yoy_change: Optional[float]
+
+
 FRESHNESS_LIMIT_DAYS = {
     Indicator.Frequency.DAILY: 10,
     Indicator.Frequency.WEEKLY: 21,
@@ -58,18 +93,6 @@ def _latest_observation(
     return qs.order_by('-observation_date').first()
 
 
-def _observation_at_or_before(series_id: str, target_date) -> Optional[Observation]:
-    indicator = Indicator.objects.filter(fred_series_id=series_id).first()
-    if not indicator:
-        return None
-    return (
-        Observation.objects
-        .filter(indicator=indicator, observation_date__lte=target_date)
-        .order_by('-observation_date')
-        .first()
-    )
-
-
 def _months_ago(today, months: int):
     year = today.year
     month = today.month - months
@@ -80,80 +103,236 @@ def _months_ago(today, months: int):
     return today.replace(year=year, month=month, day=day)
 
 
-def _metric_pct_change(latest: Optional[Observation], months: int) -> Optional[float]:
+class ObservationPanel:
+    """複数系列の観測値をまとめて読み込み、時点ごとの最新値や過去値をメモリ上で引く。
+
+    start 以降に加えて start 直前の1件も読むので、窓の外を DB に問い合わせるのは
+    その1件より前を引くときだけになる。
+    """
+
+    def __init__(
+        self,
+        series_ids: Iterable[str] = KEY_METRIC_SERIES,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        self.series_ids = frozenset(series_ids)
+        self.start = start
+        self.end = end
+        self.indicators = {
+            indicator.fred_series_id: indicator
+            for indicator in Indicator.objects.filter(fred_series_id__in=self.series_ids)
+        }
+        series_by_indicator = {
+            indicator.pk: series_id for series_id, indicator in self.indicators.items()
+        }
+        self._rows: Dict[str, List[PanelObservation]] = {
+            series_id: [] for series_id in self.indicators
+        }
+        # start 直前の1件がある系列は、それより前が未読込になる
+        self._truncated = set()
+
+        qs = Observation.objects.filter(indicator_id__in=list(series_by_indicator))
+        if end is not None:
+            qs = qs.filter(observation_date__lte=end)
+        if start is not None:
+            window = Q(observation_date__gte=start)
+            boundaries = (
+                qs.filter(observation_date__lt=start)
+                .values('indicator_id')
+                .annotate(boundary_date=Max('observation_date'))
+                .values_list('indicator_id', 'boundary_date')
+            )
+            for indicator_id, boundary_date in boundaries:
+                window |= Q(indicator_id=indicator_id, observation_date=boundary_date)
+                self._truncated.add(series_by_indicator[indicator_id])
+            qs = qs.filter(window)
+        rows = qs.order_by('indicator_id', 'observation_date').values_list(
+            'indicator_id', 'observation_date', 'value', 'prev_value', 'yoy_change',
+        )
+        for indicator_id, *values in rows:
+            self._rows[series_by_indicator[indicator_id]].append(PanelObservation(*values))
+        self._dates = {
+            series_id: [row.observation_date for row in series_rows]
+            for series_id, series_rows in self._rows.items()
+        }
+
+    @classmethod
+    def for_dates(
+        cls,
+        as_of_dates: Iterable[Optional[date]],
+        series_ids: Iterable[str] = KEY_METRIC_SERIES,
+    ) -> 'ObservationPanel':
+        """as_of_dates のどの時点の判定にも足りる範囲を読み込む。None は最新時点を表す。"""
+        as_of_dates = list(as_of_dates) or [None]
+        known = [as_of for as_of in as_of_dates if as_of is not None]
+        end = max(known) if len(known) == len(as_of_dates) else None
+        earliest = min(known) if known else timezone.localdate()
+        return cls(
+            series_ids,
+            start=earliest - timedelta(days=METRIC_WINDOW_DAYS),
+            end=end,
+        )
+
+    def at_or_before(self, series_id: str, target_date: Optional[date]):
+        """target_date 以前で最新の観測。None なら最新の観測を返す。"""
+        if series_id not in self.series_ids:
+            return _latest_observation(series_id, as_of=target_date)
+        if series_id not in self.indicators:
+            return None
+        if self.end is not None and (target_date is None or target_date > self.end):
+            return _latest_observation(series_id, as_of=target_date)
+        dates = self._dates[series_id]
+        index = len(dates) if target_date is None else bisect_right(dates, target_date)
+        if index:
+            return self._rows[series_id][index - 1]
+        if series_id in self._truncated:
+            return _latest_observation(series_id, as_of=target_date)
+        return None
+
+
+class AsOfPanel(ObservationPanel):
+    """決まった as-of 日付の並び (月末など) について、各系列の最新観測を先に引き当てたパネル。
+
+    系列ごとに観測日と as-of 日付を1回ずつ突き合わせる (merge-walk) ので、
+    バックテストの各月はそのまま値を引ける。ほかの日付は ObservationPanel と同じく引く。
+    """
+
+    def __init__(
+        self,
+        as_of_dates: Iterable[date],
+        series_ids: Iterable[str] = KEY_METRIC_SERIES,
+    ):
+        self.as_of_dates = sorted(set(as_of_dates))
+        super().__init__(
+            series_ids,
+            start=self.as_of_dates[0] - timedelta(days=METRIC_WINDOW_DAYS) if self.as_of_dates else None,
+            end=self.as_of_dates[-1] if self.as_of_dates else None,
+        )
+        self._as_of_rows: Dict[str, Dict[date, Optional[PanelObservation]]] = {}
+        for series_id, rows in self._rows.items():
+            resolved = {}
+            index = 0
+            for as_of in self.as_of_dates:
+                while index < len(rows) and rows[index].observation_date <= as_of:
+                    index += 1
+                if index:
+                    resolved[as_of] = rows[index - 1]
+                elif series_id not in self._truncated:
+                    resolved[as_of] = None
+            self._as_of_rows[series_id] = resolved
+
+    def at_or_before(self, series_id: str, target_date: Optional[date]):
+        resolved = self._as_of_rows.get(series_id)
+        if resolved is not None and target_date in resolved:
+            return resolved[target_date]
+        return super().at_or_before(series_id, target_date)
+
+    def value_lookup(self, as_of: date):
+        """compute_crash_alert に渡す value_lookup。as_of 時点で利用可能だった最新値を返す。"""
+        def lookup(series_id: str):
+            obs = self.at_or_before(series_id, as_of)
+            if obs is None:
+                return None
+            indicator = self.indicators.get(series_id)
+            return {
+                'value': obs.value,
+                'observation_date': obs.observation_date,
+                'frequency': indicator.frequency if indicator is not None else None,
+            }
+
+        return lookup
+
+
+def _metric_pct_change(
+    panel: ObservationPanel,
+    series_id: str,
+    latest,
+    months: int,
+) -> Optional[float]:
     if latest is None or latest.value in (None, 0):
         return None
-    past = _observation_at_or_before(
-        latest.indicator.fred_series_id,
-        _months_ago(latest.observation_date, months),
-    )
+    past = panel.at_or_before(series_id, _months_ago(latest.observation_date, months))
     if past is None or past.value in (None, 0):
         return None
     return (latest.value - past.value) / abs(past.value) * 100.0
 
 
-def _metric_abs_change(latest: Optional[Observation], months: int) -> Optional[float]:
+def _metric_abs_change(
+    panel: ObservationPanel,
+    series_id: str,
+    latest,
+    months: int,
+) -> Optional[float]:
     if latest is None or latest.value is None:
         return None
-    past = _observation_at_or_before(
-        latest.indicator.fred_series_id,
-        _months_ago(latest.observation_date, months),
-    )
+    past = panel.at_or_before(series_id, _months_ago(latest.observation_date, months))
     if past is None or past.value is None:
         return None
     return latest.value - past.value
 
 
-def collect_key_metrics(as_of: Optional[date] = None) -> Dict[str, Optional[float]]:
+def collect_key_metrics(
+    as_of: Optional[date] = None,
+    *,
+    panel: Optional[ObservationPanel] = None,
+) -> Dict[str, Optional[float]]:
     """レジーム判定に使う主要メトリクスを収集する。"""
+    if panel is None:
+        panel = ObservationPanel.for_dates([as_of])
     metrics: Dict[str, Optional[float]] = {}
 
-    indpro_latest = _latest_observation(GROWTH_KEY_SERIES, as_of=as_of)
+    indpro_latest = panel.at_or_before(GROWTH_KEY_SERIES, as_of)
     if indpro_latest:
         metrics['indpro_yoy'] = indpro_latest.yoy_change
         metrics['indpro_value'] = indpro_latest.value
-        metrics['indpro_3m_change_pct'] = _metric_pct_change(indpro_latest, 3)
+        metrics['indpro_3m_change_pct'] = _metric_pct_change(
+            panel, GROWTH_KEY_SERIES, indpro_latest, 3,
+        )
 
-    unrate_latest = _latest_observation(EMPLOYMENT_KEY_SERIES, as_of=as_of)
+    unrate_latest = panel.at_or_before(EMPLOYMENT_KEY_SERIES, as_of)
     if unrate_latest:
         metrics['unrate_value'] = unrate_latest.value
-        metrics['unrate_6m_change'] = _metric_abs_change(unrate_latest, 6)
+        metrics['unrate_6m_change'] = _metric_abs_change(
+            panel, EMPLOYMENT_KEY_SERIES, unrate_latest, 6,
+        )
 
-    gdp_latest = _latest_observation(GDP_KEY_SERIES, as_of=as_of)
+    gdp_latest = panel.at_or_before(GDP_KEY_SERIES, as_of)
     if gdp_latest:
         metrics['gdp_yoy'] = gdp_latest.yoy_change
 
-    core_pce_latest = _latest_observation(INFLATION_KEY_SERIES, as_of=as_of)
+    core_pce_latest = panel.at_or_before(INFLATION_KEY_SERIES, as_of)
     if core_pce_latest:
         metrics['core_pce_yoy'] = core_pce_latest.yoy_change
-        core_pce_3m_ago = _observation_at_or_before(
+        core_pce_3m_ago = panel.at_or_before(
             INFLATION_KEY_SERIES,
             _months_ago(core_pce_latest.observation_date, 3),
         )
         if core_pce_3m_ago:
             metrics['core_pce_yoy_3m_ago'] = core_pce_3m_ago.yoy_change
 
-    payems_latest = _latest_observation('PAYEMS', as_of=as_of)
+    payems_latest = panel.at_or_before('PAYEMS', as_of)
     if payems_latest and payems_latest.prev_value is not None:
         metrics['payems_mom'] = payems_latest.value - payems_latest.prev_value
 
-    rsa_latest = _latest_observation('RSAFS', as_of=as_of)
+    rsa_latest = panel.at_or_before('RSAFS', as_of)
     if rsa_latest:
         metrics['rsa_sales_yoy'] = rsa_latest.yoy_change
 
-    tcu_latest = _latest_observation('TCU', as_of=as_of)
+    tcu_latest = panel.at_or_before('TCU', as_of)
     if tcu_latest:
-        metrics['tcu_3m_change'] = _metric_abs_change(tcu_latest, 3)
+        metrics['tcu_3m_change'] = _metric_abs_change(panel, 'TCU', tcu_latest, 3)
 
-    sent_latest = _latest_observation('UMCSENT', as_of=as_of)
+    sent_latest = panel.at_or_before('UMCSENT', as_of)
     if sent_latest:
-        metrics['umcsent_3m_change'] = _metric_abs_change(sent_latest, 3)
+        metrics['umcsent_3m_change'] = _metric_abs_change(panel, 'UMCSENT', sent_latest, 3)
 
-    jolts_latest = _latest_observation('JTSJOL', as_of=as_of)
+    jolts_latest = panel.at_or_before('JTSJOL', as_of)
     if jolts_latest:
         metrics['jolts_yoy'] = jolts_latest.yoy_change
 
-    wage_latest = _latest_observation('CES0500000003', as_of=as_of)
+    wage_latest = panel.at_or_before('CES0500000003', as_of)
     if wage_latest:
         metrics['wage_yoy'] = wage_latest.yoy_change
 
@@ -167,13 +346,28 @@ def collect_key_metrics(as_of: Optional[date] = None) -> Dict[str, Optional[floa
         ('T10Y3M', 'yield_curve_3m10y'),
         ('VIXCLS', 'vix'),
     ):
-        obs = _latest_observation(series_id, as_of=as_of)
+        obs = panel.at_or_before(series_id, as_of)
         if obs:
             metrics[key] = obs.yoy_change if key.endswith('_yoy') else obs.value
 
     return metrics
 
 
+def collect_key_metrics_for_dates(
+    as_of_dates: Iterable[Optional[date]],
+    *,
+    panel: Optional[ObservationPanel] = None,
+) -> Dict[Optional[date], Dict[str, Optional[float]]]:
+    """複数時点の主要メトリクスを、観測値の読み込み1回でまとめて返す。"""
+    as_of_dates = list(as_of_dates)
+    if panel is None:
+        panel = ObservationPanel.for_dates(as_of_dates)
+    return {
+        as_of: collect_key_metrics(as_of, panel=panel)
+        for as_of in as_of_dates
+    }
+
+
 def _band_score(value: Optional[float], bands) -> Optional[int]:
     if value is None:
         return None
@@ -590,11 +784,18 @@ def _inflation_records(metrics: Dict[str, Optional[float]]) -> List[Dict]:
     return records
 
 
-def _data_quality(as_of: Optional[date] = None) -> Tuple[int, List[str]]:
+def _data_quality(
+    as_of: Optional[date] = None,
+    *,
+    panel: Optional[ObservationPanel] = None,
+) -> Tuple[int, List[str]]:
     today = as_of or timezone.localdate()
+    if panel is None:
+        panel = ObservationPanel.for_dates([as_of], QUALITY_SERIES)
     indicators = {
-        i.fred_series_id: i
-        for i in Indicator.objects.filter(fred_series_id__in=QUALITY_SERIES)
+        series_id: panel.indicators[series_id]
+        for series_id in QUALITY_SERIES
+        if series_id in panel.indicators
     }
     missing = []
     stale = []
@@ -606,7 +807,7 @@ def _data_quality(as_of: Optional[date] = None) -> Tuple[int, List[str]]:
             missing.append(series_id)
             freshness_scores.append(0)
             continue
-        obs = _latest_observation(series_id, as_of=as_of)
+        obs = panel.at_or_before(series_id, as_of)
         if obs is None:
             missing.append(indicator.name_ja)
             freshness_scores.append(0)
@@ -646,19 +847,32 @@ def _data_quality(as_of: Optional[date] = None) -> Tuple[int, List[str]]:
     return quality, warnings
 
 
-def _build_evidence(records: List[Dict], as_of: Optional[date] = None) -> List[Dict]:
+def _build_evidence(
+    records: List[Dict],
+    as_of: Optional[date] = None,
+    *,
+    panel: Optional[ObservationPanel] = None,
+) -> List[Dict]:
     if not records:
         return []
+    series_ids = {r['series_id'] for r in records}
+    if panel is None:
+        panel = ObservationPanel.for_dates([as_of], series_ids)
     indicators = {
-        i.fred_series_id: i
-        for i in Indicator.objects.filter(
-            fred_series_id__in={r['series_id'] for r in records}
-        )
+        series_id: indicator
+        for series_id, indicator in panel.indicators.items()
+        if series_id in series_ids
     }
+    unloaded = series_ids - panel.series_ids
+    if unloaded:
+        indicators.update(
+            (i.fred_series_id, i)
+            for i in Indicator.objects.filter(fred_series_id__in=unloaded)
+        )
     evidence = []
     for rec in sorted(records, key=lambda r: abs(r['contribution']), reverse=True):
         indicator = indicators.get(rec['series_id'])
-        obs = _latest_observation(rec['series_id'], as_of=as_of)
+        obs = panel.at_or_before(rec['series_id'], as_of)
         evidence.append({
             'series_id': rec['series_id'],
             'name': indicator.name_ja if indicator else rec['series_id'],
@@ -699,8 +913,11 @@ def build_regime_assessment_from_metrics(
     metrics: Dict[str, Optional[float]],
     *,
     as_of: Optional[date] = None,
+    panel: Optional[ObservationPanel] = None,
 ) -> Dict:
-    """与えた指標セットでレジーム判定を返す。"""
+    """与えた指標セットでレジーム判定を返す。panel を渡すと観測値の読み込みを共有する。"""
+    if panel is None:
+        panel = ObservationPanel.for_dates([as_of])
     regime_detail = _classify_regime_detail(metrics)
     inflation_flag, inflation_strength = classify_inflation(metrics)
     inflation_records = _inflation_records(metrics)
@@ -712,11 +929,11 @@ def build_regime_assessment_from_metrics(
         int(round(sum(strength_parts) / len(strength_parts)))
         if strength_parts else 0
     )
-    data_quality, warnings = _data_quality(as_of=as_of)
+    data_quality, warnings = _data_quality(as_of=as_of, panel=panel)
     warnings.extend(_extra_warnings(regime_detail, inflation_flag))
 
     records = regime_detail['records'] + inflation_records
-    evidence = _build_evidence(records, as_of=as_of)
+    evidence = _build_evidence(records, as_of=as_of, panel=panel)
     if len(evidence) < 5:
         warnings.append('判定根拠に使える主要指標が5件未満です。')
 
@@ -744,10 +961,16 @@ def build_regime_assessment_from_metrics(
     }
 
 
-def build_current_regime_assessment(as_of: Optional[date] = None) -> Dict:
+def build_current_regime_assessment(
+    as_of: Optional[date] = None,
+    *,
+    panel: Optional[ObservationPanel] = None,
+) -> Dict:
     """現在または指定日時点の判定結果を構造化して返す。"""
-    metrics = collect_key_metrics(as_of=as_of)
-    return build_regime_assessment_from_metrics(metrics, as_of=as_of)
+    if panel is None:
+        panel = ObservationPanel.for_dates([as_of])
+    metrics = collect_key_metrics(as_of=as_of, panel=panel)
+    return build_regime_assessment_from_metrics(metrics, as_of=as_of, panel=panel)
 
 
 def build_current_indicator_vector() -> Dict[str, float]:
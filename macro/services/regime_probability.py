@@ -12,12 +12,15 @@ from django.conf import settings
 from django.utils import timezone
 
 from ..models import Observation
-from .crash_probability import brier_score, calibration_bins, pr_auc, roc_auc, wilson_interval
+from .probability_metrics import ProbabilityMetrics, wilson_interval
 from .regime import (
+    KEY_METRIC_SERIES,
     PROBABILITY_MODEL_VERSION,
     _latest_observation,
+    AsOfPanel,
+    ObservationPanel,
     build_regime_assessment_from_metrics,
-    collect_key_metrics,
+    collect_key_metrics_for_dates,
 )
 
 
@@ -42,9 +45,16 @@ def _month_starts(start: date, end: date) -> List[date]:
     return rows
 
 
-def _actual_recession(month_start: date, horizon_months: int) -> Optional[bool]:
+def _actual_recession(
+    month_start: date,
+    horizon_months: int,
+    panel: Optional[ObservationPanel] = None,
+) -> Optional[bool]:
     target = _month_end(month_start + relativedelta(months=horizon_months))
-    obs = _latest_observation('USREC', as_of=target)
+    if panel is not None:
+        obs = panel.at_or_before('USREC', target)
+    else:
+        obs = _latest_observation('USREC', as_of=target)
     if obs is None or obs.value is None:
         return None
     return obs.value >= 0.5
@@ -60,15 +70,23 @@ def build_validation_dataset(*, years: int = 20, horizon_months: int = 3) -> Lis
     if latest is None:
         return []
     start = date(max(latest.year - years, 1900), latest.month, 1)
+    months = _month_starts(start, latest)
+    as_of_dates = [_month_end(month) for month in months]
+    # USREC の正解判定の月末も同じパネルで引き当てておく
+    panel = AsOfPanel(
+        as_of_dates + [_month_end(month + relativedelta(months=horizon_months)) for month in months],
+        (*KEY_METRIC_SERIES, 'USREC'),
+    )
+    metrics_by_date = collect_key_metrics_for_dates(as_of_dates, panel=panel)
     rows = []
-    for month in _month_starts(start, latest):
-        metrics = collect_key_metrics(as_of=_month_end(month))
+    for month, as_of in zip(months, as_of_dates):
         assessment = build_regime_assessment_from_metrics(
-            metrics,
-            as_of=_month_end(month),
+            metrics_by_date[as_of],
+            as_of=as_of,
+            panel=panel,
         )
         predicted = assessment.get('risk_probabilities', {}).get('recession')
-        actual = _actual_recession(month, horizon_months)
+        actual = _actual_recession(month, horizon_months, panel)
         if predicted is None or actual is None:
             continue
         rows.append({
@@ -90,6 +108,7 @@ def validate_regime_probability_model(
     rows = build_validation_dataset(years=years, horizon_months=horizon_months)
     event_count = sum(1 for row in rows if row['event'])
     event_interval = wilson_interval(event_count, len(rows)) if rows else None
+    metrics = ProbabilityMetrics(rows)
     return {
         'model_version': PROBABILITY_MODEL_VERSION,
         'evaluated_at': timezone.localdate().isoformat(),
@@ -100,10 +119,9 @@ def validate_regime_probability_model(
         'event_count': event_count,
         'event_rate_interval': event_interval,
         'metrics': {
-            'roc_auc': roc_auc(rows),
-            'pr_auc': pr_auc(rows),
-            'brier_score': brier_score(rows),
-            'calibration_bins': calibration_bins(rows),
+            **metrics.summary(),
+            'log_loss': metrics.log_loss(),
+            'bootstrap_intervals': metrics.bootstrap_intervals(),
         },
         'rows': rows,
         'limitations': [
@@ -8,6 +8,7 @@ from django.utils import timezone
 from ..models import Indicator, Observation, RegimeSnapshot
 from .crash_alert import compute_crash_alert
 from .regime import (
+    ObservationPanel,
     build_regime_assessment_from_metrics,
     collect_key_metrics,
 )
@@ -422,14 +423,16 @@ def build_market_shock_scenario(metrics: Dict, base_world: Dict) -> Dict:
     }
 
 
-def build_auto_scenarios() -> Dict:
-    metrics = collect_key_metrics()
+def build_auto_scenarios(panel: Optional[ObservationPanel] = None) -> Dict:
+    panel = panel or ObservationPanel.for_dates([None])
+    metrics = collect_key_metrics(panel=panel)
     base_alert = compute_crash_alert()
     base_world = build_world_state_assessment_from_metrics(
         metrics,
         crash_alert_payload=base_alert,
+        panel=panel,
     )
-    base_assessment = build_regime_assessment_from_metrics(metrics)
+    base_assessment = build_regime_assessment_from_metrics(metrics, panel=panel)
     scenarios = [
         build_most_likely_scenario(metrics, base_world, base_assessment),
         build_top_risk_scenario(metrics, base_world),
@@ -441,15 +444,18 @@ def build_auto_scenarios() -> Dict:
         for scenario in SCENARIOS
         if scenario.get('key') in ('rate_cut_delay', 'rates_down_risk_on')
     )
-    return build_scenario_analysis(scenario_list=scenarios)
+    return build_scenario_analysis(scenario_list=scenarios, panel=panel)
 
 
 def build_scenario_analysis(
     custom_scenario: Optional[Dict] = None,
     scenario_list: Optional[list[Dict]] = None,
+    panel: Optional[ObservationPanel] = None,
 ) -> Dict:
-    base_metrics = collect_key_metrics()
-    base_assessment = build_regime_assessment_from_metrics(base_metrics)
+    # 各シナリオの判定で同じ最新観測を読み直さないよう、読み込みを共有する
+    panel = panel or ObservationPanel.for_dates([None])
+    base_metrics = collect_key_metrics(panel=panel)
+    base_assessment = build_regime_assessment_from_metrics(base_metrics, panel=panel)
     base_label, base_probability = _top_regime_probability(
         base_assessment.get('regime_probabilities', {})
     )
@@ -458,6 +464,7 @@ def build_scenario_analysis(
     base_world = build_world_state_assessment_from_metrics(
         base_metrics,
         crash_alert_payload=base_alert,
+        panel=panel,
     )
 
     scenarios = []
@@ -469,7 +476,7 @@ def build_scenario_analysis(
         metrics = _apply_metric_scenario(base_metrics, scenario)
         for key, value in scenario.get('metric_sets', {}).items():
             metrics[key] = value
-        assessment = build_regime_assessment_from_metrics(metrics)
+        assessment = build_regime_assessment_from_metrics(metrics, panel=panel)
         label, probability = _top_regime_probability(
             assessment.get('regime_probabilities', {})
         )
@@ -478,6 +485,7 @@ def build_scenario_analysis(
         scenario_world = build_world_state_assessment_from_metrics(
             metrics,
             crash_alert_payload=scenario_alert,
+            panel=panel,
         )
         world_state_delta_rows = _world_state_delta_rows(base_world, scenario_world)
         stress_delta = (
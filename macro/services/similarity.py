@@ -65,6 +65,27 @@ def _build_observation_lookup(
     return lookup
 
 
+def load_importance_a_lookup() -> Dict[str, Tuple[List[date], List[float]]]:
+    """重要度A指標の全期間ぶんの lookup。類似月検索とクラッシュ月比較で共有する。"""
+    series_ids = [i.fred_series_id for i in get_importance_a_indicators()]
+    if not series_ids:
+        return {}
+    return _build_observation_lookup(series_ids)
+
+
+def slice_observation_lookup(
+    lookup: Dict[str, Tuple[List[date], List[float]]],
+    cutoff_date: date,
+) -> Dict[str, Tuple[List[date], List[float]]]:
+    """全期間の lookup を _build_observation_lookup(cutoff_date=...) と同じ範囲に切り出す。"""
+    sliced = {}
+    for sid, (dates, values) in lookup.items():
+        start = bisect_left(dates, cutoff_date)
+        if start < len(dates):
+            sliced[sid] = (dates[start:], values[start:])
+    return sliced
+
+
 def _value_at_or_before(
     series_data: Tuple[List[date], List[float]],
     target_date: date,
@@ -120,12 +141,14 @@ def find_similar_months(
     top_n: int = DEFAULT_TOP_N,
     history_years: int = SEARCH_HISTORY_YEARS,
     distance_threshold: Optional[float] = DISTANCE_THRESHOLD,
+    lookup: Optional[Dict[str, Tuple[List[date], List[float]]]] = None,
 ) -> List[Dict]:
     """現在ベクトルに最も近い過去月を返す。
 
     各要素: { 'month_start', 'distance', 'vector', 'main3' }
     main3 は表示用の主要3指標（Core PCE / INDPRO / 2-10スプレッド）の各月時点の値。
     distance_threshold が指定された場合、距離がそれより大きい月は除外する。
+    lookup には load_importance_a_lookup() の結果を渡せる (探索範囲に切り出して使う)。
     """
     indicators = get_importance_a_indicators()
     if not indicators:
@@ -136,7 +159,10 @@ def find_similar_months(
     today = timezone.localdate()
     cutoff_date = today.replace(year=today.year - history_years - 1).replace(day=1)
 
-    lookup = _build_observation_lookup(series_ids, cutoff_date=cutoff_date)
+    if lookup is None:
+        lookup = _build_observation_lookup(series_ids, cutoff_date=cutoff_date)
+    else:
+        lookup = slice_observation_lookup(lookup, cutoff_date)
     if not lookup:
         return []
 
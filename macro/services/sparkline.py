@@ -1,46 +1,92 @@
 """軽量SVGスパークラインジェネレータ。
 
 JS ライブラリに頼らず、サーバ側で SVG 文字列を生成する。
+長い系列は LTTB で max_points 点まで間引いてから描く。
+render_sparklines は複数系列をまとめて描き、(系列ID, 最終観測日, スタイル, 値) のハッシュで
+共有キャッシュに SVG を置くので、入力が変わらない事前計算では文字列を作り直さない。
 """
 
-from typing import Iterable, List, Optional
+import hashlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
+from django.core.cache import InvalidCacheBackendError, caches
 
-def generate_sparkline_svg(
-    values: Iterable[float],
-    width: int = 120,
-    height: int = 28,
-    stroke: str = "#38BDF8",
-    stroke_width: float = 1.5,
-    fill: Optional[str] = "rgba(56, 189, 248, 0.18)",
-) -> str:
-    """値の系列から SVG sparkline を返す。空または1点だけなら空文字。"""
-    arr: List[float] = [float(v) for v in values if v is not None]
-    if len(arr) < 2:
-        return ""
 
+SPARKLINE_CACHE_ALIAS = "shared"
+SPARKLINE_CACHE_VERSION = "macro_sparkline_v1"
+SPARKLINE_CACHE_TTL = 30 * 86400
+
+
+class SparklineStyle(NamedTuple):
+    width: int = 120
+    height: int = 28
+    stroke: str = "#38BDF8"
+    stroke_width: float = 1.5
+    fill: Optional[str] = "rgba(56, 189, 248, 0.18)"
+    max_points: Optional[int] = None
+
+
+# カードは 24 か月ぶんなので間引かない。詳細チャートは横 320px に 2px 間隔まで
+CARD_STYLE = SparklineStyle()
+DETAIL_STYLE = SparklineStyle(width=320, height=120, stroke_width=2.0, max_points=160)
+
+
+def lttb_indices(values: Sequence[float], threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets で残す点の添字。先頭と末尾は必ず残す。"""
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    bucket = (n - 2) / (threshold - 2)
+    selected = [0]
+    anchor = 0
+    for i in range(threshold - 2):
+        # 次のバケットの平均点を 3 点目にする
+        next_start = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        next_count = next_end - next_start
+        avg_x = (next_start + next_end - 1) / 2.0
+        avg_y = sum(values[next_start:next_end]) / next_count
+
+        anchor_y = values[anchor]
+        best_index = start = int(i * bucket) + 1
+        best_area = -1.0
+        for j in range(start, int((i + 1) * bucket) + 1):
+            area = abs((anchor - avg_x) * (values[j] - anchor_y) - (anchor - j) * (avg_y - anchor_y))
+            if area > best_area:
+                best_area = area
+                best_index = j
+        selected.append(best_index)
+        anchor = best_index
+    selected.append(n - 1)
+    return selected
+
+
+def _render(arr: List[float], style: SparklineStyle) -> str:
     n = len(arr)
+    if n < 2:
+        return ""
+    width = style.width
+    height = style.height
+    indices = lttb_indices(arr, style.max_points) if style.max_points else range(n)
+
+    # x は元の添字の位置に置くので、間引いても形の横方向は崩れない
+    x_step = width / (n - 1)
     vmin = min(arr)
     vmax = max(arr)
-
-    points: List[str] = []
     if vmax == vmin:
-        y = height / 2.0
-        for i in range(n):
-            x = (i / (n - 1)) * width
-            points.append(f"{x:.1f},{y:.1f}")
+        mid = f"{height / 2.0:.1f}"
+        points_str = " ".join(f"{i * x_step:.1f},{mid}" for i in indices)
     else:
-        for i, v in enumerate(arr):
-            x = (i / (n - 1)) * width
-            y = height - (v - vmin) / (vmax - vmin) * height
-            points.append(f"{x:.1f},{y:.1f}")
-
-    points_str = " ".join(points)
+        y_scale = height / (vmax - vmin)
+        points_str = " ".join(
+            f"{i * x_step:.1f},{(vmax - arr[i]) * y_scale:.1f}" for i in indices
+        )
 
     fill_path = ""
-    if fill:
+    if style.fill:
         fill_path = (
-            f'<polygon fill="{fill}" stroke="none" points="'
+            f'<polygon fill="{style.fill}" stroke="none" points="'
             f'0,{height} {points_str} {width},{height}"/>'
         )
 
@@ -49,8 +95,68 @@ def generate_sparkline_svg(
         f'xmlns="http://www.w3.org/2000/svg" class="macro-sparkline" '
         f'aria-hidden="true">'
         f'{fill_path}'
-        f'<polyline fill="none" stroke="{stroke}" stroke-width="{stroke_width}" '
+        f'<polyline fill="none" stroke="{style.stroke}" stroke-width="{style.stroke_width}" '
         f'stroke-linejoin="round" stroke-linecap="round" '
         f'points="{points_str}"/>'
         f'</svg>'
     )
+
+
+def generate_sparkline_svg(
+    values: Iterable[float],
+    width: int = 120,
+    height: int = 28,
+    stroke: str = "#38BDF8",
+    stroke_width: float = 1.5,
+    fill: Optional[str] = "rgba(56, 189, 248, 0.18)",
+    max_points: Optional[int] = None,
+) -> str:
+    """値の系列から SVG sparkline を返す。空または1点だけなら空文字。"""
+    arr: List[float] = [float(v) for v in values if v is not None]
+    return _render(arr, SparklineStyle(width, height, stroke, stroke_width, fill, max_points))
+
+
+def sparkline_cache_key(series_id: str, last_date, style: SparklineStyle, values: Sequence[float]) -> str:
+    # float のタプルのハッシュはプロセスをまたいでも変わらないので、値の改定も見分けられる
+    raw = f"{series_id}|{last_date}|{tuple(style)}|{len(values)}|{hash(tuple(values))}"
+    return f"{SPARKLINE_CACHE_VERSION}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _sparkline_cache():
+    try:
+        return caches[SPARKLINE_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+
+
+def render_sparklines(
+    series: Iterable[Tuple[str, object, Iterable[float]]],
+    style: SparklineStyle = CARD_STYLE,
+) -> Dict[str, str]:
+    """(系列ID, 最終観測日, 値) の並びをまとめて描き、系列ID -> SVG を返す。
+
+    キャッシュは 1 回の get_many と 1 回の set_many だけで引く。
+    """
+    keyed = []
+    for series_id, last_date, values in series:
+        arr = [float(v) for v in values if v is not None]
+        keyed.append((series_id, sparkline_cache_key(series_id, last_date, style, arr), arr))
+    if not keyed:
+        return {}
+
+    cache = _sparkline_cache()
+    cached = cache.get_many([key for _, key, _ in keyed]) if cache is not None else {}
+    rendered = {}
+    fresh = {}
+    for series_id, key, arr in keyed:
+        svg = cached.get(key)
+        if svg is None:
+            svg = fresh[key] = _render(arr, style)
+        rendered[series_id] = svg
+    if fresh and cache is not None:
+        cache.set_many(fresh, SPARKLINE_CACHE_TTL)
+    return rendered
+
+
+def render_sparkline(series_id: str, last_date, values: Iterable[float], style: SparklineStyle = CARD_STYLE) -> str:
+    return render_sparklines([(series_id, last_date, values)], style)[series_id]
@@ -229,9 +229,10 @@ def build_world_state_assessment_from_metrics(
     *,
     as_of: Optional[date] = None,
     crash_alert_payload: Optional[Dict] = None,
+    panel: Optional[regime.ObservationPanel] = None,
 ) -> Dict:
     """任意のメトリクスから World State 評価を作る。シナリオ分析でも使う。"""
-    assessment = regime.build_regime_assessment_from_metrics(metrics, as_of=as_of)
+    assessment = regime.build_regime_assessment_from_metrics(metrics, as_of=as_of, panel=panel)
     scores = assessment.get('scores') or {}
     risks = assessment.get('risk_probabilities') or {}
     crash = crash_alert_payload or compute_crash_alert(as_of=as_of)
@@ -307,9 +308,15 @@ def build_world_state_assessment_from_metrics(
     }
 
 
-def build_world_state_assessment(as_of: Optional[date] = None) -> dict:
-    metrics = regime.collect_key_metrics(as_of=as_of)
-    return build_world_state_assessment_from_metrics(metrics, as_of=as_of)
+def build_world_state_assessment(
+    as_of: Optional[date] = None,
+    *,
+    panel: Optional[regime.ObservationPanel] = None,
+) -> dict:
+    if panel is None:
+        panel = regime.ObservationPanel.for_dates([as_of])
+    metrics = regime.collect_key_metrics(as_of=as_of, panel=panel)
+    return build_world_state_assessment_from_metrics(metrics, as_of=as_of, panel=panel)
 
 
 def _policy_expectation_score() -> Optional[float]:
@@ -340,9 +347,10 @@ def compute_current_world_state(
     cadence: str = WorldStateSnapshot.Cadence.DAILY,
     *,
     as_of: Optional[date] = None,
+    panel: Optional[regime.ObservationPanel] = None,
 ) -> WorldStateSnapshot:
     target_date = as_of or timezone.localdate()
-    assessment = build_world_state_assessment(as_of=target_date)
+    assessment = build_world_state_assessment(as_of=target_date, panel=panel)
     defaults = {
         field: assessment.get(field)
         for field in STATE_SCORE_FIELDS
@@ -377,18 +385,21 @@ def backfill_world_states(
 ) -> dict:
     end_date = end or timezone.localdate()
     start_date = start or (end_date - relativedelta(years=years)).replace(day=1)
+    as_of_dates = []
     current = start_date.replace(day=1)
+    while current <= end_date:
+        as_of_dates.append(min(_month_end(current), end_date))
+        current = current + relativedelta(months=1)
+    # レジーム指標は全月分を一度に読み込んで使い回す
+    panel = regime.ObservationPanel.for_dates(as_of_dates)
     processed = 0
     success = 0
     failed = 0
     failures = []
-    while current <= end_date:
-        as_of = _month_end(current)
-        if as_of > end_date:
-            as_of = end_date
+    for as_of in as_of_dates:
         processed += 1
         try:
-            snapshot = compute_current_world_state(cadence=cadence, as_of=as_of)
+            snapshot = compute_current_world_state(cadence=cadence, as_of=as_of, panel=panel)
             if not snapshot.feature_vector:
                 snapshot.warnings = [
                     *(snapshot.warnings or []),
@@ -399,7 +410,6 @@ def backfill_world_states(
         except Exception as exc:
             failed += 1
             failures.append({'as_of_date': as_of.isoformat(), 'error': str(exc)})
-        current = current + relativedelta(months=1)
     return {
         'processed_count': processed,
         'success_count': success,
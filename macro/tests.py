@@ -2,13 +2,14 @@
 
 import gzip
 import json
+import multiprocessing
 import requests
 import yaml
 from datetime import date, datetime, timedelta
 from io import StringIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from unittest import mock
+from unittest import mock, skipUnless
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
@@ -23,6 +24,8 @@ from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from myproject.perf import assert_within_query_budget
+
 from .models import (
     DashboardCache,
     DailyPriceObservation,
@@ -48,6 +51,7 @@ from .services import (
     dashboard_cache,
     data_quality,
     data_sync,
+    detail,
     detail_analysis,
     forecast_models,
     forecast_tracking,
@@ -56,6 +60,7 @@ from .services import (
     judgment,
     linkage,
     operations,
+    probability_metrics,
     raw_archive,
     regime,
     regime_probability,
@@ -618,6 +623,55 @@ class MonthlyMacroMaintenanceCommandTest(SimpleTestCase):
             call_command('monthly_macro_maintenance')
 
 
+class ProbabilityMetricsTest(SimpleTestCase):
+    def _records(self):
+        # 同点・確率 0/1 ちょうど・帯の境界を含む固定データ
+        probabilities = [0.0, 0.2, 0.2, 0.35, 0.4, 0.4, 0.4, 0.55, 0.6, 0.8, 0.95, 1.0, 0.1, 0.2, 0.6, 0.75]
+        events = [0, 0, 1, 0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 0]
+        return [
+            {'probability': probability, 'event': bool(event)}
+            for probability, event in zip(probabilities, events)
+        ]
+
+    def _pairwise_roc_auc(self, records):
+        positives = [r['probability'] for r in records if r['event']]
+        negatives = [r['probability'] for r in records if not r['event']]
+        wins = 0.0
+        for pos in positives:
+            for neg in negatives:
+                if pos > neg:
+                    wins += 1
+                elif pos == neg:
+                    wins += 0.5
+        return wins / (len(positives) * len(negatives))
+
+    def test_metrics_match_previous_record_walks(self):
+        records = self._records()
+        metrics = probability_metrics.ProbabilityMetrics(records)
+
+        self.assertEqual(metrics.roc_auc(), self._pairwise_roc_auc(records))
+        self.assertEqual(crash_probability.roc_auc(records), self._pairwise_roc_auc(records))
+        bins = metrics.calibration_bins()
+        self.assertEqual([row['count'] for row in bins], [2, 4, 4, 3, 3])
+        self.assertEqual([row['event_count'] for row in bins], [0, 1, 2, 2, 2])
+        self.assertEqual(bins[-1]['avg_probability'], (0.8 + 0.95 + 1.0) / 3)
+        self.assertEqual(metrics.summary()['pr_auc'], crash_probability.pr_auc(records))
+        self.assertIsNone(probability_metrics.ProbabilityMetrics([{'probability': 0.3, 'event': True}]).roc_auc())
+
+    def test_bootstrap_intervals_bracket_the_point_estimates(self):
+        metrics = probability_metrics.ProbabilityMetrics(self._records())
+
+        intervals = metrics.bootstrap_intervals(200, seed=1)
+
+        self.assertEqual(intervals, metrics.bootstrap_intervals(200, seed=1))
+        lower, upper = intervals['roc_auc']
+        self.assertLessEqual(lower, metrics.roc_auc())
+        self.assertGreaterEqual(upper, metrics.roc_auc())
+        lower, upper = intervals['brier_score']
+        self.assertLessEqual(lower, metrics.brier_score())
+        self.assertGreaterEqual(upper, metrics.brier_score())
+
+
 class CrashProbabilityModelCommandTest(TestCase):
     def test_training_command_stores_forecast_snapshot(self):
         rows = [
@@ -786,6 +840,159 @@ class MacroWorldModelStorageTest(TestCase):
             snapshot.id,
         )
 
+    def test_columnar_feature_store_matrix_matches_dict_rows(self):
+        from macro.services import forecast_models
+
+        feature_maps = {
+            date(2020, 1, 1): {'b': 2.0, 'a': 1.0},
+            date(2020, 2, 1): {'a': 3.5, 'c': -1.25},
+            date(2020, 3, 1): {},
+        }
+        with TemporaryDirectory() as tmpdir:
+            store = feature_store.ColumnarFeatureStore('test', root=Path(tmpdir))
+            for month, features in feature_maps.items():
+                store.put(month, features, source_mode='vintage_point_in_time', watermark={'vintage': 'v1'})
+            store.flush()
+
+            reopened = feature_store.ColumnarFeatureStore('test', root=Path(tmpdir))
+            names, matrix = reopened.matrix(feature_maps)
+            self.assertEqual(
+                (names, matrix),
+                forecast_models._matrix_from_feature_maps(feature_maps.values()),
+            )
+            self.assertEqual(reopened.names, ['a', 'b', 'c'])
+            self.assertEqual(reopened.feature_map(date(2020, 2, 1)), {'a': 3.5, 'c': -1.25})
+            self.assertEqual(
+                reopened.entry(date(2020, 1, 1))['feature_hash'],
+                feature_store.hash_feature_vector({'a': 1.0, 'b': 2.0}),
+            )
+            self.assertTrue(reopened.is_fresh(date(2020, 1, 1), {'vintage': 'v1'}))
+            self.assertFalse(reopened.is_fresh(date(2020, 1, 1), {'vintage': 'v2'}))
+            self.assertFalse(reopened.is_fresh(date(2020, 4, 1), {'vintage': 'v1'}))
+
+    def test_monthly_feature_matrix_rebuilds_only_when_vintages_change(self):
+        from macro.services import forecast_models
+
+        indicator = Indicator.objects.create(
+            fred_series_id='STOREFEAT',
+            name_ja='store feature',
+            category=Indicator.Category.GROWTH,
+            source=Indicator.Source.FRED,
+            importance=Indicator.Importance.A,
+        )
+        for month in range(24):
+            observation_date = date(2022, 1, 1) + relativedelta(months=month)
+            PriceObservation.objects.create(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=observation_date,
+                close_price=100 + month,
+            )
+            VintageObservation.objects.create(
+                indicator=indicator,
+                observation_date=observation_date,
+                realtime_start=observation_date,
+                realtime_end=date(9999, 12, 31),
+                value=float(month),
+                collected_at=timezone.now(),
+            )
+
+        with TemporaryDirectory() as tmpdir, mock.patch.dict('os.environ', {'FEATURE_STORE_DIR': tmpdir}), \
+             mock.patch(
+                 'macro.services.forecast_models._historical_feature_row',
+                 wraps=forecast_models._historical_feature_row,
+             ) as row_builder:
+            first = forecast_models.build_monthly_feature_matrix('return_forecast', 'GSPC', '3m')
+            self.assertEqual(row_builder.call_count, 24)
+            second = forecast_models.build_monthly_feature_matrix('return_forecast', 'GSPC', '3m')
+            self.assertEqual(row_builder.call_count, 24)
+
+            VintageObservation.objects.create(
+                indicator=indicator,
+                observation_date=date(2022, 1, 1),
+                realtime_start=date(2022, 3, 1),
+                realtime_end=date(9999, 12, 31),
+                value=9.0,
+                collected_at=timezone.now(),
+            )
+            forecast_models.build_monthly_feature_matrix('return_forecast', 'GSPC', '3m')
+            self.assertEqual(row_builder.call_count, 48)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['feature_names'], ['STOREFEAT_vintage_value'])
+        self.assertEqual(len(first['rows']), 21)
+        self.assertEqual(first['rows'][2]['x'], [2.0])
+
+    def test_feature_matrix_memo_shares_feature_block_across_horizons(self):
+        from macro.services import forecast_models
+
+        indicator = Indicator.objects.create(
+            fred_series_id='MEMOFEAT',
+            name_ja='memo feature',
+            category=Indicator.Category.GROWTH,
+            source=Indicator.Source.FRED,
+            importance=Indicator.Importance.A,
+        )
+        for month in range(24):
+            observation_date = date(2022, 1, 1) + relativedelta(months=month)
+            PriceObservation.objects.create(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=observation_date,
+                close_price=100 + month,
+            )
+            VintageObservation.objects.create(
+                indicator=indicator,
+                observation_date=observation_date,
+                realtime_start=observation_date,
+                realtime_end=date(9999, 12, 31),
+                value=float(month),
+                collected_at=timezone.now(),
+            )
+
+        with TemporaryDirectory() as tmpdir, mock.patch.dict('os.environ', {'FEATURE_STORE_DIR': tmpdir}):
+            expected = {
+                horizon: forecast_models.build_monthly_feature_matrix('return_forecast', 'GSPC', horizon)
+                for horizon in ('1m', '3m', '6m')
+            }
+            with mock.patch(
+                'macro.services.forecast_models._load_monthly_target_series',
+                wraps=forecast_models._load_monthly_target_series,
+            ) as series_loader, forecast_models.feature_matrix_memo() as memo:
+                shared = {
+                    horizon: forecast_models.build_monthly_feature_matrix('return_forecast', 'GSPC', horizon)
+                    for horizon in ('1m', '3m', '6m')
+                }
+                with forecast_models.feature_matrix_memo() as inner:
+                    self.assertIs(inner, memo)
+
+        self.assertEqual(shared, expected)
+        self.assertEqual(series_loader.call_count, 1)
+        self.assertEqual(memo.summary()['built'], 1)
+        self.assertEqual(memo.summary()['avoided'], 2)
+        self.assertEqual([len(shared[h]['rows']) for h in ('1m', '3m', '6m')], [23, 21, 18])
+
+    def test_feature_matrix_memo_reloads_target_series_after_data_changes(self):
+        from macro.services import forecast_models
+
+        for month in range(3):
+            PriceObservation.objects.create(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=date(2022, 1, 1) + relativedelta(months=month),
+                close_price=100 + month,
+            )
+
+        with forecast_models.feature_matrix_memo():
+            before = forecast_models.load_monthly_target_series('GSPC')
+            self.assertIs(forecast_models.load_monthly_target_series('GSPC'), before)
+            PriceObservation.objects.create(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=date(2022, 4, 1),
+                close_price=110,
+            )
+            after = forecast_models.load_monthly_target_series('GSPC')
+
+        self.assertEqual(len(before), 3)
+        self.assertEqual(after[date(2022, 4, 1)], 110.0)
+
     def test_crash_probability_prefers_daily_drawdown_when_available(self):
         for idx in range(5):
             PriceObservation.objects.create(
@@ -1235,6 +1442,64 @@ class MacroReliabilityEnhancementTest(TestCase):
         self.assertEqual(report['rows'][0]['validation_target'], 'macro_regime_3m')
         self.assertEqual(report['rows'][1]['miss_type'], 'too_bullish')
 
+    @skipUnless(
+        multiprocessing.get_start_method() == 'fork',
+        'テスト用のメモリ DB はフォークしたワーカーからしか見えない',
+    )
+    def test_house_view_backtest_process_pool_matches_sequential_run(self):
+        from macro.services.house_view_backtest import run_house_view_backtest
+
+        labels = [
+            RegimeSnapshot.Label.EXPANSION,
+            RegimeSnapshot.Label.SLOWDOWN,
+            RegimeSnapshot.Label.CONTRACTION,
+            RegimeSnapshot.Label.RECOVERY,
+        ]
+        for index in range(24):
+            RegimeSnapshot.objects.create(
+                snapshot_date=date(2024, 1, 1) + relativedelta(months=index),
+                regime_label=labels[index // 3 % len(labels)],
+                confidence=70,
+                data_quality=90,
+            )
+        for series_id, base in (('INDPRO', 100.0), ('UNRATE', 4.0), ('PCEPILFE', 120.0)):
+            indicator, _ = Indicator.objects.get_or_create(
+                fred_series_id=series_id,
+                defaults={
+                    'name_ja': series_id,
+                    'category': Indicator.Category.GROWTH,
+                    'source': Indicator.Source.FRED,
+                    'frequency': Indicator.Frequency.MONTHLY,
+                },
+            )
+            for index in range(30):
+                value = base + (index % 7) - 3
+                Observation.objects.create(
+                    indicator=indicator,
+                    observation_date=date(2023, 7, 1) + relativedelta(months=index),
+                    value=value,
+                    prev_value=value - 0.5,
+                    yoy_change=(index % 5) - 2.0,
+                )
+
+        def run(workers):
+            return run_house_view_backtest(
+                start=date(2024, 1, 1),
+                end=date(2024, 12, 1),
+                horizons=(3, 6),
+                data_mode='auto',
+                workers=workers,
+                shard_months=3,
+            )
+
+        with mock.patch('macro.services.house_view_backtest.timezone.localdate', return_value=date(2026, 1, 1)):
+            sequential = run(1)
+            pooled = run(3)
+
+        self.assertGreater(sequential['backtest_accuracy']['sample_count'], 0)
+        for key in ('rows', 'backtest_accuracy', 'warnings'):
+            self.assertEqual(pooled[key], sequential[key])
+
     def test_house_view_backtest_computes_actual_regime_when_snapshot_is_missing(self):
         from macro.services.house_view_backtest import run_house_view_backtest
 
@@ -1348,6 +1613,101 @@ class MacroReliabilityEnhancementTest(TestCase):
         self.assertEqual(report['rows'][0]['data_mode'], 'point_in_time')
         self.assertEqual(report['backtest_accuracy']['data_modes']['point_in_time']['sample_count'], 1)
 
+    def test_house_view_vintage_index_matches_visible_vintage_queries(self):
+        from macro.services import house_view_backtest
+
+        indicator, _ = Indicator.objects.update_or_create(
+            fred_series_id='INDPRO',
+            defaults={
+                'name_ja': '鉱工業生産',
+                'category': Indicator.Category.GROWTH,
+                'source': Indicator.Source.FRED,
+                'importance': Indicator.Importance.A,
+                'frequency': Indicator.Frequency.MONTHLY,
+            },
+        )
+        for month in range(6):
+            observation_date = date(2025, 1, 1) + relativedelta(months=month)
+            first_release = observation_date + relativedelta(months=1, days=14)
+            VintageObservation.objects.create(
+                indicator=indicator,
+                observation_date=observation_date,
+                realtime_start=first_release,
+                realtime_end=first_release + relativedelta(months=1, days=-1),
+                value=100.0 + month,
+                collected_at=timezone.now(),
+            )
+            VintageObservation.objects.create(
+                indicator=indicator,
+                observation_date=observation_date,
+                realtime_start=first_release + relativedelta(months=1),
+                realtime_end=date(9999, 12, 31),
+                value=100.5 + month,
+                collected_at=timezone.now(),
+            )
+        index = house_view_backtest.VintageIndex.load(
+            ['INDPRO', 'UNRATE'],
+            start=date(2025, 1, 1),
+            end=date(2025, 12, 1),
+        )
+
+        for as_of in (date(2025, 2, 1), date(2025, 3, 1), date(2025, 4, 20), date(2025, 9, 1)):
+            for observation_date in (None, date(2025, 2, 1)):
+                expected = house_view_backtest._visible_vintage('INDPRO', as_of, observation_date)
+                actual = index.visible('INDPRO', as_of, observation_date)
+                if expected is None:
+                    self.assertIsNone(actual)
+                    continue
+                self.assertEqual(
+                    (actual.observation_date, actual.realtime_start, actual.value),
+                    (expected.observation_date, expected.realtime_start, expected.value),
+                )
+        self.assertIsNone(index.visible('UNRATE', date(2025, 9, 1)))
+
+    def test_house_view_backtest_shards_merge_in_month_order(self):
+        from macro.services.house_view_backtest import run_house_view_backtest
+
+        for month in range(1, 13):
+            RegimeSnapshot.objects.create(
+                snapshot_date=date(2025, month, 1),
+                regime_label=(
+                    RegimeSnapshot.Label.EXPANSION if month % 2 else RegimeSnapshot.Label.SLOWDOWN
+                ),
+                confidence=75,
+                data_quality=90,
+            )
+        progress = []
+
+        with mock.patch('macro.services.house_view_backtest.timezone.localdate', return_value=date(2026, 1, 1)), \
+             mock.patch(
+                 'macro.services.house_view_backtest.regime.build_current_regime_assessment',
+                 return_value={'regime_label': 'expansion', 'rule_strength': 70, 'data_quality': 85},
+             ):
+            single = run_house_view_backtest(
+                start=date(2025, 1, 1),
+                end=date(2025, 9, 1),
+                horizons=(1, 3),
+                data_mode='revised_reference',
+                shard_months=120,
+            )
+            sharded = run_house_view_backtest(
+                start=date(2025, 1, 1),
+                end=date(2025, 9, 1),
+                horizons=(1, 3),
+                data_mode='revised_reference',
+                shard_months=4,
+                progress=progress.append,
+            )
+
+        self.assertEqual(sharded['rows'], single['rows'])
+        self.assertEqual(sharded['backtest_accuracy'], single['backtest_accuracy'])
+        self.assertEqual(sharded['warnings'], single['warnings'])
+        self.assertEqual(
+            [(item['shard'], item['start'], item['month_count']) for item in progress],
+            [(0, '2025-01-01', 4), (1, '2025-05-01', 4), (2, '2025-09-01', 1)],
+        )
+        self.assertEqual(single['backtest_accuracy']['sample_count'], 18)
+
     def test_run_house_view_backtest_command_writes_summary_json(self):
         RegimeSnapshot.objects.create(
             snapshot_date=date(2026, 4, 1),
@@ -1737,6 +2097,12 @@ class ProductionDataSyncTest(SimpleTestCase):
         self.assertEqual(saved['git_sha'], 'abcdef1234567890')
         self.assertEqual(saved['workflow_run_id'], '12345')
         self.assertIn('米国3指数確認が不足', saved['blocking_reasons'])
+        self.assertEqual(set(saved['files']), {
+            'basecalc/data/latest_snapshot.json',
+            'explanation/data/latest_snapshot.json',
+            'static/macro/latest_dashboard.json',
+        })
+        self.assertEqual(len(saved['files']['static/macro/latest_dashboard.json']['sha256']), 64)
 
     def test_finance_manifest_export_mirrors_existing_staticfiles_manifest(self):
         from macro.services.finance_manifest import write_finance_data_manifest
@@ -1786,6 +2152,87 @@ class ProductionDataSyncTest(SimpleTestCase):
             )
             self.assertEqual(result['mirrored_count'], 1)
 
+    def test_sync_downloads_only_files_that_differ_from_production_manifest(self):
+        from macro.services import production_data_sync
+        from macro.services.production_data_sync import content_digest, sync_production_data
+
+        same = b'{"version":"same"}'
+        changed = b'{"version":"prod"}'
+        manifest = {
+            'schema': 'finance_data_manifest_v1',
+            'files': {
+                'static/macro/same.json': content_digest(same),
+                'static/macro/changed.json': content_digest(changed),
+            },
+        }
+        base = 'https://yoshi-nakane0-github-io-finance.vercel.app/static/'
+        responses = {
+            base + 'finance_data_manifest.json': (json.dumps(manifest).encode('utf-8'), '"m1"'),
+            base + 'macro/changed.json': (changed, '"c1"'),
+        }
+        requested = []
+
+        def fake_fetch(url, etag=None):
+            requested.append((url, etag))
+            if etag is not None and etag == responses[url][1]:
+                return None, etag
+            return responses[url]
+
+        with TemporaryDirectory() as tmpdir:
+            base_dir = Path(tmpdir)
+            (base_dir / 'static' / 'macro').mkdir(parents=True)
+            (base_dir / 'static' / 'macro' / 'same.json').write_bytes(same)
+            (base_dir / 'static' / 'macro' / 'changed.json').write_bytes(b'{"version":"old"}')
+            paths = ['static/macro/same.json', 'static/macro/changed.json']
+
+            with mock.patch.object(production_data_sync, 'fetch_url', side_effect=fake_fetch):
+                first = sync_production_data(base_dir=base_dir, paths=paths)
+                requested.clear()
+                (base_dir / 'static' / 'macro' / 'changed.json').write_bytes(b'{"version":"old"}')
+                manifest['files']['static/macro/changed.json'] = content_digest(b'{"version":"newer"}')
+                responses[base + 'finance_data_manifest.json'] = (json.dumps(manifest).encode('utf-8'), '"m2"')
+                second = sync_production_data(base_dir=base_dir, paths=paths)
+
+            changed_text = (base_dir / 'static' / 'macro' / 'changed.json').read_text(encoding='utf-8')
+
+        self.assertEqual(first['updated'], ['static/macro/changed.json'])
+        self.assertEqual(first['skipped_by_manifest'], ['static/macro/same.json'])
+        self.assertEqual(first['downloaded_count'], 2)
+        # ローカルを書き換えたので ETag は送らず取り直す
+        self.assertIn((base + 'macro/changed.json', None), requested)
+        self.assertEqual(second['updated'], ['static/macro/changed.json'])
+        self.assertEqual(changed_text, '{"version":"prod"}')
+
+    def test_sync_does_not_trust_manifest_for_github_raw_files(self):
+        from macro.services import production_data_sync
+        from macro.services.production_data_sync import content_digest, sync_production_data
+
+        old = b'{"version":"old"}'
+        # Vercel の manifest はまだデプロイ前の内容を指している
+        manifest = {'schema': 'finance_data_manifest_v1', 'files': {'basecalc/data/latest_snapshot.json': content_digest(old)}}
+        manifest_url = 'https://yoshi-nakane0-github-io-finance.vercel.app/static/finance_data_manifest.json'
+        raw_url = production_data_sync.GITHUB_RAW_BASE_URL + '/basecalc/data/latest_snapshot.json'
+        responses = {
+            manifest_url: (json.dumps(manifest).encode('utf-8'), '"m1"'),
+            raw_url: (b'{"version":"new"}', '"r1"'),
+        }
+
+        with TemporaryDirectory() as tmpdir:
+            base_dir = Path(tmpdir)
+            (base_dir / 'basecalc' / 'data').mkdir(parents=True)
+            (base_dir / 'basecalc' / 'data' / 'latest_snapshot.json').write_bytes(old)
+
+            with mock.patch.object(
+                production_data_sync, 'fetch_url', side_effect=lambda url, etag=None: responses[url],
+            ), mock.patch.object(production_data_sync, '_run_importers', return_value=({}, [])):
+                result = sync_production_data(base_dir=base_dir, paths=['basecalc/data/latest_snapshot.json'])
+
+            content = (base_dir / 'basecalc' / 'data' / 'latest_snapshot.json').read_bytes()
+
+        self.assertEqual(result['skipped_by_manifest'], [])
+        self.assertEqual(result['updated'], ['basecalc/data/latest_snapshot.json'])
+        self.assertEqual(content, b'{"version":"new"}')
+
 
 class ProductionForecastLedgerImportTest(TestCase):
     def test_sync_imports_forecast_ledger_into_local_forecast_snapshots(self):
@@ -1838,6 +2285,32 @@ class ProductionForecastLedgerImportTest(TestCase):
         self.assertEqual(snapshot.metadata['primary_regime'], 'expansion')
         self.assertEqual(snapshot.metadata['previous_regime'], 'slowdown')
 
+    def test_sync_skips_importer_when_input_hash_is_unchanged(self):
+        from macro.services import production_data_sync
+        from macro.services.production_data_sync import sync_production_data
+
+        content = json.dumps({'forecast_ledger': []}).encode('utf-8')
+        with TemporaryDirectory() as tmpdir:
+            base_dir = Path(tmpdir)
+            (base_dir / 'static' / 'macro').mkdir(parents=True)
+            with mock.patch.object(
+                production_data_sync, '_import_forecast_ledger', return_value=0,
+            ) as import_mock:
+                first = sync_production_data(
+                    base_dir=base_dir,
+                    paths=['static/macro/forecast_ledger.json'],
+                    downloader=lambda url: content,
+                )
+                second = sync_production_data(
+                    base_dir=base_dir,
+                    paths=['static/macro/forecast_ledger.json'],
+                    downloader=lambda url: content,
+                )
+
+        self.assertEqual(import_mock.call_count, 1)
+        self.assertEqual(first['skipped_imports'], [])
+        self.assertEqual(second['skipped_imports'], ['static/macro/forecast_ledger.json'])
+
 
 class _ObsStub:
     """ユニットテスト用の最小 Observation モック。"""
@@ -1865,6 +2338,38 @@ class SparklineTest(TestCase):
         # 全て同じ値なら中央水平線が描かれる
         self.assertIn("<polyline", svg)
 
+    def test_lttb_keeps_endpoints_and_spikes_within_budget(self):
+        values = [0.0] * 500
+        values[123] = 50.0
+        values[400] = -30.0
+
+        indices = sparkline.lttb_indices(values, 40)
+
+        self.assertEqual(len(indices), 40)
+        self.assertEqual((indices[0], indices[-1]), (0, 499))
+        self.assertIn(123, indices)
+        self.assertIn(400, indices)
+        self.assertEqual(sparkline.lttb_indices(values[:30], 40), list(range(30)))
+        svg = sparkline.generate_sparkline_svg(values, max_points=40)
+        self.assertEqual(svg.split('points="')[-1].count(","), 40)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sparkline-default'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sparkline-shared'},
+    })
+    def test_batch_render_reuses_cached_svg_until_inputs_change(self):
+        series = [("CPIAUCSL", date(2024, 5, 1), [1.0, 2.0, 3.0]), ("UNRATE", date(2024, 5, 1), [4.0, 3.5])]
+        first = sparkline.render_sparklines(series)
+
+        with mock.patch.object(sparkline, "_render", wraps=sparkline._render) as render:
+            second = sparkline.render_sparklines(series)
+            revised = sparkline.render_sparklines([("CPIAUCSL", date(2024, 5, 1), [1.0, 2.0, 3.5])])
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["CPIAUCSL"], sparkline.generate_sparkline_svg([1.0, 2.0, 3.0]))
+        self.assertEqual(render.call_count, 1)
+        self.assertNotEqual(revised["CPIAUCSL"], first["CPIAUCSL"])
+
 
 class SimilarityTest(TestCase):
     def test_distance_empty_returns_inf(self):
@@ -2254,6 +2759,77 @@ class ForecastTrackingTest(TestCase):
         self.assertAlmostEqual(snapshot.error, 4.0)
         self.assertEqual(snapshot.realized_at, date(2025, 2, 1))
 
+    def test_settle_due_forecasts_loads_each_series_once_and_reports_next_due(self):
+        for month, close in ((1, 100.0), (2, 110.0), (3, 85.0)):
+            PriceObservation.objects.create(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=date(2025, month, 1),
+                close_price=close,
+            )
+        indicator, _ = Indicator.objects.update_or_create(
+            fred_series_id='UNRATE',
+            defaults={
+                'name_ja': '失業率',
+                'category': Indicator.Category.EMPLOYMENT,
+                'importance': Indicator.Importance.A,
+                'frequency': Indicator.Frequency.MONTHLY,
+            },
+        )
+        for month, value in ((1, 4.0), (3, 4.3)):
+            Observation.objects.create(indicator=indicator, observation_date=date(2025, month, 1), value=value)
+        for day in (10, 20):
+            ForecastSnapshot.objects.create(
+                as_of_date=date(2025, 1, day),
+                model_version='lightgbm_return_v1',
+                target='GSPC',
+                horizon=f'1m-{day}',
+                prediction_value=6.0,
+                metadata={'horizon_months': 1},
+            )
+        ForecastSnapshot.objects.create(
+            as_of_date=date(2025, 1, 5),
+            model_version='crash_probability_logistic_v1',
+            target='GSPC',
+            horizon='63d',
+            prediction_value=0.2,
+            metadata={'horizon_days': 63, 'drawdown_threshold_pct': -10.0},
+        )
+        ForecastSnapshot.objects.create(
+            as_of_date=date(2025, 2, 5),
+            model_version='macro_forecast_v1',
+            target='UNRATE',
+            horizon='2m',
+            prediction_value=0.1,
+            metadata={},
+        )
+        ForecastSnapshot.objects.create(
+            as_of_date=date(2025, 3, 5),
+            model_version='lightgbm_return_v1',
+            target='GSPC',
+            horizon='3m',
+            prediction_value=1.0,
+            metadata={},
+        )
+
+        # 未決済の読み込み、価格系列、観測系列、一括更新の 4 クエリ
+        with self.assertNumQueries(4):
+            summary = forecast_tracking.settle_due_forecasts()
+
+        self.assertEqual(summary['checked_count'], 5)
+        self.assertEqual(summary['settled_count'], 3)
+        self.assertEqual(summary['next_due_date'], '2025-04-01')
+        self.assertEqual(
+            [(row['kind'], row['horizon'], row['next_due_date']) for row in summary['pending_groups']],
+            [('crash_probability', '63d', '2025-04-01'), ('return', '3m', '2025-06-01')],
+        )
+        macro = ForecastSnapshot.objects.get(target='UNRATE')
+        self.assertAlmostEqual(macro.realized_value, 0.3)
+        self.assertEqual(macro.realized_at, date(2025, 3, 1))
+        self.assertEqual(
+            sorted(ForecastSnapshot.objects.filter(horizon__startswith='1m-').values_list('realized_value', flat=True)),
+            [10.0, 10.0],
+        )
+
 
 class WorldModelOperationsTest(TestCase):
     def test_operations_context_uses_latest_runs(self):
@@ -2432,6 +3008,86 @@ class RegimeClassificationTest(TestCase):
             RegimeSnapshot.Label.RECOVERY,
         })
 
+    def _create_monthly_series(self, series_id, start, values):
+        indicator, _ = Indicator.objects.get_or_create(
+            fred_series_id=series_id,
+            defaults={
+                'name_ja': series_id,
+                'category': Indicator.Category.GROWTH,
+                'source': Indicator.Source.FRED,
+                'importance': Indicator.Importance.A,
+                'frequency': Indicator.Frequency.MONTHLY,
+            },
+        )
+        for index, value in enumerate(values):
+            Observation.objects.create(
+                indicator=indicator,
+                observation_date=start + relativedelta(months=index),
+                value=value,
+                prev_value=values[index - 1] if index else None,
+                yoy_change=value / 10,
+            )
+
+    def test_batched_key_metrics_match_per_date_collection(self):
+        self._create_monthly_series('INDPRO', date(2024, 1, 1), [100 + i for i in range(24)])
+        self._create_monthly_series('UNRATE', date(2024, 1, 1), [4.0 + i / 10 for i in range(24)])
+        self._create_monthly_series('PCEPILFE', date(2024, 1, 1), [30 + i for i in range(24)])
+        # 読み込み窓より前にしか観測がない系列も拾う
+        self._create_monthly_series('GDPC1', date(2022, 1, 1), [20.0])
+        as_of_dates = [date(2025, 1, 15), date(2025, 6, 30), date(2025, 12, 31)]
+
+        expected = {
+            as_of: regime.collect_key_metrics(
+                as_of,
+                panel=regime.ObservationPanel(),
+            )
+            for as_of in as_of_dates
+        }
+        batched = regime.collect_key_metrics_for_dates(as_of_dates)
+
+        self.assertEqual(batched, expected)
+        self.assertEqual(batched[date(2025, 6, 30)]['indpro_value'], 117)
+        self.assertAlmostEqual(batched[date(2025, 6, 30)]['unrate_6m_change'], 0.6)
+        self.assertEqual(batched[date(2025, 6, 30)]['core_pce_yoy_3m_ago'], 4.4)
+        self.assertEqual(batched[date(2025, 6, 30)]['gdp_yoy'], 2.0)
+
+    def test_batched_key_metrics_load_observations_once(self):
+        self._create_monthly_series('INDPRO', date(2024, 1, 1), [100 + i for i in range(24)])
+        self._create_monthly_series('UNRATE', date(2024, 1, 1), [4.0 + i / 10 for i in range(24)])
+        as_of_dates = [date(2025, 1, 1) + relativedelta(months=index) for index in range(12)]
+
+        with CaptureQueriesContext(connection) as query_context:
+            metrics_by_date = regime.collect_key_metrics_for_dates(as_of_dates)
+
+        self.assertEqual(len(query_context.captured_queries), 3)
+        self.assertEqual(metrics_by_date[date(2025, 12, 1)]['indpro_3m_change_pct'], 3 / 120 * 100)
+
+    def test_as_of_panel_matches_per_date_lookups(self):
+        self._create_monthly_series('INDPRO', date(2024, 1, 1), [100 + i for i in range(24)])
+        self._create_monthly_series('VIXCLS', date(2025, 3, 1), [15 + i for i in range(6)])
+        # 読み込み窓より前にしか観測がない系列も拾う
+        self._create_monthly_series('GDPC1', date(2022, 1, 1), [20.0])
+        as_of_dates = [date(2025, 1, 1) + relativedelta(months=index) - timedelta(days=1) for index in range(14)]
+
+        with CaptureQueriesContext(connection) as query_context:
+            panel = regime.AsOfPanel(as_of_dates)
+            metrics_by_date = regime.collect_key_metrics_for_dates(as_of_dates, panel=panel)
+            lookups = {as_of: panel.value_lookup(as_of)('VIXCLS') for as_of in as_of_dates}
+
+        self.assertEqual(len(query_context.captured_queries), 3)
+        for as_of in as_of_dates:
+            self.assertEqual(
+                metrics_by_date[as_of],
+                regime.collect_key_metrics(as_of, panel=regime.ObservationPanel()),
+            )
+            self.assertEqual(lookups[as_of], crash_alert._latest_observation_meta('VIXCLS', as_of=as_of))
+        self.assertEqual(metrics_by_date[date(2025, 6, 30)]['gdp_yoy'], 2.0)
+        self.assertIsNone(lookups[date(2024, 12, 31)])
+        self.assertEqual(lookups[date(2026, 1, 31)]['value'], 20)
+
+        panel.indicators.pop('VIXCLS')
+        self.assertIsNone(panel.value_lookup(date(2025, 6, 30))('VIXCLS')['frequency'])
+
     def test_regime_probability_validation_handles_empty_dataset(self):
         payload = regime_probability.validate_regime_probability_model()
 
@@ -4628,6 +5284,76 @@ class DashboardCacheTest(TestCase):
         self.assertEqual(payload['house_view']['house_view'], '公式見解')
         self.assertEqual(payload['data_quality_report']['freshness_score'], 80)
 
+    def test_dashboard_sections_run_after_dependencies_and_isolate_failures(self):
+        calls = []
+
+        def base():
+            calls.append('base')
+            return 2
+
+        def broken():
+            raise RuntimeError('boom')
+
+        def combine(value, other=None):
+            calls.append('combine')
+            return {'value': value * 10, 'other': other}
+
+        sections = (
+            dashboard_cache.DashboardSection('combined', combine, args=('base',), kwargs=(('other', 'broken'),)),
+            dashboard_cache.DashboardSection('base', base),
+            dashboard_cache.DashboardSection('broken', broken),
+        )
+        for workers in (1, 3):
+            calls.clear()
+            with self.subTest(workers=workers), self.assertLogs('macro.services.dashboard_cache', level='ERROR'):
+                results, records = dashboard_cache.run_dashboard_sections(sections, workers=workers)
+                self.assertEqual(calls, ['base', 'combine'])
+                self.assertEqual(results['combined'], {'value': 20, 'other': None})
+                self.assertEqual(records['base']['status'], 'ok')
+                self.assertEqual(records['broken']['status'], 'failed')
+                self.assertIn('RuntimeError: boom', records['broken']['error'])
+
+        with self.assertRaises(ValueError):
+            dashboard_cache.run_dashboard_sections(
+                (dashboard_cache.DashboardSection('combined', combine, args=('missing',)),),
+            )
+
+    def test_precompute_dashboard_payload_shares_sections_and_records_meta(self):
+        with mock.patch('macro.services.dashboard.build_similar_periods', return_value=[]), \
+             mock.patch('macro.services.dashboard.build_linkages', side_effect=RuntimeError('linkage down')), \
+             mock.patch('macro.services.dashboard.build_indicator_cards', return_value=[]), \
+             mock.patch('macro.services.dashboard.build_crash_alert_context', return_value={'level': 'low'}) as crash, \
+             mock.patch('macro.services.dashboard.build_world_state_context', return_value={'has_snapshot': False}) as world, \
+             self.assertLogs('macro.services.dashboard_cache', level='ERROR'):
+            payload = dashboard_cache.precompute_dashboard_payload()
+
+        crash.assert_called_once_with()
+        world.assert_called_once_with()
+        self.assertIsNone(payload['linkages'])
+        self.assertIn('macro_decision', payload)
+        self.assertIn('top_decision', payload)
+        self.assertNotIn('importance_a_lookup', payload)
+        meta = payload['precompute_meta']
+        self.assertEqual(meta['failed_sections'], ['linkages'])
+        self.assertEqual(meta['sections']['crash_alert']['status'], 'ok')
+        self.assertIn('top_decision', meta['sections'])
+        self.assertIn('latest_observation_date', meta['watermarks'])
+
+    def test_precompute_dashboard_payload_keeps_saved_value_for_failed_section(self):
+        dashboard_cache.save_dashboard_payload({'linkages': [{'label': '前回の連動'}], 'similar_periods': []})
+
+        with mock.patch('macro.services.dashboard.build_similar_periods', side_effect=RuntimeError('similar down')), \
+             mock.patch('macro.services.dashboard.build_linkages', side_effect=RuntimeError('linkage down')), \
+             mock.patch('macro.services.dashboard.build_indicator_cards', return_value=[]), \
+             self.assertLogs('macro.services.dashboard_cache', level='ERROR'):
+            payload = dashboard_cache.precompute_dashboard_payload()
+
+        meta = payload['precompute_meta']
+        self.assertEqual(payload['linkages'], [{'label': '前回の連動'}])
+        self.assertEqual(payload['similar_periods'], [])
+        self.assertEqual(meta['failed_sections'], ['similar_periods', 'linkages'])
+        self.assertEqual(meta['stale_sections'], ['similar_periods', 'linkages'])
+
     def test_export_macro_payload_command_writes_static_payload_with_metadata(self):
         with TemporaryDirectory() as tmpdir:
             output = Path(tmpdir) / 'latest_dashboard.json'
@@ -4755,6 +5481,7 @@ class MacroUrlsTest(TestCase):
     def test_index_renders(self):
         r = self.client.get(reverse('macro:index'))
         self.assertEqual(r.status_code, 200)
+        assert_within_query_budget(r)
 
     def test_index_regime_copy_avoids_confidence_word(self):
         RegimeSnapshot.objects.create(
@@ -5348,6 +6075,7 @@ class MacroUrlsTest(TestCase):
             reverse('macro:indicator_detail', args=['CPIAUCSL'])
         )
         self.assertEqual(r.status_code, 200)
+        assert_within_query_budget(r)
 
     def test_indicator_detail_404(self):
         r = self.client.get(
@@ -5360,6 +6088,7 @@ class MacroUrlsTest(TestCase):
             reverse('macro:similar_detail', args=['2019-03-01'])
         )
         self.assertEqual(r.status_code, 200)
+        assert_within_query_budget(r)
 
     def test_similar_detail_invalid_date(self):
         r = self.client.get(
@@ -5367,6 +6096,59 @@ class MacroUrlsTest(TestCase):
         )
         self.assertEqual(r.status_code, 404)
 
+    def test_bulk_detail_precompute_matches_per_indicator_context(self):
+        from myproject.json_payload import to_json_safe
+
+        series_ids = ['CPIAUCSL', 'UNRATE', 'INDPRO']
+        indicators = list(Indicator.objects.filter(fred_series_id__in=series_ids))
+        Indicator.objects.filter(fred_series_id__in=series_ids).update(importance='A')
+        start = date(2020, 1, 1)
+        for offset, indicator in enumerate(indicators):
+            Observation.objects.bulk_create([
+                Observation(
+                    indicator=indicator,
+                    observation_date=start + relativedelta(months=month),
+                    value=100 + ((month * (offset + 3)) % 7),
+                    prev_value=100,
+                    yoy_change=month / 10,
+                    expanding_z_score=((month * (offset + 2)) % 5) - 2.0,
+                )
+                for month in range(40)
+                if (month + offset) % 9
+            ])
+        PriceObservation.objects.bulk_create([
+            PriceObservation(
+                ticker=PriceObservation.Ticker.SP500,
+                observation_month=start + relativedelta(months=month),
+                close_price=4000 + (month % 6) * 10,
+            )
+            for month in range(40)
+        ])
+        indicators = list(Indicator.objects.filter(fred_series_id__in=series_ids))
+        expected = {}
+        for indicator in indicators:
+            context = detail.build_indicator_detail_context(indicator)
+            context.pop('indicator')
+            expected[indicator.fred_series_id] = to_json_safe(context)
+        expected_similar = to_json_safe(detail.build_similar_detail_context(date(2021, 6, 1)))
+
+        panel = detail.DetailPanel()
+        with CaptureQueriesContext(connection) as queries:
+            dashboard_cache.precompute_all_indicator_details(panel=panel)
+            dashboard_cache.precompute_top_similar_details(
+                payload={'similar_periods': [{'month_start': '2021-06-01'}]},
+                panel=panel,
+            )
+
+        self.assertLess(len(queries), 12)
+        for series_id, payload in expected.items():
+            self.assertTrue(payload['correlations'])
+            self.assertEqual(dashboard_cache.load_indicator_detail_payload(series_id), payload)
+        self.assertEqual(
+            dashboard_cache.load_similar_detail_payload('2021-06-01'),
+            expected_similar,
+        )
+
 
 class JudgmentTest(TestCase):
     """指標値→5段階評価の変換ロジック。"""
@@ -5653,14 +6435,17 @@ class BacktestCrashAlertCommandTest(TestCase):
         with TemporaryDirectory() as tmpdir:
             output = Path(tmpdir) / 'backtest.json'
             out = StringIO()
-            call_command(
-                'backtest_crash_alert',
-                '--target', 'GSPC',
-                '--horizon-days', '63',
-                '--drawdown-threshold', '-10',
-                '--output', str(output),
-                stdout=out,
-            )
+            with CaptureQueriesContext(connection) as query_context:
+                call_command(
+                    'backtest_crash_alert',
+                    '--target', 'GSPC',
+                    '--horizon-days', '63',
+                    '--drawdown-threshold', '-10',
+                    '--output', str(output),
+                    stdout=out,
+                )
+            # 月数によらず、価格と各系列の観測はまとめて1回ずつ読む
+            self.assertLessEqual(len(query_context.captured_queries), 4)
             self.assertTrue(output.exists())
             payload = output.read_text(encoding='utf-8')
             self.assertIn('"roc_auc"', payload)
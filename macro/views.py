@@ -13,6 +13,7 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from myproject.auth import is_creator_user
+from myproject.perf import query_budget, span
 
 from .models import Indicator, RegimeSnapshot
 from .services.commentary import (
@@ -176,6 +177,7 @@ def _refresh_serverless_macro_data(request):
     return redirect(reverse('macro:index'))
 
 
+@query_budget(100)
 def index(request):
     """macro モジュールのトップ画面。生成済みJSONだけを表示に使う。"""
     custom_scenario = scenario_overrides_from_query(request.GET)
@@ -464,6 +466,7 @@ def recompute_crash_backtest(request):
     return redirect(reverse('macro:index'))
 
 
+@query_budget(10)
 def indicator_detail(request, series_id):
     """指標詳細ページ。?range= で表示期間を切り替えられる。"""
     indicator = get_object_or_404(
@@ -480,13 +483,15 @@ def indicator_detail(request, series_id):
             context['indicator'] = indicator
 
     if context is None:
-        context = build_indicator_detail_context(indicator, range_param=range_param)
+        with span('indicator_detail_build'):
+            context = build_indicator_detail_context(indicator, range_param=range_param)
 
     context['range_param'] = range_param
     context['range_options'] = RANGE_OPTIONS
     return render(request, 'macro/indicator_detail.html', context)
 
 
+@query_budget(90)
 def similar_period_detail(request, month):
     """類似局面詳細ページ。month は YYYY-MM-DD 形式（月初日推奨）。"""
     try:
@@ -500,6 +505,7 @@ def similar_period_detail(request, month):
     if cached is not None:
         context = dict(cached)
     else:
-        context = build_similar_detail_context(target)
+        with span('similar_detail_build'):
+            context = build_similar_detail_context(target)
 
     return render(request, 'macro/similar_detail.html', context)
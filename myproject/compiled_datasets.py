@@ -0,0 +1,109 @@
+"""静的 CSV ページ用のコンパイル済みデータセット。
+
+CSV は (path, mtime_ns, size) をキーにプロセス内で一度だけ解析して表示用の構造へ落とす。
+build_compiled_datasets で事前に pickle を出しておけば、コールドスタート時は
+CSV の内容ハッシュが一致する限り解析そのものを省略できる。
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+# name -> (CSV パスを返す関数, CSV パスを受け取って表示用構造を返す関数)
+COMPILED_DATASETS = {
+    'person': ('person.views.person_csv_path', 'person.views.compile_person_dataset'),
+    'prompt': ('prompt.views.prompt_csv_path', 'prompt.views.compile_prompt_dataset'),
+}
+ARTIFACT_VERSION = 1
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def csv_signature(path):
+    csv_path = Path(path)
+    try:
+        stat = csv_path.stat()
+    except FileNotFoundError:
+        return str(csv_path), 0, 0
+    return str(csv_path), stat.st_mtime_ns, stat.st_size
+
+
+def content_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def artifact_dir():
+    explicit_dir = (os.getenv('COMPILED_DATASET_DIR') or '').strip()
+    if explicit_dir:
+        return Path(explicit_dir)
+    return Path(settings.BASE_DIR) / 'runtime' / 'compiled'
+
+
+def artifact_path(name):
+    return artifact_dir() / f'{name}.pickle'
+
+
+def _load_artifact(name, path):
+    # デプロイ時のコピーで mtime は変わるので、事前ビルド分は内容ハッシュで照合する
+    artifact = artifact_path(name)
+    if not artifact.exists():
+        return None
+    try:
+        with artifact.open('rb') as artifact_file:
+            payload = pickle.load(artifact_file)
+        if (
+            payload.get('version') != ARTIFACT_VERSION
+            or payload.get('name') != name
+            or payload.get('digest') != content_digest(path)
+        ):
+            return None
+    except Exception:
+        return None
+    return payload
+
+
+def load_compiled_dataset(name, path, builder):
+    """CSV が変わっていなければ前回コンパイルした結果をそのまま返す。戻り値は共有なので書き換えないこと。"""
+    signature = csv_signature(path)
+    entry = _compiled.get(name)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    with _lock:
+        entry = _compiled.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        payload = _load_artifact(name, path) if signature[2] else None
+        value = payload['value'] if payload is not None else builder(path)
+        _compiled[name] = (signature, value)
+    return value
+
+
+def clear_compiled_datasets():
+    with _lock:
+        _compiled.clear()
+
+
+def write_compiled_artifact(name):
+    path_func, builder_path = COMPILED_DATASETS[name]
+    csv_path = import_string(path_func)()
+    payload = {
+        'version': ARTIFACT_VERSION,
+        'name': name,
+        'digest': content_digest(csv_path),
+        'value': import_string(builder_path)(csv_path),
+    }
+    artifact = artifact_path(name)
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = artifact.with_name(f'.{artifact.name}.tmp')
+    with temp_path.open('wb') as artifact_file:
+        pickle.dump(payload, artifact_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, artifact)
+    return artifact
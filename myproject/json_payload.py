@@ -0,0 +1,92 @@
+"""事前計算ペイロードを JSON へ落とすための共通ヘルパー。
+
+以前は各 writer が json.dumps -> json.loads で日付を文字列化してから
+もう一度 json.dumps していた。ここでは payload を一度だけ走査して
+JSON ネイティブな値へ変換し、ファイルには一回の dumps で書き出す。
+"""
+
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+
+_PASSTHROUGH_TYPES = (str, int, float, bool, type(None))
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    # Django モデルインスタンスは表示用 JSON には不要なので捨てる
+    from django.db.models import Model
+    if isinstance(value, Model):
+        return None
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def to_json_safe(value):
+    """json.loads(json.dumps(value, default=json_default)) と同じ結果を一度の走査で返す。"""
+    value_type = type(value)
+    if value_type is dict:
+        return {
+            key if type(key) is str else _json_key(key): to_json_safe(item)
+            for key, item in value.items()
+        }
+    if value_type is list or value_type is tuple:
+        return [to_json_safe(item) for item in value]
+    if value_type in _PASSTHROUGH_TYPES:
+        return value
+    if isinstance(value, dict):
+        return to_json_safe(dict(value))
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(item) for item in value]
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return to_json_safe(json_default(value))
+
+
+def pretty_json_requested():
+    return os.getenv('FINANCE_JSON_PRETTY', '').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def dumps_json_payload(value, *, pretty=None):
+    if pretty is None:
+        pretty = pretty_json_requested()
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2, sort_keys=True, default=json_default) + '\n'
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+
+
+def write_json_payload(path, value, *, pretty=None):
+    """payload を書き出す。既定は機械読み取り用の compact で、pretty=True か FINANCE_JSON_PRETTY=1 で整形する。"""
+    payload_path = Path(path)
+    payload_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = payload_path.with_name(f'.{payload_path.name}.tmp')
+    temp_path.write_text(dumps_json_payload(value, pretty=pretty), encoding='utf-8')
+    os.replace(temp_path, payload_path)
+    return payload_path
+
+
+def _json_key(key):
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, (datetime, date)):
+        return key.isoformat()
+    if isinstance(key, float):
+        return float.__repr__(key)
+    if isinstance(key, (str, int)):
+        return str(int(key)) if isinstance(key, int) else str(key)
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myproject.compiled_datasets import COMPILED_DATASETS, write_compiled_artifact
+
+
+class Command(BaseCommand):
+    help = 'Prebuild compiled CSV datasets (person, prompt) so cold starts skip CSV parsing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help=f'Datasets to build (default: all of {", ".join(COMPILED_DATASETS)}).')
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(COMPILED_DATASETS)
+        unknown = [name for name in names if name not in COMPILED_DATASETS]
+        if unknown:
+            raise CommandError(f'Unknown dataset(s): {", ".join(unknown)}')
+
+        for name in names:
+            artifact = write_compiled_artifact(name)
+            self.stdout.write(f'{name}: {artifact}')
+        self.stdout.write(self.style.SUCCESS(f'Built {len(names)} compiled datasets'))
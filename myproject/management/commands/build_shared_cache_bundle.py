@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myproject.sqlite_cache import CACHE_WARMERS, build_cache_bundle
+
+
+class Command(BaseCommand):
+    help = 'Prebuild the read-only shared cache bundle so new instances start with warm earnings payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help=f'Warmers to run (default: all of {", ".join(CACHE_WARMERS)}).')
+        parser.add_argument('--alias', default='shared', help='Cache alias whose key settings the bundle uses.')
+        parser.add_argument('--output', help='Bundle path (default: the alias BUNDLE option).')
+
+    def handle(self, *args, **options):
+        try:
+            path, counts = build_cache_bundle(options['names'] or None, alias=options['alias'], output=options['output'])
+        except (KeyError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count} entries')
+        self.stdout.write(self.style.SUCCESS(f'Built shared cache bundle at {path}'))
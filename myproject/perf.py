@@ -0,0 +1,268 @@
+"""リクエスト単位の性能計測。
+
+perf_scope() の中では SQL の件数と時間、requests による外部通信の件数と時間、
+キャッシュのヒット・ミス、span() で名前を付けた区間の時間を記録する。
+PerfMiddleware は 1 リクエストを perf_scope で包み、結果を Server-Timing ヘッダに出す。
+PERF_LOG_JSON が有効なら 1 リクエスト 1 行の JSON もログに出す。
+
+ビューには query_budget(n) で SQL 件数の上限を宣言できる。超えたらログに警告を出し、
+テストでは assert_within_query_budget(response) で落とす。
+
+外部通信とキャッシュの計測は、requests.Session.send と設定済みキャッシュバックエンドの
+get/get_many をプロセス全体で差し替えて行う (PERF_INSTRUMENTATION が無効なら差し替えない)。
+差し替えた関数は perf_scope の外では元の関数をそのまま呼ぶ。
+スレッドプールで外部通信する場合は contextvars.copy_context().run 経由で呼べば記録に入る。
+"""
+
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_active_recorder = contextvars.ContextVar('myproject_perf_recorder', default=None)
+_missing = object()
+_installed = set()
+
+
+class PerfRecorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_sec = 0.0
+        self.http_calls = 0
+        self.http_sec = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.spans = {}
+        self.query_budget = None
+        self.view_name = None
+        self._cache_depth = 0
+        self._lock = threading.Lock()
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_sec += time.perf_counter() - started
+
+    def record_http(self, elapsed):
+        # ワーカースレッドからも呼ばれる
+        with self._lock:
+            self.http_calls += 1
+            self.http_sec += elapsed
+
+    def record_span(self, name, elapsed):
+        span = self.spans.setdefault(name, {'count': 0, 'sec': 0.0})
+        span['count'] += 1
+        span['sec'] += elapsed
+
+    @property
+    def over_budget(self):
+        return self.query_budget is not None and self.queries > self.query_budget
+
+    def summary(self):
+        return {
+            'view': self.view_name,
+            'total_sec': round(time.perf_counter() - self.started, 6),
+            'queries': self.queries,
+            'query_sec': round(self.query_sec, 6),
+            'query_budget': self.query_budget,
+            'http_calls': self.http_calls,
+            'http_sec': round(self.http_sec, 6),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'spans': {name: {'count': span['count'], 'sec': round(span['sec'], 6)} for name, span in self.spans.items()},
+        }
+
+
+def current_recorder():
+    return _active_recorder.get()
+
+
+@contextmanager
+def perf_scope():
+    """スコープ内の SQL・外部通信・キャッシュ・span を記録する。入れ子の場合は外側の記録を共有する。"""
+    recorder = _active_recorder.get()
+    if recorder is not None:
+        yield recorder
+        return
+    install_instrumentation()
+    recorder = PerfRecorder()
+    token = _active_recorder.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder.sql_wrapper))
+            yield recorder
+    finally:
+        _active_recorder.reset(token)
+
+
+@contextmanager
+def span(name):
+    """名前付きの区間を計る。perf_scope の外では何もしない。"""
+    recorder = _active_recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.record_span(name, time.perf_counter() - started)
+
+
+def query_budget(max_queries):
+    """ビューの SQL 件数の上限を宣言する。"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+
+    return decorator
+
+
+# --- 計測フック ---
+
+def _instrument_cache_class(cls):
+    if cls in _installed:
+        return
+    original_get = cls.get
+    original_get_many = cls.get_many
+
+    def get(self, key, default=None, version=None):
+        recorder = _active_recorder.get()
+        if recorder is None or recorder._cache_depth:
+            return original_get(self, key, default=default, version=version)
+        recorder._cache_depth += 1
+        try:
+            value = original_get(self, key, default=_missing, version=version)
+        finally:
+            recorder._cache_depth -= 1
+        if value is _missing:
+            recorder.cache_misses += 1
+            return default
+        recorder.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        recorder = _active_recorder.get()
+        if recorder is None or recorder._cache_depth:
+            return original_get_many(self, keys, version=version)
+        keys = list(keys)
+        recorder._cache_depth += 1
+        try:
+            found = original_get_many(self, keys, version=version)
+        finally:
+            recorder._cache_depth -= 1
+        recorder.cache_hits += len(found)
+        recorder.cache_misses += len(keys) - len(found)
+        return found
+
+    cls.get = get
+    cls.get_many = get_many
+    _installed.add(cls)
+
+
+def _instrument_requests():
+    if 'requests' in _installed:
+        return
+    try:
+        import requests
+    except ImportError:
+        return
+    original_send = requests.Session.send
+
+    def send(self, request, **kwargs):
+        recorder = _active_recorder.get()
+        if recorder is None:
+            return original_send(self, request, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original_send(self, request, **kwargs)
+        finally:
+            recorder.record_http(time.perf_counter() - started)
+
+    requests.Session.send = send
+    _installed.add('requests')
+
+
+def install_instrumentation():
+    """設定済みのキャッシュバックエンドと requests に計測フックを一度だけ付ける。"""
+    if not getattr(settings, 'PERF_INSTRUMENTATION', True):
+        return
+    for alias in settings.CACHES:
+        _instrument_cache_class(type(caches[alias]))
+    _instrument_requests()
+
+
+# --- 出力 ---
+
+def _metric_name(name):
+    return re.sub(r'[^A-Za-z0-9_\-.]', '_', name) or 'span'
+
+
+def server_timing_header(summary):
+    entries = [
+        f'db;dur={summary["query_sec"] * 1000:.1f};desc="{summary["queries"]} queries"',
+        f'cache;desc="{summary["cache_hits"]} hit {summary["cache_misses"]} miss"',
+    ]
+    if summary['http_calls']:
+        entries.append(f'http;dur={summary["http_sec"] * 1000:.1f};desc="{summary["http_calls"]} calls"')
+    for name, span_summary in summary['spans'].items():
+        entries.append(f'{_metric_name(name)};dur={span_summary["sec"] * 1000:.1f}')
+    entries.append(f'total;dur={summary["total_sec"] * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def _view_name(view_func):
+    return f'{view_func.__module__}.{getattr(view_func, "__qualname__", view_func.__class__.__name__)}'
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with perf_scope() as recorder:
+            response = self.get_response(request)
+        summary = recorder.summary()
+        response['Server-Timing'] = server_timing_header(summary)
+        response.perf_summary = summary
+        if recorder.over_budget:
+            logger.warning(
+                'Query budget exceeded for %s: %s queries (budget %s)',
+                recorder.view_name, recorder.queries, recorder.query_budget,
+            )
+        if getattr(settings, 'PERF_LOG_JSON', False):
+            logger.info(json.dumps({'path': request.path, 'status': response.status_code, **summary}, sort_keys=True))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = _active_recorder.get()
+        if recorder is not None:
+            recorder.view_name = _view_name(view_func)
+            recorder.query_budget = getattr(view_func, 'query_budget', None)
+        return None
+
+
+def assert_within_query_budget(response, budget=None):
+    """テスト用。PerfMiddleware が記録した件数がビューの上限 (または budget) 以内か確かめる。"""
+    summary = getattr(response, 'perf_summary', None)
+    if summary is None:
+        raise AssertionError('Response has no perf summary; is PerfMiddleware installed?')
+    budget = budget if budget is not None else summary['query_budget']
+    if budget is None:
+        raise AssertionError(f'{summary["view"]} declares no query budget')
+    if summary['queries'] > budget:
+        raise AssertionError(f'{summary["view"]} ran {summary["queries"]} queries (budget {budget})')
@@ -1,6 +1,7 @@
 import logging
 import os
 import shutil
+import tempfile
 from pathlib import Path
 from urllib.parse import unquote, urlparse
 from dotenv import load_dotenv
@@ -115,6 +116,8 @@ INSTALLED_APPS = [
     'basecalc',
     'macro',
     'explanation',
+    # プロジェクト共通の管理コマンド (build_compiled_datasets など) 用
+    'myproject',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -123,6 +126,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myproject.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.gzip.GZipMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -134,6 +138,22 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
 ]
 
+# PerfMiddleware が 1 リクエスト 1 行の JSON (SQL・外部通信・キャッシュ・span の集計) を標準出力へ書く
+PERF_LOG_JSON = env_bool('PERF_LOG_JSON', False)
+# 外部通信とキャッシュの計測のため、最初の perf_scope で requests.Session.send と
+# CACHES の各バックエンドクラスの get/get_many をプロセス全体で差し替える。
+# 無効にすると差し替えず、PerfMiddleware は SQL と span だけを記録する
+PERF_INSTRUMENTATION = env_bool('PERF_INSTRUMENTATION', True)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {'message': {'format': '%(message)s'}},
+    'handlers': {'perf_console': {'class': 'logging.StreamHandler', 'formatter': 'message'}},
+    'loggers': {
+        'myproject.perf': {'handlers': ['perf_console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'myproject.urls'
 
 TEMPLATES = [
@@ -168,11 +188,34 @@ else:
     }
 
 # キャッシュ設定
+# shared は gunicorn ワーカーやサーバーレスのインスタンス間で共有する SQLite キャッシュ。
+# locmem に無い行をここから引き戻し、手元に無ければデプロイ同梱のバンドルを読む。
+SHARED_CACHE_DIR = (os.getenv('SHARED_CACHE_DIR') or '').strip() or os.path.join(
+    tempfile.gettempdir(), 'finance-shared-cache',
+)
+SHARED_CACHE_BUNDLE = (os.getenv('SHARED_CACHE_BUNDLE') or '').strip() or str(
+    BASE_DIR / 'runtime' / 'shared_cache.sqlite3'
+)
+# basecalc の MarketBar 履歴を列ごとに詰めたキャッシュファイルの置き場所
+MARKET_BAR_CACHE_DIR = (os.getenv('MARKET_BAR_CACHE_DIR') or '').strip() or os.path.join(
+    tempfile.gettempdir(), 'finance-market-bars',
+)
+# テスト実行中は MARKET_BAR_CACHE_DIR と shared キャッシュを実行ごとの一時ディレクトリに差し替える
+TEST_RUNNER = 'myproject.test_runner.IsolatedCacheDiscoverRunner'
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'earnings-cache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'myproject.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(SHARED_CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_BYTES': int(os.getenv('SHARED_CACHE_MAX_BYTES') or 256 * 1024 * 1024),
+            'BUNDLE': SHARED_CACHE_BUNDLE,
+            'READ_ONLY': env_bool('SHARED_CACHE_READ_ONLY', False),
+        },
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = []
@@ -0,0 +1,355 @@
+"""プロセス間で共有する SQLite ファイルのキャッシュバックエンド。
+
+gunicorn ワーカーや Vercel のインスタンスごとに locmem が空から始まるので、
+計算済みの値を手元の SQLite ファイル (WAL) に pickle で置いて共有する。
+エントリは TTL で失効し、合計バイト数が MAX_BYTES を超えたら最終アクセスの古い順に消す。
+
+OPTIONS:
+    MAX_BYTES     手元ファイルの上限バイト数 (0 なら無制限)
+    BUNDLE        デプロイに同梱する読み取り専用のバンドル。手元に無いキーはここから引く
+    READ_ONLY     True なら手元ファイルを作らずバンドルだけを読む
+    LOCK_TIMEOUT  get_or_set で計算中の他プロセスを待つ最大秒数
+    LOCK_POLL     待機中に値を見直す間隔 (秒)
+
+get_or_set はロック行で同じキーの計算を 1 プロセスに絞り、他のプロセスは結果を待つ。
+バンドルは build_cache_bundle でビルド時に作る。
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# name -> バンドルへ値を書き込む関数 (cache を受け取り、書いた件数を返す)
+CACHE_WARMERS = {
+    'earnings': 'earning.views.warm_shared_cache',
+}
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 上限を超えたら、この割合まで減らす
+CULL_TARGET_RATIO = 0.9
+# 最終アクセス時刻はこの秒数より古いときだけ書き直す (読み込みのたびに書き込みロックを取らない)
+ACCESS_RESOLUTION_SEC = 60
+DEFAULT_LOCK_TIMEOUT = 30.0
+DEFAULT_LOCK_POLL = 0.1
+BUSY_TIMEOUT_SEC = 5.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, size INTEGER NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_lock (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)',
+)
+
+_missing = object()
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.max_bytes = int(options.get('MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.lock_timeout = float(options.get('LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+        self.lock_poll = float(options.get('LOCK_POLL', DEFAULT_LOCK_POLL))
+        bundle = options.get('BUNDLE')
+        self.bundle_path = Path(bundle) if bundle else None
+        self.read_only = bool(options.get('READ_ONLY')) or not location
+        self.path = None if self.read_only else Path(location)
+        self._local = threading.local()
+
+    # --- 接続 ---
+
+    def _connection(self):
+        # 接続はスレッドごと。fork 後の子プロセスでは親の接続を使わない
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.path), timeout=BUSY_TIMEOUT_SEC, isolation_level=None, check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _bundle_connection(self):
+        if self.bundle_path is None:
+            return None
+        if getattr(self._local, 'bundle_pid', None) == os.getpid():
+            return self._local.bundle
+        bundle = None
+        if self.bundle_path.exists():
+            try:
+                bundle = sqlite3.connect(
+                    f'file:{self.bundle_path}?mode=ro&immutable=1', uri=True, check_same_thread=False,
+                )
+                bundle.execute('SELECT 1 FROM cache_entry LIMIT 1')
+            except sqlite3.DatabaseError:
+                logger.warning('Ignoring unreadable cache bundle: %s', self.bundle_path)
+                bundle = None
+        self._local.bundle = bundle
+        self._local.bundle_pid = os.getpid()
+        return bundle
+
+    def close(self, **kwargs):
+        # リクエスト終了ごとに呼ばれるが、接続はスレッド内で使い回す
+        pass
+
+    def close_connections(self):
+        for name in ('conn', 'bundle'):
+            conn = getattr(self._local, name, None)
+            if conn is not None:
+                conn.close()
+        self._local = threading.local()
+
+    # --- 読み込み ---
+
+    def _select(self, conn, keys, now):
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(
+            f'SELECT key, value, expires, accessed FROM cache_entry WHERE key IN ({placeholders})',
+            keys,
+        ).fetchall()
+        return {
+            key: (value, accessed)
+            for key, value, expires, accessed in rows
+            if expires is None or expires > now
+        }
+
+    def _fetch(self, keys):
+        """make_key 済みのキー -> 値。手元に無いものはバンドルから引く。"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        if not self.read_only:
+            conn = self._connection()
+            rows = self._select(conn, keys, now)
+            stale = [key for key, (_, accessed) in rows.items() if accessed < now - ACCESS_RESOLUTION_SEC]
+            if stale:
+                conn.executemany('UPDATE cache_entry SET accessed = ? WHERE key = ?', [(now, key) for key in stale])
+            found.update((key, value) for key, (value, _) in rows.items())
+        missing = [key for key in keys if key not in found]
+        bundle = self._bundle_connection() if missing else None
+        if bundle is not None:
+            found.update((key, value) for key, (value, _) in self._select(bundle, missing, now).items())
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {key_map[key]: value for key, value in self._fetch(list(key_map)).items()}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return key in self._fetch([key])
+
+    # --- 書き込み ---
+
+    def _rows(self, values, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in values:
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            rows.append((key, blob, expires, len(blob) + len(key), now))
+        return rows
+
+    def _write(self, rows):
+        if self.read_only or not rows:
+            return
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO cache_entry (key, value, expires, size, accessed) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+                'size = excluded.size, accessed = excluded.accessed',
+                rows,
+            )
+            self._cull(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _cull(self, conn):
+        if not self.max_bytes:
+            return
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entry').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute('DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        # 新しくアクセスした順に積み上げ、目標サイズを超えた分を消す
+        conn.execute(
+            'DELETE FROM cache_entry WHERE key IN ('
+            ' SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running'
+            ' FROM cache_entry) WHERE running > ?)',
+            (int(self.max_bytes * CULL_TARGET_RATIO),),
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(self._rows([(key, value)], timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        values = [(self.make_and_validate_key(key, version=version), value) for key, value in data.items()]
+        self._write(self._rows(values, timeout))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self.read_only:
+            return False
+        if key in self._fetch([key]):
+            return False
+        # 失効済みの行だけを上書きする
+        row = self._rows([(key, value)], timeout)[0]
+        conn = self._connection()
+        cursor = conn.execute(
+            'INSERT INTO cache_entry (key, value, expires, size, accessed) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'size = excluded.size, accessed = excluded.accessed '
+            'WHERE cache_entry.expires IS NOT NULL AND cache_entry.expires <= ?',
+            (*row, row[4]),
+        )
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self.read_only:
+            return False
+        cursor = self._connection().execute(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        """手元のファイルからだけ消す。バンドルは読み取り専用なので残る。"""
+        key = self.make_and_validate_key(key, version=version)
+        if self.read_only:
+            return False
+        return self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        if self.read_only:
+            return
+        self._connection().executemany(
+            'DELETE FROM cache_entry WHERE key = ?',
+            [(self.make_and_validate_key(key, version=version),) for key in keys],
+        )
+
+    def clear(self):
+        if self.read_only:
+            return
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entry')
+        conn.execute('DELETE FROM cache_lock')
+
+    # --- 多重計算の抑止 ---
+
+    def _acquire_lock(self, key, owner):
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache_lock (key, owner, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+            'WHERE cache_lock.expires <= ?',
+            (key, owner, now + self.lock_timeout, now),
+        )
+        return cursor.rowcount == 1
+
+    def _release_lock(self, key, owner):
+        self._connection().execute('DELETE FROM cache_lock WHERE key = ? AND owner = ?', (key, owner))
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """無ければ default() を計算して保存する。同じキーを計算中のプロセスがあれば結果を待つ。
+
+        ロック行は LOCK_TIMEOUT で失効するので、計算中に落ちたプロセスがいても待ち続けない。
+        """
+        value = self.get(key, _missing, version=version)
+        if value is not _missing:
+            return value
+        if self.read_only or not callable(default):
+            return super().get_or_set(key, default, timeout=timeout, version=version)
+
+        lock_key = self.make_and_validate_key(key, version=version)
+        owner = f'{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}'
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            if self._acquire_lock(lock_key, owner):
+                try:
+                    # 待っている間に他のプロセスが書き終えていればそれを使う
+                    value = self.get(key, _missing, version=version)
+                    if value is _missing:
+                        value = default()
+                        self.set(key, value, timeout=timeout, version=version)
+                    return value
+                finally:
+                    self._release_lock(lock_key, owner)
+            time.sleep(self.lock_poll)
+            value = self.get(key, _missing, version=version)
+            if value is not _missing:
+                return value
+            if time.monotonic() >= deadline:
+                logger.warning('Cache lock wait timed out; computing %s without the lock', key)
+                value = default()
+                self.set(key, value, timeout=timeout, version=version)
+                return value
+
+    # --- バンドル ---
+
+    def export_bundle(self):
+        """WAL を書き戻して 1 ファイルにまとめる。デプロイに同梱する前に呼ぶ。"""
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_lock')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.execute('VACUUM')
+        self.close_connections()
+
+
+def build_cache_bundle(names=None, *, alias='shared', output=None):
+    """CACHE_WARMERS の値を書いたバンドルを作り、(パス, {name: 件数}) を返す。
+
+    キーの作り方を揃えるため、alias の設定をそのまま使って書き込み先だけ差し替える。
+    """
+    params = dict(settings.CACHES[alias])
+    options = dict(params.get('OPTIONS', {}))
+    output = Path(output or options.get('BUNDLE') or '')
+    if not output.name:
+        raise ValueError(f'Cache alias {alias!r} has no BUNDLE path')
+    names = names or list(CACHE_WARMERS)
+    unknown = [name for name in names if name not in CACHE_WARMERS]
+    if unknown:
+        raise ValueError(f'Unknown cache warmer(s): {", ".join(unknown)}')
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output.with_name(f'.{output.name}.{os.getpid()}.tmp')
+    for suffix in ('', '-wal', '-shm'):
+        Path(f'{temp_path}{suffix}').unlink(missing_ok=True)
+    options.update({'MAX_BYTES': 0, 'READ_ONLY': False, 'BUNDLE': None})
+    params['OPTIONS'] = options
+    bundle_cache = SQLiteCache(str(temp_path), params)
+    counts = {name: import_string(CACHE_WARMERS[name])(bundle_cache) for name in names}
+    bundle_cache.export_bundle()
+    os.replace(temp_path, output)
+    return output, counts
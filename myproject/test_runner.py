@@ -0,0 +1,41 @@
+"""テスト実行用のランナー。
+
+プロセスの外に残るファイルキャッシュ (MarketBar のバーファイル、shared の SQLite キャッシュ) の
+置き場所を実行ごとの一時ディレクトリへ移し、前回の実行や他の開発者のファイルを読まないようにする。
+shared はデプロイ同梱のバンドル (失効しない) も読まない。
+"""
+
+import os
+import tempfile
+
+from django.conf import settings
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class IsolatedCacheDiscoverRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_root = tempfile.TemporaryDirectory(prefix='finance-test-')
+        self._cache_overrides = override_settings(**self.cache_settings(self._cache_root.name))
+        self._cache_overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_overrides.disable()
+        self._cache_root.cleanup()
+        super().teardown_test_environment(**kwargs)
+
+    def cache_settings(self, root):
+        shared = settings.CACHES['shared']
+        return {
+            'MARKET_BAR_CACHE_DIR': os.path.join(root, 'market-bars'),
+            'CACHES': {
+                **settings.CACHES,
+                'shared': {
+                    **shared,
+                    'LOCATION': os.path.join(root, 'shared-cache', 'cache.sqlite3'),
+                    'OPTIONS': {**shared.get('OPTIONS', {}), 'BUNDLE': None, 'READ_ONLY': False},
+                },
+            },
+        }
@@ -2,13 +2,19 @@ import json
 import os
 import sqlite3
 import tempfile
+from io import StringIO
 from pathlib import Path
 from unittest import mock
 
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db import OperationalError
 from django.test import SimpleTestCase, TestCase
 
+from benchmarks import runner as benchmark_runner
+from myproject import compiled_datasets, perf, sqlite_cache
 from myproject.auth import ensure_env_superuser
+from myproject.json_payload import json_default, to_json_safe, write_json_payload
 from myproject.settings import (
     BASE_DIR,
     bootstrap_sqlite_database,
@@ -74,6 +80,267 @@ class SQLiteBootstrapTests(SimpleTestCase):
                 )
 
 
+class TestRunnerIsolationTests(SimpleTestCase):
+    def test_market_bar_cache_dir_is_private_to_this_run(self):
+        from django.conf import settings
+
+        self.assertIn('finance-test-', settings.MARKET_BAR_CACHE_DIR)
+        self.assertNotEqual(
+            settings.MARKET_BAR_CACHE_DIR,
+            os.path.join(tempfile.gettempdir(), 'finance-market-bars'),
+        )
+
+    def test_shared_cache_is_private_to_this_run_and_ignores_the_bundle(self):
+        from django.conf import settings
+        from django.core.cache import caches
+
+        shared = settings.CACHES['shared']
+        self.assertIn('finance-test-', shared['LOCATION'])
+        self.assertIsNone(shared['OPTIONS']['BUNDLE'])
+        self.assertIsNone(caches['shared'].bundle_path)
+
+
+class JsonPayloadTests(SimpleTestCase):
+    def test_to_json_safe_matches_json_round_trip(self):
+        from datetime import date, datetime, timezone as dt_timezone
+        from decimal import Decimal
+
+        payload = {
+            'as_of': datetime(2026, 6, 25, 1, 15, tzinfo=dt_timezone.utc),
+            'rows': ({'date': date(2026, 6, 24), 'value': 1.5}, None),
+            1: True,
+            2.5: 'float-key',
+            None: [1, 'a', False],
+        }
+
+        expected = json.loads(json.dumps(payload, default=json_default))
+        self.assertEqual(to_json_safe(payload), expected)
+        self.assertEqual(to_json_safe({'value': Decimal('1.25')}), {'value': 1.25})
+
+    def test_write_json_payload_is_compact_unless_pretty_is_requested(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'nested' / 'payload.json'
+            with mock.patch.dict('os.environ', {'FINANCE_JSON_PRETTY': ''}):
+                write_json_payload(path, {'b': 1, 'a': [1, 2]})
+                compact = path.read_text(encoding='utf-8')
+            write_json_payload(path, {'b': 1, 'a': [1, 2]}, pretty=True)
+            pretty = path.read_text(encoding='utf-8')
+
+        self.assertEqual(compact, '{"b":1,"a":[1,2]}\n')
+        self.assertTrue(pretty.startswith('{\n  "a": ['))
+
+
+class CompiledDatasetTests(SimpleTestCase):
+    def setUp(self):
+        compiled_datasets.clear_compiled_datasets()
+        self.addCleanup(compiled_datasets.clear_compiled_datasets)
+
+    def test_csv_is_compiled_once_until_signature_changes(self):
+        calls = []
+
+        def builder(path):
+            calls.append(path)
+            return Path(path).read_text(encoding='utf-8').splitlines()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / 'data.csv'
+            csv_path.write_text('name\nalice\n', encoding='utf-8')
+            with mock.patch.dict('os.environ', {'COMPILED_DATASET_DIR': tmpdir}):
+                first = compiled_datasets.load_compiled_dataset('sample', csv_path, builder)
+                second = compiled_datasets.load_compiled_dataset('sample', csv_path, builder)
+                csv_path.write_text('name\nalice\nbob\n', encoding='utf-8')
+                third = compiled_datasets.load_compiled_dataset('sample', csv_path, builder)
+
+        self.assertIs(first, second)
+        self.assertEqual(third, ['name', 'alice', 'bob'])
+        self.assertEqual(len(calls), 2)
+
+    def test_prebuilt_artifact_skips_parsing_when_content_matches(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / 'prompt.csv'
+            csv_path.write_text('category,summary,jp,en,ai\n仕事,s,jp text,en text,gpt\n', encoding='utf-8')
+            with (
+                mock.patch.dict('os.environ', {'COMPILED_DATASET_DIR': tmpdir}),
+                mock.patch('prompt.views.prompt_csv_path', return_value=str(csv_path)),
+            ):
+                compiled_datasets.write_compiled_artifact('prompt')
+                builder = mock.Mock(side_effect=AssertionError('CSV should not be parsed'))
+                rows = compiled_datasets.load_compiled_dataset('prompt', csv_path, builder)
+
+                # 内容が変わった CSV には古い成果物を使わない
+                compiled_datasets.clear_compiled_datasets()
+                csv_path.write_text('category,summary,jp,en,ai\n医療,s2,jp2,en2,claude\n', encoding='utf-8')
+                stale_builder = mock.Mock(return_value=['rebuilt'])
+                rebuilt = compiled_datasets.load_compiled_dataset('prompt', csv_path, stale_builder)
+
+        self.assertEqual(rows[0]['category_emoji'], '💼')
+        self.assertEqual(rows[0]['target_ai'], 'gpt')
+        self.assertEqual(rebuilt, ['rebuilt'])
+
+    def test_build_command_rejects_unknown_dataset(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown dataset(s): missing'):
+            call_command('build_compiled_datasets', 'missing', stdout=StringIO())
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def _cache(self, tmpdir, **options):
+        cache = sqlite_cache.SQLiteCache(str(Path(tmpdir) / 'cache.sqlite3'), {'OPTIONS': options})
+        self.addCleanup(cache.close_connections)
+        return cache
+
+    def test_values_are_shared_between_instances_and_expire(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = self._cache(tmpdir)
+            reader = self._cache(tmpdir)
+            writer.set('pool', {'theme': [1, 2]}, 60)
+            writer.set('gone', 'x', -1)
+
+            self.assertEqual(reader.get('pool'), {'theme': [1, 2]})
+            self.assertIsNone(reader.get('gone'))
+            self.assertFalse(reader.add('pool', 'other'))
+            self.assertTrue(reader.add('gone', 'fresh'))
+            self.assertEqual(writer.get_many(['pool', 'gone', 'missing']), {'pool': {'theme': [1, 2]}, 'gone': 'fresh'})
+
+    def test_oldest_entries_are_evicted_past_max_bytes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = self._cache(tmpdir, MAX_BYTES=3500)
+            with mock.patch('myproject.sqlite_cache.time.time', side_effect=lambda: clock[0]):
+                clock = [1000.0]
+                for name in ('a', 'b', 'c'):
+                    cache.set(name, 'x' * 900, None)
+                    clock[0] += 100
+                cache.get('a')
+                cache.set('d', 'x' * 900, None)
+
+            self.assertEqual(set(cache.get_many(['a', 'b', 'c', 'd'])), {'a', 'c', 'd'})
+
+    def test_bundle_serves_keys_missing_from_the_local_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bundle = Path(tmpdir) / 'bundle.sqlite3'
+            caches = {'shared': {
+                'BACKEND': 'myproject.sqlite_cache.SQLiteCache',
+                'LOCATION': str(Path(tmpdir) / 'build.sqlite3'),
+                'OPTIONS': {'BUNDLE': str(bundle)},
+            }}
+
+            def warm(cache):
+                cache.set_many({'grouped': ['payload']}, None)
+                return 1
+
+            with (
+                self.settings(CACHES=caches),
+                mock.patch.dict(sqlite_cache.CACHE_WARMERS, {'sample': 'warm'}, clear=True),
+                mock.patch('myproject.sqlite_cache.import_string', return_value=warm),
+            ):
+                path, counts = sqlite_cache.build_cache_bundle()
+
+            self.assertEqual((path, counts), (bundle, {'sample': 1}))
+            self.assertFalse(Path(f'{bundle}-wal').exists())
+            read_only = sqlite_cache.SQLiteCache('', {'OPTIONS': {'BUNDLE': str(bundle)}})
+            self.addCleanup(read_only.close_connections)
+            local = self._cache(tmpdir, BUNDLE=str(bundle))
+            local.set('local', 1)
+
+            self.assertEqual(read_only.get('grouped'), ['payload'])
+            read_only.set('ignored', 1)
+            self.assertIsNone(read_only.get('ignored'))
+            self.assertEqual(local.get_many(['grouped', 'local']), {'grouped': ['payload'], 'local': 1})
+
+    def test_get_or_set_waits_for_the_process_holding_the_lock(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            holder = self._cache(tmpdir)
+            waiter = self._cache(tmpdir, LOCK_POLL=0.01, LOCK_TIMEOUT=5)
+            lock_key = holder.make_and_validate_key('pool')
+            self.assertTrue(holder._acquire_lock(lock_key, 'other-process'))
+
+            def finish_elsewhere(_seconds):
+                holder.set('pool', 'computed elsewhere')
+                holder._release_lock(lock_key, 'other-process')
+
+            compute = mock.Mock(return_value='computed here')
+            with mock.patch('myproject.sqlite_cache.time.sleep', side_effect=finish_elsewhere):
+                value = waiter.get_or_set('pool', compute)
+
+            self.assertEqual(value, 'computed elsewhere')
+            compute.assert_not_called()
+            self.assertEqual(waiter.get_or_set('fresh', compute), 'computed here')
+            self.assertEqual(holder.get('fresh'), 'computed here')
+
+
+class BenchmarkComparisonTests(SimpleTestCase):
+    def _payload(self, **timings):
+        return {
+            'version': benchmark_runner.RESULT_VERSION,
+            'results': {name: {'min_sec': value} for name, value in timings.items()},
+        }
+
+    def test_slowdowns_beyond_threshold_are_regressions(self):
+        rows = benchmark_runner.compare_results(
+            self._payload(adx=0.010, rsi=0.010, macd=0.010, dropped=0.5),
+            self._payload(adx=0.0125, rsi=0.011, macd=0.005, added=0.1),
+            threshold=0.15,
+        )
+
+        self.assertEqual(
+            {row['name']: row['status'] for row in rows},
+            {'adx': 'regression', 'rsi': 'ok', 'macd': 'improved', 'dropped': 'missing', 'added': 'new'},
+        )
+
+    def test_result_file_round_trips_and_rejects_other_versions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = benchmark_runner.write_results(self._payload(adx=0.01), Path(tmpdir) / 'nested' / 'run.json')
+            loaded = benchmark_runner.load_results(path)
+            path.write_text(json.dumps({'version': 0, 'results': {}}), encoding='utf-8')
+            with self.assertRaises(ValueError):
+                benchmark_runner.load_results(path)
+
+        self.assertEqual(loaded['results'], {'adx': {'min_sec': 0.01}})
+
+
+class PerfInstrumentationTests(TestCase):
+    def test_scope_records_queries_cache_http_and_spans(self):
+        import requests
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+
+        cache.set('perf-hit', 1)
+        response = requests.Response()
+        response.status_code = 200
+        with (
+            mock.patch('requests.adapters.HTTPAdapter.send', return_value=response),
+            perf.perf_scope() as recorder,
+        ):
+            with perf.span('lookup'):
+                User.objects.count()
+                User.objects.exists()
+            cache.get('perf-hit')
+            cache.get_many(['perf-hit', 'perf-miss'])
+            requests.get('https://example.com/quote')
+
+        summary = recorder.summary()
+        self.assertEqual(summary['queries'], 2)
+        self.assertEqual((summary['cache_hits'], summary['cache_misses']), (2, 1))
+        self.assertEqual(summary['http_calls'], 1)
+        self.assertEqual(summary['spans']['lookup']['count'], 1)
+        header = perf.server_timing_header(summary)
+        self.assertIn('db;dur=', header)
+        self.assertIn('lookup;dur=', header)
+        self.assertIn('http;dur=', header)
+
+    def test_middleware_reports_the_view_budget(self):
+        response = self.client.get('/sector/')
+        unbudgeted = self.client.get('/explanation/')
+
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertEqual(response.perf_summary['view'], 'sector.views.index')
+        self.assertEqual(response.perf_summary['query_budget'], 5)
+        perf.assert_within_query_budget(response)
+        with self.assertRaisesMessage(AssertionError, 'budget 0'):
+            perf.assert_within_query_budget(response, budget=0)
+        with self.assertRaisesMessage(AssertionError, 'declares no query budget'):
+            perf.assert_within_query_budget(unbudgeted)
+
+
 class RuntimeAdminProvisioningTests(TestCase):
     @mock.patch.dict(
         'os.environ',
@@ -5,6 +5,8 @@ from statistics import mean
 from django.conf import settings
 from django.shortcuts import render
 
+from myproject.compiled_datasets import load_compiled_dataset
+
 # Configuration
 DOMAIN_MAPPING = {
     'Macro': 'Macro',
@@ -92,9 +94,16 @@ def _format_average(value):
     return f"{rounded_value:.1f}"
 
 
+def person_csv_path():
+    return os.path.join(settings.BASE_DIR, 'static', 'person', 'data', 'person_data.csv')
+
+
 def fetch_and_process_data():
-    csv_path = os.path.join(settings.BASE_DIR, 'static', 'person', 'data', 'person_data.csv')
+    csv_path = person_csv_path()
+    return load_compiled_dataset('person', csv_path, compile_person_dataset)
+
 
+def compile_person_dataset(csv_path):
     if not os.path.exists(csv_path):
         print(f"CSV file not found at {csv_path}")
         return {}, [], []
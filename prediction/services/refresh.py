@@ -1,11 +1,12 @@
 """GDELT 取得→DB 保存の共通処理（ボタンとコマンドから利用）。"""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 from django.db import transaction
-from django.db.models import Max
+from django.db.models import Max, Q
 
 from ..models import SentimentArticle, SentimentObservation, SentimentTopic
 from .gdelt_client import GdeltApiError, fetch_topic_window
@@ -15,6 +16,8 @@ logger = logging.getLogger(__name__)
 SKIP_WINDOW_SEC = 300  # 5分
 ARTICLE_RETENTION_DAYS = 7
 MAX_ARTICLES_PER_TOPIC = 75
+ARTICLE_BULK_BATCH_SIZE = 200
+ARTICLE_UPDATE_FIELDS = ('title', 'published_at', 'domain', 'tone')
 
 
 def get_last_refresh_at() -> Optional[datetime]:
@@ -54,49 +57,87 @@ def _save_observation(topic: SentimentTopic, observation_date: date, aggregate:
     )
 
 
-def _save_articles(topic: SentimentTopic, articles: list):
+def _article_fields(article: dict) -> dict:
+    return {
+        'title': article.get('title', '')[:2000],
+        'published_at': article['published_at'],
+        'domain': (article.get('domain') or '')[:128],
+        'tone': article.get('tone'),
+    }
+
+
+def _save_articles(topic: SentimentTopic, articles: list) -> dict:
+    """既存 URL を一度だけ読み、新規は bulk_create・変更分は bulk_update する。
+
+    同じ URL が重複した場合は update_or_create と同じく後勝ちにする。
+    """
+    incoming = {}
     for article in articles:
         if not article.get('url') or article.get('published_at') is None:
             continue
-        SentimentArticle.objects.update_or_create(
-            topic=topic,
-            url=article['url'][:512],
-            defaults={
-                'title': article.get('title', '')[:2000],
-                'published_at': article['published_at'],
-                'domain': (article.get('domain') or '')[:128],
-                'tone': article.get('tone'),
-            },
-        )
+        incoming[article['url'][:512]] = _article_fields(article)
+    if not incoming:
+        return {'created': 0, 'updated': 0}
 
+    existing = {
+        row.url: row
+        for row in SentimentArticle.objects.filter(topic=topic, url__in=list(incoming))
+    }
+    to_create = []
+    to_update = []
+    for url, fields in incoming.items():
+        row = existing.get(url)
+        if row is None:
+            to_create.append(SentimentArticle(topic=topic, url=url, **fields))
+            continue
+        if any(getattr(row, name) != value for name, value in fields.items()):
+            for name, value in fields.items():
+                setattr(row, name, value)
+            to_update.append(row)
+    if to_create:
+        SentimentArticle.objects.bulk_create(to_create, batch_size=ARTICLE_BULK_BATCH_SIZE)
+    if to_update:
+        SentimentArticle.objects.bulk_update(
+            to_update, ARTICLE_UPDATE_FIELDS, batch_size=ARTICLE_BULK_BATCH_SIZE,
+        )
+    return {'created': len(to_create), 'updated': len(to_update)}
 
-def _purge_old_articles(topic: SentimentTopic, now: datetime):
-    cutoff = now - timedelta(days=ARTICLE_RETENTION_DAYS)
-    SentimentArticle.objects.filter(
-        topic=topic, published_at__lt=cutoff,
-    ).delete()
 
+def _purge_old_articles(refreshed) -> int:
+    """保持期間を過ぎた記事を消す。refreshed は (トピック, 取得時刻) の並び。
 
-def refresh_topic(topic: SentimentTopic) -> dict:
-    """1トピックを GDELT から取得し DB に保存。"""
-    now = datetime.now(timezone.utc)
-    window = fetch_topic_window(
+    トピックごとの基準時刻で、対象トピックまとめて1回の DELETE にする。
+    """
+    condition = Q()
+    for topic, fetched_at in refreshed:
+        condition |= Q(topic_id=topic.pk, published_at__lt=fetched_at - timedelta(days=ARTICLE_RETENTION_DAYS))
+    if not condition:
+        return 0
+    deleted, _ = SentimentArticle.objects.filter(condition).delete()
+    return deleted
+
+
+def _fetch_topic(topic: SentimentTopic) -> dict:
+    # 取得期間の終端はトピックごとに取得開始時の現在時刻にする
+    return fetch_topic_window(
         topic.query,
         days=1,
         max_records=MAX_ARTICLES_PER_TOPIC,
-        end=now,
+        end=datetime.now(timezone.utc),
     )
+
+
+def _store_topic_window(topic: SentimentTopic, window: dict) -> dict:
     aggregate = {
         'articles_count': window['articles_count'],
         'tone_avg': window['tone_avg'],
         'tone_min': window['tone_min'],
         'tone_max': window['tone_max'],
     }
-    today = now.date()
+    today = window['end'].date()
     with transaction.atomic():
         _save_observation(topic, today, aggregate)
         _save_articles(topic, window['articles'])
-        _purge_old_articles(topic, now)
     return {
         'topic': topic.slug,
         'observation_date': today.isoformat(),
@@ -105,6 +146,14 @@ def refresh_topic(topic: SentimentTopic) -> dict:
     }
 
 
+def refresh_topic(topic: SentimentTopic) -> dict:
+    """1トピックを GDELT から取得し DB に保存。"""
+    window = _fetch_topic(topic)
+    result = _store_topic_window(topic, window)
+    _purge_old_articles([(topic, window['end'])])
+    return result
+
+
 def refresh_all_topics(force: bool = False) -> dict:
     """全アクティブトピックを更新。5分以内は force=False ならスキップ。"""
     now = datetime.now(timezone.utc)
@@ -121,17 +170,32 @@ def refresh_all_topics(force: bool = False) -> dict:
 
     success = []
     failed = []
-    for topic in SentimentTopic.objects.filter(is_active=True).order_by(
-        'display_order', 'slug',
-    ):
-        try:
-            success.append(refresh_topic(topic))
-        except GdeltApiError as exc:
-            logger.warning("GDELT refresh failed for %s: %s", topic.slug, exc)
-            failed.append({'topic': topic.slug, 'error': str(exc)})
-        except Exception as exc:
-            logger.exception("Unexpected error on topic %s", topic.slug)
-            failed.append({'topic': topic.slug, 'error': str(exc)})
+    refreshed_topics = []
+    topics = list(
+        SentimentTopic.objects.filter(is_active=True).order_by('display_order', 'slug')
+    )
+    # GDELT 取得は1本のワーカースレッドで順番に行い（間隔制御はそのまま）、
+    # トピック N の DB 保存中に N+1 のレート制限待ちと HTTP を進める。
+    # DB 書き込みは呼び出し元スレッドだけで行う。
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='gdelt-fetch') as executor:
+        pending = executor.submit(_fetch_topic, topics[0]) if topics else None
+        for index, topic in enumerate(topics):
+            current = pending
+            pending = (
+                executor.submit(_fetch_topic, topics[index + 1])
+                if index + 1 < len(topics) else None
+            )
+            try:
+                window = current.result()
+                success.append(_store_topic_window(topic, window))
+                refreshed_topics.append((topic, window['end']))
+            except GdeltApiError as exc:
+                logger.warning("GDELT refresh failed for %s: %s", topic.slug, exc)
+                failed.append({'topic': topic.slug, 'error': str(exc)})
+            except Exception as exc:
+                logger.exception("Unexpected error on topic %s", topic.slug)
+                failed.append({'topic': topic.slug, 'error': str(exc)})
+    _purge_old_articles(refreshed_topics)
 
     return {
         'skipped': False,
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import SentimentArticle, SentimentObservation, SentimentTopic
+from .services import refresh
+from .services.gdelt_client import GdeltApiError
+
+
+FETCHED_AT = datetime(2026, 6, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def _article(url, title='記事', hours_ago=1, tone=-2.0, domain='example.com'):
+    return {
+        'url': url,
+        'title': title,
+        'published_at': FETCHED_AT - timedelta(hours=hours_ago),
+        'domain': domain,
+        'tone': tone,
+    }
+
+
+def _window(articles, end=FETCHED_AT):
+    return {
+        'start': end - timedelta(days=1),
+        'end': end,
+        'articles': articles,
+        'articles_count': len(articles),
+        'tone_avg': -1.5,
+        'tone_min': -4.0,
+        'tone_max': 1.0,
+        'daily_tone': [],
+    }
+
+
+class SaveArticlesTests(TestCase):
+    def setUp(self):
+        self.topic = SentimentTopic.objects.create(
+            slug='inflation', name_ja='インフレ', category=SentimentTopic.Category.INFLATION, query='inflation',
+        )
+
+    def test_creates_new_rows_and_updates_changed_rows(self):
+        refresh._save_articles(self.topic, [_article('https://a.example/1'), _article('https://a.example/2')])
+
+        result = refresh._save_articles(self.topic, [
+            _article('https://a.example/1', title='改題'),
+            _article('https://a.example/2'),
+            _article('https://a.example/3'),
+        ])
+
+        self.assertEqual(result, {'created': 1, 'updated': 1})
+        self.assertEqual(SentimentArticle.objects.filter(topic=self.topic).count(), 3)
+        self.assertEqual(SentimentArticle.objects.get(url='https://a.example/1').title, '改題')
+
+    def test_duplicate_url_in_one_batch_keeps_last_row(self):
+        result = refresh._save_articles(self.topic, [
+            _article('https://a.example/1', title='先', tone=-1.0),
+            _article('https://a.example/1', title='後', tone=-3.0),
+        ])
+
+        self.assertEqual(result, {'created': 1, 'updated': 0})
+        article = SentimentArticle.objects.get(url='https://a.example/1')
+        self.assertEqual((article.title, article.tone), ('後', -3.0))
+
+    def test_unchanged_articles_are_not_written(self):
+        articles = [_article('https://a.example/1'), _article('https://a.example/2')]
+        refresh._save_articles(self.topic, articles)
+
+        with CaptureQueriesContext(connection) as query_context:
+            result = refresh._save_articles(self.topic, articles)
+
+        self.assertEqual(result, {'created': 0, 'updated': 0})
+        self.assertEqual(len(query_context.captured_queries), 1)
+
+
+class RefreshAllTopicsTests(TestCase):
+    def setUp(self):
+        self.topics = [
+            SentimentTopic.objects.create(
+                slug=slug, name_ja=slug, category=SentimentTopic.Category.FED, query=slug, display_order=order,
+            )
+            for order, slug in enumerate(('fed', 'war', 'recession'))
+        ]
+
+    def test_failed_topic_is_recorded_and_other_topics_continue(self):
+        windows = {
+            'fed': _window([_article('https://a.example/fed')]),
+            'recession': _window([_article('https://a.example/recession')]),
+        }
+
+        def fetch(query, **kwargs):
+            if query == 'war':
+                raise GdeltApiError('rate limited')
+            return windows[query]
+
+        with mock.patch.object(refresh, 'fetch_topic_window', side_effect=fetch), \
+                self.assertLogs('prediction.services.refresh', level='WARNING'):
+            result = refresh.refresh_all_topics(force=True)
+
+        self.assertEqual([row['topic'] for row in result['success']], ['fed', 'recession'])
+        self.assertEqual(result['failed'], [{'topic': 'war', 'error': 'rate limited'}])
+        self.assertEqual(
+            set(SentimentObservation.objects.values_list('topic__slug', flat=True)),
+            {'fed', 'recession'},
+        )
+        self.assertEqual(SentimentArticle.objects.count(), 2)
+
+    def test_each_topic_fetches_with_its_own_end(self):
+        def fetch(query, **kwargs):
+            return _window([], kwargs['end'])
+
+        with mock.patch.object(refresh, 'fetch_topic_window', side_effect=fetch) as fetch_mock:
+            refresh.refresh_all_topics(force=True)
+
+        ends = [call.kwargs['end'] for call in fetch_mock.call_args_list]
+        self.assertEqual(len(ends), 3)
+        self.assertEqual(ends, sorted(ends))
+        self.assertTrue(all(end.tzinfo is not None for end in ends))
+
+    def test_purge_only_touches_refreshed_topics(self):
+        fed, war, _ = self.topics
+        for topic in (fed, war):
+            SentimentArticle.objects.create(
+                topic=topic,
+                url=f'https://old.example/{topic.slug}',
+                title='古い記事',
+                published_at=FETCHED_AT - timedelta(days=refresh.ARTICLE_RETENTION_DAYS + 1),
+            )
+
+        def fetch(query, **kwargs):
+            if query == 'war':
+                raise GdeltApiError('timeout')
+            return _window([])
+
+        with mock.patch.object(refresh, 'fetch_topic_window', side_effect=fetch), \
+                self.assertLogs('prediction.services.refresh', level='WARNING'):
+            refresh.refresh_all_topics(force=True)
+
+        self.assertEqual(
+            list(SentimentArticle.objects.values_list('url', flat=True)),
+            ['https://old.example/war'],
+        )
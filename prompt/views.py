@@ -5,13 +5,25 @@ from django.conf import settings
 import os
 from django.utils.text import Truncator  # 追加: 文字列を切り詰めるためのユーティリティ
 
+from myproject.compiled_datasets import load_compiled_dataset
+
+
+def prompt_csv_path():
+    return os.path.join(settings.STATICFILES_DIRS[0], 'prompt/data/prompt_data.csv')
+
 
 def index(request):
     """
     CSVからプロンプトデータを読み込み、表示する
     """
-    data_file_path = os.path.join(settings.STATICFILES_DIRS[0], 'prompt/data/prompt_data.csv')
+    prompt_data = load_compiled_dataset('prompt', prompt_csv_path(), compile_prompt_dataset)
+    return render(request, 'prompt/index.html', {'prompt_data': prompt_data})
 
+
+def compile_prompt_dataset(data_file_path):
+    """
+    CSV を表示用の行リストに変換する (CSV が変わるまで使い回される)
+    """
     prompt_data = []
 
     try:
@@ -61,4 +73,4 @@ def index(request):
         traceback.print_exc()
         # その他の例外に対するエラーハンドリング
 
-    return render(request, 'prompt/index.html', {'prompt_data': prompt_data})
\ No newline at end of file
+    return prompt_data
\ No newline at end of file
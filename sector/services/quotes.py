@@ -0,0 +1,188 @@
+"""セクター更新ボタン用の相場取得をまとめて並列で行う。
+
+Yahoo Finance の 15 銘柄と JPX の TOPIX-17 を1つの接続プールから同時に取りに行き、
+全体の締め切りを過ぎた銘柄は取得失敗として扱う（呼び出し側で保存済みの値に戻す）。
+直近に取れた相場セットは短時間キャッシュし、連打された更新は1回の取得にまとめる。
+キャッシュは銘柄ごとに取得時刻を持ち、古くなった銘柄と失敗した銘柄だけを取り直して足し込む。
+失敗した銘柄は短い間隔を空けてから取り直す（上流が不調なときに全銘柄を取り直さない）。
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+JPX_INDICES_URL = "https://www.jpx.co.jp/market/indices/e_indices_stock_price3.txt"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+REQUEST_TIMEOUT_SEC = 10
+QUOTE_DEADLINE_SEC = 12
+QUOTE_CACHE_KEY = 'sector_quote_set_v1'
+QUOTE_CACHE_TTL_SEC = 60
+QUOTE_FAILURE_RETRY_SEC = 15
+MAX_WORKERS = 16
+
+_session = None
+_session_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def get_session():
+    """スレッド間で共有する接続プール付きセッション。"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.headers.update({'User-Agent': USER_AGENT})
+            _session = session
+        return _session
+
+
+def fetch_yahoo_quote(ticker, session=None):
+    """(現在値, 前日比, 前日比%) を返す。取れなければ (None, None, None)。"""
+    try:
+        response = (session or get_session()).get(
+            YAHOO_CHART_URL.format(ticker=ticker),
+            timeout=REQUEST_TIMEOUT_SEC,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
+            meta = data['chart']['result'][0]['meta']
+            current_price = meta.get('regularMarketPrice', 0)
+            previous_close = meta.get('previousClose', current_price)
+            change_abs = current_price - previous_close
+            change_pct = (change_abs / previous_close * 100) if previous_close != 0 else 0
+            return current_price, change_abs, change_pct
+
+        return None, None, None
+    except Exception:
+        logger.exception("Failed to fetch Yahoo Finance data for %s", ticker)
+        return None, None, None
+
+
+def fetch_jpx_indices(session=None):
+    """JPX の業種別指数（IndustryTypeStockIndex）を返す。失敗時は空 dict。"""
+    try:
+        response = (session or get_session()).get(JPX_INDICES_URL, timeout=REQUEST_TIMEOUT_SEC)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("IndustryTypeStockIndex") or {}
+    except Exception:
+        logger.exception("Failed to fetch JPX data")
+        return {}
+
+
+def fetch_quote_set(tickers, *, include_jpx=True, deadline=QUOTE_DEADLINE_SEC):
+    """全銘柄を同時に取得する。締め切りまでに返らなかった銘柄は None で埋める。"""
+    tickers = list(dict.fromkeys(tickers))
+    session = get_session()
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(MAX_WORKERS, len(tickers) + int(include_jpx))),
+        thread_name_prefix='sector-quote',
+    )
+    started = time.monotonic()
+    try:
+        # ワーカーでも呼び出し元の perf_scope などが見えるよう、文脈を写して呼ぶ
+        futures = {
+            executor.submit(contextvars.copy_context().run, fetch_yahoo_quote, ticker, session): ticker
+            for ticker in tickers
+        }
+        jpx_future = (
+            executor.submit(contextvars.copy_context().run, fetch_jpx_indices, session)
+            if include_jpx else None
+        )
+        pending = set(futures) | ({jpx_future} if jpx_future else set())
+        done, not_done = wait(pending, timeout=deadline)
+    finally:
+        # 締め切り超過分は待たずに返す（各リクエストは自身の timeout で終わる）
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    quotes = {}
+    for future, ticker in futures.items():
+        quotes[ticker] = future.result() if future in done else (None, None, None)
+    jpx = jpx_future.result() if jpx_future in done else {}
+    timed_out = sorted(futures[future] for future in not_done if future in futures)
+    if jpx_future is not None and jpx_future in not_done:
+        timed_out.append('JPX')
+    if timed_out:
+        logger.warning("[sector] quote fetch deadline exceeded: %s", ', '.join(timed_out))
+    return {
+        'yahoo': quotes,
+        'jpx': jpx,
+        'include_jpx': include_jpx,
+        'timed_out': timed_out,
+        'elapsed_sec': round(time.monotonic() - started, 3),
+    }
+
+
+def get_quote_set(tickers, *, include_jpx=True, deadline=QUOTE_DEADLINE_SEC, ttl=QUOTE_CACHE_TTL_SEC):
+    """直近の相場セットを返す。TTL 内の銘柄はキャッシュを使い、古い銘柄と失敗した銘柄だけ取り直す。
+
+    取得に失敗した銘柄は QUOTE_FAILURE_RETRY_SEC の間は取り直さない。同時の更新要求は1回の取得に合流させる。
+    """
+    tickers = list(dict.fromkeys(tickers))
+    cached = cache.get(QUOTE_CACHE_KEY)
+    stale_tickers, need_jpx = _stale_parts(cached, tickers, include_jpx, ttl)
+    if not stale_tickers and not need_jpx:
+        return cached
+    with _refresh_lock:
+        # 待っている間に別リクエストが取得を終えていればそれを使う
+        cached = cache.get(QUOTE_CACHE_KEY)
+        stale_tickers, need_jpx = _stale_parts(cached, tickers, include_jpx, ttl)
+        if not stale_tickers and not need_jpx:
+            return cached
+        fetched = fetch_quote_set(stale_tickers, include_jpx=need_jpx, deadline=deadline)
+        quote_set = _merge_quote_set(cached, fetched)
+        cache.set(QUOTE_CACHE_KEY, quote_set, ttl)
+        return quote_set
+
+
+def _now():
+    return time.time()
+
+
+def _stale_parts(cached, tickers, include_jpx, ttl):
+    """取り直しが要る銘柄と、JPX を取り直すかを返す。"""
+    if not isinstance(cached, dict):
+        return tickers, include_jpx
+    fetched_at = cached.get('fetched_at') or {}
+    now = _now()
+
+    def is_stale(key, ok):
+        if key not in fetched_at:
+            return True
+        return now - fetched_at[key] >= (ttl if ok else QUOTE_FAILURE_RETRY_SEC)
+
+    yahoo = cached.get('yahoo') or {}
+    stale_tickers = [
+        ticker for ticker in tickers
+        if is_stale(ticker, (yahoo.get(ticker) or (None,))[0] is not None)
+    ]
+    need_jpx = include_jpx and is_stale('JPX', bool(cached.get('jpx')))
+    return stale_tickers, need_jpx
+
+
+def _merge_quote_set(cached, fetched):
+    now = _now()
+    cached = cached if isinstance(cached, dict) else {}
+    merged = {
+        **fetched,
+        'yahoo': {**(cached.get('yahoo') or {}), **fetched['yahoo']},
+        'jpx': fetched['jpx'] if fetched['include_jpx'] else cached.get('jpx') or {},
+        'include_jpx': fetched['include_jpx'] or bool(cached.get('include_jpx')),
+        'fetched_at': {**(cached.get('fetched_at') or {}), **{ticker: now for ticker in fetched['yahoo']}},
+    }
+    if fetched['include_jpx']:
+        merged['fetched_at']['JPX'] = now
+    return merged
@@ -1,7 +1,16 @@
+import threading
+from unittest import mock
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
+from myproject.perf import assert_within_query_budget, perf_scope
+
+from .services import quotes
+from .views import get_benchmark_data_real
+
 
 class SectorRefreshSecurityTests(TestCase):
     def test_anonymous_refresh_is_forbidden(self):
@@ -17,6 +26,7 @@ class SectorRefreshSecurityTests(TestCase):
         response = self.client.get(reverse('sector:index'))
 
         self.assertNotContains(response, 'id="refresh-btn"')
+        assert_within_query_budget(response)
 
     def test_refresh_button_is_hidden_for_staff_users(self):
         user = User.objects.create_user(
@@ -73,3 +83,116 @@ class SectorRefreshSecurityTests(TestCase):
         )
 
         self.assertEqual(response.status_code, 400)
+
+
+class SectorQuoteFetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_quote_set_fetches_concurrently_and_times_out_slow_tickers(self):
+        release = threading.Event()
+
+        def fake_quote(ticker, session=None):
+            if ticker == 'SLOW':
+                release.wait(2)
+                return 1.0, 0.0, 0.0
+            return 100.0, 1.0, 1.0
+
+        with (
+            mock.patch.object(quotes, 'fetch_yahoo_quote', side_effect=fake_quote),
+            mock.patch.object(quotes, 'fetch_jpx_indices', return_value={'Topix17Food': {}}),
+        ):
+            quote_set = quotes.fetch_quote_set(['XLK', 'SLOW', 'XLK'], deadline=0.2)
+        release.set()
+
+        self.assertEqual(quote_set['yahoo']['XLK'], (100.0, 1.0, 1.0))
+        self.assertEqual(quote_set['yahoo']['SLOW'], (None, None, None))
+        self.assertEqual(quote_set['timed_out'], ['SLOW'])
+        self.assertEqual(quote_set['jpx'], {'Topix17Food': {}})
+
+    def test_worker_thread_requests_are_counted_by_perf_scope(self):
+        import requests
+
+        def fake_send(request, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{}'
+            response.request = request
+            return response
+
+        with (
+            mock.patch('requests.adapters.HTTPAdapter.send', side_effect=fake_send),
+            perf_scope() as recorder,
+        ):
+            quotes.fetch_quote_set(['XLK', 'XLF'])
+
+        self.assertEqual(recorder.http_calls, 3)
+
+    def test_repeated_refreshes_reuse_cached_quote_set(self):
+        with (
+            mock.patch.object(quotes, 'fetch_yahoo_quote', return_value=(100.0, 1.0, 1.0)) as fetch_quote,
+            mock.patch.object(quotes, 'fetch_jpx_indices', return_value={'Topix17Food': {}}),
+        ):
+            first = quotes.get_quote_set(['XLK', 'XLF'])
+            second = quotes.get_quote_set(['XLF'])
+
+        self.assertEqual(fetch_quote.call_count, 2)
+        self.assertEqual(first['yahoo'], second['yahoo'])
+
+    def test_failed_tickers_are_retried_alone_after_short_delay(self):
+        results = {'XLK': [(100.0, 1.0, 1.0)], 'XLF': [(None, None, None), (40.0, 0.5, 1.2)]}
+        clock = [1000.0]
+
+        def fake_quote(ticker, session=None):
+            return results[ticker].pop(0)
+
+        with (
+            mock.patch.object(quotes, '_now', side_effect=lambda: clock[0]),
+            mock.patch.object(quotes, 'fetch_yahoo_quote', side_effect=fake_quote) as fetch_quote,
+            mock.patch.object(quotes, 'fetch_jpx_indices', return_value={'Topix17Food': {}}) as fetch_jpx,
+        ):
+            first = quotes.get_quote_set(['XLK', 'XLF'])
+            clock[0] += quotes.QUOTE_FAILURE_RETRY_SEC - 1
+            # 失敗した銘柄があっても、すぐには取り直さない
+            second = quotes.get_quote_set(['XLK', 'XLF'])
+            clock[0] += 1
+            third = quotes.get_quote_set(['XLK', 'XLF'])
+
+        self.assertEqual(first['yahoo']['XLF'], (None, None, None))
+        self.assertEqual(second['yahoo'], first['yahoo'])
+        # 取り直すのは失敗した XLF だけで、XLK と JPX はキャッシュのまま
+        self.assertEqual([call.args[0] for call in fetch_quote.call_args_list], ['XLK', 'XLF', 'XLF'])
+        self.assertEqual(fetch_jpx.call_count, 1)
+        self.assertEqual(third['yahoo'], {'XLK': (100.0, 1.0, 1.0), 'XLF': (40.0, 0.5, 1.2)})
+        self.assertEqual(third['jpx'], {'Topix17Food': {}})
+
+    def test_successful_quotes_expire_after_cache_ttl(self):
+        clock = [1000.0]
+
+        with (
+            mock.patch.object(quotes, '_now', side_effect=lambda: clock[0]),
+            mock.patch.object(quotes, 'fetch_yahoo_quote', return_value=(100.0, 1.0, 1.0)) as fetch_quote,
+            mock.patch.object(quotes, 'fetch_jpx_indices', return_value={'Topix17Food': {}}) as fetch_jpx,
+        ):
+            quotes.get_quote_set(['XLK'])
+            clock[0] += quotes.QUOTE_CACHE_TTL_SEC - 1
+            quotes.get_quote_set(['XLK'])
+            clock[0] += 1
+            quotes.get_quote_set(['XLK'])
+
+        self.assertEqual(fetch_quote.call_count, 2)
+        self.assertEqual(fetch_jpx.call_count, 2)
+
+    def test_refresh_falls_back_per_ticker_when_quote_is_missing(self):
+        quote_set = {
+            'yahoo': {'^N225': (40000.0, 100.0, 0.25), '^DJI': (None, None, None)},
+            'jpx': {},
+        }
+        fallback = [{'sector': 'Dow Jones', 'current': 1.0, 'change': 2.0, 'change_pct': 3.0}]
+
+        rows = get_benchmark_data_real(fallback_benchmarks=fallback, quote_set=quote_set)
+
+        self.assertEqual(
+            [(row['sector'], row['current']) for row in rows],
+            [('Nikkei 225', 40000.0), ('Dow Jones', 1.0)],
+        )
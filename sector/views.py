@@ -7,9 +7,10 @@ from django.core.cache import cache
 from django.db.utils import DatabaseError, OperationalError, ProgrammingError
 from datetime import datetime, timezone, timedelta
 from .models import SectorSnapshot
+from .services.quotes import get_quote_set
 from myproject.auth import is_creator_user
+from myproject.perf import query_budget, span
 import json
-import requests
 
 logger = logging.getLogger(__name__)
 
@@ -58,61 +59,23 @@ TOPIX17_SECTORS = {
     "不動産": {"icon": "🏠", "color": "#82E0AA", "jpx_key": "Topix17RealEstate"},
 }
 
-def fetch_jpx_data():
-    """Fetch real TOPIX-17 data from JPX"""
-    try:
-        url = "https://www.jpx.co.jp/market/indices/e_indices_stock_price3.txt"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract IndustryTypeStockIndex section
-        if "IndustryTypeStockIndex" in data:
-            return data["IndustryTypeStockIndex"]
-        return {}
-    except Exception:
-        logger.exception("Failed to fetch JPX data")
-        return {}
-
-def fetch_yahoo_finance_data(ticker: str):
-    """Fetch real data from Yahoo Finance using their API"""
-    try:
-        # Yahoo Finance API endpoint
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-            result = data['chart']['result'][0]
-            meta = result['meta']
-            
-            current_price = meta.get('regularMarketPrice', 0)
-            previous_close = meta.get('previousClose', current_price)
-            
-            change_abs = current_price - previous_close
-            change_pct = (change_abs / previous_close * 100) if previous_close != 0 else 0
-            
-            return current_price, change_abs, change_pct
-        
-        return None, None, None
-    except Exception:
-        logger.exception("Failed to fetch Yahoo Finance data for %s", ticker)
-        return None, None, None
+def fetch_refresh_quotes():
+    """Fetch every SPDR/benchmark quote and the JPX indices concurrently"""
+    tickers = [data["ticker"] for data in SPDR_TICKERS.values()]
+    tickers += [data["ticker"] for data in BENCHMARKS.values()]
+    return get_quote_set(tickers, include_jpx=True)
 
-def get_sector_data_real(fallback_sectors=None):
+def get_sector_data_real(fallback_sectors=None, quote_set=None):
     """Get real sector data for refresh button"""
     sectors = []
     fallback_sectors = fallback_sectors or []
+    quote_set = quote_set or fetch_refresh_quotes()
+    quotes = quote_set.get('yahoo') or {}
     
     # US SPDR sectors - fetch real data from Yahoo Finance
     for sector, data in SPDR_TICKERS.items():
         ticker = data["ticker"]
-        price, change, pct = fetch_yahoo_finance_data(ticker)
+        price, change, pct = quotes.get(ticker) or (None, None, None)
         
         # Fallback: try to get persisted data first
         if price is None or change is None or pct is None:
@@ -135,7 +98,7 @@ def get_sector_data_real(fallback_sectors=None):
         })
     
     # JP TOPIX-17 sectors - fetch real data from JPX
-    jpx_data = fetch_jpx_data()
+    jpx_data = quote_set.get('jpx') or {}
     for sector, data in TOPIX17_SECTORS.items():
         jpx_key = data["jpx_key"]
         current_price = None
@@ -172,13 +135,14 @@ def get_sector_data_real(fallback_sectors=None):
     
     return sectors
 
-def get_benchmark_data_real(fallback_benchmarks=None):
+def get_benchmark_data_real(fallback_benchmarks=None, quote_set=None):
     """Get real benchmark data for refresh button"""
     benchmarks = []
     fallback_benchmarks = fallback_benchmarks or []
+    quotes = (quote_set or fetch_refresh_quotes()).get('yahoo') or {}
     for name, data in BENCHMARKS.items():
         ticker = data["ticker"]
-        price, change, pct = fetch_yahoo_finance_data(ticker)
+        price, change, pct = quotes.get(ticker) or (None, None, None)
         
         # Fallback: try to get persisted data first
         if price is None or change is None or pct is None:
@@ -282,6 +246,7 @@ def persist_snapshot(sectors, benchmarks, update_time):
     except (OperationalError, ProgrammingError, DatabaseError):
         logger.exception("[sector] DB write failed, skip snapshot")
 
+@query_budget(5)
 @ensure_csrf_cookie
 def index(request):
     if request.method == 'POST':
@@ -292,8 +257,10 @@ def index(request):
             data = json.loads(request.body)
             if data.get('action') == 'refresh':
                 fallback_sectors, fallback_benchmarks = get_fallback_data()
-                sectors = get_sector_data_real(fallback_sectors=fallback_sectors)
-                benchmarks = get_benchmark_data_real(fallback_benchmarks=fallback_benchmarks)
+                with span('sector_quotes'):
+                    quote_set = fetch_refresh_quotes()
+                sectors = get_sector_data_real(fallback_sectors=fallback_sectors, quote_set=quote_set)
+                benchmarks = get_benchmark_data_real(fallback_benchmarks=fallback_benchmarks, quote_set=quote_set)
                 update_time = datetime.now(TZ_JST).strftime("%Y年%m月%d日 %H:%M:%S")
                 
                 # Cache the new data